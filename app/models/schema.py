@@ -197,6 +197,9 @@ class VideoClipParams(BaseModel):
     original_volume: Optional[float] = Field(default=AudioVolumeDefaults.ORIGINAL_VOLUME, description="视频原声音量")
     bgm_volume: Optional[float] = Field(default=AudioVolumeDefaults.BGM_VOLUME, description="背景音乐音量")
 
+    draft: bool = Field(default=False, description="草稿模式：从低分辨率代理快速渲染预览，时间轴与成片一致")
+    incremental: bool = Field(default=False, description="增量渲染：只重新生成与上一次渲染相比有变化的片段")
+
 
 
 
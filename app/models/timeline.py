@@ -0,0 +1,250 @@
+"""
+剪辑时间轴模型
+
+脚本中的时间以 "HH:MM:SS,mmm-HH:MM:SS,mmm" 字符串传递，过去 TTS、裁剪、音频合并和字幕合并
+各自解析一遍，裁剪结果还要编码进文件名再解析回来，成片时间（editedTimeRange）只精确到秒，
+按浮点秒数累加片段时长在长视频中会产生累计误差。
+
+这里在加载脚本时一次性解析为整数毫秒的 Segment，整个流水线共用同一个 Timeline：
+TTS 写入配音时长，裁剪写入实际裁剪的结束时间，合并阶段直接使用按整数毫秒累加的成片位置。
+to_script() 输出与原有脚本字典兼容的结构（sourceTimeRange / duration / editedTimeRange 等字段）。
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from loguru import logger
+
+MS_PER_SECOND = 1000
+
+
+def parse_time_ms(time_str: str) -> int:
+    """
+    把时间字符串转换为整数毫秒
+
+    支持 HH:MM:SS,mmm、HH:MM:SS.mmm、MM:SS,mmm、SS,mmm 以及不带毫秒的形式
+
+    Raises:
+        ValueError: 格式无效
+    """
+    text = str(time_str).strip().replace(".", ",")
+    if "," in text:
+        text, fraction = text.split(",", 1)
+        if not fraction.isdigit():
+            raise ValueError(f"无效的时间: {time_str}")
+        # 按小数处理：",5" 表示 500 毫秒
+        ms = int(fraction.ljust(3, "0")[:3])
+    else:
+        ms = 0
+    parts = text.split(":")
+    if not 1 <= len(parts) <= 3:
+        raise ValueError(f"无效的时间: {time_str}")
+    seconds = 0
+    for part in parts:
+        seconds = seconds * 60 + int(part)
+    return seconds * MS_PER_SECOND + ms
+
+
+def format_time_ms(ms: int, separator: str = ",") -> str:
+    """把整数毫秒格式化为 HH:MM:SS,mmm（ffmpeg 参数使用 separator="."）"""
+    ms = max(0, int(ms))
+    hours, rest = divmod(ms, 3600 * MS_PER_SECOND)
+    minutes, rest = divmod(rest, 60 * MS_PER_SECOND)
+    seconds, millis = divmod(rest, MS_PER_SECOND)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{millis:03d}"
+
+
+def parse_range_ms(timestamp: str) -> Tuple[int, int]:
+    """
+    解析 "开始-结束" 或 "开始 --> 结束" 形式的时间段
+
+    Raises:
+        ValueError: 格式无效
+    """
+    separator = "-->" if "-->" in timestamp else "-"
+    parts = timestamp.split(separator)
+    if len(parts) != 2:
+        raise ValueError(f"无效的时间段: {timestamp}")
+    return parse_time_ms(parts[0]), parse_time_ms(parts[1])
+
+
+def format_range_ms(start: int, end: int) -> str:
+    """把时间段格式化为 HH:MM:SS,mmm-HH:MM:SS,mmm"""
+    return f"{format_time_ms(start)}-{format_time_ms(end)}"
+
+
+class Segment:
+    """
+    时间轴上的一个片段，所有时间均为整数毫秒
+
+    Attributes:
+        id: 脚本中的 _id
+        ost: 原声类型（0: 仅解说, 1: 仅原声, 2: 解说+原声）
+        source_start / source_end: 脚本指定的原视频时间段
+        tts_duration: 配音时长，TTS 完成后写入
+        clip_end: 实际裁剪的结束时间（原视频时间），裁剪完成后写入
+        edited_start: 片段在成片中的开始时间，由 Timeline.layout() 计算
+        audio / subtitle / video: 配音、字幕和裁剪片段的文件路径
+        item: 原始脚本字典
+    """
+
+    __slots__ = (
+        "id", "ost", "source_start", "source_end", "tts_duration", "clip_end",
+        "edited_start", "audio", "subtitle", "video", "item",
+    )
+
+    def __init__(self, item: Dict[str, Any], resume: bool = False):
+        self.item = item
+        self.id = item.get("_id")
+        self.ost = item.get("OST", 0)
+        try:
+            self.source_start, self.source_end = parse_range_ms(item.get("timestamp", ""))
+        except ValueError:
+            logger.warning(f"片段 {self.id} 的时间戳无效: {item.get('timestamp')}")
+            self.source_start = self.source_end = 0
+        self.tts_duration: Optional[int] = None
+        self.clip_end: Optional[int] = None
+        self.edited_start: Optional[int] = None
+        self.audio = ""
+        self.subtitle = ""
+        self.video = ""
+        if resume:
+            # 从 to_script() / update_script_timestamps 输出的脚本字典恢复处理结果
+            self.audio = item.get("audio") or ""
+            self.subtitle = item.get("subtitle") or ""
+            self.video = item.get("video") or ""
+            duration = item.get("duration")
+            if isinstance(duration, (int, float)) and duration > 0:
+                self.clip_end = self.source_start + int(round(duration * MS_PER_SECOND))
+            elif item.get("editedTimeRange"):
+                try:
+                    edited_start, edited_end = parse_range_ms(item["editedTimeRange"])
+                    self.clip_end = self.source_start + (edited_end - edited_start)
+                except ValueError:
+                    pass
+
+    @property
+    def timestamp(self) -> str:
+        """脚本中的原始时间戳字符串"""
+        return self.item.get("timestamp", "")
+
+    @property
+    def narration(self) -> str:
+        return self.item.get("narration", "")
+
+    def clip_range(self) -> Optional[Tuple[int, int]]:
+        """
+        需要从原视频裁剪的时间段
+
+        OST=1 严格按脚本时间段裁剪，OST=0/2 从脚本开始时间裁剪与配音等长的画面；
+        需要配音但还没有配音时长时返回None
+        """
+        if self.ost == 1:
+            return self.source_start, self.source_end
+        if self.tts_duration is None:
+            return None
+        return self.source_start, self.source_start + self.tts_duration
+
+    @property
+    def duration(self) -> int:
+        """片段在成片中的时长（毫秒）：已裁剪时为实际裁剪时长，否则为脚本时间段的长度"""
+        end = self.clip_end if self.clip_end is not None else self.source_end
+        return max(0, end - self.source_start)
+
+    @property
+    def edited_end(self) -> Optional[int]:
+        if self.edited_start is None:
+            return None
+        return self.edited_start + self.duration
+
+    def __repr__(self) -> str:
+        return (f"Segment(id={self.id!r}, ost={self.ost}, "
+                f"source={format_range_ms(self.source_start, self.source_end)}, duration={self.duration}ms)")
+
+
+class Timeline:
+    """由脚本构建的片段序列，在 TTS、裁剪、音频/字幕合并和视频合并之间传递"""
+
+    __slots__ = ("segments",)
+
+    def __init__(self, segments: Iterable[Segment]):
+        self.segments: List[Segment] = list(segments)
+        self.layout()
+
+    @classmethod
+    def from_script(cls, items: Iterable[Dict[str, Any]], resume: bool = False) -> "Timeline":
+        """
+        根据脚本字典列表构建时间轴
+
+        Args:
+            items: 脚本字典列表
+            resume: 是否读取字典中已有的 audio / subtitle / video / duration 处理结果
+        """
+        return cls(Segment(item, resume=resume) for item in items)
+
+    @classmethod
+    def coerce(cls, script: Union["Timeline", Iterable[Dict[str, Any]]], resume: bool = False) -> "Timeline":
+        """已经是时间轴时原样返回，否则按脚本字典列表构建"""
+        if isinstance(script, cls):
+            return script
+        return cls.from_script(script, resume=resume)
+
+    def __iter__(self) -> Iterator[Segment]:
+        return iter(self.segments)
+
+    def __len__(self) -> int:
+        return len(self.segments)
+
+    def get(self, key: Union[int, str]) -> Optional[Segment]:
+        """按 _id（或原始时间戳）查找片段"""
+        for segment in self.segments:
+            if segment.id is not None and segment.id == key:
+                return segment
+        for segment in self.segments:
+            if segment.timestamp and segment.timestamp == key:
+                return segment
+        return None
+
+    def apply_tts(self, tts_results: Iterable[Dict[str, Any]]) -> None:
+        """写入 voice.tts_multiple 的结果（配音、字幕路径和配音时长）"""
+        for result in tts_results or []:
+            segment = self.get(result.get("_id"))
+            if segment is None:
+                segment = self.get(result.get("timestamp"))
+            if segment is None:
+                continue
+            segment.audio = result.get("audio_file") or segment.audio
+            segment.subtitle = result.get("subtitle_file") or segment.subtitle
+            if result.get("duration"):
+                segment.tts_duration = int(round(result["duration"] * MS_PER_SECOND))
+
+    def layout(self) -> None:
+        """按片段顺序以整数毫秒累加，计算每个片段在成片中的开始时间（时长为0的片段不占位置）"""
+        position = 0
+        for segment in self.segments:
+            duration = segment.duration
+            if duration > 0:
+                segment.edited_start = position
+                position += duration
+            else:
+                segment.edited_start = None
+
+    @property
+    def total_duration(self) -> int:
+        """成片总时长（毫秒）"""
+        return sum(segment.duration for segment in self.segments)
+
+    def to_script(self) -> List[Dict[str, Any]]:
+        """输出与原有脚本字典兼容的列表，包含 audio / subtitle / video / sourceTimeRange / duration / editedTimeRange"""
+        items = []
+        for segment in self.segments:
+            item = dict(segment.item)
+            item["audio"] = segment.audio
+            item["subtitle"] = segment.subtitle
+            item["video"] = segment.video
+            if segment.timestamp:
+                item["sourceTimeRange"] = format_range_ms(segment.source_start, segment.source_start + segment.duration)
+                item["duration"] = segment.duration / MS_PER_SECOND
+            if segment.edited_start is not None:
+                item["editedTimeRange"] = format_range_ms(segment.edited_start, segment.edited_end)
+            items.append(item)
+        return items
@@ -6,7 +6,7 @@ from .utils.step1_subtitle_analyzer_openai import analyze_subtitle
 from .utils.step5_merge_script import merge_script
 
 
-def generate_script(srt_path: str, api_key: str, model_name: str, output_path: str, base_url: str = None, custom_clips: int = 5, provider: str = None):
+def generate_script(srt_path: str, api_key: str, model_name: str, output_path: str, base_url: str = None, custom_clips: int = 5, provider: str = None, segmented: bool = None):
     """生成视频混剪脚本
 
     Args:
@@ -17,6 +17,7 @@ def generate_script(srt_path: str, api_key: str, model_name: str, output_path: s
         base_url: API基础URL
         custom_clips: 自定义片段数量
         provider: LLM服务提供商
+        segmented: 是否按时间窗口分段并发分析字幕，None 表示字幕较长时自动分段
 
     Returns:
         str: 生成的脚本内容
@@ -33,7 +34,8 @@ def generate_script(srt_path: str, api_key: str, model_name: str, output_path: s
         model_name=model_name,
         base_url=base_url,
         custom_clips=custom_clips,
-        provider=provider
+        provider=provider,
+        segmented=segmented
     )
 
     # 合并生成最终脚本
@@ -0,0 +1,319 @@
+"""
+分段分析长字幕，提取并合并爆点
+
+整部短剧的字幕一次性发送给大模型时，长视频容易超出输出长度或超时，能提取的爆点数量也受单次响应限制。
+分段模式按时间窗口切分字幕，各窗口并发提取带评分的候选爆点，再按评分排序、去掉时间重叠的候选，
+合并为需要的 custom_clips 个爆点。每个窗口的结果按窗口内容哈希缓存，重新生成时只请求变化的窗口。
+"""
+import asyncio
+import json
+import math
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from app.config import config
+from app.services.llm.unified_service import UnifiedLLMService
+from app.services.llm.migration_adapter import _run_async_safely
+from app.services.prompts import PromptManager
+from app.utils import utils
+from .utils import load_srt
+
+# 默认时间窗口长度（秒）
+DEFAULT_WINDOW_SECONDS = 600
+# 字幕总时长超过该值（秒）时自动使用分段模式
+DEFAULT_SEGMENT_THRESHOLD = 1200
+# 默认并发请求的窗口数
+DEFAULT_CONCURRENCY = 4
+# 每个窗口至少提取的候选爆点数
+MIN_CANDIDATES_PER_WINDOW = 3
+# 未给出评分的候选爆点使用的默认评分
+DEFAULT_SCORE = 5.0
+CACHE_DIR_NAME = "sdp_windows"
+PROMPT_NAME = "window_plot_extraction"
+
+
+def parse_srt_time(time_str: str) -> float:
+    """把 HH:MM:SS,mmm（或 HH:MM:SS）转换为秒"""
+    time_str = time_str.strip().replace(".", ",")
+    if "," in time_str:
+        time_part, ms_part = time_str.split(",", 1)
+        ms = float(ms_part) / 1000
+    else:
+        time_part, ms = time_str, 0.0
+    hours, minutes, seconds = map(int, time_part.split(":"))
+    return hours * 3600 + minutes * 60 + seconds + ms
+
+
+def format_srt_time(seconds: float) -> str:
+    """把秒转换为 HH:MM:SS,mmm"""
+    total_ms = int(round(seconds * 1000))
+    hours, rest = divmod(total_ms, 3600 * 1000)
+    minutes, rest = divmod(rest, 60 * 1000)
+    secs, ms = divmod(rest, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d},{ms:03d}"
+
+
+def parse_time_range(timestamp: str) -> Optional[Tuple[float, float]]:
+    """解析 "开始-结束" 或 "开始 --> 结束" 形式的时间段，无法解析时返回None"""
+    if not timestamp:
+        return None
+    separator = "-->" if "-->" in timestamp else "-"
+    parts = timestamp.split(separator)
+    if len(parts) != 2:
+        return None
+    try:
+        start, end = parse_srt_time(parts[0]), parse_srt_time(parts[1])
+    except ValueError:
+        return None
+    if end <= start:
+        return None
+    return start, end
+
+
+def should_segment(subtitles: List[Dict], threshold: Optional[float] = None) -> bool:
+    """字幕总时长超过阈值（[app] sdp_segment_threshold）时使用分段模式"""
+    if not subtitles:
+        return False
+    if threshold is None:
+        threshold = float(config.app.get("sdp_segment_threshold", DEFAULT_SEGMENT_THRESHOLD))
+    try:
+        duration = parse_srt_time(subtitles[-1]["end_time"])
+    except (KeyError, ValueError):
+        return False
+    return duration > threshold
+
+
+def split_windows(subtitles: List[Dict], window_seconds: float) -> List[List[Dict]]:
+    """
+    按字幕开始时间把字幕切分为连续的时间窗口（空窗口会被跳过）
+
+    Args:
+        subtitles: load_srt 返回的字幕列表
+        window_seconds: 窗口长度（秒）
+
+    Returns:
+        List[List[Dict]]: 每个窗口内的字幕
+    """
+    windows: Dict[int, List[Dict]] = {}
+    for sub in subtitles:
+        try:
+            start = parse_srt_time(sub["start_time"])
+        except ValueError:
+            continue
+        windows.setdefault(int(start // window_seconds), []).append(sub)
+    return [windows[index] for index in sorted(windows)]
+
+
+class WindowCache:
+    """按窗口内容哈希缓存单个窗口的分析结果"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self._directory = directory
+
+    @property
+    def directory(self) -> str:
+        if self._directory is None:
+            self._directory = os.path.join(utils.storage_dir("cache", create=True), CACHE_DIR_NAME)
+        os.makedirs(self._directory, exist_ok=True)
+        return self._directory
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(self.directory, f"{key}.json"), "r", encoding="utf-8") as f:
+                return json.load(f)["result"]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.debug(f"读取字幕窗口缓存失败: {str(e)}")
+            return None
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        path = os.path.join(self.directory, f"{key}.json")
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({"created_at": time.time(), "result": result}, f, ensure_ascii=False)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"写入字幕窗口缓存失败: {str(e)}")
+
+
+def _normalize_plot_points(raw_points: Any) -> List[Dict[str, Any]]:
+    """只保留时间戳有效的候选爆点，并统一为 merge_script 使用的 开始-结束 格式"""
+    points = []
+    for point in raw_points or []:
+        if not isinstance(point, dict):
+            continue
+        time_range = parse_time_range(str(point.get("timestamp", "")))
+        if time_range is None:
+            logger.warning(f"忽略时间戳无效的候选爆点: {point.get('timestamp')}")
+            continue
+        try:
+            score = float(point.get("score", DEFAULT_SCORE))
+        except (TypeError, ValueError):
+            score = DEFAULT_SCORE
+        points.append({
+            "timestamp": f"{format_srt_time(time_range[0])}-{format_srt_time(time_range[1])}",
+            "title": point.get("title", ""),
+            "picture": point.get("picture", ""),
+            "score": score,
+        })
+    return points
+
+
+async def _analyze_windows(
+    window_requests: List[Tuple[int, str, Optional[str]]],
+    provider: str,
+    model_name: str,
+    api_key: Optional[str],
+    base_url: Optional[str],
+    concurrency: int
+) -> Dict[int, Optional[str]]:
+    """并发请求多个窗口，单个窗口失败时结果为None"""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def _one(index: int, prompt: str, system_prompt: Optional[str]) -> Tuple[int, Optional[str]]:
+        async with semaphore:
+            try:
+                response = await UnifiedLLMService.generate_text(
+                    prompt=prompt,
+                    system_prompt=system_prompt,
+                    provider=provider,
+                    model=model_name,
+                    api_key=api_key,
+                    base_url=base_url,
+                    temperature=0.1,
+                    max_tokens=4000
+                )
+                return index, response
+            except Exception as e:
+                logger.warning(f"第 {index + 1} 个字幕窗口分析失败: {str(e)}")
+                return index, None
+
+    results = await asyncio.gather(*(_one(*request) for request in window_requests))
+    return dict(results)
+
+
+def rank_plot_points(candidates: List[Dict[str, Any]], custom_clips: int) -> List[Dict[str, Any]]:
+    """
+    按评分从高到低选出 custom_clips 个时间上不重叠的爆点，再按时间顺序排列
+
+    Args:
+        candidates: 所有窗口的候选爆点
+        custom_clips: 需要的爆点数量
+
+    Returns:
+        List[Dict[str, Any]]: 选中的爆点
+    """
+    ranked = sorted(candidates, key=lambda point: point["score"], reverse=True)
+    selected: List[Tuple[float, float, Dict[str, Any]]] = []
+    for point in ranked:
+        if len(selected) >= custom_clips:
+            break
+        start, end = parse_time_range(point["timestamp"])
+        if any(start < other_end and other_start < end for other_start, other_end, _ in selected):
+            continue
+        selected.append((start, end, point))
+    return [point for _, _, point in sorted(selected, key=lambda item: item[0])]
+
+
+def analyze_subtitle_segmented(
+    srt_path: str,
+    model_name: str,
+    api_key: str = None,
+    base_url: str = None,
+    custom_clips: int = 5,
+    provider: str = None,
+    window_seconds: Optional[float] = None,
+    concurrency: Optional[int] = None,
+    cache: Optional[WindowCache] = None
+) -> dict:
+    """分段分析字幕内容，返回与 analyze_subtitle 相同结构的结果
+
+    Args:
+        srt_path (str): SRT字幕文件路径
+        model_name (str): 大模型名称
+        api_key (str, optional): 大模型API密钥. Defaults to None.
+        base_url (str, optional): 大模型API基础URL. Defaults to None.
+        custom_clips (int): 需要提取的片段数量. Defaults to 5.
+        provider (str, optional): LLM服务提供商. Defaults to None.
+        window_seconds (float, optional): 时间窗口长度（秒），默认读取 [app] sdp_window_seconds
+        concurrency (int, optional): 并发请求的窗口数，默认读取 [app] sdp_window_concurrency
+        cache (WindowCache, optional): 窗口结果缓存
+
+    Returns:
+        dict: 包含剧情梗概、爆点标题和爆点时间段的字典
+    """
+    window_seconds = float(window_seconds or config.app.get("sdp_window_seconds", DEFAULT_WINDOW_SECONDS))
+    concurrency = int(concurrency or config.app.get("sdp_window_concurrency", DEFAULT_CONCURRENCY))
+    cache = cache or WindowCache()
+
+    subtitles = load_srt(srt_path)
+    windows = split_windows(subtitles, window_seconds)
+    if not windows:
+        raise Exception("字幕文件中没有有效的字幕")
+
+    candidate_count = max(MIN_CANDIDATES_PER_WINDOW, math.ceil(custom_clips * 1.5 / len(windows)))
+    logger.info(f"字幕分为 {len(windows)} 个窗口（每个 {window_seconds:.0f} 秒），每个窗口提取最多 {candidate_count} 个候选爆点")
+
+    prompt_object = PromptManager.get_prompt_object(category="short_drama_editing", name=PROMPT_NAME)
+    window_results: Dict[int, Dict[str, Any]] = {}
+    cache_keys: Dict[int, str] = {}
+    pending: List[Tuple[int, str, Optional[str]]] = []
+    for index, window in enumerate(windows):
+        subtitle_content = "\n".join([f"{sub['timestamp']}\n{sub['text']}" for sub in window])
+        window_range = f"{window[0]['start_time']} - {window[-1]['end_time']}"
+        prompt = PromptManager.get_prompt(
+            category="short_drama_editing",
+            name=PROMPT_NAME,
+            parameters={
+                "subtitle_content": subtitle_content,
+                "window_range": window_range,
+                "candidate_count": candidate_count
+            }
+        )
+        cache_key = utils.md5(f"{prompt_object.metadata.version}|{provider}|{model_name}|{prompt}")
+        cached = cache.get(cache_key)
+        if cached is not None:
+            window_results[index] = cached
+            continue
+        cache_keys[index] = cache_key
+        pending.append((index, prompt, prompt_object.get_system_prompt()))
+
+    if pending:
+        logger.info(f"开始并发分析 {len(pending)} 个字幕窗口（{len(windows) - len(pending)} 个命中缓存）...")
+        responses = _run_async_safely(
+            _analyze_windows, pending, provider, model_name, api_key, base_url, concurrency
+        )
+        from webui.tools.generate_short_summary import parse_and_fix_json
+        for index, response in responses.items():
+            data = parse_and_fix_json(response) if response else None
+            if not data:
+                logger.warning(f"第 {index + 1} 个字幕窗口没有返回有效的JSON，已跳过")
+                continue
+            result = {
+                "summary": data.get("summary", ""),
+                "plot_points": _normalize_plot_points(data.get("plot_points")),
+            }
+            window_results[index] = result
+            cache.put(cache_keys[index], result)
+    else:
+        logger.info("所有字幕窗口均命中缓存")
+
+    if not window_results:
+        raise Exception("所有字幕窗口分析均失败")
+
+    candidates = [point for index in sorted(window_results) for point in window_results[index]["plot_points"]]
+    plot_points = rank_plot_points(candidates, custom_clips)
+    logger.info(f"从 {len(candidates)} 个候选爆点中选出 {len(plot_points)} 个")
+
+    return {
+        "summary": "\n".join(
+            window_results[index]["summary"] for index in sorted(window_results) if window_results[index]["summary"]
+        ),
+        "plot_titles": [point["title"] for point in plot_points],
+        "plot_points": plot_points,
+    }
@@ -6,7 +6,10 @@ import json
 import asyncio
 from loguru import logger
 
+from typing import Optional
+
 from .utils import load_srt
+from .step1_segmented_analyzer import analyze_subtitle_segmented, should_segment
 # 导入新的提示词管理系统
 from app.services.prompts import PromptManager
 # 导入统一LLM服务
@@ -21,7 +24,8 @@ def analyze_subtitle(
     api_key: str = None,
     base_url: str = None,
     custom_clips: int = 5,
-    provider: str = None
+    provider: str = None,
+    segmented: Optional[bool] = None
 ) -> dict:
     """分析字幕内容，返回完整的分析结果
 
@@ -32,6 +36,7 @@ def analyze_subtitle(
         base_url (str, optional): 大模型API基础URL. Defaults to None.
         custom_clips (int): 需要提取的片段数量. Defaults to 5.
         provider (str, optional): LLM服务提供商. Defaults to None.
+        segmented (bool, optional): 是否按时间窗口分段分析，None 表示字幕较长时自动分段. Defaults to None.
 
     Returns:
         dict: 包含剧情梗概和结构化的时间段分析的字典
@@ -57,6 +62,18 @@ def analyze_subtitle(
 
         logger.info(f"使用LLM服务分析字幕，提供商: {provider}, 模型: {model_name}")
 
+        if segmented is None:
+            segmented = should_segment(subtitles)
+        if segmented:
+            return analyze_subtitle_segmented(
+                srt_path=srt_path,
+                model_name=model_name,
+                api_key=api_key,
+                base_url=base_url,
+                custom_clips=custom_clips,
+                provider=provider
+            )
+
         # 使用新的提示词管理系统
         subtitle_analysis_prompt = PromptManager.get_prompt(
             category="short_drama_editing",
@@ -0,0 +1,225 @@
+"""
+原声音轨拼装
+
+combine_clip_videos 原来为每个保留原声的片段单独运行一次 ffmpeg 提取 AAC，为每个规范化片段运行一次
+ffprobe 读取时长，再生成一条静音轨，用 adelay/amix 滤镜把所有片段混到一起。amix 的输入数等于片段数，
+超过一百个输入后滤镜图的内存和耗时都急剧上升，而且每段原声都要经历一次 AAC 解码和重新编码。
+
+这里改为：
+
+- 片段时长直接从 MP4 的 mvhd 头读取，不再启动 ffprobe（读取失败时才回退到 ffprobe）
+- 同一个来源（原视频）的所有保留片段按来源时间排序，相邻片段合并成少量连续区间，
+  每个区间只启动一次 ffmpeg 解码为 PCM（s16le），边读边把样本写到成片时间轴上对应的位置
+- 时间轴是一个与成片等长的 PCM 文件（numpy.memmap，未写入的部分就是静音），内存占用与时长无关
+- 最后把整条时间轴编码为一条 AAC 音轨，供最终封装使用
+"""
+
+import os
+import struct
+import subprocess
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from loguru import logger
+
+from app.utils.ffmpeg_runner import StderrTail, run_ffmpeg
+
+SAMPLE_RATE = 44100
+CHANNELS = 2
+# 同一来源相邻两个保留片段之间的间隔小于该值（秒）时合并为一次解码，大于时分开解码以跳过中间不需要的部分
+MERGE_GAP_SECONDS = 30.0
+# 每次从解码管道读取的样本帧数
+READ_FRAMES = SAMPLE_RATE
+
+
+@dataclass
+class AudioPlacement:
+    """把来源中 [source_start, source_start + duration) 的原声放到成片的 offset 处（单位：秒）"""
+    source: str
+    source_start: float
+    duration: float
+    offset: float
+
+    @property
+    def source_end(self) -> float:
+        return self.source_start + self.duration
+
+
+def _read_box_header(f):
+    header = f.read(8)
+    if len(header) < 8:
+        return None
+    size, box_type = struct.unpack(">I4s", header)
+    header_size = 8
+    if size == 1:
+        size = struct.unpack(">Q", f.read(8))[0]
+        header_size = 16
+    return size, box_type, header_size
+
+
+def mp4_duration(path: str) -> Optional[float]:
+    """
+    从 MP4/MOV 的 moov/mvhd 读取时长（秒），不是 MP4 或读取失败时返回None
+
+    与 ffprobe 的 format=duration 相同，取各轨道中最长的时长
+    """
+    try:
+        file_size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            end = file_size
+            while f.tell() < end:
+                start = f.tell()
+                header = _read_box_header(f)
+                if header is None:
+                    return None
+                size, box_type, header_size = header
+                box_end = end if size == 0 else start + size
+                if size != 0 and size < header_size:
+                    return None
+                if box_type == b"moov":
+                    # 进入 moov 继续查找 mvhd
+                    end = box_end
+                    continue
+                if box_type == b"mvhd":
+                    version = f.read(1)[0]
+                    f.seek(3, os.SEEK_CUR)
+                    if version == 1:
+                        f.seek(16, os.SEEK_CUR)
+                        timescale, duration = struct.unpack(">IQ", f.read(12))
+                    else:
+                        f.seek(8, os.SEEK_CUR)
+                        timescale, duration = struct.unpack(">II", f.read(8))
+                    return duration / timescale if timescale else None
+                f.seek(box_end)
+    except (OSError, struct.error, IndexError):
+        return None
+    return None
+
+
+def media_duration(path: str) -> float:
+    """片段时长（秒）：优先读取 MP4 头，失败时使用 ffprobe"""
+    duration = mp4_duration(path)
+    if duration is not None:
+        return duration
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", path],
+        check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+    return float(result.stdout.strip())
+
+
+def _clusters(placements: List[AudioPlacement]) -> List[List[AudioPlacement]]:
+    """按来源时间排序后把相邻的片段分组，每组只解码一次"""
+    ordered = sorted(placements, key=lambda p: p.source_start)
+    groups: List[List[AudioPlacement]] = []
+    span_end = None
+    for placement in ordered:
+        if groups and placement.source_start - span_end <= MERGE_GAP_SECONDS:
+            groups[-1].append(placement)
+            span_end = max(span_end, placement.source_end)
+        else:
+            groups.append([placement])
+            span_end = placement.source_end
+    return groups
+
+
+def _decode_into(timeline: np.ndarray, source: str, group: List[AudioPlacement]) -> None:
+    """解码一个来源区间，并把其中各片段的样本写到时间轴上"""
+    span_start = group[0].source_start
+    span_end = max(p.source_end for p in group)
+    # 各片段在区间内的 [开始, 结束) 样本帧和在时间轴上的开始样本帧
+    ranges = []
+    for p in group:
+        first = int(round((p.source_start - span_start) * SAMPLE_RATE))
+        count = int(round(p.duration * SAMPLE_RATE))
+        ranges.append((first, first + count, int(round(p.offset * SAMPLE_RATE))))
+
+    cmd = [
+        "ffmpeg", "-hide_banner", "-nostats", "-loglevel", "error",
+        "-ss", f"{span_start:.6f}", "-t", f"{span_end - span_start:.6f}",
+        "-i", source,
+        "-vn", "-f", "s16le", "-acodec", "pcm_s16le", "-ac", str(CHANNELS), "-ar", str(SAMPLE_RATE),
+        "pipe:1",
+    ]
+    frame_bytes = CHANNELS * 2
+    process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stderr_tail = StderrTail(process.stderr)
+    position = 0
+    pending = b""
+    try:
+        while True:
+            data = process.stdout.read(READ_FRAMES * frame_bytes)
+            if not data:
+                break
+            data = pending + data
+            usable = len(data) - len(data) % frame_bytes
+            pending = data[usable:]
+            samples = np.frombuffer(data[:usable], dtype=np.int16).reshape(-1, CHANNELS)
+            chunk_end = position + len(samples)
+            for first, last, offset in ranges:
+                lo, hi = max(first, position), min(last, chunk_end)
+                if lo >= hi:
+                    continue
+                dest = offset + lo - first
+                dest_end = min(dest + hi - lo, len(timeline))
+                if dest_end > dest:
+                    timeline[dest:dest_end] = samples[lo - position:lo - position + dest_end - dest]
+            position = chunk_end
+        returncode = process.wait()
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        stderr_tail.join()
+        process.stdout.close()
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd, stderr=stderr_tail.text())
+
+
+def assemble_audio(placements: Iterable[AudioPlacement], total_duration: float, output_path: str) -> str:
+    """
+    把各片段的原声拼装成一条与成片等长的音轨
+
+    Args:
+        placements: 需要保留原声的片段
+        total_duration: 成片时长（秒），没有原声的部分为静音
+        output_path: 输出音频路径（AAC，使用 .m4a 时编码器延迟会写入容器，封装后与画面逐样本对齐）
+
+    Returns:
+        str: 输出音频路径
+
+    Raises:
+        subprocess.CalledProcessError: 解码或编码失败
+    """
+    placements = [p for p in placements if p.duration > 0]
+    by_source: Dict[str, List[AudioPlacement]] = defaultdict(list)
+    for placement in placements:
+        by_source[placement.source].append(placement)
+
+    pcm_path = f"{os.path.splitext(output_path)[0]}.pcm"
+    total_frames = max(1, int(round(total_duration * SAMPLE_RATE)))
+    timeline = np.memmap(pcm_path, dtype=np.int16, mode="w+", shape=(total_frames, CHANNELS))
+    try:
+        decodes = 0
+        for source, items in by_source.items():
+            for group in _clusters(items):
+                _decode_into(timeline, source, group)
+                decodes += 1
+        timeline.flush()
+        timeline = None
+        logger.info(f"原声拼装: {len(placements)} 个片段，{len(by_source)} 个来源，解码 {decodes} 次")
+
+        run_ffmpeg([
+            "ffmpeg", "-y",
+            "-f", "s16le", "-ar", str(SAMPLE_RATE), "-ac", str(CHANNELS), "-i", pcm_path,
+            "-c:a", "aac", "-b:a", "128k",
+            output_path,
+        ], duration=total_duration)
+        return output_path
+    finally:
+        # 先释放 memmap 再删除文件（Windows 上删除仍被映射的文件会失败，并掩盖原来的异常）
+        timeline = None
+        if os.path.exists(pcm_path):
+            os.remove(pcm_path)
@@ -1,11 +1,9 @@
 import os
 import json
 import subprocess
-import edge_tts
-from edge_tts import submaker
-from pydub import AudioSegment
-from typing import List, Dict
+from typing import List, Dict, Union
 from loguru import logger
+from app.models.timeline import Timeline, parse_time_ms
 from app.utils import utils
 
 
@@ -18,14 +16,14 @@ def check_ffmpeg():
         return False
 
 
-def merge_audio_files(task_id: str, total_duration: float, list_script: list):
+def merge_audio_files(task_id: str, total_duration: float, list_script: Union[Timeline, list]):
     """
     合并音频文件
     
     Args:
         task_id: 任务ID
         total_duration: 总时长
-        list_script: 完整脚本信息，包含duration时长和audio路径
+        list_script: Timeline，或包含duration时长和audio路径的完整脚本信息
     
     Returns:
         str: 合并后的音频文件路径
@@ -35,37 +33,32 @@ def merge_audio_files(task_id: str, total_duration: float, list_script: list):
         logger.error("FFmpeg未安装，无法合并音频文件")
         return None
 
+    from pydub import AudioSegment
+
     # 创建一个空的音频片段
     final_audio = AudioSegment.silent(duration=total_duration * 1000)  # 总时长以毫秒为单位
 
-    # 计算每个片段的开始位置（基于duration字段）
-    current_position = 0  # 初始位置（秒）
-    
-    # 遍历脚本中的每个片段
-    for segment in list_script:
+    # 每个片段的开始位置由时间轴按整数毫秒累加得到，长视频中不会累计误差
+    timeline = Timeline.coerce(list_script, resume=True)
+
+    # 遍历时间轴中的每个片段
+    for segment in timeline:
+        if segment.edited_start is None:
+            continue
         try:
-            # 获取片段时长（秒）
-            duration = segment['duration']
-            
             # 检查audio字段是否为空
-            if segment['audio'] and os.path.exists(segment['audio']):
+            if segment.audio and os.path.exists(segment.audio):
                 # 加载TTS音频文件
-                tts_audio = AudioSegment.from_file(segment['audio'])
+                tts_audio = AudioSegment.from_file(segment.audio)
                 
                 # 将TTS音频添加到最终音频
-                final_audio = final_audio.overlay(tts_audio, position=current_position * 1000)
+                final_audio = final_audio.overlay(tts_audio, position=segment.edited_start)
             else:
                 # audio为空，不添加音频，仅保留间隔
-                logger.info(f"片段 {segment.get('timestamp', '')} 没有音频文件，保留 {duration} 秒的间隔")
-            
-            # 更新下一个片段的开始位置
-            current_position += duration
+                logger.info(f"片段 {segment.timestamp} 没有音频文件，保留 {segment.duration / 1000} 秒的间隔")
 
         except Exception as e:
             logger.error(f"处理音频片段时出错: {str(e)}")
-            # 即使处理失败，也要更新位置，确保后续片段位置正确
-            if 'duration' in segment:
-                current_position += segment['duration']
             continue
 
     # 保存合并后的音频文件
@@ -84,28 +77,8 @@ def time_to_seconds(time_str):
     3. 'SS,mmm' (秒,毫秒)
     """
     try:
-        # 处理毫秒部分
-        if ',' in time_str:
-            time_part, ms_part = time_str.split(',')
-            ms = float(ms_part) / 1000
-        else:
-            time_part = time_str
-            ms = 0
-
-        # 分割时间部分
-        parts = time_part.split(':')
-
-        if len(parts) == 3:  # HH:MM:SS
-            h, m, s = map(int, parts)
-            seconds = h * 3600 + m * 60 + s
-        elif len(parts) == 2:  # MM:SS
-            m, s = map(int, parts)
-            seconds = m * 60 + s
-        else:  # SS
-            seconds = int(parts[0])
-
-        return seconds + ms
-    except (ValueError, IndexError) as e:
+        return parse_time_ms(time_str) / 1000
+    except ValueError as e:
         logger.error(f"Error parsing time {time_str}: {str(e)}")
         return 0.0
 
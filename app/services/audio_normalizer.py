@@ -18,6 +18,8 @@ from moviepy import AudioFileClip
 from pydub import AudioSegment
 import numpy as np
 
+from app.utils.ffmpeg_runner import run_ffmpeg
+
 
 class AudioNormalizer:
     """音频响度分析和标准化工具"""
@@ -49,14 +51,9 @@ class AudioNormalizer:
                 '-f', 'null', '-'
             ]
             
-            result = subprocess.run(
-                cmd, 
-                capture_output=True, 
-                text=True, 
-                check=False
-            )
+            result = run_ffmpeg(cmd, check=False)
             
-            # 从stderr中提取JSON信息
+            # 从stderr中提取JSON信息（loudnorm的输出位于stderr末尾）
             stderr_lines = result.stderr.split('\n')
             json_start = False
             json_lines = []
@@ -144,12 +141,7 @@ class AudioNormalizer:
                 '-f', 'null', '-'
             ]
             
-            analyze_result = subprocess.run(
-                analyze_cmd, 
-                capture_output=True, 
-                text=True, 
-                check=False
-            )
+            analyze_result = run_ffmpeg(analyze_cmd, check=False)
             
             # 解析分析结果
             stderr_lines = analyze_result.stderr.split('\n')
@@ -187,12 +179,7 @@ class AudioNormalizer:
                 output_path
             ]
             
-            result = subprocess.run(
-                normalize_cmd, 
-                capture_output=True, 
-                text=True, 
-                check=True
-            )
+            run_ffmpeg(normalize_cmd)
             
             logger.info(f"音频标准化完成: {output_path}")
             return True
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+'''
+@Project: NarratoAI
+@File   : bgm_bed
+@Description: 预渲染背景音乐音轨（循环、淡出、音量）并缓存
+'''
+
+import math
+import os
+import subprocess
+from typing import Optional
+
+from loguru import logger
+
+from app.utils import utils
+from app.utils.ffmpeg_runner import run_ffmpeg
+from app.utils.fingerprint import file_fingerprint
+
+# 预渲染音轨的采样率，与其它音频中间文件保持一致
+BGM_SAMPLE_RATE = 44100
+# 时长分桶（秒）：同一分桶内的渲染任务复用同一条音轨
+DURATION_BUCKET = 1.0
+
+
+def bgm_bed_dir() -> str:
+    return utils.temp_dir("bgm_bed")
+
+
+def _probe_duration(path: str) -> Optional[float]:
+    cmd = [
+        'ffprobe', '-v', 'error',
+        '-show_entries', 'format=duration',
+        '-of', 'csv=p=0',
+        path
+    ]
+    try:
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True)
+        return float(result.stdout.strip())
+    except (subprocess.CalledProcessError, ValueError, FileNotFoundError) as e:
+        logger.warning(f"获取背景音乐时长失败: {str(e)}")
+        return None
+
+
+def bucket_duration(duration: float) -> float:
+    """将目标时长向上取整到分桶边界"""
+    return math.ceil(duration / DURATION_BUCKET) * DURATION_BUCKET
+
+
+def build_bgm_bed(
+    bgm_path: str,
+    duration: float,
+    volume: float,
+    fade_out: float = 3.0
+) -> Optional[str]:
+    """
+    使用ffmpeg一次性渲染循环、淡出、调整音量后的背景音乐音轨
+
+    与原先 MoviePy 的 MultiplyVolume -> AudioFadeOut -> AudioLoop 效果链一致：
+    淡出作用在原曲结尾，然后整体循环到目标时长。
+    结果按 (背景音乐内容指纹, 时长分桶, 音量, 淡出时长) 缓存。
+
+    Args:
+        bgm_path: 背景音乐文件路径
+        duration: 目标时长（秒），通常为视频时长
+        volume: 音量系数
+        fade_out: 每次循环结尾的淡出时长（秒）
+
+    Returns:
+        Optional[str]: 渲染好的音轨路径（AAC），失败时返回None
+    """
+    if not bgm_path or not os.path.exists(bgm_path) or duration <= 0:
+        return None
+
+    bed_duration = bucket_duration(duration)
+    cache_key = utils.md5(
+        f"{file_fingerprint(bgm_path)}_{bed_duration:.1f}_{volume:.3f}_{fade_out:.2f}"
+    )
+    output_path = os.path.join(bgm_bed_dir(), f"bgm_{cache_key}.m4a")
+    if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+        logger.info(f"复用已缓存的背景音乐音轨: {output_path}")
+        return output_path
+
+    source_duration = _probe_duration(bgm_path)
+    if not source_duration:
+        return None
+
+    filters = [f"aresample={BGM_SAMPLE_RATE}", f"volume={volume:.3f}"]
+    if fade_out > 0:
+        fade_start = max(source_duration - fade_out, 0.0)
+        filters.append(f"afade=t=out:st={fade_start:.3f}:d={min(fade_out, source_duration):.3f}")
+    if source_duration < bed_duration:
+        loop_size = int(round(source_duration * BGM_SAMPLE_RATE))
+        filters.append(f"aloop=loop=-1:size={loop_size}")
+    filters.append(f"atrim=duration={bed_duration:.3f}")
+
+    # 先写入临时文件再原子替换，避免中断时留下不完整的缓存
+    temp_path = f"{output_path}.part.m4a"
+    cmd = [
+        'ffmpeg', '-y', '-hide_banner',
+        '-i', bgm_path,
+        '-vn',
+        '-af', ",".join(filters),
+        '-ac', '2',
+        '-c:a', 'aac',
+        '-b:a', '192k',
+        temp_path
+    ]
+    try:
+        run_ffmpeg(cmd, duration=bed_duration)
+        os.replace(temp_path, output_path)
+        logger.info(f"背景音乐音轨渲染完成: {output_path} (时长 {bed_duration:.0f}s, 音量 {volume})")
+        return output_path
+    except subprocess.CalledProcessError as e:
+        logger.warning(f"渲染背景音乐音轨失败: {e.stderr if e.stderr else str(e)}")
+    except OSError as e:
+        logger.warning(f"保存背景音乐音轨失败: {str(e)}")
+
+    if os.path.exists(temp_path):
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+    return None
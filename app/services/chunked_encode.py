@@ -0,0 +1,181 @@
+"""
+最后合成阶段的分段并行编码
+
+merge_materials 用一个 libx264 编码器实例编码整条时间轴，MoviePy 逐帧合成字幕也在同一个进程里完成，
+CPU 编码 60 分钟的 1080p 成片时无法用满所有核心。分段模式：
+
+- 在片段边界（或固定秒数）处把时间轴切成若干段，切点对齐到帧
+- 每段在独立进程中调用 merge_materials（time_range 指定范围，只编码画面），
+  所有段使用相同的编码参数和固定长度的闭合 GOP（-flags +cgop，关闭场景切换插入关键帧）
+- 完整音轨只混音一次（merge_materials 的 audio_output），避免 AAC 在段落衔接处产生间隙
+- 用 concat 分离器按流复制拼接各段画面，并与音轨一起封装，不再重新编码
+
+通过 [app] final_encode_workers 启用（大于1时生效），失败时回退到单进程的 merge_materials。
+"""
+
+import multiprocessing
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from loguru import logger
+from moviepy import VideoFileClip
+
+from app.config import config
+from app.services import generate_video
+from app.services.merger_video import create_ffmpeg_concat_file
+from app.utils.ffmpeg_runner import run_ffmpeg
+
+# 切分时每段的最短时长（秒），过短的段进程启动和 GOP 开销占比过高
+MIN_CHUNK_SECONDS = 10.0
+# 闭合 GOP 的关键帧间隔（秒）
+GOP_SECONDS = 2
+
+
+def encode_workers() -> int:
+    """分段并行编码的进程数（[app] final_encode_workers），不大于1表示使用单进程的 merge_materials"""
+    workers = int(config.app.get("final_encode_workers", 1) or 1)
+    return max(1, min(workers, os.cpu_count() or 1))
+
+
+def plan_chunks(
+    duration: float,
+    fps: float,
+    workers: int,
+    boundaries: Optional[Sequence[float]] = None,
+    chunk_seconds: Optional[float] = None
+) -> List[Tuple[float, float]]:
+    """
+    计算分段范围
+
+    Args:
+        duration: 总时长（秒）
+        fps: 输出帧率，切点对齐到帧
+        workers: 并行进程数
+        boundaries: 可用的切点（如各片段在成片中的开始时间），为空时按固定时长切分
+        chunk_seconds: 每段的目标时长，默认按进程数平均分配
+
+    Returns:
+        List[Tuple[float, float]]: 各段的 (开始, 结束) 秒，首尾相接覆盖整条时间轴
+    """
+    target = max(chunk_seconds or duration / max(1, workers), MIN_CHUNK_SECONDS)
+    if boundaries:
+        candidates = sorted(b for b in boundaries if 0 < b < duration)
+    else:
+        count = int(duration // target)
+        candidates = [target * i for i in range(1, count + 1)]
+
+    # 切点对齐到帧，保证各段的帧拼接后与整段编码的帧完全相同
+    def snap(t: float) -> float:
+        return round(t * fps) / fps
+
+    cuts = [0.0]
+    for t in candidates:
+        t = snap(t)
+        if t - cuts[-1] >= target and duration - t >= MIN_CHUNK_SECONDS / 2:
+            cuts.append(t)
+    return list(zip(cuts, cuts[1:] + [duration]))
+
+
+def _encode_chunk(job: Dict[str, Any]) -> str:
+    """在子进程中编码一段画面"""
+    generate_video.merge_materials(
+        video_path=job["video_path"],
+        audio_path=None,
+        output_path=job["output_path"],
+        subtitle_path=job["subtitle_path"],
+        bgm_path=None,
+        options=job["options"],
+    )
+    return job["output_path"]
+
+
+def _gop_params(fps: float) -> List[str]:
+    """所有分段相同的闭合 GOP 参数"""
+    gop = str(max(1, int(round(fps * GOP_SECONDS))))
+    return ["-g", gop, "-keyint_min", gop, "-sc_threshold", "0", "-flags", "+cgop"]
+
+
+def merge_materials_chunked(
+    video_path: str,
+    audio_path: str,
+    output_path: str,
+    subtitle_path: Optional[str] = None,
+    bgm_path: Optional[str] = None,
+    options: Optional[Dict[str, Any]] = None,
+    boundaries: Optional[Sequence[float]] = None,
+    workers: Optional[int] = None,
+    chunk_seconds: Optional[float] = None
+) -> str:
+    """
+    分段并行编码生成最终视频，参数与 generate_video.merge_materials 相同
+
+    Args:
+        boundaries: 允许切分的时间点（秒），一般为各片段在成片中的开始时间
+        workers: 并行进程数，默认读取 [app] final_encode_workers
+        chunk_seconds: 每段的目标时长，默认读取 [app] final_encode_chunk_seconds，未设置时按进程数平均分配
+
+    Returns:
+        str: 输出视频的路径
+    """
+    options = dict(options or {})
+    workers = workers or encode_workers()
+    chunk_seconds = chunk_seconds or config.app.get("final_encode_chunk_seconds")
+    fps = options.get("fps", 30)
+
+    with VideoFileClip(video_path) as clip:
+        duration = clip.duration
+    chunks = plan_chunks(duration, fps, workers, boundaries, chunk_seconds)
+    if workers <= 1 or len(chunks) <= 1:
+        logger.info("时间轴过短或未启用并行编码，使用单进程合成")
+        return generate_video.merge_materials(video_path, audio_path, output_path, subtitle_path, bgm_path, options)
+
+    work_dir = f"{os.path.splitext(output_path)[0]}_chunks"
+    os.makedirs(work_dir, exist_ok=True)
+    logger.info(f"分段并行编码: {len(chunks)} 段, {workers} 个进程, 总时长 {duration:.2f}秒")
+
+    try:
+        # 1. 完整音轨只混音一次
+        audio_track = generate_video.merge_materials(
+            video_path, audio_path, output_path, subtitle_path, bgm_path,
+            options={**options, "audio_output": os.path.join(work_dir, "audio.m4a")}
+        )
+
+        # 2. 各段画面并行编码
+        threads = max(1, (os.cpu_count() or workers) // workers)
+        jobs = []
+        for i, (start, end) in enumerate(chunks):
+            jobs.append({
+                "video_path": video_path,
+                "subtitle_path": subtitle_path,
+                "output_path": os.path.join(work_dir, f"chunk_{i:04d}.mp4"),
+                "options": {
+                    **options,
+                    "include_audio": False,
+                    # MoviePy 按 int(时长 * 帧率) 取帧，多给半帧避免浮点误差少取每段的最后一帧
+                    "time_range": (start, end + 0.5 / fps),
+                    "threads": threads,
+                    "ffmpeg_params": _gop_params(fps),
+                },
+            })
+        # 使用 spawn 启动子进程，避免在 Streamlit 等多线程进程中 fork
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            chunk_paths = list(executor.map(_encode_chunk, jobs))
+
+        # 3. 按流复制拼接画面并封装音轨
+        concat_file = create_ffmpeg_concat_file(chunk_paths, os.path.join(work_dir, "concat_list.txt"))
+        cmd = ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", concat_file]
+        if audio_track:
+            cmd += ["-i", audio_track, "-map", "0:v:0", "-map", "1:a:0"]
+        else:
+            logger.warning("没有可用的音频轨道，输出视频将没有声音")
+        cmd += ["-c", "copy", "-movflags", "+faststart", output_path]
+        run_ffmpeg(cmd, duration=duration)
+        logger.success(f"分段并行编码完成: {output_path}")
+        return output_path
+    except Exception as e:
+        logger.warning(f"分段并行编码失败，回退到单进程合成: {e}")
+        return generate_video.merge_materials(video_path, audio_path, output_path, subtitle_path, bgm_path, options)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
@@ -13,10 +13,13 @@ import subprocess
 import json
 import hashlib
 from loguru import logger
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
 from pathlib import Path
 
+from app.models.timeline import Segment, Timeline, format_time_ms
+from app.services import proxy_media
 from app.utils import ffmpeg_utils
+from app.utils.ffmpeg_runner import run_ffmpeg, scale_progress, FFmpegStallError, ProgressCallback
 
 def parse_timestamp(timestamp: str) -> tuple:
     """
@@ -73,6 +76,20 @@ def calculate_end_time(start_time: str, duration: float, extra_seconds: float =
         return f"{h_new:02d}:{m_new:02d}:{s_new:02d}"
 
 
+def _ffmpeg_time_to_seconds(time_str: str) -> float:
+    """将'HH:MM:SS'或'HH:MM:SS.sss'格式的ffmpeg时间转换为秒数"""
+    h, m, s = time_str.replace(',', '.').split(':')
+    return int(h) * 3600 + int(m) * 60 + float(s)
+
+
+def _segment_duration(start_time: str, end_time: str) -> Optional[float]:
+    """计算裁剪片段时长，用于ffmpeg进度计算"""
+    try:
+        return max(_ffmpeg_time_to_seconds(end_time) - _ffmpeg_time_to_seconds(start_time), 0.0)
+    except (ValueError, AttributeError):
+        return None
+
+
 def check_hardware_acceleration() -> Optional[str]:
     """
     检查系统支持的硬件加速选项
@@ -233,7 +250,8 @@ def execute_ffmpeg_with_fallback(
     input_path: str,
     output_path: str,
     start_time: str,
-    end_time: str
+    end_time: str,
+    progress_callback: Optional[ProgressCallback] = None
 ) -> bool:
     """
     执行ffmpeg命令，带有智能fallback机制
@@ -245,26 +263,15 @@ def execute_ffmpeg_with_fallback(
         output_path: 输出路径
         start_time: 开始时间
         end_time: 结束时间
+        progress_callback: 进度回调，参数为0~1的完成比例
         
     Returns:
         bool: 是否成功
     """
+    duration = _segment_duration(start_time, end_time)
     try:
         # logger.debug(f"执行ffmpeg命令: {' '.join(cmd)}")
-        
-        # 在Windows系统上使用UTF-8编码处理输出
-        is_windows = os.name == 'nt'
-        process_kwargs = {
-            "stdout": subprocess.PIPE,
-            "stderr": subprocess.PIPE,
-            "text": True,
-            "check": True
-        }
-        
-        if is_windows:
-            process_kwargs["encoding"] = 'utf-8'
-        
-        result = subprocess.run(cmd, **process_kwargs)
+        run_ffmpeg(cmd, duration=duration, progress_callback=progress_callback)
         
         # 验证输出文件
         if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
@@ -278,23 +285,24 @@ def execute_ffmpeg_with_fallback(
         error_msg = e.stderr if e.stderr else str(e)
         logger.warning(f"主要命令失败: {error_msg}")
         
-        # 智能错误分析
-        error_type = analyze_ffmpeg_error(error_msg)
+        # 智能错误分析；卡死通常出现在硬件编码器上，直接走软件编码
+        error_type = "hardware_error" if isinstance(e, FFmpegStallError) else analyze_ffmpeg_error(error_msg)
         logger.debug(f"错误类型分析: {error_type}")
         
+        fallback_kwargs = {"progress_callback": progress_callback}
         # 根据错误类型选择fallback策略
         if error_type == "filter_chain_error":
             logger.info(f"检测到滤镜链错误，尝试兼容性模式: {timestamp}")
-            return try_compatibility_fallback(input_path, output_path, start_time, end_time, timestamp)
+            return try_compatibility_fallback(input_path, output_path, start_time, end_time, timestamp, **fallback_kwargs)
         elif error_type == "hardware_error":
             logger.info(f"检测到硬件加速错误，尝试软件编码: {timestamp}")
-            return try_software_fallback(input_path, output_path, start_time, end_time, timestamp)
+            return try_software_fallback(input_path, output_path, start_time, end_time, timestamp, **fallback_kwargs)
         elif error_type == "encoder_error":
             logger.info(f"检测到编码器错误，尝试基本编码: {timestamp}")
-            return try_basic_fallback(input_path, output_path, start_time, end_time, timestamp)
+            return try_basic_fallback(input_path, output_path, start_time, end_time, timestamp, **fallback_kwargs)
         else:
             logger.info(f"尝试通用fallback方案: {timestamp}")
-            return try_fallback_encoding(input_path, output_path, start_time, end_time, timestamp)
+            return try_fallback_encoding(input_path, output_path, start_time, end_time, timestamp, **fallback_kwargs)
             
     except Exception as e:
         logger.error(f"执行ffmpeg命令时发生异常: {str(e)}")
@@ -347,7 +355,8 @@ def try_compatibility_fallback(
     output_path: str,
     start_time: str,
     end_time: str,
-    timestamp: str
+    timestamp: str,
+    progress_callback: Optional[ProgressCallback] = None
 ) -> bool:
     """
     尝试兼容性fallback方案（解决滤镜链问题）
@@ -358,6 +367,7 @@ def try_compatibility_fallback(
         start_time: 开始时间
         end_time: 结束时间
         timestamp: 时间戳
+        progress_callback: 进度回调
         
     Returns:
         bool: 是否成功
@@ -380,7 +390,9 @@ def try_compatibility_fallback(
         output_path
     ]
     
-    return execute_simple_command(fallback_cmd, timestamp, "兼容性模式")
+    return execute_simple_command(fallback_cmd, timestamp, "兼容性模式",
+                                  duration=_segment_duration(start_time, end_time),
+                                  progress_callback=progress_callback)
 
 
 def try_software_fallback(
@@ -388,7 +400,8 @@ def try_software_fallback(
     output_path: str,
     start_time: str,
     end_time: str,
-    timestamp: str
+    timestamp: str,
+    progress_callback: Optional[ProgressCallback] = None
 ) -> bool:
     """
     尝试软件编码fallback方案
@@ -399,6 +412,7 @@ def try_software_fallback(
         start_time: 开始时间
         end_time: 结束时间
         timestamp: 时间戳
+        progress_callback: 进度回调
         
     Returns:
         bool: 是否成功
@@ -420,7 +434,9 @@ def try_software_fallback(
         output_path
     ]
     
-    return execute_simple_command(fallback_cmd, timestamp, "软件编码")
+    return execute_simple_command(fallback_cmd, timestamp, "软件编码",
+                                  duration=_segment_duration(start_time, end_time),
+                                  progress_callback=progress_callback)
 
 
 def try_basic_fallback(
@@ -428,7 +444,8 @@ def try_basic_fallback(
     output_path: str,
     start_time: str,
     end_time: str,
-    timestamp: str
+    timestamp: str,
+    progress_callback: Optional[ProgressCallback] = None
 ) -> bool:
     """
     尝试基本编码fallback方案
@@ -439,6 +456,7 @@ def try_basic_fallback(
         start_time: 开始时间
         end_time: 结束时间
         timestamp: 时间戳
+        progress_callback: 进度回调
         
     Returns:
         bool: 是否成功
@@ -458,10 +476,18 @@ def try_basic_fallback(
         output_path
     ]
     
-    return execute_simple_command(fallback_cmd, timestamp, "基本编码")
+    return execute_simple_command(fallback_cmd, timestamp, "基本编码",
+                                  duration=_segment_duration(start_time, end_time),
+                                  progress_callback=progress_callback)
 
 
-def execute_simple_command(cmd: List[str], timestamp: str, method_name: str) -> bool:
+def execute_simple_command(
+    cmd: List[str],
+    timestamp: str,
+    method_name: str,
+    duration: Optional[float] = None,
+    progress_callback: Optional[ProgressCallback] = None
+) -> bool:
     """
     执行简单的ffmpeg命令
     
@@ -469,6 +495,8 @@ def execute_simple_command(cmd: List[str], timestamp: str, method_name: str) ->
         cmd: 命令列表
         timestamp: 时间戳
         method_name: 方法名称
+        duration: 输出时长（秒），用于进度计算
+        progress_callback: 进度回调
         
     Returns:
         bool: 是否成功
@@ -476,18 +504,7 @@ def execute_simple_command(cmd: List[str], timestamp: str, method_name: str) ->
     try:
         logger.debug(f"执行{method_name}命令: {' '.join(cmd)}")
         
-        is_windows = os.name == 'nt'
-        process_kwargs = {
-            "stdout": subprocess.PIPE,
-            "stderr": subprocess.PIPE,
-            "text": True,
-            "check": True
-        }
-        
-        if is_windows:
-            process_kwargs["encoding"] = 'utf-8'
-        
-        subprocess.run(cmd, **process_kwargs)
+        run_ffmpeg(cmd, duration=duration, progress_callback=progress_callback)
         
         output_path = cmd[-1]  # 输出路径总是最后一个参数
         if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
@@ -511,7 +528,8 @@ def try_fallback_encoding(
     output_path: str,
     start_time: str,
     end_time: str,
-    timestamp: str
+    timestamp: str,
+    progress_callback: Optional[ProgressCallback] = None
 ) -> bool:
     """
     尝试fallback编码方案（通用方案）
@@ -522,6 +540,7 @@ def try_fallback_encoding(
         start_time: 开始时间
         end_time: 结束时间
         timestamp: 时间戳
+        progress_callback: 进度回调
         
     Returns:
         bool: 是否成功
@@ -542,155 +561,115 @@ def try_fallback_encoding(
         output_path
     ]
     
-    return execute_simple_command(fallback_cmd, timestamp, "通用Fallback")
+    return execute_simple_command(fallback_cmd, timestamp, "通用Fallback",
+                                  duration=_segment_duration(start_time, end_time),
+                                  progress_callback=progress_callback)
 
 
-def _process_narration_only_segment(
+def _cut_segment(
     video_origin_path: str,
-    script_item: Dict,
-    tts_map: Dict,
+    segment: Segment,
     output_dir: str,
     encoder_config: Dict,
-    hwaccel_args: List[str]
+    hwaccel_args: List[str],
+    remove_audio: bool,
+    progress_callback: Optional[ProgressCallback] = None
 ) -> Optional[str]:
     """
-    处理OST=0的纯解说片段
-    - 根据TTS音频时长动态裁剪
-    - 移除原声，生成静音视频
+    按片段的裁剪范围（Segment.clip_range）裁剪原视频，成功后写入 segment.video 和 segment.clip_end
     """
-    _id = script_item["_id"]
-    timestamp = script_item["timestamp"]
-
-    # 获取对应的TTS结果
-    tts_item = tts_map.get(_id)
-    if not tts_item:
-        logger.error(f"未找到片段 {_id} 的TTS结果")
+    clip_range = segment.clip_range()
+    if clip_range is None:
+        logger.error(f"未找到片段 {segment.id} 的TTS结果")
         return None
-
-    # 解析起始时间，使用TTS音频时长计算结束时间
-    start_time, _ = parse_timestamp(timestamp)
-    duration = tts_item["duration"]
-    calculated_end_time = calculate_end_time(start_time, duration, extra_seconds=0)
+    start_ms, end_ms = clip_range
 
     # 转换为FFmpeg兼容的时间格式
-    ffmpeg_start_time = start_time.replace(',', '.')
-    ffmpeg_end_time = calculated_end_time.replace(',', '.')
+    ffmpeg_start_time = format_time_ms(start_ms, ".")
+    ffmpeg_end_time = format_time_ms(end_ms, ".")
 
     # 生成输出文件名
-    safe_start_time = start_time.replace(':', '-').replace(',', '-')
-    safe_end_time = calculated_end_time.replace(':', '-').replace(',', '-')
-    output_filename = f"ost0_vid_{safe_start_time}@{safe_end_time}.mp4"
+    safe_start_time = format_time_ms(start_ms, "-").replace(':', '-')
+    safe_end_time = format_time_ms(end_ms, "-").replace(':', '-')
+    output_filename = f"ost{segment.ost}_vid_{safe_start_time}@{safe_end_time}.mp4"
     output_path = os.path.join(output_dir, output_filename)
 
-    # 构建FFmpeg命令 - 移除音频
+    # 构建FFmpeg命令
     cmd = _build_ffmpeg_command_with_audio_control(
         video_origin_path, output_path, ffmpeg_start_time, ffmpeg_end_time,
-        encoder_config, hwaccel_args, remove_audio=True
+        encoder_config, hwaccel_args, remove_audio=remove_audio
     )
 
     # 执行命令
     success = execute_ffmpeg_with_fallback(
-        cmd, timestamp, video_origin_path, output_path,
-        ffmpeg_start_time, ffmpeg_end_time
+        cmd, segment.timestamp, video_origin_path, output_path,
+        ffmpeg_start_time, ffmpeg_end_time,
+        progress_callback=progress_callback
     )
+    if not success:
+        return None
 
-    return output_path if success else None
+    segment.video = output_path
+    segment.clip_end = end_ms
+    return output_path
+
+
+def _process_narration_only_segment(
+    video_origin_path: str,
+    segment: Segment,
+    output_dir: str,
+    encoder_config: Dict,
+    hwaccel_args: List[str],
+    progress_callback: Optional[ProgressCallback] = None
+) -> Optional[str]:
+    """
+    处理OST=0的纯解说片段
+    - 根据TTS音频时长动态裁剪
+    - 移除原声，生成静音视频
+    """
+    return _cut_segment(
+        video_origin_path, segment, output_dir, encoder_config, hwaccel_args,
+        remove_audio=True, progress_callback=progress_callback
+    )
 
 
 def _process_original_audio_segment(
     video_origin_path: str,
-    script_item: Dict,
+    segment: Segment,
     output_dir: str,
     encoder_config: Dict,
-    hwaccel_args: List[str]
+    hwaccel_args: List[str],
+    progress_callback: Optional[ProgressCallback] = None
 ) -> Optional[str]:
     """
     处理OST=1的纯原声片段
     - 严格按照脚本timestamp精确裁剪
     - 保持原声不变
     """
-    _id = script_item["_id"]
-    timestamp = script_item["timestamp"]
-
-    # 严格按照timestamp进行裁剪
-    start_time, end_time = parse_timestamp(timestamp)
-
-    # 转换为FFmpeg兼容的时间格式
-    ffmpeg_start_time = start_time.replace(',', '.')
-    ffmpeg_end_time = end_time.replace(',', '.')
-
-    # 生成输出文件名
-    safe_start_time = start_time.replace(':', '-').replace(',', '-')
-    safe_end_time = end_time.replace(':', '-').replace(',', '-')
-    output_filename = f"ost1_vid_{safe_start_time}@{safe_end_time}.mp4"
-    output_path = os.path.join(output_dir, output_filename)
-
-    # 构建FFmpeg命令 - 保持原声
-    cmd = _build_ffmpeg_command_with_audio_control(
-        video_origin_path, output_path, ffmpeg_start_time, ffmpeg_end_time,
-        encoder_config, hwaccel_args, remove_audio=False
-    )
-
-    # 执行命令
-    success = execute_ffmpeg_with_fallback(
-        cmd, timestamp, video_origin_path, output_path,
-        ffmpeg_start_time, ffmpeg_end_time
+    return _cut_segment(
+        video_origin_path, segment, output_dir, encoder_config, hwaccel_args,
+        remove_audio=False, progress_callback=progress_callback
     )
 
-    return output_path if success else None
-
 
 def _process_mixed_segment(
     video_origin_path: str,
-    script_item: Dict,
-    tts_map: Dict,
+    segment: Segment,
     output_dir: str,
     encoder_config: Dict,
-    hwaccel_args: List[str]
+    hwaccel_args: List[str],
+    progress_callback: Optional[ProgressCallback] = None
 ) -> Optional[str]:
     """
     处理OST=2的解说+原声混合片段
     - 根据TTS音频时长动态裁剪
     - 保持原声，确保视频时长等于TTS音频时长
     """
-    _id = script_item["_id"]
-    timestamp = script_item["timestamp"]
-
-    # 获取对应的TTS结果
-    tts_item = tts_map.get(_id)
-    if not tts_item:
-        logger.error(f"未找到片段 {_id} 的TTS结果")
-        return None
-
-    # 解析起始时间，使用TTS音频时长计算结束时间
-    start_time, _ = parse_timestamp(timestamp)
-    duration = tts_item["duration"]
-    calculated_end_time = calculate_end_time(start_time, duration, extra_seconds=0)
-
-    # 转换为FFmpeg兼容的时间格式
-    ffmpeg_start_time = start_time.replace(',', '.')
-    ffmpeg_end_time = calculated_end_time.replace(',', '.')
-
-    # 生成输出文件名
-    safe_start_time = start_time.replace(':', '-').replace(',', '-')
-    safe_end_time = calculated_end_time.replace(':', '-').replace(',', '-')
-    output_filename = f"ost2_vid_{safe_start_time}@{safe_end_time}.mp4"
-    output_path = os.path.join(output_dir, output_filename)
-
-    # 构建FFmpeg命令 - 保持原声
-    cmd = _build_ffmpeg_command_with_audio_control(
-        video_origin_path, output_path, ffmpeg_start_time, ffmpeg_end_time,
-        encoder_config, hwaccel_args, remove_audio=False
-    )
-
-    # 执行命令
-    success = execute_ffmpeg_with_fallback(
-        cmd, timestamp, video_origin_path, output_path,
-        ffmpeg_start_time, ffmpeg_end_time
+    return _cut_segment(
+        video_origin_path, segment, output_dir, encoder_config, hwaccel_args,
+        remove_audio=False, progress_callback=progress_callback
     )
 
-    return output_path if success else None
-
 
 def _build_ffmpeg_command_with_audio_control(
     input_path: str,
@@ -779,20 +758,26 @@ def _build_ffmpeg_command_with_audio_control(
 
 def clip_video_unified(
         video_origin_path: str,
-        script_list: List[Dict],
+        script_list: Union[Timeline, List[Dict]],
         tts_results: List[Dict],
         output_dir: Optional[str] = None,
-        task_id: Optional[str] = None
+        task_id: Optional[str] = None,
+        progress_callback: Optional[ProgressCallback] = None,
+        draft: bool = False,
+        reuse_existing: bool = False
 ) -> Dict[str, str]:
     """
     基于OST类型的统一视频裁剪策略 - 消除双重裁剪问题
 
     Args:
         video_origin_path: 原始视频的路径
-        script_list: 完整的脚本列表，包含所有片段信息
+        script_list: 完整的脚本列表或 Timeline（传入 Timeline 时裁剪结果直接写入对应片段）
         tts_results: TTS结果列表，仅包含OST=0和OST=2的片段
         output_dir: 输出目录路径，默认为None时会自动生成
         task_id: 任务ID，用于生成唯一的输出目录，默认为None时会自动生成
+        progress_callback: 整体裁剪进度回调，参数为0~1的完成比例
+        draft: 草稿模式，从低分辨率代理裁剪并使用 ultrafast 编码
+        reuse_existing: 片段已有裁剪结果（segment.video，由增量渲染恢复）且文件存在时不再重新裁剪
 
     Returns:
         Dict[str, str]: 片段ID到裁剪后视频路径的映射
@@ -801,9 +786,19 @@ def clip_video_unified(
     if not os.path.exists(video_origin_path):
         raise FileNotFoundError(f"视频文件不存在: {video_origin_path}")
 
+    if draft:
+        # 代理与原视频的时间轴相同，后续按同样的时间戳裁剪
+        video_origin_path = proxy_media.get_proxy(
+            video_origin_path, progress_callback=scale_progress(progress_callback, 0.0, 0.3)
+        )
+        progress_callback = scale_progress(progress_callback, 0.3, 1.0)
+
+    timeline = Timeline.coerce(script_list)
+    timeline.apply_tts(tts_results)
+
     # 如果未提供task_id，则根据输入生成一个唯一ID
     if task_id is None:
-        content_for_hash = f"{video_origin_path}_{json.dumps(script_list)}"
+        content_for_hash = f"{video_origin_path}_{json.dumps([segment.item for segment in timeline])}"
         task_id = hashlib.md5(content_for_hash.encode()).hexdigest()
 
     # 设置输出目录
@@ -816,57 +811,66 @@ def clip_video_unified(
     # 确保输出目录存在
     Path(output_dir).mkdir(parents=True, exist_ok=True)
 
-    # 创建TTS结果的快速查找映射
-    tts_map = {item['_id']: item for item in tts_results}
-
-    # 获取硬件加速支持
-    hwaccel_type = check_hardware_acceleration()
+    # 获取硬件加速支持（草稿的代理分辨率很低，ultrafast 软件编码已足够快）
+    hwaccel_type = None if draft else check_hardware_acceleration()
     hwaccel_args = []
 
     if hwaccel_type:
         hwaccel_args = ffmpeg_utils.get_ffmpeg_hwaccel_args()
         hwaccel_info = ffmpeg_utils.get_ffmpeg_hwaccel_info()
         logger.info(f"🚀 使用硬件加速: {hwaccel_type} ({hwaccel_info.get('message', '')})")
+    elif draft:
+        logger.info("📝 草稿模式：使用代理视频和 ultrafast 软件编码")
     else:
         logger.info("🔧 使用软件编码")
 
     # 获取编码器配置
-    encoder_config = get_safe_encoder_config(hwaccel_type)
+    encoder_config = proxy_media.draft_encoder_config() if draft else get_safe_encoder_config(hwaccel_type)
     logger.debug(f"编码器配置: {encoder_config}")
 
     # 统计信息
-    total_clips = len(script_list)
+    total_clips = len(timeline)
     result = {}
     failed_clips = []
     success_count = 0
 
     logger.info(f"📹 开始统一视频裁剪，总共{total_clips}个片段")
 
-    for i, script_item in enumerate(script_list, 1):
-        _id = script_item.get("_id")
-        ost = script_item.get("OST", 0)
-        timestamp = script_item["timestamp"]
+    for i, segment in enumerate(timeline, 1):
+        _id = segment.id
+        ost = segment.ost
+        timestamp = segment.timestamp
 
         logger.info(f"📹 [{i}/{total_clips}] 处理片段 ID:{_id}, OST:{ost}, 时间戳:{timestamp}")
+        clip_progress = scale_progress(progress_callback, (i - 1) / total_clips, i / total_clips)
+
+        if reuse_existing and segment.video and segment.clip_end is not None and os.path.exists(segment.video):
+            result[_id] = segment.video
+            success_count += 1
+            logger.info(f"♻️  [{i}/{total_clips}] 复用已有片段: OST={ost}, ID={_id}")
+            if clip_progress:
+                clip_progress(1.0)
+            continue
 
         try:
             if ost == 0:  # 纯解说片段
                 output_path = _process_narration_only_segment(
-                    video_origin_path, script_item, tts_map, output_dir,
-                    encoder_config, hwaccel_args
+                    video_origin_path, segment, output_dir,
+                    encoder_config, hwaccel_args, clip_progress
                 )
             elif ost == 1:  # 纯原声片段
                 output_path = _process_original_audio_segment(
-                    video_origin_path, script_item, output_dir,
-                    encoder_config, hwaccel_args
+                    video_origin_path, segment, output_dir,
+                    encoder_config, hwaccel_args, clip_progress
                 )
             elif ost == 2:  # 解说+原声混合片段
                 output_path = _process_mixed_segment(
-                    video_origin_path, script_item, tts_map, output_dir,
-                    encoder_config, hwaccel_args
+                    video_origin_path, segment, output_dir,
+                    encoder_config, hwaccel_args, clip_progress
                 )
             else:
                 logger.warning(f"未知的OST类型: {ost}，跳过片段 {_id}")
+                segment.video, segment.clip_end = "", segment.source_start
                 continue
 
             if output_path and os.path.exists(output_path) and os.path.getsize(output_path) > 0:
@@ -874,13 +878,19 @@ def clip_video_unified(
                 success_count += 1
                 logger.info(f"✅ [{i}/{total_clips}] 片段处理成功: OST={ost}, ID={_id}")
             else:
+                # 裁剪失败的片段不会出现在成片中，也不占用成片时间
+                segment.video, segment.clip_end = "", segment.source_start
                 failed_clips.append(f"ID:{_id}, OST:{ost}")
                 logger.error(f"❌ [{i}/{total_clips}] 片段处理失败: OST={ost}, ID={_id}")
 
         except Exception as e:
+            segment.video, segment.clip_end = "", segment.source_start
             failed_clips.append(f"ID:{_id}, OST:{ost}")
             logger.error(f"❌ [{i}/{total_clips}] 片段处理异常: OST={ost}, ID={_id}, 错误: {str(e)}")
 
+    # 按实际裁剪时长重新计算各片段在成片中的位置
+    timeline.layout()
+
     # 最终统计
     logger.info(f"📊 统一视频裁剪完成: 成功 {success_count}/{total_clips}, 失败 {len(failed_clips)}")
 
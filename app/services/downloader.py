@@ -0,0 +1,322 @@
+"""
+素材下载管理器
+
+- 分块流式写入 .part 临时文件，不再把整个视频读入内存
+- 中断后再次下载时通过 HTTP Range 从已下载的位置继续
+- 有界的并发下载线程池，复用共享的 requests.Session 连接池
+- 下载完成后用一次 ffprobe 校验时长和帧率，校验通过才重命名为正式文件
+- 同一 URL（忽略查询参数）的并发下载合并为一次
+"""
+
+import json
+import os
+import subprocess
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+import requests
+from loguru import logger
+
+from app.config import config
+from app.services import storage_manager
+from app.utils import utils
+from app.utils.http_session import get_session
+
+# 每次写入的块大小
+CHUNK_SIZE = 1024 * 1024
+# 默认并发下载数
+DEFAULT_MAX_WORKERS = 4
+# 单个文件下载中断后的最大续传次数
+MAX_RESUME_ATTEMPTS = 3
+PART_SUFFIX = ".part"
+
+
+def url_key(url: str) -> str:
+    """URL 的缓存键（忽略查询参数，与历史的 vid-<md5>.mp4 命名保持一致）"""
+    return utils.md5(url.split("?")[0])
+
+
+def probe_video(path: str) -> Optional[Tuple[float, float]]:
+    """
+    使用一次 ffprobe 读取视频的时长和帧率
+
+    Args:
+        path: 视频文件路径
+
+    Returns:
+        Optional[Tuple[float, float]]: (时长, 帧率)，无法解析时返回None
+
+    Raises:
+        FileNotFoundError: 系统中没有 ffprobe
+    """
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "stream=r_frame_rate:format=duration",
+        "-of", "json",
+        path,
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+    except subprocess.TimeoutExpired:
+        return None
+    if result.returncode != 0:
+        return None
+    try:
+        info = json.loads(result.stdout or "{}")
+        duration = float(info.get("format", {}).get("duration") or 0)
+        streams = info.get("streams") or []
+        rate = (streams[0].get("r_frame_rate") if streams else None) or "0/1"
+        num, _, den = rate.partition("/")
+        den = float(den or 1)
+        fps = float(num) / den if den else 0.0
+    except (ValueError, TypeError):
+        return None
+    return duration, fps
+
+
+def _validate_with_moviepy(path: str) -> bool:
+    from moviepy.video.io.VideoFileClip import VideoFileClip
+
+    clip = VideoFileClip(path)
+    try:
+        return bool(clip.duration and clip.duration > 0 and clip.fps and clip.fps > 0)
+    finally:
+        clip.close()
+
+
+def is_valid_video(path: str) -> bool:
+    """校验下载的视频文件是否可用（时长和帧率都大于0）"""
+    try:
+        probed = probe_video(path)
+    except FileNotFoundError:
+        # 没有安装 ffprobe 时退回到 MoviePy 校验
+        try:
+            return _validate_with_moviepy(path)
+        except Exception as e:
+            logger.warning(f"视频校验失败: {path} => {str(e)}")
+            return False
+    if probed is None:
+        return False
+    duration, fps = probed
+    return duration > 0 and fps > 0
+
+
+class DownloadManager:
+    """并发、可续传的素材下载管理器"""
+
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        session: Optional[requests.Session] = None,
+        proxies: Optional[dict] = None,
+        verify: bool = False,
+        timeout: Tuple[int, int] = (60, 240),
+        chunk_size: int = CHUNK_SIZE,
+        validate: Callable[[str], bool] = is_valid_video
+    ):
+        """
+        Args:
+            max_workers: 最大并发下载数
+            session: HTTP 会话，默认使用共享的素材下载会话
+            proxies: 代理配置，默认使用 config.proxy
+            verify: 是否校验 HTTPS 证书（与原实现一致默认不校验）
+            timeout: (连接超时, 读取超时)
+            chunk_size: 写入块大小
+            validate: 下载完成后的文件校验函数
+        """
+        self.max_workers = max(1, int(max_workers))
+        self.session = session or get_session("materials", pool_size=self.max_workers)
+        self.proxies = proxies if proxies is not None else config.proxy
+        self.verify = verify
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.validate = validate
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="material-download")
+            return self._executor
+
+    @staticmethod
+    def target_path(url: str, save_dir: str = "") -> str:
+        """URL 对应的本地文件路径"""
+        if not save_dir:
+            save_dir = utils.storage_dir("cache_videos")
+        return os.path.join(save_dir, f"vid-{url_key(url)}.mp4")
+
+    def submit(self, url: str, save_dir: str = "") -> "Future[str]":
+        """
+        提交下载任务；同一文件正在下载时返回同一个 Future
+
+        Args:
+            url: 视频地址
+            save_dir: 保存目录，为空时使用 storage/cache_videos
+
+        Returns:
+            Future[str]: 结果为保存路径，下载或校验失败时为空字符串
+        """
+        path = self.target_path(url, save_dir)
+        with self._lock:
+            future = self._inflight.get(path)
+            if future is not None:
+                logger.debug(f"合并重复的下载请求: {url}")
+                return future
+            future = Future()
+            self._inflight[path] = future
+
+        def _run():
+            try:
+                future.set_result(self._download(url, path))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    self._inflight.pop(path, None)
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            # 已下载过的文件直接返回，不占用下载线程
+            _run()
+        else:
+            self.executor.submit(_run)
+        return future
+
+    def download(self, url: str, save_dir: str = "") -> str:
+        """下载单个视频并等待完成，返回保存路径（失败时返回空字符串）"""
+        return self.submit(url, save_dir).result()
+
+    def download_iter(self, urls: Iterable[str], save_dir: str = "") -> Iterator[Tuple[str, str]]:
+        """
+        按输入顺序并发下载，逐个返回 (url, 保存路径)
+
+        同时进行的下载不超过 max_workers 个；调用方提前停止迭代时不再提交新的下载
+
+        Args:
+            urls: 视频地址
+            save_dir: 保存目录
+
+        Yields:
+            Tuple[str, str]: (url, 保存路径)，失败时保存路径为空字符串
+        """
+        pending = []
+        iterator = iter(urls)
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < self.max_workers:
+                try:
+                    url = next(iterator)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending.append((url, self.submit(url, save_dir)))
+            if not pending:
+                return
+            url, future = pending.pop(0)
+            try:
+                yield url, future.result()
+            except Exception as e:
+                logger.error(f"下载失败: {url} => {str(e)}")
+                yield url, ""
+
+    def _download(self, url: str, path: str) -> str:
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            logger.info(f"video already exists: {path}")
+            storage_manager.touch(path)
+            return path
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        part_path = path + PART_SUFFIX
+        for attempt in range(MAX_RESUME_ATTEMPTS + 1):
+            try:
+                if self._fetch(url, part_path):
+                    break
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                if attempt >= MAX_RESUME_ATTEMPTS:
+                    logger.error(f"下载中断且续传次数已用完: {url} => {str(e)}")
+                    return ""
+                logger.warning(f"下载中断，将从 {self._part_size(part_path)} 字节处续传: {url} => {str(e)}")
+        else:
+            return ""
+
+        if not self.validate(part_path):
+            logger.warning(f"无效的视频文件: {url}")
+            self._remove(part_path)
+            return ""
+
+        os.replace(part_path, path)
+        storage_manager.touch(path, written=True)
+        return path
+
+    @staticmethod
+    def _part_size(part_path: str) -> int:
+        return os.path.getsize(part_path) if os.path.exists(part_path) else 0
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _fetch(self, url: str, part_path: str) -> bool:
+        """把 url 流式写入 part_path（已有部分内容时请求剩余部分），完整下载返回 True"""
+        offset = self._part_size(part_path)
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+        with self.session.get(
+            url,
+            headers=headers,
+            proxies=self.proxies,
+            verify=self.verify,
+            timeout=self.timeout,
+            stream=True,
+        ) as response:
+            if response.status_code == 416 and offset:
+                # 已下载的部分就是完整文件
+                return True
+            response.raise_for_status()
+
+            if offset and response.status_code != 206:
+                # 服务端不支持 Range，从头下载
+                logger.debug(f"服务端不支持断点续传，重新下载: {url}")
+                offset = 0
+            mode = "ab" if offset else "wb"
+
+            expected = response.headers.get("Content-Length")
+            written = 0
+            with open(part_path, mode) as f:
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    if chunk:
+                        f.write(chunk)
+                        written += len(chunk)
+
+        if expected is not None and written < int(expected):
+            raise requests.exceptions.ChunkedEncodingError(f"连接提前关闭: {written}/{expected} 字节")
+        return True
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+_manager: Optional[DownloadManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_download_manager() -> DownloadManager:
+    """获取进程共享的下载管理器（并发数由 [app] material_download_workers 配置）"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = DownloadManager(
+                max_workers=config.app.get("material_download_workers", DEFAULT_MAX_WORKERS)
+            )
+        return _manager
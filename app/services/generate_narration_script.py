@@ -118,7 +118,7 @@ def parse_frame_analysis_to_markdown(json_file_path):
         return ""  # 返回空字符串，而不是错误信息
 
 
-def generate_narration(markdown_content, api_key, base_url, model, video_type="documentary"):
+def generate_narration(markdown_content, api_key, base_url, model, video_type="documentary", on_item=None):
     """
     调用大模型API根据视频帧分析的Markdown内容生成解说文案 - 已重构为使用新的LLM服务架构
 
@@ -127,6 +127,7 @@ def generate_narration(markdown_content, api_key, base_url, model, video_type="d
     :param base_url: API基础URL
     :param model: 使用的模型名称
     :param video_type: 视频类型，支持: documentary(纪录片), outdoor_food(野外美食), movie_commentary(影视解说), movie_mashup(影视混剪)
+    :param on_item: 可选回调，传入时流式生成，每个解说片段生成完成后立即回调
     :return: 生成的解说文案
     """
     # 检查markdown_content是否为空或无效
@@ -147,7 +148,7 @@ def generate_narration(markdown_content, api_key, base_url, model, video_type="d
     try:
         # 优先使用新的LLM服务架构
         logger.info(f"使用新的LLM服务架构生成解说文案，视频类型: {video_type}")
-        result = generate_narration_new(markdown_content, api_key, base_url, model, video_type)
+        result = generate_narration_new(markdown_content, api_key, base_url, model, video_type, on_item=on_item)
         
         # 验证返回的结果
         if not result or result.strip() == "":
@@ -10,7 +10,6 @@
 
 import os
 import traceback
-import tempfile
 from typing import Optional, Dict, Any
 from loguru import logger
 from moviepy import (
@@ -22,11 +21,11 @@ from moviepy import (
     afx
 )
 from moviepy.video.tools.subtitles import SubtitlesClip
-from PIL import ImageFont
 
-from app.utils import utils
+from app.utils import subtitle_layout, utils
 from app.models.schema import AudioVolumeDefaults
-from app.services.audio_normalizer import AudioNormalizer, normalize_audio_for_mixing
+from app.services import loudness, proxy_media
+from app.services.bgm_bed import build_bgm_bed
 
 
 def is_valid_subtitle_file(subtitle_path: str) -> bool:
@@ -83,6 +82,7 @@ def merge_materials(
         options: 其他选项配置，可包含以下字段:
             - voice_volume: 人声音量，默认1.0
             - bgm_volume: 背景音乐音量，默认0.3
+            - bgm_fade_out: 背景音乐每次循环结尾的淡出时长（秒），默认3
             - original_audio_volume: 原始音频音量，默认0.0
             - keep_original_audio: 是否保留原始音频，默认False
             - subtitle_font: 字幕字体，默认None，系统会使用默认字体
@@ -96,6 +96,12 @@ def merge_materials(
             - threads: 处理线程数，默认2
             - fps: 输出帧率，默认30
             - subtitle_enabled: 是否启用字幕，默认True
+            - subtitle_scale: 字幕字号和描边的缩放比例，默认1.0（草稿按分辨率缩小时使用）
+            - draft: 草稿模式，跳过响度分析并使用 ultrafast 编码，默认False
+            - include_audio: 是否合成音频，默认True（分段并行编码时各段只编码画面）
+            - audio_output: 只导出混音后的完整音轨到该路径（跳过字幕和画面编码），返回音轨路径，没有音轨时返回None
+            - time_range: (开始, 结束) 秒，只编码这一段画面
+            - ffmpeg_params: 附加的编码参数列表
             
     返回:
         输出视频的路径
@@ -107,6 +113,7 @@ def merge_materials(
     # 设置默认参数值 - 使用统一的音量配置
     voice_volume = options.get('voice_volume', AudioVolumeDefaults.VOICE_VOLUME)
     bgm_volume = options.get('bgm_volume', AudioVolumeDefaults.BGM_VOLUME)
+    bgm_fade_out = options.get('bgm_fade_out', 3)
     # 修复bug: 将原声音量默认值从0.0改为0.7，确保短剧解说模式下原片音量正常
     original_audio_volume = options.get('original_audio_volume', AudioVolumeDefaults.ORIGINAL_VOLUME)
     keep_original_audio = options.get('keep_original_audio', True)  # 默认保留原声
@@ -121,6 +128,22 @@ def merge_materials(
     threads = options.get('threads', 2)
     fps = options.get('fps', 30)
     subtitle_enabled = options.get('subtitle_enabled', True)
+    draft = options.get('draft', False)
+    include_audio = options.get('include_audio', True)
+    audio_output = options.get('audio_output')
+    time_range = options.get('time_range')
+    ffmpeg_params = options.get('ffmpeg_params')
+    if not include_audio:
+        # 只编码画面：不加载配音、原声和背景音乐
+        audio_path = None
+        bgm_path = None
+        keep_original_audio = False
+
+    # 草稿的分辨率按比例缩小，字幕也同比缩小以保持相同的画面布局
+    subtitle_scale = options.get('subtitle_scale', 1.0)
+    if subtitle_scale != 1.0:
+        subtitle_font_size = max(1, int(round(subtitle_font_size * subtitle_scale)))
+        stroke_width = stroke_width * subtitle_scale
 
     # 配置日志 - 便于调试问题
     logger.info(f"音量配置详情:")
@@ -193,37 +216,37 @@ def merge_materials(
     # 处理背景音乐和所有音频轨道合成
     audio_tracks = []
 
-    # 智能音量调整（可选功能）
-    if AudioVolumeDefaults.ENABLE_SMART_VOLUME and audio_path and os.path.exists(audio_path) and original_audio is not None:
+    # 智能音量调整（可选功能，草稿模式跳过响度分析，直接使用设置的音量）
+    if not draft and AudioVolumeDefaults.ENABLE_SMART_VOLUME and audio_path and os.path.exists(audio_path) and original_audio is not None:
         try:
-            normalizer = AudioNormalizer()
-            temp_dir = tempfile.mkdtemp()
-            temp_original_path = os.path.join(temp_dir, "temp_original.wav")
-
-            # 保存原声到临时文件进行分析
-            original_audio.write_audiofile(temp_original_path, verbose=False, logger=None)
-
-            # 计算智能音量调整
-            tts_adjustment, original_adjustment = normalizer.calculate_volume_adjustment(
-                audio_path, temp_original_path
-            )
+            # 直接对源文件做一次 ebur128 扫描，结果按文件指纹缓存，无需导出临时WAV
+            tts_profile = loudness.measure_loudness(audio_path)
+            original_profile = loudness.measure_loudness(video_path)
+            gains = None
+            if tts_profile and original_profile:
+                gains = loudness.calculate_mix_gains(
+                    tts_profile, original_profile,
+                    # original_audio 已经乘过一次原声音量
+                    original_pre_gain=original_audio_volume
+                )
 
-            # 应用智能调整，但保留用户设置的相对比例
-            smart_voice_volume = voice_volume * tts_adjustment
-            smart_original_volume = original_audio_volume * original_adjustment
+            if gains:
+                tts_adjustment, original_adjustment = gains
 
-            # 限制音量范围，避免过度调整
-            smart_voice_volume = max(0.1, min(1.5, smart_voice_volume))
-            smart_original_volume = max(0.1, min(2.0, smart_original_volume))
+                # 应用智能调整，但保留用户设置的相对比例
+                smart_voice_volume = voice_volume * tts_adjustment
+                smart_original_volume = original_audio_volume * original_adjustment
 
-            voice_volume = smart_voice_volume
-            original_audio_volume = smart_original_volume
+                # 限制音量范围，避免过度调整
+                smart_voice_volume = max(0.1, min(1.5, smart_voice_volume))
+                smart_original_volume = max(0.1, min(2.0, smart_original_volume))
 
-            logger.info(f"智能音量调整 - TTS: {voice_volume:.2f}, 原声: {original_audio_volume:.2f}")
+                voice_volume = smart_voice_volume
+                original_audio_volume = smart_original_volume
 
-            # 清理临时文件
-            import shutil
-            shutil.rmtree(temp_dir)
+                logger.info(f"智能音量调整 - TTS: {voice_volume:.2f}, 原声: {original_audio_volume:.2f}")
+            else:
+                logger.warning("无法分析音频响度，使用原始设置")
 
         except Exception as e:
             logger.warning(f"智能音量分析失败，使用原始设置: {e}")
@@ -251,11 +274,18 @@ def merge_materials(
     # 添加背景音乐（如果有）
     if bgm_path and os.path.exists(bgm_path):
         try:
-            bgm_clip = AudioFileClip(bgm_path).with_effects([
-                afx.MultiplyVolume(bgm_volume),
-                afx.AudioFadeOut(3),
-                afx.AudioLoop(duration=video_clip.duration),
-            ])
+            # 优先使用ffmpeg预渲染好的背景音乐音轨，避免导出时逐块执行音效
+            bgm_bed_path = build_bgm_bed(bgm_path, video_clip.duration, bgm_volume, fade_out=bgm_fade_out)
+            if bgm_bed_path:
+                bgm_clip = AudioFileClip(bgm_bed_path)
+                if bgm_clip.duration > video_clip.duration:
+                    bgm_clip = bgm_clip.subclipped(0, video_clip.duration)
+            else:
+                bgm_clip = AudioFileClip(bgm_path).with_effects([
+                    afx.MultiplyVolume(bgm_volume),
+                    afx.AudioFadeOut(bgm_fade_out),
+                    afx.AudioLoop(duration=video_clip.duration),
+                ])
             audio_tracks.append(bgm_clip)
             logger.info(f"已添加背景音乐，音量: {bgm_volume}")
         except Exception as e:
@@ -266,8 +296,21 @@ def merge_materials(
         final_audio = CompositeAudioClip(audio_tracks)
         video_clip = video_clip.with_audio(final_audio)
         logger.info(f"已合成所有音频轨道，共{len(audio_tracks)}个")
-    else:
+    elif include_audio:
         logger.warning("没有可用的音频轨道，输出视频将没有声音")
+
+    if audio_output:
+        # 只导出音轨，时长与画面一致
+        try:
+            if video_clip.audio is None:
+                return None
+            video_clip.audio.with_duration(video_clip.duration).write_audiofile(
+                audio_output, fps=44100, codec="aac"
+            )
+            logger.success(f"音轨导出完成: {audio_output}")
+            return audio_output
+        finally:
+            video_clip.close()
     
     # 处理字体路径
     font_path = None
@@ -383,6 +426,9 @@ def merge_materials(
     elif not subtitle_path:
         logger.info("未提供字幕文件路径，跳过字幕处理")
     
+    if time_range:
+        video_clip = video_clip.subclipped(*time_range)
+
     # 导出最终视频
     try:
         video_clip.write_videofile(
@@ -391,6 +437,8 @@ def merge_materials(
             temp_audiofile_path=output_dir,
             threads=threads,
             fps=fps,
+            preset=proxy_media.DRAFT_PRESET if draft else "medium",
+            ffmpeg_params=ffmpeg_params,
         )
         logger.success(f"素材合并完成: {output_path}")
     except Exception as e:
@@ -406,72 +454,18 @@ def merge_materials(
 
 def wrap_text(text, max_width, font="Arial", fontsize=60):
     """
-    文本换行函数，使长文本适应指定宽度
-    
-    参数:
-        text: 需要换行的文本
+    文本自动换行处理（字体和字形宽度按字体、字号缓存，见 app.utils.subtitle_layout）
+
+    Args:
+        text: 待处理的文本
         max_width: 最大宽度（像素）
-        font: 字体路径
+        font: 字体文件路径
         fontsize: 字体大小
-        
-    返回:
-        换行后的文本和文本高度
+
+    Returns:
+        tuple: (换行后的文本, 文本高度)
     """
-    # 创建ImageFont对象
-    try:
-        font_obj = ImageFont.truetype(font, fontsize)
-    except:
-        # 如果无法加载指定字体，使用默认字体
-        font_obj = ImageFont.load_default()
-    
-    def get_text_size(inner_text):
-        inner_text = inner_text.strip()
-        left, top, right, bottom = font_obj.getbbox(inner_text)
-        return right - left, bottom - top
-
-    width, height = get_text_size(text)
-    if width <= max_width:
-        return text, height
-
-    processed = True
-
-    _wrapped_lines_ = []
-    words = text.split(" ")
-    _txt_ = ""
-    for word in words:
-        _before = _txt_
-        _txt_ += f"{word} "
-        _width, _height = get_text_size(_txt_)
-        if _width <= max_width:
-            continue
-        else:
-            if _txt_.strip() == word.strip():
-                processed = False
-                break
-            _wrapped_lines_.append(_before)
-            _txt_ = f"{word} "
-    _wrapped_lines_.append(_txt_)
-    if processed:
-        _wrapped_lines_ = [line.strip() for line in _wrapped_lines_]
-        result = "\n".join(_wrapped_lines_).strip()
-        height = len(_wrapped_lines_) * height
-        return result, height
-
-    _wrapped_lines_ = []
-    chars = list(text)
-    _txt_ = ""
-    for word in chars:
-        _txt_ += word
-        _width, _height = get_text_size(_txt_)
-        if _width <= max_width:
-            continue
-        else:
-            _wrapped_lines_.append(_txt_)
-            _txt_ = ""
-    _wrapped_lines_.append(_txt_)
-    result = "\n".join(_wrapped_lines_).strip()
-    height = len(_wrapped_lines_) * height
-    return result, height
+    return subtitle_layout.wrap_text(text, max_width, font, fontsize)
 
 
 if __name__ == '__main__':
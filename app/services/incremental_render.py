@@ -0,0 +1,287 @@
+"""
+增量渲染
+
+每次点击生成都会新建一个 task_id，配音、裁剪、规范化（merger_video 中统一分辨率和帧率的中间文件）
+全部重新计算，即使只改了 80 个片段中 2 个片段的解说。增量模式按原视频内容为每个项目保留一个缓存目录
+（storage/temp/projects/<原视频指纹>/），其中的 manifest.json 按片段 _id 记录上一次成功渲染的结果：
+
+- 配音：签名为 (解说文本, TTS 引擎, 音色, 语速, 音调)，签名相同且文件完整时复用配音、字幕和配音时长
+- 裁剪：签名为 (OST, 裁剪时间段, 是否草稿)，裁剪时间段由脚本时间戳和配音时长决定，
+  所以改了文本导致配音时长变化的片段会自动重新裁剪
+- 规范化中间文件：由 merger_video.combine_clip_videos 按 (裁剪片段指纹, 分辨率, 是否保留原声, 是否草稿)
+  缓存在 normalized/ 下
+
+只有签名变化或文件丢失的片段会重新生成，音频/字幕合并、视频拼接和最后的合成仍然完整执行。
+manifest 只在整个任务成功后写入，中途失败不会让后续渲染复用不完整的结果。
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+from app.models.timeline import Segment, Timeline
+from app.services import storage_manager
+from app.utils import utils
+from app.utils.fingerprint import file_fingerprint
+
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+PROJECTS_DIR_NAME = "projects"
+
+
+def _signature(*parts: Any) -> str:
+    return hashlib.md5(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _segment_key(segment: Segment) -> Optional[str]:
+    """manifest 中片段的键：优先使用 _id，没有 _id 时使用时间戳"""
+    if segment.id is not None:
+        return str(segment.id)
+    return segment.timestamp or None
+
+
+def _file_ok(path: str, size: Optional[int]) -> bool:
+    """文件存在且大小与记录一致"""
+    return bool(path) and os.path.isfile(path) and (size is None or os.path.getsize(path) == size)
+
+
+def _size(path: str) -> Optional[int]:
+    return os.path.getsize(path) if path and os.path.isfile(path) else None
+
+
+def _copy_atomic(src: str, dst: str) -> None:
+    part = f"{dst}.part"
+    shutil.copyfile(src, part)
+    os.replace(part, dst)
+
+
+class IncrementalRender:
+    """
+    一个项目（同一个原视频）的增量渲染缓存
+
+    用法（见 task.start_subclip_unified）：
+        cache = IncrementalRender.open(video_origin_path, draft)
+        tts_targets = cache.restore_tts(timeline, tts_settings)   # 只为返回的片段生成配音
+        cache.restore_clips(timeline)                              # 恢复未变化片段的裁剪结果
+        ...
+        cache.commit(timeline)                                     # 任务成功后写入 manifest
+    """
+
+    def __init__(self, directory: str, draft: bool = False):
+        self.directory = directory
+        self.draft = draft
+        self.started_at = time.time()
+        self._tts_settings: Dict[str, Any] = {}
+        os.makedirs(self.tts_dir, exist_ok=True)
+        os.makedirs(self.clip_dir, exist_ok=True)
+        os.makedirs(self.normalized_dir, exist_ok=True)
+        self.manifest = self._load()
+
+    @classmethod
+    def open(cls, video_origin_path: str, draft: bool = False) -> "IncrementalRender":
+        """
+        打开原视频对应的项目缓存（不存在时创建）
+
+        Args:
+            video_origin_path: 原视频路径，项目按原视频的内容指纹区分
+            draft: 是否为草稿渲染（草稿和成片的裁剪片段分开缓存，配音共用）
+        """
+        project_id = file_fingerprint(video_origin_path)
+        directory = os.path.join(utils.storage_dir("temp", create=True), PROJECTS_DIR_NAME, project_id)
+        cache = cls(directory, draft=draft)
+        storage_manager.touch(directory)
+        logger.info(f"增量渲染：项目缓存 {directory}（已记录 {len(cache.manifest['segments'])} 个片段）")
+        return cache
+
+    @property
+    def tts_dir(self) -> str:
+        return os.path.join(self.directory, "tts")
+
+    @property
+    def clip_dir(self) -> str:
+        """裁剪片段目录，作为 clip_video_unified 的 output_dir"""
+        return os.path.join(self.directory, "clips_draft" if self.draft else "clips")
+
+    @property
+    def normalized_dir(self) -> str:
+        """规范化中间文件目录，作为 combine_clip_videos 的 cache_dir"""
+        return os.path.join(self.directory, "normalized_draft" if self.draft else "normalized")
+
+    @property
+    def _clip_field(self) -> str:
+        return "clip_draft" if self.draft else "clip"
+
+    def _load(self) -> Dict[str, Any]:
+        path = os.path.join(self.directory, MANIFEST_FILE)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("version") == MANIFEST_VERSION:
+                return manifest
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"增量渲染记录无法读取，将完整渲染: {e}")
+        return {"version": MANIFEST_VERSION, "segments": {}}
+
+    def _entry(self, segment: Segment, field: str) -> Optional[Dict[str, Any]]:
+        key = _segment_key(segment)
+        if key is None:
+            return None
+        return self.manifest["segments"].get(key, {}).get(field)
+
+    def _tts_signature(self, segment: Segment) -> str:
+        return _signature(
+            segment.narration,
+            self._tts_settings.get("tts_engine"),
+            self._tts_settings.get("voice_name"),
+            self._tts_settings.get("voice_rate"),
+            self._tts_settings.get("voice_pitch"),
+        )
+
+    def _clip_signature(self, segment: Segment) -> Optional[str]:
+        clip_range = segment.clip_range()
+        if clip_range is None:
+            return None
+        return _signature(segment.ost, list(clip_range), self.draft)
+
+    def restore_tts(self, timeline: Timeline, tts_settings: Dict[str, Any]) -> Timeline:
+        """
+        为配音签名未变化的片段恢复配音结果
+
+        Args:
+            timeline: 本次渲染的时间轴
+            tts_settings: tts_engine / voice_name / voice_rate / voice_pitch
+
+        Returns:
+            Timeline: 需要重新生成配音的片段（与 timeline 共用 Segment 对象，可直接传给 voice.tts_multiple）
+        """
+        self._tts_settings = dict(tts_settings)
+        dirty = []
+        reused = 0
+        for segment in timeline:
+            if segment.ost == 1:
+                continue
+            entry = self._entry(segment, "tts")
+            if (
+                entry
+                and entry.get("signature") == self._tts_signature(segment)
+                and _file_ok(entry.get("audio", ""), entry.get("audio_size"))
+                and (not entry.get("subtitle") or _file_ok(entry["subtitle"], entry.get("subtitle_size")))
+            ):
+                segment.audio = entry["audio"]
+                segment.subtitle = entry.get("subtitle") or ""
+                segment.tts_duration = int(entry["duration_ms"])
+                reused += 1
+            else:
+                dirty.append(segment)
+        logger.info(f"增量渲染：复用 {reused} 个片段的配音，{len(dirty)} 个片段需要重新生成")
+        return Timeline(dirty)
+
+    def restore_clips(self, timeline: Timeline) -> int:
+        """
+        为裁剪签名未变化的片段恢复裁剪结果（需要先完成配音，裁剪时间段依赖配音时长）
+
+        恢复的片段写入 segment.video 和 segment.clip_end，clip_video_unified(reuse_existing=True) 会跳过它们
+
+        Returns:
+            int: 复用的片段数
+        """
+        reused = 0
+        for segment in timeline:
+            entry = self._entry(segment, self._clip_field)
+            signature = self._clip_signature(segment)
+            if (
+                entry
+                and signature is not None
+                and entry.get("signature") == signature
+                and _file_ok(entry.get("video", ""), entry.get("video_size"))
+            ):
+                segment.video = entry["video"]
+                segment.clip_end = int(entry["clip_end"])
+                reused += 1
+        logger.info(f"增量渲染：复用 {reused}/{len(timeline)} 个裁剪片段")
+        return reused
+
+    def _store_tts(self, segment: Segment, signature: str) -> None:
+        """把配音和字幕复制到项目目录，以签名命名，不同片段和不同版本互不覆盖"""
+        for attr, ext in (("audio", os.path.splitext(segment.audio)[1] or ".mp3"), ("subtitle", ".srt")):
+            path = getattr(segment, attr)
+            if not path or not os.path.isfile(path):
+                continue
+            target = os.path.join(self.tts_dir, f"{signature}{ext}")
+            if os.path.abspath(path) != os.path.abspath(target):
+                _copy_atomic(path, target)
+            setattr(segment, attr, target)
+
+    def commit(self, timeline: Timeline) -> None:
+        """
+        任务成功后记录各片段的配音和裁剪结果，并删除本次渲染没有用到的旧文件
+        """
+        segments = self.manifest["segments"]
+        for segment in timeline:
+            key = _segment_key(segment)
+            if key is None:
+                continue
+            record = segments.setdefault(key, {})
+            if segment.ost != 1 and segment.audio and segment.tts_duration is not None:
+                signature = self._tts_signature(segment)
+                self._store_tts(segment, signature)
+                record["tts"] = {
+                    "signature": signature,
+                    "audio": segment.audio,
+                    "audio_size": _size(segment.audio),
+                    "subtitle": segment.subtitle,
+                    "subtitle_size": _size(segment.subtitle),
+                    "duration_ms": segment.tts_duration,
+                }
+            signature = self._clip_signature(segment)
+            if signature is not None and segment.video and segment.clip_end is not None:
+                record[self._clip_field] = {
+                    "signature": signature,
+                    "video": segment.video,
+                    "video_size": _size(segment.video),
+                    "clip_end": segment.clip_end,
+                }
+
+        # 脚本中已删除的片段不再保留
+        keys = {_segment_key(segment) for segment in timeline}
+        for key in list(segments):
+            if key not in keys:
+                del segments[key]
+
+        path = os.path.join(self.directory, MANIFEST_FILE)
+        with open(f"{path}.part", "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+        os.replace(f"{path}.part", path)
+        self._prune()
+        storage_manager.touch(self.directory, written=True)
+        logger.info(f"增量渲染：已记录 {len(segments)} 个片段的渲染结果")
+
+    def _prune(self) -> None:
+        """删除 manifest 不再引用、且本次渲染没有使用过的文件"""
+        referenced = set()
+        for record in self.manifest["segments"].values():
+            for entry in record.values():
+                for field in ("audio", "subtitle", "video"):
+                    if entry.get(field):
+                        referenced.add(os.path.abspath(entry[field]))
+        removed = 0
+        for directory in (self.tts_dir, self.clip_dir, self.normalized_dir):
+            for name in os.listdir(directory):
+                path = os.path.join(directory, name)
+                if os.path.abspath(path) in referenced:
+                    continue
+                try:
+                    if os.path.getmtime(path) < self.started_at:
+                        os.remove(path)
+                        removed += 1
+                except OSError:
+                    pass
+        if removed:
+            logger.debug(f"增量渲染：清理了 {removed} 个过期的缓存文件")
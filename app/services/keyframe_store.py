@@ -0,0 +1,413 @@
+"""
+关键帧存储
+
+按视频内容指纹（而不是 路径 + 修改时间）组织关键帧缓存，重命名或复制视频后仍能命中。
+每次提取写入独立的间隔目录，并带有 manifest.json 记录间隔、分辨率、帧列表和完成标记：
+
+    temp/keyframes/<指纹>/interval_3.000/manifest.json
+    temp/keyframes/<指纹>/interval_3.000/keyframe_000000_000000000.jpg
+
+- 提取先写入临时目录，全部完成后写入 complete=True 的 manifest，再原子地重命名为正式目录；
+  崩溃留下的临时目录和没有完成标记的目录都不会被当作有效缓存
+- 请求的间隔是已有更密集间隔的整数倍时（如已有 3 秒，请求 6 秒），直接从已有帧中抽取子集，不再重新提取
+- 视觉分析使用 get_for_vision：没有缓存时由 frame_ring 单进程流式解码、缩放到视觉模型尺寸，
+  帧直接在内存中交给分析器；[frames] keyframe_disk_cache 开启时（默认）同样的 JPEG 字节写入存储。
+  这类缩小后的提取结果在 manifest 中记录 max_side，只提供给同样接受缩小帧的请求
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+from loguru import logger
+from PIL import Image
+
+from app.config import config
+from app.services import storage_manager
+from app.utils import frame_ring, utils
+from app.utils.fingerprint import file_fingerprint
+
+# 清单格式版本，变化时旧缓存失效（2: 流式解码改为 round=up 取帧，版本 1 的流式关键帧时间偏移了半个间隔）
+MANIFEST_VERSION = 2
+MANIFEST_FILE = "manifest.json"
+TEMP_PREFIX = ".tmp-"
+# 临时目录超过该时间（秒）仍未完成，视为崩溃残留
+STALE_TEMP_AGE = 6 * 3600
+# 判断帧时间是否落在目标间隔上的容差（秒），文件名中的时间精确到毫秒
+TIME_TOLERANCE = 2e-3
+
+
+@dataclass
+class KeyframeSet:
+    """一组可直接用于分析的关键帧"""
+    files: List[str]
+    interval: float
+    # 实际提供这些帧的提取间隔（与 interval 不同时表示从更密集的提取结果中抽取）
+    source_interval: float
+    directory: str
+    # 是否命中已有缓存
+    cached: bool
+    width: Optional[int] = None
+    height: Optional[int] = None
+    # 流式解码时与 files 一一对应的内存图片（files 只用于命名和解析时间，不一定存在于磁盘）
+    images: Optional[List[Image.Image]] = None
+
+    def for_analysis(self, files: Sequence[str]) -> List[Union[str, Image.Image]]:
+        """视觉分析的输入：有内存图片时使用图片，否则使用文件路径"""
+        if not self.images:
+            return list(files)
+        images = dict(zip(self.files, self.images))
+        return [images.get(file, file) for file in files]
+
+
+def _interval_dirname(interval: float) -> str:
+    return f"interval_{interval:.3f}"
+
+
+def _frame_time(filename: str) -> Optional[float]:
+    """从 keyframe_<帧号>_<HHMMSSmmm>.jpg 中解析时间（秒）"""
+    stem = os.path.splitext(filename)[0]
+    parts = stem.split("_")
+    if len(parts) < 3 or len(parts[-1]) != 9 or not parts[-1].isdigit():
+        return None
+    time_str = parts[-1]
+    return int(time_str[0:2]) * 3600 + int(time_str[2:4]) * 60 + int(time_str[4:6]) + int(time_str[6:9]) / 1000
+
+
+def _is_multiple(interval: float, base: float) -> bool:
+    ratio = interval / base
+    return ratio >= 1 and abs(ratio - round(ratio)) < 1e-6
+
+
+class KeyframeStore:
+    """按内容指纹组织的关键帧缓存"""
+
+    def __init__(self, root: Optional[str] = None):
+        self._root = root
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    @property
+    def root(self) -> str:
+        if self._root is None:
+            self._root = os.path.join(utils.temp_dir(), "keyframes")
+        return self._root
+
+    def _lock_for(self, fingerprint: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(fingerprint, threading.Lock())
+
+    def video_dir(self, video_path: str) -> str:
+        """视频对应的缓存目录"""
+        return os.path.join(self.root, file_fingerprint(video_path))
+
+    def _read_manifest(self, directory: str) -> Optional[dict]:
+        """读取已完成的 manifest，缺失、损坏、未完成或帧文件缺失时返回None"""
+        path = os.path.join(directory, MANIFEST_FILE)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get("version") != MANIFEST_VERSION or not manifest.get("complete"):
+            return None
+        frames = manifest.get("frames") or []
+        if not frames or not all(os.path.exists(os.path.join(directory, frame["file"])) for frame in frames):
+            return None
+        return manifest
+
+    def _complete_entries(self, video_dir: str) -> List[dict]:
+        """列出视频已完成的全部提取结果（按间隔从小到大），顺带清理无效目录"""
+        if not os.path.isdir(video_dir):
+            return []
+
+        entries = []
+        now = time.time()
+        for name in os.listdir(video_dir):
+            directory = os.path.join(video_dir, name)
+            if not os.path.isdir(directory):
+                continue
+            if name.startswith(TEMP_PREFIX):
+                if now - os.path.getmtime(directory) > STALE_TEMP_AGE:
+                    logger.info(f"清理崩溃残留的关键帧临时目录: {directory}")
+                    shutil.rmtree(directory, ignore_errors=True)
+                continue
+            manifest = self._read_manifest(directory)
+            if manifest is None:
+                logger.warning(f"关键帧目录未完成或已损坏，删除: {directory}")
+                shutil.rmtree(directory, ignore_errors=True)
+                continue
+            manifest["directory"] = directory
+            entries.append(manifest)
+        return sorted(entries, key=lambda entry: entry["interval"])
+
+    def lookup(self, video_path: str, interval: float, max_side: Optional[int] = None) -> Optional[KeyframeSet]:
+        """
+        查找可以满足指定间隔的已有关键帧
+
+        优先使用间隔完全相同的提取结果，否则使用间隔能整除请求间隔的最稀疏的结果并抽取子集
+
+        Args:
+            video_path: 视频文件路径
+            interval: 帧间隔（秒）
+            max_side: 可以接受的缩小帧的最长边，为空时只使用原始分辨率的提取结果
+
+        Returns:
+            Optional[KeyframeSet]: 命中时返回关键帧，否则返回None
+        """
+        interval = float(interval)
+        candidates = [
+            entry for entry in self._complete_entries(self.video_dir(video_path))
+            if _is_multiple(interval, entry["interval"])
+            and (not entry.get("max_side") or (max_side is not None and entry["max_side"] >= max_side))
+        ]
+        if not candidates:
+            return None
+
+        # 间隔越接近请求间隔，需要跳过的帧越少
+        entry = candidates[-1]
+        directory = entry["directory"]
+        source_interval = entry["interval"]
+        frames = entry["frames"]
+        if abs(source_interval - interval) >= TIME_TOLERANCE:
+            frames = [
+                frame for frame in frames
+                if abs(frame["time"] / interval - round(frame["time"] / interval)) * interval < TIME_TOLERANCE
+            ]
+            logger.info(f"从 {source_interval}s 间隔的 {len(entry['frames'])} 帧中抽取 {interval}s 间隔的 {len(frames)} 帧")
+        if not frames:
+            return None
+
+        return KeyframeSet(
+            files=[os.path.join(directory, frame["file"]) for frame in frames],
+            interval=interval,
+            source_interval=source_interval,
+            directory=directory,
+            cached=True,
+            width=entry.get("width"),
+            height=entry.get("height"),
+        )
+
+    def get_or_extract(
+        self,
+        video_path: str,
+        interval: float,
+        extract: Optional[Callable[[object, str, float], object]] = None
+    ) -> KeyframeSet:
+        """
+        获取指定间隔的关键帧，没有可用缓存时提取并写入存储
+
+        Args:
+            video_path: 视频文件路径
+            interval: 帧间隔（秒）
+            extract: 提取函数 (VideoProcessor, 输出目录, 间隔)，默认使用超级兼容性方案
+
+        Returns:
+            KeyframeSet: 关键帧
+
+        Raises:
+            Exception: 提取失败或没有生成任何关键帧
+        """
+        interval = float(interval)
+        fingerprint = file_fingerprint(video_path)
+        with self._lock_for(fingerprint):
+            found = self.lookup(video_path, interval)
+            if found is not None:
+                logger.info(f"使用已缓存的关键帧: {found.directory}（{len(found.files)} 帧）")
+                storage_manager.touch(found.directory)
+                return found
+            extracted = self._extract(video_path, fingerprint, interval, extract)
+            storage_manager.touch(extracted.directory, written=True)
+            return extracted
+
+    def _extract(self, video_path: str, fingerprint: str, interval: float, extract) -> KeyframeSet:
+        from app.utils import video_processor
+
+        video_dir = os.path.join(self.root, fingerprint)
+        final_dir = os.path.join(video_dir, _interval_dirname(interval))
+        temp_dir = os.path.join(video_dir, f"{TEMP_PREFIX}{_interval_dirname(interval)}-{os.getpid()}-{uuid.uuid4().hex[:8]}")
+        os.makedirs(temp_dir, exist_ok=True)
+
+        try:
+            processor = video_processor.VideoProcessor(video_path)
+            if extract is None:
+                processor.extract_frames_by_interval_ultra_compatible(output_dir=temp_dir, interval_seconds=interval)
+            else:
+                extract(processor, temp_dir, interval)
+
+            frames = []
+            for filename in sorted(os.listdir(temp_dir)):
+                if not filename.endswith(".jpg"):
+                    continue
+                frame_time = _frame_time(filename)
+                frames.append({"file": filename, "time": frame_time if frame_time is not None else 0.0})
+            if not frames:
+                raise Exception("未提取到任何关键帧文件，请检查视频文件格式")
+
+            manifest = {
+                "version": MANIFEST_VERSION,
+                "fingerprint": fingerprint,
+                "source": os.path.abspath(video_path),
+                "interval": interval,
+                "width": processor.width,
+                "height": processor.height,
+                "duration": processor.duration,
+                "frames": frames,
+                "created_at": time.time(),
+                "complete": True,
+            }
+            manifest = self._finalize(temp_dir, final_dir, manifest)
+        except Exception:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+
+        logger.info(f"关键帧提取完成并写入存储: {final_dir}（{len(manifest['frames'])} 帧）")
+        return KeyframeSet(
+            files=[os.path.join(final_dir, frame["file"]) for frame in manifest["frames"]],
+            interval=interval,
+            source_interval=interval,
+            directory=final_dir,
+            cached=False,
+            width=manifest.get("width"),
+            height=manifest.get("height"),
+        )
+
+    def _finalize(self, temp_dir: str, final_dir: str, manifest: dict) -> dict:
+        """写入完成标记并把临时目录重命名为正式目录，返回最终生效的 manifest"""
+        manifest_temp = os.path.join(temp_dir, f"{MANIFEST_FILE}.tmp")
+        with open(manifest_temp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(manifest_temp, os.path.join(temp_dir, MANIFEST_FILE))
+
+        if os.path.isdir(final_dir):
+            # 其他进程已经完成了相同的提取，或者是未完成的旧目录
+            if self._read_manifest(final_dir) is None:
+                shutil.rmtree(final_dir, ignore_errors=True)
+            else:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+                manifest = self._read_manifest(final_dir)
+        if os.path.isdir(temp_dir):
+            os.replace(temp_dir, final_dir)
+        return manifest
+
+    def get_for_vision(
+        self,
+        video_path: str,
+        interval: float,
+        max_side: int = frame_ring.DEFAULT_MAX_SIDE,
+        persist: Optional[bool] = None
+    ) -> KeyframeSet:
+        """
+        获取用于视觉分析的关键帧
+
+        有可用缓存（原始分辨率，或最长边不小于 max_side 的缩小帧）时直接使用磁盘文件；
+        否则单进程流式解码并缩放到 max_side，帧以内存图片的形式返回（KeyframeSet.images）
+
+        Args:
+            video_path: 视频文件路径
+            interval: 帧间隔（秒）
+            max_side: 视觉分析使用的最长边
+            persist: 是否把流式解码的帧写入存储，默认读取 [frames] keyframe_disk_cache（默认开启）
+
+        Returns:
+            KeyframeSet: 关键帧
+
+        Raises:
+            ValueError: 无法获取视频时长或帧率
+            Exception: 解码失败或没有生成任何关键帧
+        """
+        interval = float(interval)
+        if persist is None:
+            persist = bool(config.frames.get("keyframe_disk_cache", True))
+        fingerprint = file_fingerprint(video_path)
+        with self._lock_for(fingerprint):
+            found = self.lookup(video_path, interval, max_side=max_side)
+            if found is not None:
+                logger.info(f"使用已缓存的关键帧: {found.directory}（{len(found.files)} 帧）")
+                storage_manager.touch(found.directory)
+                return found
+            streamed = self._stream(video_path, fingerprint, interval, max_side, persist)
+            if persist:
+                storage_manager.touch(streamed.directory, written=True)
+            return streamed
+
+    def _stream(self, video_path: str, fingerprint: str, interval: float, max_side: int, persist: bool) -> KeyframeSet:
+        from app.utils import video_processor
+
+        processor = video_processor.VideoProcessor(video_path)
+        if processor.fps is None or processor.fps <= 0:
+            raise ValueError(f"无法获取有效的视频帧率信息，请检查视频文件: {video_path}")
+        if processor.duration is None or processor.duration <= 0:
+            raise ValueError(f"无法获取有效的视频时长信息，请检查视频文件: {video_path}")
+
+        video_dir = os.path.join(self.root, fingerprint)
+        dirname = f"{_interval_dirname(interval)}_max{max_side}"
+        final_dir = os.path.join(video_dir, dirname)
+        temp_dir = os.path.join(video_dir, f"{TEMP_PREFIX}{dirname}-{os.getpid()}-{uuid.uuid4().hex[:8]}")
+        if persist:
+            os.makedirs(temp_dir, exist_ok=True)
+
+        try:
+            frames = []
+            for frame in frame_ring.stream_keyframes(
+                video_path, interval, processor.width, processor.height, processor.fps,
+                duration=processor.duration, max_side=max_side
+            ):
+                if persist:
+                    with open(os.path.join(temp_dir, frame.name), "wb") as f:
+                        f.write(frame.data)
+                frames.append(frame)
+            if not frames:
+                raise Exception("未解码到任何关键帧，请检查视频文件格式")
+
+            width, height = frame_ring.output_size(processor.width, processor.height, max_side)
+            if persist:
+                manifest = {
+                    "version": MANIFEST_VERSION,
+                    "fingerprint": fingerprint,
+                    "source": os.path.abspath(video_path),
+                    "interval": interval,
+                    "max_side": max_side,
+                    "width": width,
+                    "height": height,
+                    "duration": processor.duration,
+                    "frames": [{"file": frame.name, "time": frame.time} for frame in frames],
+                    "created_at": time.time(),
+                    "complete": True,
+                }
+                self._finalize(temp_dir, final_dir, manifest)
+        except Exception:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+
+        logger.info(f"关键帧流式解码完成: {len(frames)} 帧" + (f"，已写入存储: {final_dir}" if persist else ""))
+        return KeyframeSet(
+            files=[os.path.join(final_dir, frame.name) for frame in frames],
+            interval=interval,
+            source_interval=interval,
+            directory=final_dir,
+            cached=False,
+            width=width,
+            height=height,
+            images=[frame.image() for frame in frames],
+        )
+
+    def remove(self, video_path: str) -> None:
+        """删除视频的全部关键帧缓存"""
+        video_dir = self.video_dir(video_path)
+        if os.path.isdir(video_dir):
+            shutil.rmtree(video_dir, ignore_errors=True)
+            logger.info(f"已删除关键帧缓存: {video_dir}")
+
+
+_store = KeyframeStore()
+
+
+def get_store() -> KeyframeStore:
+    """获取进程共享的关键帧存储"""
+    return _store
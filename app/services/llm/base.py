@@ -5,7 +5,7 @@
 """
 
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional, Union
+from typing import AsyncIterator, List, Dict, Any, Optional, Union
 from pathlib import Path
 import PIL.Image
 from loguru import logger
@@ -176,6 +176,38 @@ class TextModelProvider(BaseLLMProvider):
             生成的文本内容
         """
         pass
+
+    async def stream_text(self,
+                          prompt: str,
+                          system_prompt: Optional[str] = None,
+                          temperature: float = 1.0,
+                          max_tokens: Optional[int] = None,
+                          response_format: Optional[str] = None,
+                          **kwargs) -> AsyncIterator[str]:
+        """
+        流式生成文本内容，逐块返回模型输出
+
+        默认实现等待完整结果后一次性返回，支持流式输出的提供商应重写此方法
+
+        Args:
+            prompt: 用户提示词
+            system_prompt: 系统提示词
+            temperature: 生成温度
+            max_tokens: 最大token数
+            response_format: 响应格式 ('json' 或 None)
+            **kwargs: 其他参数
+
+        Yields:
+            生成的文本片段
+        """
+        yield await self.generate_text(
+            prompt,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            response_format=response_format,
+            **kwargs
+        )
     
     def _build_messages(self, prompt: str, system_prompt: Optional[str] = None) -> List[Dict[str, str]]:
         """构建消息列表"""
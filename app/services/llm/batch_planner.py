@@ -0,0 +1,213 @@
+"""
+视觉分析批次规划
+
+根据图片分辨率估算每张图片的 token 数和请求体大小，在模型已知上限和配置预算内
+把连续的帧装入尽量少的批次；请求因上下文或请求体过大失败时，由调用方把批次对半拆分重试，
+并把观察到的上限记录到模型能力登记表中，后续规划自动收紧预算。
+"""
+
+import math
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+import PIL.Image
+
+from .capabilities import ModelCapabilities
+
+# 图片预处理后的最长边（与 _prepare_images 的缩放保持一致）
+MAX_IMAGE_SIDE = 1024
+# 分块计费模型（OpenAI 等）的分块边长、每块 token 数和每张图片的基础 token 数
+TILE_SIZE = 512
+TOKENS_PER_TILE = 170
+BASE_IMAGE_TOKENS = 85
+# JPEG(quality=85) 每像素的平均字节数，再乘 base64 膨胀系数
+JPEG_BYTES_PER_PIXEL = 0.25
+BASE64_OVERHEAD = 4 / 3
+
+# 默认预算：单次请求的图片+提示词 token 数、请求体字节数
+DEFAULT_TOKEN_BUDGET = 32000
+DEFAULT_BYTE_BUDGET = 15 * 1024 * 1024
+# 为模型输出预留的 token（未指定 max_tokens 时）
+DEFAULT_OUTPUT_RESERVE = 4000
+# 因请求过大失败后，把本次请求的估算值乘以该系数作为新的上限
+SHRINK_FACTOR = 0.75
+
+
+class BatchResult(str):
+    """
+    单个批次的分析结果文本，同时记录该批次包含的图片数量
+
+    继承自 str，对只把结果当作字符串使用的调用方完全兼容；
+    需要把结果对应回帧的调用方通过 image_count 计算每个批次的起始位置
+    """
+
+    image_count: int
+
+    def __new__(cls, text: str, image_count: int) -> "BatchResult":
+        result = super().__new__(cls, text if text is not None else "")
+        result.image_count = image_count
+        return result
+
+
+@dataclass
+class ImageCost:
+    """单张图片的估算开销"""
+    tokens: int
+    bytes: int
+
+
+def estimate_image_cost(width: int, height: int, max_side: int = MAX_IMAGE_SIDE) -> ImageCost:
+    """
+    根据分辨率估算单张图片的 token 数和 base64 后的字节数
+
+    Args:
+        width: 图片宽度
+        height: 图片高度
+        max_side: 预处理缩放后的最长边
+
+    Returns:
+        ImageCost: 估算开销
+    """
+    scale = min(1.0, max_side / max(width, height, 1))
+    width, height = max(int(width * scale), 1), max(int(height * scale), 1)
+    tiles = math.ceil(width / TILE_SIZE) * math.ceil(height / TILE_SIZE)
+    tokens = BASE_IMAGE_TOKENS + TOKENS_PER_TILE * tiles
+    size = int(width * height * JPEG_BYTES_PER_PIXEL * BASE64_OVERHEAD)
+    return ImageCost(tokens=tokens, bytes=size)
+
+
+def estimate_text_tokens(text: str) -> int:
+    """粗略估算文本 token 数：中日韩字符约 1 token/字，其它字符约 4 字符/token"""
+    if not text:
+        return 0
+    cjk = sum(1 for ch in text if ord(ch) >= 0x2E80)
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+class VisionBatchPlanner:
+    """在 token / 字节预算内把连续帧装箱为批次"""
+
+    def __init__(
+        self,
+        max_batch_size: int,
+        token_budget: int = DEFAULT_TOKEN_BUDGET,
+        byte_budget: int = DEFAULT_BYTE_BUDGET,
+        prompt_tokens: int = 0,
+        prompt_bytes: int = 0
+    ):
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.token_budget = token_budget
+        self.byte_budget = byte_budget
+        self.prompt_tokens = prompt_tokens
+        self.prompt_bytes = prompt_bytes
+
+    @classmethod
+    def for_model(
+        cls,
+        capabilities: ModelCapabilities,
+        prompt: str,
+        max_batch_size: int,
+        max_output_tokens: Optional[int] = None,
+        token_budget: Optional[int] = None,
+        byte_budget: Optional[int] = None
+    ) -> "VisionBatchPlanner":
+        """
+        结合配置预算和模型已知上限创建规划器
+
+        Args:
+            capabilities: 模型能力信息
+            prompt: 每个批次都会携带的提示词
+            max_batch_size: 单批次最多帧数（界面配置的 vision_batch_size）
+            max_output_tokens: 请求的最大输出 token，占用上下文窗口
+            token_budget: 配置的 token 预算，为None时使用默认值
+            byte_budget: 配置的请求体字节预算，为None时使用默认值
+
+        Returns:
+            VisionBatchPlanner: 批次规划器
+        """
+        tokens = token_budget or DEFAULT_TOKEN_BUDGET
+        if capabilities.max_context_tokens:
+            reserve = max_output_tokens or DEFAULT_OUTPUT_RESERVE
+            tokens = min(tokens, capabilities.max_context_tokens - reserve)
+
+        size = byte_budget or DEFAULT_BYTE_BUDGET
+        if capabilities.max_request_bytes:
+            size = min(size, capabilities.max_request_bytes)
+
+        return cls(
+            max_batch_size=max_batch_size,
+            token_budget=tokens,
+            byte_budget=size,
+            prompt_tokens=estimate_text_tokens(prompt),
+            prompt_bytes=len(prompt.encode("utf-8")),
+        )
+
+    def cost_of(self, images: Sequence[PIL.Image.Image]) -> ImageCost:
+        """估算一个批次（含提示词）的总开销"""
+        tokens, size = self.prompt_tokens, self.prompt_bytes
+        for img in images:
+            cost = estimate_image_cost(*img.size)
+            tokens += cost.tokens
+            size += cost.bytes
+        return ImageCost(tokens=tokens, bytes=size)
+
+    def plan(self, images: Sequence[PIL.Image.Image]) -> List[List[PIL.Image.Image]]:
+        """
+        按顺序把图片装入批次：每批不超过 max_batch_size 张，且估算开销不超过预算
+
+        单张图片本身超出预算时单独成批，交给服务端判断
+
+        Args:
+            images: 已预处理的图片列表（保持时间顺序）
+
+        Returns:
+            List[List[PIL.Image.Image]]: 批次列表
+        """
+        batches: List[List[PIL.Image.Image]] = []
+        current: List[PIL.Image.Image] = []
+        tokens, size = self.prompt_tokens, self.prompt_bytes
+
+        for img in images:
+            cost = estimate_image_cost(*img.size)
+            over_budget = tokens + cost.tokens > self.token_budget or size + cost.bytes > self.byte_budget
+            if current and (len(current) >= self.max_batch_size or over_budget):
+                batches.append(current)
+                current = []
+                tokens, size = self.prompt_tokens, self.prompt_bytes
+            current.append(img)
+            tokens += cost.tokens
+            size += cost.bytes
+
+        if current:
+            batches.append(current)
+        return batches
+
+    @staticmethod
+    def split(batch: Sequence[PIL.Image.Image]) -> List[List[PIL.Image.Image]]:
+        """把失败的批次对半拆分"""
+        middle = max(1, len(batch) // 2)
+        return [list(batch[:middle]), list(batch[middle:])]
+
+    def shrink_for(self, batch: Sequence[PIL.Image.Image], limit_kind: str, limit: Optional[int] = None) -> dict:
+        """
+        请求过大失败后收紧预算，返回应记录到模型能力登记表的上限
+
+        Args:
+            batch: 失败的批次
+            limit_kind: "context"（上下文超限）或 "payload"（请求体超限）
+            limit: 错误信息中给出的确切上限（如果有）
+
+        Returns:
+            dict: 供 CapabilityRegistry.record 使用的字段
+        """
+        cost = self.cost_of(batch)
+        if limit_kind == "payload":
+            self.byte_budget = min(self.byte_budget, limit or int(cost.bytes * SHRINK_FACTOR))
+            return {"max_request_bytes": self.byte_budget}
+
+        if limit:
+            # 错误中给出的是模型真实的上下文长度，记录原值，本次规划再扣除输出预留
+            self.token_budget = min(self.token_budget, limit - DEFAULT_OUTPUT_RESERVE)
+            return {"max_context_tokens": limit}
+        self.token_budget = min(self.token_budget, int(cost.tokens * SHRINK_FACTOR))
+        return {"max_context_tokens": self.token_budget + DEFAULT_OUTPUT_RESERVE}
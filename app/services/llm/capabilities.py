@@ -0,0 +1,217 @@
+"""
+模型能力登记表
+
+按 (provider, model, api_base) 记录模型对 JSON mode、图片输入、最大上下文和最大输出 token 的支持情况。
+能力信息在首次失败时学习并持久化到磁盘，后续请求在构建参数前先查询，避免重复发送注定失败的请求
+（例如不支持 response_format 的模型每次都要多一次完整的往返）。
+
+“不支持图片输入”只根据明确描述模型能力的错误信息判断，并且只在 VISION_UNSUPPORTED_TTL 内有效：
+网关偶发错误或服务商升级模型后，过期的记录会重新通过实际调用确认，不会让视觉分析永久不可用。
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass, fields
+from typing import Dict, Optional
+
+from loguru import logger
+
+# 缓存格式版本，字段含义变化时递增
+CACHE_VERSION = 1
+CACHE_FILE = "llm_capabilities.json"
+# “不支持图片输入”记录的有效期（秒），过期后视为未知
+VISION_UNSUPPORTED_TTL = 24 * 3600
+
+_CONTEXT_LIMIT_PATTERNS = (
+    re.compile(r"maximum context length is (\d+)", re.IGNORECASE),
+    re.compile(r"context(?:[ _]window|[ _]length)?[^.\d]{0,40}?(?:limit|maximum)[^.\d]{0,20}?(\d{4,})", re.IGNORECASE),
+)
+_OUTPUT_LIMIT_PATTERNS = (
+    re.compile(r"max_tokens[^.\d]{0,60}?(?:<=|less than or equal to|at most|maximum(?: value)? (?:is|of))\s*(\d+)", re.IGNORECASE),
+    re.compile(r"max_tokens[^.]{0,40}?range of \[?\d+,\s*(\d+)\]?", re.IGNORECASE),
+    re.compile(r"supports at most (\d+) completion tokens", re.IGNORECASE),
+)
+# 只匹配描述“模型不支持图片输入”的措辞，"unsupported image format"、"image size not supported" 等
+# 针对单张图片的错误不算
+_VISION_UNSUPPORTED_PATTERNS = (
+    re.compile(r"(?:does not|doesn't|do not|don't|not) support (?:image|vision|multimodal|multi-modal)", re.IGNORECASE),
+    re.compile(r"(?:image|vision|multimodal|multi-modal) (?:input|inputs|content|message|messages) (?:is|are) not supported", re.IGNORECASE),
+    re.compile(r"not an? (?:vision|multimodal|multi-modal)(?: language)? model", re.IGNORECASE),
+    re.compile(r"image_url is not (?:supported|allowed)", re.IGNORECASE),
+    re.compile(r"only (?:supports? )?text(?: input| content)? (?:is )?(?:supported|allowed)", re.IGNORECASE),
+)
+
+
+@dataclass
+class ModelCapabilities:
+    """单个模型的能力信息，None 表示尚未确定"""
+    json_mode: Optional[bool] = None
+    vision: Optional[bool] = None
+    max_context_tokens: Optional[int] = None
+    max_output_tokens: Optional[int] = None
+    # 服务端允许的最大请求体（字节），从 413 错误中学习
+    max_request_bytes: Optional[int] = None
+    # 记录 vision=False 的时间，用于判断该记录是否过期
+    vision_unsupported_at: Optional[float] = None
+    updated_at: float = 0.0
+
+    def clamp_output_tokens(self, max_tokens: Optional[int]) -> Optional[int]:
+        """把请求的最大输出 token 限制在已知上限以内"""
+        if max_tokens and self.max_output_tokens and max_tokens > self.max_output_tokens:
+            return self.max_output_tokens
+        return max_tokens
+
+
+def capability_key(provider: str, model: str, api_base: Optional[str] = None) -> str:
+    return f"{(provider or '').lower()}|{model}|{(api_base or '').rstrip('/')}"
+
+
+def parse_context_limit(error_message: str) -> Optional[int]:
+    """从上下文超长的错误信息中解析最大上下文 token 数"""
+    for pattern in _CONTEXT_LIMIT_PATTERNS:
+        match = pattern.search(error_message)
+        if match:
+            return int(match.group(1))
+    return None
+
+
+def parse_output_limit(error_message: str) -> Optional[int]:
+    """从 max_tokens 超限的错误信息中解析最大输出 token 数"""
+    for pattern in _OUTPUT_LIMIT_PATTERNS:
+        match = pattern.search(error_message)
+        if match:
+            return int(match.group(1))
+    return None
+
+
+def is_json_mode_error(error_message: str) -> bool:
+    message = error_message.lower()
+    return "response_format" in message or "json_object" in message or "json mode" in message
+
+
+def is_vision_unsupported_error(error_message: str) -> bool:
+    """错误信息是否说明模型本身不支持图片输入"""
+    return any(pattern.search(error_message) for pattern in _VISION_UNSUPPORTED_PATTERNS)
+
+
+def _expire_vision(entry: ModelCapabilities) -> ModelCapabilities:
+    """vision=False 的记录过期（或来自没有记录时间的旧缓存）时改为未知"""
+    if entry.vision is False and (
+        not entry.vision_unsupported_at or time.time() - entry.vision_unsupported_at > VISION_UNSUPPORTED_TTL
+    ):
+        entry.vision = None
+        entry.vision_unsupported_at = None
+    return entry
+
+
+class CapabilityRegistry:
+    """模型能力登记表，读写都是线程安全的，变更会原子写入磁盘"""
+
+    def __init__(self, path: Optional[str] = None):
+        self._path = path
+        self._entries: Optional[Dict[str, ModelCapabilities]] = None
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> str:
+        if self._path is None:
+            from app.utils import utils
+            self._path = os.path.join(utils.storage_dir("cache", create=True), CACHE_FILE)
+        return self._path
+
+    def _load(self) -> Dict[str, ModelCapabilities]:
+        if self._entries is not None:
+            return self._entries
+
+        entries: Dict[str, ModelCapabilities] = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == CACHE_VERSION:
+                    known = {field.name for field in fields(ModelCapabilities)}
+                    for key, value in data.get("models", {}).items():
+                        entries[key] = ModelCapabilities(**{k: v for k, v in value.items() if k in known})
+            except (OSError, ValueError, TypeError) as e:
+                logger.debug(f"读取模型能力缓存失败: {str(e)}")
+        self._entries = entries
+        return entries
+
+    def _save(self) -> None:
+        temp_path = f"{self.path}.tmp"
+        payload = {
+            "version": CACHE_VERSION,
+            "models": {key: asdict(value) for key, value in self._entries.items()},
+        }
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.debug(f"写入模型能力缓存失败: {str(e)}")
+
+    def get(self, provider: str, model: str, api_base: Optional[str] = None) -> ModelCapabilities:
+        """
+        获取模型能力信息（返回副本，未知模型返回全部为None的对象）
+
+        Args:
+            provider: 提供商名称
+            model: 模型名称
+            api_base: 自定义API地址
+
+        Returns:
+            ModelCapabilities: 模型能力信息
+        """
+        key = capability_key(provider, model, api_base)
+        with self._lock:
+            entry = self._load().get(key)
+            return _expire_vision(ModelCapabilities(**asdict(entry))) if entry else ModelCapabilities()
+
+    def record(self, provider: str, model: str, api_base: Optional[str] = None, **updates) -> ModelCapabilities:
+        """
+        记录模型能力，只有信息发生变化时才写入磁盘
+
+        Args:
+            provider: 提供商名称
+            model: 模型名称
+            api_base: 自定义API地址
+            **updates: 要更新的字段（json_mode / vision / max_context_tokens / max_output_tokens / max_request_bytes）
+
+        Returns:
+            ModelCapabilities: 更新后的模型能力信息
+        """
+        key = capability_key(provider, model, api_base)
+        with self._lock:
+            entries = self._load()
+            entry = _expire_vision(entries.setdefault(key, ModelCapabilities()))
+            changed = {}
+            for name, value in updates.items():
+                if value is None or not hasattr(entry, name) or getattr(entry, name) == value:
+                    continue
+                setattr(entry, name, value)
+                changed[name] = value
+            if "vision" in changed:
+                entry.vision_unsupported_at = time.time() if entry.vision is False else None
+            if changed:
+                entry.updated_at = time.time()
+                self._save()
+                logger.info(f"更新模型能力记录 {key}: {changed}")
+            return ModelCapabilities(**asdict(entry))
+
+    def forget(self, provider: str, model: str, api_base: Optional[str] = None) -> None:
+        """删除模型的能力记录（例如更换了服务商或模型升级后）"""
+        key = capability_key(provider, model, api_base)
+        with self._lock:
+            if self._load().pop(key, None) is not None:
+                self._save()
+
+
+_registry = CapabilityRegistry()
+
+
+def get_registry() -> CapabilityRegistry:
+    """获取进程共享的模型能力登记表"""
+    return _registry
@@ -116,3 +116,13 @@ class ContentFilterError(LLMServiceError):
             message=message,
             error_code="CONTENT_FILTER_ERROR"
         )
+
+
+class RequestTooLargeError(APICallError):
+    """请求超出模型上下文或服务端请求体大小限制（可通过缩小批次重试）"""
+
+    def __init__(self, message: str, limit_kind: str = "context", limit: Optional[int] = None):
+        super().__init__(message, status_code=413 if limit_kind == "payload" else 400)
+        self.limit_kind = limit_kind
+        self.limit = limit
+        self.details.update({"limit_kind": limit_kind, "limit": limit})
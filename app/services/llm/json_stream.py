@@ -0,0 +1,135 @@
+"""
+流式 JSON 条目解析
+
+大模型以流式方式输出 {"items": [{...}, {...}]} 形式的解说文案时，逐块喂入文本，
+每当 items 数组中的一个对象的右花括号到达就立即解析并返回该条目，
+调用方（界面预览、TTS 等）无需等待完整响应即可开始处理。
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+# {"items": [ ... 的起始位置
+_ITEMS_ARRAY_PATTERN = re.compile(r'"items"\s*:\s*\[')
+# 顶层直接是数组（可能带 ```json 代码块标记）
+_TOP_LEVEL_ARRAY_PATTERN = re.compile(r'^\s*(?:```(?:json)?\s*)?\[')
+_TRAILING_COMMA_PATTERN = re.compile(r',\s*([}\]])')
+
+
+class JsonItemStream:
+    """
+    增量解析 items 数组中的对象
+
+    用法:
+        stream = JsonItemStream()
+        async for chunk in provider.stream_text(...):
+            for item in stream.feed(chunk):
+                ...
+        full_text = stream.text
+    """
+
+    def __init__(self, key: str = "items"):
+        self._pattern = _ITEMS_ARRAY_PATTERN if key == "items" else re.compile(rf'"{re.escape(key)}"\s*:\s*\[')
+        self._text = ""
+        # 已扫描到的位置；None 表示尚未找到数组起点
+        self._pos: Optional[int] = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._item_start = -1
+        self._finished = False
+        self.items: List[Dict[str, Any]] = []
+
+    @property
+    def text(self) -> str:
+        """到目前为止收到的完整文本"""
+        return self._text
+
+    @property
+    def finished(self) -> bool:
+        """items 数组是否已经结束"""
+        return self._finished
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """
+        喂入一段新文本，返回本次新完成的条目
+
+        Args:
+            chunk: 模型新输出的文本片段
+
+        Returns:
+            List[Dict[str, Any]]: 新完成的条目（可能为空）
+        """
+        if not chunk:
+            return []
+        self._text += chunk
+        if self._finished:
+            return []
+
+        text = self._text
+        if self._pos is None and not self._find_array_start(text):
+            return []
+        return self._scan(text)
+
+    def _find_array_start(self, text: str) -> bool:
+        match = self._pattern.search(text) or _TOP_LEVEL_ARRAY_PATTERN.match(text)
+        if not match:
+            return False
+        self._pos = match.end()
+        return True
+
+    def _scan(self, text: str) -> List[Dict[str, Any]]:
+        completed = []
+        i = self._pos
+        length = len(text)
+        while i < length:
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                if self._depth == 0:
+                    self._item_start = i
+                self._depth += 1
+            elif ch in "}]":
+                if self._depth == 0:
+                    # items 数组本身结束
+                    if ch == "]":
+                        self._finished = True
+                        i += 1
+                        break
+                else:
+                    self._depth -= 1
+                    if self._depth == 0 and self._item_start >= 0:
+                        item = self._parse_item(text[self._item_start:i + 1])
+                        self._item_start = -1
+                        if item is not None:
+                            self.items.append(item)
+                            completed.append(item)
+            i += 1
+        self._pos = i
+        return completed
+
+    @staticmethod
+    def _parse_item(raw: str) -> Optional[Dict[str, Any]]:
+        try:
+            item = json.loads(raw)
+        except json.JSONDecodeError:
+            try:
+                # 大模型输出中常见的尾随逗号
+                item = json.loads(_TRAILING_COMMA_PATTERN.sub(r"\1", raw))
+            except json.JSONDecodeError as e:
+                logger.warning(f"流式解析条目失败，已跳过: {str(e)}")
+                return None
+        if not isinstance(item, dict):
+            return None
+        return item
@@ -8,7 +8,8 @@ LiteLLM 统一提供商实现
 import asyncio
 import base64
 import io
-from typing import List, Dict, Any, Optional, Union
+from collections import deque
+from typing import AsyncIterator, List, Dict, Any, Optional, Union
 from pathlib import Path
 import PIL.Image
 from loguru import logger
@@ -17,6 +18,7 @@ try:
     import litellm
     from litellm import acompletion, completion
     from litellm.exceptions import (
+        ContextWindowExceededError as LiteLLMContextWindowError,
         AuthenticationError as LiteLLMAuthError,
         RateLimitError as LiteLLMRateLimitError,
         BadRequestError as LiteLLMBadRequestError,
@@ -27,11 +29,22 @@ except ImportError:
     raise
 
 from .base import VisionModelProvider, TextModelProvider
+from .batch_planner import BatchResult, VisionBatchPlanner
+from .capabilities import (
+    ModelCapabilities,
+    get_registry,
+    is_json_mode_error,
+    is_vision_unsupported_error,
+    parse_context_limit,
+    parse_output_limit,
+)
+from app.utils.frame_ring import encoded_jpeg
 from .exceptions import (
     APICallError,
     AuthenticationError,
     RateLimitError,
-    ContentFilterError
+    ContentFilterError,
+    RequestTooLargeError
 )
 
 
@@ -55,8 +68,56 @@ def configure_litellm():
 # 初始化配置
 configure_litellm()
 
+def is_payload_too_large(error: Exception) -> bool:
+    """判断错误是否为请求体过大（HTTP 413）"""
+    if getattr(error, "status_code", None) == 413:
+        return True
+    message = str(error).lower()
+    return ("413" in message and ("too large" in message or "entity" in message)) or "payload too large" in message
+
+
+# 提示词中的 JSON 输出约束（用于不支持 response_format 的模型）
+JSON_PROMPT_SUFFIX = "\n\n请确保输出严格的JSON格式，不要包含任何其他文字或标记。"
+
+
+class _CapabilityMixin:
+    """按 (provider, model, api_base) 查询和记录模型能力"""
+
+    def _capability_scope(self):
+        return self.provider_name, self.model_name, getattr(self, '_api_base', None)
+
+    def get_capabilities(self) -> ModelCapabilities:
+        """获取当前模型的能力信息，首次使用时用 LiteLLM 内置的模型信息补充上限"""
+        registry = get_registry()
+        capabilities = registry.get(*self._capability_scope())
+        if capabilities.updated_at or getattr(self, '_api_base', None):
+            # 自定义 api_base 可能是代理/兼容服务，内置模型信息不一定准确，只依赖实际调用学习
+            return capabilities
 
-class LiteLLMVisionProvider(VisionModelProvider):
+        try:
+            info = litellm.get_model_info(self.model_name)
+        except Exception:
+            info = None
+        if not info:
+            return capabilities
+        return registry.record(
+            *self._capability_scope(),
+            max_context_tokens=info.get("max_input_tokens"),
+            max_output_tokens=info.get("max_output_tokens"),
+        )
+
+    def record_capabilities(self, **updates) -> ModelCapabilities:
+        return get_registry().record(*self._capability_scope(), **updates)
+
+    def _learn_limits_from_error(self, error_msg: str) -> ModelCapabilities:
+        """从请求错误中学习上下文/输出上限"""
+        return self.record_capabilities(
+            max_context_tokens=parse_context_limit(error_msg),
+            max_output_tokens=parse_output_limit(error_msg),
+        )
+
+
+class LiteLLMVisionProvider(_CapabilityMixin, VisionModelProvider):
     """使用 LiteLLM 的统一视觉模型提供商"""
 
     @property
@@ -146,19 +207,37 @@ class LiteLLMVisionProvider(VisionModelProvider):
         """
         logger.info(f"开始使用 LiteLLM ({self.model_name}) 分析 {len(images)} 张图片")
 
+        if self.get_capabilities().vision is False:
+            # 已确认该模型不支持图片输入，避免上传图片后才失败
+            raise APICallError(f"模型 {self.model_name} 不支持图片输入，请更换视觉模型")
+
         # 预处理图片
         processed_images = self._prepare_images(images)
 
+        # 按 token / 请求体预算规划批次，batch_size 作为单批次帧数上限
+        from app.config import config
+        planner = VisionBatchPlanner.for_model(
+            self.get_capabilities(),
+            prompt,
+            max_batch_size=batch_size,
+            max_output_tokens=kwargs.get("max_tokens", 4000),
+            token_budget=config.frames.get("vision_token_budget"),
+            byte_budget=config.frames.get("vision_byte_budget"),
+        )
+        pending = deque(planner.plan(processed_images))
+        logger.info(f"批次规划完成: {len(processed_images)} 张图片分为 {len(pending)} 批")
+
         # 分批处理
         results = []
-        for i in range(0, len(processed_images), batch_size):
-            batch = processed_images[i:i + batch_size]
-            logger.info(f"处理第 {i//batch_size + 1} 批，共 {len(batch)} 张图片")
+        max_retries = kwargs.get("retries", 2)
+        timeout_seconds = kwargs.get("timeout", 600)
+        while pending:
+            batch = pending.popleft()
+            batch_no = len(results) + 1
+            logger.info(f"处理第 {batch_no} 批，共 {len(batch)} 张图片")
 
             try:
                 result = None
-                max_retries = kwargs.get("retries", 2)
-                timeout_seconds = kwargs.get("timeout", 600)
                 for attempt in range(max_retries):
                     try:
                         # 添加超时控制（每个批次最多10分钟）
@@ -169,7 +248,7 @@ class LiteLLMVisionProvider(VisionModelProvider):
                         break
                     except asyncio.TimeoutError:
                         logger.warning(
-                            f"LiteLLM 批次 {i//batch_size + 1} 超时（第{attempt + 1}次，超过{timeout_seconds}秒），正在重试..."
+                            f"LiteLLM 批次 {batch_no} 超时（第{attempt + 1}次，超过{timeout_seconds}秒），正在重试..."
                         )
                         if attempt < max_retries - 1:
                             await asyncio.sleep(2)
@@ -179,14 +258,30 @@ class LiteLLMVisionProvider(VisionModelProvider):
                 if result is None:
                     raise asyncio.TimeoutError()
 
-                results.append(result)
+                results.append(BatchResult(result, len(batch)))
+            except RequestTooLargeError as e:
+                if len(batch) > 1:
+                    # 请求过大：记录上限、收紧预算，并把该批次拆成两半重新排队
+                    self.record_capabilities(**planner.shrink_for(batch, e.limit_kind, e.limit))
+                    halves = planner.split(batch)
+                    # 尚未发送的批次按收紧后的预算重新规划
+                    remaining = [img for queued in pending for img in queued]
+                    pending = deque(halves + planner.plan(remaining))
+                    logger.warning(f"批次 {batch_no} 请求过大（{e.limit_kind}），拆分为 {len(halves[0])}+{len(halves[1])} 张重试")
+                    continue
+                logger.error(f"批次 {batch_no} 处理失败: {str(e)}")
+                results.append(BatchResult(f"批次处理失败: {str(e)}", len(batch)))
             except asyncio.TimeoutError:
-                error_msg = f"批次 {i//batch_size + 1} 处理超时（超过{timeout_seconds}秒）"
+                error_msg = f"批次 {batch_no} 处理超时（超过{timeout_seconds}秒）"
                 logger.error(error_msg)
-                results.append(f"批次处理超时: 可能API响应过慢或网络问题")
+                results.append(BatchResult(f"批次处理超时: 可能API响应过慢或网络问题", len(batch)))
+            except RateLimitError:
+                # 速率限制交给 LLMRouter 处理（切换到备用提供商），不能记为失败批次后继续
+                logger.warning(f"批次 {batch_no} 触发速率限制，停止当前提供商的分析")
+                raise
             except Exception as e:
-                logger.error(f"批次 {i//batch_size + 1} 处理失败: {str(e)}")
-                results.append(f"批次处理失败: {str(e)}")
+                logger.error(f"批次 {batch_no} 处理失败: {str(e)}")
+                results.append(BatchResult(f"批次处理失败: {str(e)}", len(batch)))
 
         return results
 
@@ -213,11 +308,12 @@ class LiteLLMVisionProvider(VisionModelProvider):
         # 调用 LiteLLM
         try:
             # 准备参数
+            capabilities = self.get_capabilities()
             completion_kwargs = {
                 "model": self.model_name,
                 "messages": messages,
                 "temperature": kwargs.get("temperature", 1.0),
-                "max_tokens": kwargs.get("max_tokens", 4000)
+                "max_tokens": capabilities.clamp_output_tokens(kwargs.get("max_tokens", 4000))
             }
 
             # 如果有自定义 base_url，添加 api_base 参数
@@ -239,6 +335,8 @@ class LiteLLMVisionProvider(VisionModelProvider):
             if response.choices and len(response.choices) > 0:
                 content = response.choices[0].message.content
                 logger.debug(f"LiteLLM 调用成功，消耗 tokens: {response.usage.total_tokens if response.usage else 'N/A'}")
+                if capabilities.vision is None:
+                    self.record_capabilities(vision=True)
                 return content
             else:
                 raise APICallError("LiteLLM 返回空响应")
@@ -249,24 +347,40 @@ class LiteLLMVisionProvider(VisionModelProvider):
         except LiteLLMRateLimitError as e:
             logger.error(f"LiteLLM 速率限制: {str(e)}")
             raise RateLimitError()
+        except LiteLLMContextWindowError as e:
+            raise RequestTooLargeError(f"超出模型上下文长度: {str(e)}", "context", parse_context_limit(str(e)))
         except LiteLLMBadRequestError as e:
             error_msg = str(e)
+            if is_payload_too_large(e):
+                raise RequestTooLargeError(f"请求体过大: {error_msg}", "payload")
             if "SAFETY" in error_msg.upper() or "content_filter" in error_msg.lower():
                 raise ContentFilterError(f"内容被安全过滤器阻止: {error_msg}")
+            if is_vision_unsupported_error(error_msg):
+                self.record_capabilities(vision=False)
+            else:
+                self._learn_limits_from_error(error_msg)
             logger.error(f"LiteLLM 请求错误: {error_msg}")
             raise APICallError(f"请求错误: {error_msg}")
         except LiteLLMAPIError as e:
+            if is_payload_too_large(e):
+                raise RequestTooLargeError(f"请求体过大: {str(e)}", "payload")
             logger.error(f"LiteLLM API 错误: {str(e)}")
             raise APICallError(f"API 错误: {str(e)}")
+        except APICallError:
+            raise
         except Exception as e:
+            if is_payload_too_large(e):
+                raise RequestTooLargeError(f"请求体过大: {str(e)}", "payload")
             logger.error(f"LiteLLM 调用失败: {str(e)}")
             raise APICallError(f"调用失败: {str(e)}")
 
     def _image_to_base64(self, img: PIL.Image.Image) -> str:
-        """将PIL图片转换为base64编码"""
-        img_buffer = io.BytesIO()
-        img.save(img_buffer, format='JPEG', quality=85)
-        img_bytes = img_buffer.getvalue()
+        """将PIL图片转换为base64编码（流式解码的关键帧已经是 JPEG，直接使用）"""
+        img_bytes = encoded_jpeg(img)
+        if img_bytes is None:
+            img_buffer = io.BytesIO()
+            img.save(img_buffer, format='JPEG', quality=85)
+            img_bytes = img_buffer.getvalue()
         return base64.b64encode(img_bytes).decode('utf-8')
 
     async def _make_api_call(self, payload: Dict[str, Any]) -> Dict[str, Any]:
@@ -274,7 +388,7 @@ class LiteLLMVisionProvider(VisionModelProvider):
         pass
 
 
-class LiteLLMTextProvider(TextModelProvider):
+class LiteLLMTextProvider(_CapabilityMixin, TextModelProvider):
     """使用 LiteLLM 的统一文本生成提供商"""
 
     @property
@@ -378,48 +492,18 @@ class LiteLLMTextProvider(TextModelProvider):
         Returns:
             生成的文本内容
         """
-        # 构建消息列表
-        messages = self._build_messages(prompt, system_prompt)
-
-        # 准备参数
-        completion_kwargs = {
-            "model": self.model_name,
-            "messages": messages,
-            "temperature": temperature
-        }
-
-        if max_tokens:
-            completion_kwargs["max_tokens"] = max_tokens
-
-        # 处理 JSON 格式输出
-        # LiteLLM 会自动处理不同 provider 的 JSON mode 差异
-        if response_format == "json":
-            try:
-                completion_kwargs["response_format"] = {"type": "json_object"}
-            except Exception as e:
-                # 如果不支持，在提示词中添加约束
-                logger.warning(f"模型可能不支持 response_format，将在提示词中添加 JSON 约束: {str(e)}")
-                messages[-1]["content"] += "\n\n请确保输出严格的JSON格式，不要包含任何其他文字或标记。"
-
-        # 如果有自定义 base_url，添加 api_base 参数
-        if hasattr(self, '_api_base'):
-            completion_kwargs["api_base"] = self._api_base
+        capabilities = self.get_capabilities()
+        completion_kwargs = self._build_completion_kwargs(
+            capabilities, prompt, system_prompt, temperature, max_tokens, response_format
+        )
+        messages = completion_kwargs["messages"]
 
         try:
             # 调用 LiteLLM（自动重试）
             response = await acompletion(**completion_kwargs)
-
-            if response.choices and len(response.choices) > 0:
-                content = response.choices[0].message.content
-
-                # 清理可能的 markdown 代码块（针对不支持 JSON mode 的模型）
-                if response_format == "json" and "response_format" not in completion_kwargs:
-                    content = self._clean_json_output(content)
-
-                logger.debug(f"LiteLLM 调用成功，消耗 tokens: {response.usage.total_tokens if response.usage else 'N/A'}")
-                return content
-            else:
-                raise APICallError("LiteLLM 返回空响应")
+            if "response_format" in completion_kwargs and capabilities.json_mode is None:
+                self.record_capabilities(json_mode=True)
+            return self._extract_content(response, response_format, completion_kwargs)
 
         except LiteLLMAuthError as e:
             logger.error(f"LiteLLM 认证失败: {str(e)}")
@@ -429,20 +513,21 @@ class LiteLLMTextProvider(TextModelProvider):
             raise RateLimitError()
         except LiteLLMBadRequestError as e:
             error_msg = str(e)
-            # 处理不支持 response_format 的情况
-            if "response_format" in error_msg and response_format == "json":
+            # 处理不支持 response_format 的情况：记录下来，之后的请求不再携带
+            if "response_format" in completion_kwargs and is_json_mode_error(error_msg):
                 logger.warning(f"模型不支持 response_format，重试不带格式约束的请求")
+                self.record_capabilities(json_mode=False)
                 completion_kwargs.pop("response_format", None)
-                messages[-1]["content"] += "\n\n请确保输出严格的JSON格式，不要包含任何其他文字或标记。"
+                messages[-1]["content"] += JSON_PROMPT_SUFFIX
+                return await self._retry_completion(completion_kwargs, response_format)
 
-                # 重试
-                response = await acompletion(**completion_kwargs)
-                if response.choices and len(response.choices) > 0:
-                    content = response.choices[0].message.content
-                    content = self._clean_json_output(content)
-                    return content
-                else:
-                    raise APICallError("LiteLLM 返回空响应")
+            # 处理 max_tokens 超出模型上限的情况：记录上限并按上限重试一次
+            learned = self._learn_limits_from_error(error_msg)
+            requested = completion_kwargs.get("max_tokens")
+            if requested and learned.max_output_tokens and requested > learned.max_output_tokens:
+                logger.warning(f"max_tokens={requested} 超出模型上限，按 {learned.max_output_tokens} 重试")
+                completion_kwargs["max_tokens"] = learned.max_output_tokens
+                return await self._retry_completion(completion_kwargs, response_format)
 
             # 检查是否是安全过滤
             if "SAFETY" in error_msg.upper() or "content_filter" in error_msg.lower():
@@ -457,6 +542,140 @@ class LiteLLMTextProvider(TextModelProvider):
             logger.error(f"LiteLLM 调用失败: {str(e)}")
             raise APICallError(f"调用失败: {str(e)}")
 
+    async def stream_text(self,
+                          prompt: str,
+                          system_prompt: Optional[str] = None,
+                          temperature: float = 1.0,
+                          max_tokens: Optional[int] = None,
+                          response_format: Optional[str] = None,
+                          **kwargs) -> AsyncIterator[str]:
+        """
+        使用 LiteLLM 流式生成文本（stream=True），逐块返回模型输出
+
+        服务端拒绝流式请求（BadRequest，如不支持 stream 或 response_format）时退回到 generate_text
+        （由其处理 JSON mode / max_tokens 的学习与重试），并一次性返回完整结果；
+        认证失败和速率限制直接抛出，由路由器决定是否切换提供商
+
+        Args:
+            prompt: 用户提示词
+            system_prompt: 系统提示词
+            temperature: 生成温度
+            max_tokens: 最大token数
+            response_format: 响应格式 ('json' 或 None)
+            **kwargs: 其他参数
+
+        Yields:
+            生成的文本片段
+        """
+        capabilities = self.get_capabilities()
+        completion_kwargs = self._build_completion_kwargs(
+            capabilities, prompt, system_prompt, temperature, max_tokens, response_format
+        )
+        completion_kwargs["stream"] = True
+
+        try:
+            response = await acompletion(**completion_kwargs)
+        except LiteLLMAuthError as e:
+            logger.error(f"LiteLLM 认证失败: {str(e)}")
+            raise AuthenticationError()
+        except LiteLLMRateLimitError as e:
+            logger.error(f"LiteLLM 速率限制: {str(e)}")
+            raise RateLimitError()
+        except LiteLLMBadRequestError as e:
+            logger.warning(f"LiteLLM 流式请求被拒绝，改用非流式请求: {str(e)}")
+            yield await self.generate_text(
+                prompt,
+                system_prompt=system_prompt,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                response_format=response_format,
+                **kwargs
+            )
+            return
+        except LiteLLMAPIError as e:
+            logger.error(f"LiteLLM API 错误: {str(e)}")
+            raise APICallError(f"API 错误: {str(e)}")
+        except Exception as e:
+            logger.error(f"LiteLLM 流式调用失败: {str(e)}")
+            raise APICallError(f"调用失败: {str(e)}")
+
+        received = 0
+        try:
+            async for chunk in response:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                content = getattr(delta, "content", None) if delta else None
+                if content:
+                    received += len(content)
+                    yield content
+        except Exception as e:
+            logger.error(f"LiteLLM 流式输出中断（已接收 {received} 字符）: {str(e)}")
+            raise APICallError(f"流式输出中断: {str(e)}")
+
+        if "response_format" in completion_kwargs and capabilities.json_mode is None:
+            self.record_capabilities(json_mode=True)
+        logger.debug(f"LiteLLM 流式调用完成，共接收 {received} 字符")
+
+    def _build_completion_kwargs(self,
+                                 capabilities: ModelCapabilities,
+                                 prompt: str,
+                                 system_prompt: Optional[str],
+                                 temperature: float,
+                                 max_tokens: Optional[int],
+                                 response_format: Optional[str]) -> Dict[str, Any]:
+        """根据已知的模型能力构建 acompletion 参数"""
+        # 构建消息列表
+        messages = self._build_messages(prompt, system_prompt)
+
+        # 准备参数
+        completion_kwargs = {
+            "model": self.model_name,
+            "messages": messages,
+            "temperature": temperature
+        }
+
+        max_tokens = capabilities.clamp_output_tokens(max_tokens)
+        if max_tokens:
+            completion_kwargs["max_tokens"] = max_tokens
+
+        # 处理 JSON 格式输出
+        # LiteLLM 会自动处理不同 provider 的 JSON mode 差异；
+        # 已确认不支持 response_format 的模型直接在提示词中添加约束，不再发送注定失败的请求
+        if response_format == "json":
+            if capabilities.json_mode is False:
+                messages[-1]["content"] += JSON_PROMPT_SUFFIX
+            else:
+                completion_kwargs["response_format"] = {"type": "json_object"}
+
+        # 如果有自定义 base_url，添加 api_base 参数
+        if hasattr(self, '_api_base'):
+            completion_kwargs["api_base"] = self._api_base
+
+        return completion_kwargs
+
+    async def _retry_completion(self, completion_kwargs: Dict[str, Any], response_format: Optional[str]) -> str:
+        """根据已学习的模型能力调整参数后重试一次"""
+        try:
+            response = await acompletion(**completion_kwargs)
+        except LiteLLMBadRequestError as e:
+            logger.error(f"LiteLLM 请求错误: {str(e)}")
+            raise APICallError(f"请求错误: {str(e)}")
+        return self._extract_content(response, response_format, completion_kwargs)
+
+    def _extract_content(self, response, response_format: Optional[str], completion_kwargs: Dict[str, Any]) -> str:
+        if not response.choices or len(response.choices) == 0:
+            raise APICallError("LiteLLM 返回空响应")
+
+        content = response.choices[0].message.content
+
+        # 清理可能的 markdown 代码块（针对不支持 JSON mode 的模型）
+        if response_format == "json" and "response_format" not in completion_kwargs:
+            content = self._clean_json_output(content)
+
+        logger.debug(f"LiteLLM 调用成功，消耗 tokens: {response.usage.total_tokens if response.usage else 'N/A'}")
+        return content
+
     def _clean_json_output(self, output: str) -> str:
         """清理JSON输出，移除markdown标记等"""
         import re
@@ -4,39 +4,90 @@
 统一管理所有大模型服务提供商，提供简单的工厂方法来创建和获取服务实例
 """
 
-from typing import Dict, Type, Optional
+import importlib
+from typing import Dict, List, Type, Optional, Union
 from loguru import logger
 
 from app.config import config
 from .base import VisionModelProvider, TextModelProvider
 from .exceptions import ProviderNotFoundError, ConfigurationError
+from .router import Route
+
+# 未注册为独立提供商的配置档（如备用提供商）使用该提供商的实现
+PROFILE_PROVIDER = 'litellm'
 
 
 class LLMServiceManager:
     """大模型服务管理器"""
     
-    # 注册的视觉模型提供商
-    _vision_providers: Dict[str, Type[VisionModelProvider]] = {}
+    # 注册的视觉模型提供商（值为类，或延迟加载的 "模块路径:类名"）
+    _vision_providers: Dict[str, Union[Type[VisionModelProvider], str]] = {}
     
-    # 注册的文本模型提供商  
-    _text_providers: Dict[str, Type[TextModelProvider]] = {}
+    # 注册的文本模型提供商（值为类，或延迟加载的 "模块路径:类名"）
+    _text_providers: Dict[str, Union[Type[TextModelProvider], str]] = {}
     
     # 缓存的提供商实例
     _vision_instance_cache: Dict[str, VisionModelProvider] = {}
     _text_instance_cache: Dict[str, TextModelProvider] = {}
     
     @classmethod
-    def register_vision_provider(cls, name: str, provider_class: Type[VisionModelProvider]):
-        """注册视觉模型提供商"""
+    def register_vision_provider(cls, name: str, provider_class: Union[Type[VisionModelProvider], str]):
+        """
+        注册视觉模型提供商
+
+        Args:
+            name: 提供商名称
+            provider_class: 提供商类，或 "模块路径:类名" 字符串（首次创建实例时才导入模块）
+        """
         cls._vision_providers[name.lower()] = provider_class
         logger.debug(f"注册视觉模型提供商: {name}")
     
     @classmethod
-    def register_text_provider(cls, name: str, provider_class: Type[TextModelProvider]):
-        """注册文本模型提供商"""
+    def register_text_provider(cls, name: str, provider_class: Union[Type[TextModelProvider], str]):
+        """
+        注册文本模型提供商
+
+        Args:
+            name: 提供商名称
+            provider_class: 提供商类，或 "模块路径:类名" 字符串（首次创建实例时才导入模块）
+        """
         cls._text_providers[name.lower()] = provider_class
         logger.debug(f"注册文本模型提供商: {name}")
 
+    @staticmethod
+    def _resolve_provider_class(registry: Dict[str, Union[type, str]], name: str) -> type:
+        """将延迟注册的 "模块路径:类名" 解析为提供商类，并写回注册表"""
+        provider_class = registry[name]
+        if isinstance(provider_class, str):
+            module_path, _, class_name = provider_class.partition(":")
+            provider_class = getattr(importlib.import_module(module_path), class_name)
+            registry[name] = provider_class
+            logger.debug(f"已加载提供商实现: {name} -> {module_path}.{class_name}")
+        return provider_class
+
+    @staticmethod
+    def _registry_key(
+        registry: Dict[str, Union[type, str]], provider_name: str, kind: str, config_prefix: str
+    ) -> Optional[str]:
+        """
+        确定提供商名称对应的注册表键
+
+        已注册的名称直接使用；未注册的名称只有列在 {kind}_llm_fallbacks 中、且配置了
+        {config_prefix}_model_name 时才视为 LiteLLM 配置档，
+        例如 text_llm_fallbacks = ["backup"] 配合 text_backup_model_name / text_backup_api_key；
+        其他未注册的名称（如拼写错误的主提供商）返回None
+        """
+        if provider_name in registry:
+            return provider_name
+        fallbacks = [str(name).lower() for name in config.app.get(f'{kind}_llm_fallbacks') or []]
+        if (
+            provider_name in fallbacks
+            and PROFILE_PROVIDER in registry
+            and config.app.get(f'{config_prefix}_model_name')
+        ):
+            return PROFILE_PROVIDER
+        return None
+
     # _ensure_providers_registered() 方法已移除
     # 现在使用显式注册机制（见 webui.py:main()）
     # 如需检查注册状态，使用 is_registered() 方法
@@ -99,11 +150,12 @@ class LLMServiceManager:
             return cls._vision_instance_cache[cache_key]
 
         # 检查提供商是否已注册
-        if provider_name not in cls._vision_providers:
+        config_prefix = f"vision_{provider_name}"
+        registry_key = cls._registry_key(cls._vision_providers, provider_name, "vision", config_prefix)
+        if registry_key is None:
             raise ProviderNotFoundError(provider_name)
         
         # 获取配置
-        config_prefix = f"vision_{provider_name}"
         api_key = config.app.get(f'{config_prefix}_api_key')
         model_name = config.app.get(f'{config_prefix}_model_name')
         base_url = config.app.get(f'{config_prefix}_base_url')
@@ -115,8 +167,8 @@ class LLMServiceManager:
             raise ConfigurationError(f"缺少模型名称配置: {config_prefix}_model_name")
         
         # 创建提供商实例
-        provider_class = cls._vision_providers[provider_name]
         try:
+            provider_class = cls._resolve_provider_class(cls._vision_providers, registry_key)
             instance = provider_class(
                 api_key=api_key,
                 model_name=model_name,
@@ -171,13 +223,14 @@ class LLMServiceManager:
             return cls._text_instance_cache[cache_key]
 
         # 检查提供商是否已注册
-        if provider_name not in cls._text_providers:
+        config_prefix = f"text_{provider_name}"
+        registry_key = cls._registry_key(cls._text_providers, provider_name, "text", config_prefix)
+        if registry_key is None:
             logger.error(f"提供商未注册: {provider_name}")
             logger.error(f"已注册的提供商列表: {list(cls._text_providers.keys())}")
             raise ProviderNotFoundError(provider_name)
         
         # 获取配置
-        config_prefix = f"text_{provider_name}"
         api_key = config.app.get(f'{config_prefix}_api_key')
         model_name = config.app.get(f'{config_prefix}_model_name')
         base_url = config.app.get(f'{config_prefix}_base_url')
@@ -189,8 +242,8 @@ class LLMServiceManager:
             raise ConfigurationError(f"缺少模型名称配置: {config_prefix}_model_name")
         
         # 创建提供商实例
-        provider_class = cls._text_providers[provider_name]
         try:
+            provider_class = cls._resolve_provider_class(cls._text_providers, registry_key)
             instance = provider_class(
                 api_key=api_key,
                 model_name=model_name,
@@ -207,6 +260,34 @@ class LLMServiceManager:
             logger.error(f"创建文本模型提供商实例失败: {provider_name} - {str(e)}")
             raise ConfigurationError(f"创建提供商实例失败: {str(e)}")
     
+    @classmethod
+    def get_routes(cls, kind: str, provider_name: Optional[str] = None) -> List[Route]:
+        """
+        获取请求路由的候选提供商：主提供商在前，之后是 {kind}_llm_fallbacks 中配置的备用提供商
+
+        备用提供商创建失败（如缺少密钥）时跳过，不影响主提供商
+
+        Args:
+            kind: "text" 或 "vision"
+            provider_name: 主提供商名称，如果不指定则从配置中获取
+
+        Returns:
+            List[Route]: 候选提供商列表
+        """
+        getter = cls.get_text_provider if kind == "text" else cls.get_vision_provider
+        primary_name = (provider_name or config.app.get(f'{kind}_llm_provider', 'openai' if kind == "text" else 'gemini')).lower()
+        routes = [Route(primary_name, getter(primary_name))]
+
+        for name in config.app.get(f'{kind}_llm_fallbacks') or []:
+            name = str(name).lower()
+            if any(route.name == name for route in routes):
+                continue
+            try:
+                routes.append(Route(name, getter(name)))
+            except Exception as e:
+                logger.warning(f"备用{kind}提供商 {name} 不可用，已跳过: {str(e)}")
+        return routes
+
     @classmethod
     def clear_cache(cls):
         """清空提供商实例缓存"""
@@ -224,22 +305,23 @@ class LLMServiceManager:
         """列出所有已注册的文本模型提供商"""
         return list(cls._text_providers.keys())
     
+    @staticmethod
+    def _describe_provider(provider_class: Union[type, str]) -> Dict[str, str]:
+        if isinstance(provider_class, str):
+            module_path, _, class_name = provider_class.partition(":")
+            return {"class": class_name, "module": module_path}
+        return {"class": provider_class.__name__, "module": provider_class.__module__}
+
     @classmethod
     def get_provider_info(cls) -> Dict[str, Dict[str, any]]:
         """获取所有提供商信息"""
         return {
             "vision_providers": {
-                name: {
-                    "class": provider_class.__name__,
-                    "module": provider_class.__module__
-                }
+                name: cls._describe_provider(provider_class)
                 for name, provider_class in cls._vision_providers.items()
             },
             "text_providers": {
-                name: {
-                    "class": provider_class.__name__,
-                    "module": provider_class.__module__
-                }
+                name: cls._describe_provider(provider_class)
                 for name, provider_class in cls._text_providers.items()
             }
         }
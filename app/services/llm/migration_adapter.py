@@ -6,15 +6,17 @@
 
 import asyncio
 import json
-from typing import List, Dict, Any, Optional, Union
+from typing import Callable, List, Dict, Any, Optional, Union
 from pathlib import Path
 import PIL.Image
 from loguru import logger
 
 from .unified_service import UnifiedLLMService
 from .exceptions import LLMServiceError
+from .json_stream import JsonItemStream
 # 导入新的提示词管理系统
 from app.services.prompts import PromptManager
+from app.utils.async_runtime import iterate_sync, run_sync
 
 # 提供商注册由 webui.py:main() 显式调用（见 LLM 提供商注册机制重构）
 # 这样更可靠，错误也更容易调试
@@ -22,7 +24,9 @@ from app.services.prompts import PromptManager
 
 def _run_async_safely(coro_func, *args, **kwargs):
     """
-    安全地运行异步协程，处理各种事件循环情况
+    在进程共享的后台事件循环上运行异步协程
+
+    所有调用复用同一个事件循环，HTTP 连接池和 litellm 的异步客户端可以在多次调用之间保持
 
     Args:
         coro_func: 协程函数（不是协程对象）
@@ -32,28 +36,8 @@ def _run_async_safely(coro_func, *args, **kwargs):
     Returns:
         协程的执行结果
     """
-    def run_in_new_loop():
-        """在新的事件循环中运行协程"""
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            return loop.run_until_complete(coro_func(*args, **kwargs))
-        finally:
-            loop.close()
-            asyncio.set_event_loop(None)
-
     try:
-        # 尝试获取当前事件循环
-        try:
-            loop = asyncio.get_running_loop()
-            # 如果有运行中的事件循环，使用线程池执行
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(run_in_new_loop)
-                return future.result()
-        except RuntimeError:
-            # 没有运行中的事件循环，直接运行
-            return run_in_new_loop()
+        return run_sync(coro_func, *args, **kwargs)
     except Exception as e:
         logger.error(f"异步执行失败: {str(e)}")
         raise LLMServiceError(f"异步执行失败: {str(e)}")
@@ -62,6 +46,32 @@ def _run_async_safely(coro_func, *args, **kwargs):
 class LegacyLLMAdapter:
     """传统LLM接口适配器"""
     
+    @staticmethod
+    def _stream_narration(prompt: str, on_item: Callable[[Dict[str, Any]], None]) -> str:
+        """
+        流式生成解说文案，逐个回调已完成的片段，返回完整输出文本
+
+        超时按相邻两个片段之间的间隔计算，长文案只要持续有输出就不会因总时长超时
+        """
+        stream = JsonItemStream()
+        items = UnifiedLLMService.stream_narration_items(
+            prompt=prompt,
+            system_prompt="你是一名专业的短视频解说文案撰写专家。",
+            temperature=1.5,
+            stream=stream
+        )
+        try:
+            for item in iterate_sync(items, timeout=180):
+                on_item(item)
+        except TimeoutError:
+            logger.error("文本生成超时（超过3分钟没有新的输出）")
+            raise Exception("解说文案生成超时，可能API响应过慢。请检查网络连接或API配置。")
+
+        if stream.items and not stream.finished:
+            logger.warning("流式输出未正常结束，使用已生成的片段")
+            return json.dumps({"items": stream.items}, ensure_ascii=False)
+        return stream.text
+
     @staticmethod
     def create_vision_analyzer(provider: str, api_key: str, model: str, base_url: str = None):
         """
@@ -79,7 +89,8 @@ class LegacyLLMAdapter:
         return VisionAnalyzerAdapter(provider, api_key, model, base_url)
     
     @staticmethod
-    def generate_narration(markdown_content: str, api_key: str, base_url: str, model: str, video_type: str = "documentary") -> str:
+    def generate_narration(markdown_content: str, api_key: str, base_url: str, model: str, video_type: str = "documentary",
+                           on_item: Optional[Callable[[Dict[str, Any]], None]] = None) -> str:
         """
         生成解说文案 - 兼容原有接口
 
@@ -89,6 +100,7 @@ class LegacyLLMAdapter:
             base_url: API基础URL
             model: 模型名称
             video_type: 视频类型，支持: documentary(纪录片), outdoor_food(野外美食), movie_commentary(影视解说), movie_mashup(影视混剪), animal_world(动物世界)
+            on_item: 传入时使用流式生成，每个解说片段生成完成后立即在调用方线程中回调
 
         Returns:
             生成的解说文案JSON字符串
@@ -141,7 +153,10 @@ class LegacyLLMAdapter:
                     logger.error("文本生成超时（超过3分钟）")
                     raise Exception("解说文案生成超时，可能API响应过慢。请检查网络连接或API配置。")
             
-            result = _run_async_safely(generate_with_timeout)
+            if on_item is None:
+                result = _run_async_safely(generate_with_timeout)
+            else:
+                result = LegacyLLMAdapter._stream_narration(prompt, on_item)
 
             # 检查markdown_content是否为空
             if not markdown_content or not markdown_content.strip():
@@ -243,18 +258,21 @@ class VisionAnalyzerAdapter:
             # 转换为旧格式以保持向后兼容性
             # 新实现返回 List[str]，需要转换为 List[Dict]
             compatible_results = []
+            start_idx = 0
             for i, result in enumerate(results):
-                # 计算这个批次处理的图片数量
-                start_idx = i * batch_size
-                end_idx = min(start_idx + batch_size, len(images))
-                images_processed = end_idx - start_idx
+                # 计算这个批次处理的图片数量（批次由规划器按 token 预算划分，不一定等于 batch_size）
+                images_processed = getattr(result, 'image_count', None)
+                if images_processed is None:
+                    images_processed = min(batch_size, len(images) - start_idx)
 
                 compatible_results.append({
                     'batch_index': i,
+                    'image_start': start_idx,
                     'images_processed': images_processed,
-                    'response': result,
+                    'response': str(result),
                     'model_used': self.model
                 })
+                start_idx += images_processed
 
             logger.info(f"图片分析完成，共处理 {len(images)} 张图片，生成 {len(compatible_results)} 个批次结果")
             return compatible_results
@@ -392,6 +410,7 @@ def create_vision_analyzer(provider: str, api_key: str, model: str, base_url: st
     return LegacyLLMAdapter.create_vision_analyzer(provider, api_key, model, base_url)
 
 
-def generate_narration(markdown_content: str, api_key: str, base_url: str, model: str, video_type: str = "documentary") -> str:
+def generate_narration(markdown_content: str, api_key: str, base_url: str, model: str, video_type: str = "documentary",
+                       on_item: Optional[Callable[[Dict[str, Any]], None]] = None) -> str:
     """生成解说文案 - 全局函数"""
-    return LegacyLLMAdapter.generate_narration(markdown_content, api_key, base_url, model, video_type)
+    return LegacyLLMAdapter.generate_narration(markdown_content, api_key, base_url, model, video_type, on_item)
@@ -9,6 +9,9 @@
 # 所有导入都在 register_all_providers() 函数内部进行
 
 
+LITELLM_MODULE = 'app.services.llm.litellm_provider'
+
+
 def register_all_providers():
     """
     注册所有提供商
@@ -21,15 +24,13 @@ def register_all_providers():
     from ..manager import LLMServiceManager
     from loguru import logger
 
-    # 只导入 LiteLLM provider
-    from ..litellm_provider import LiteLLMVisionProvider, LiteLLMTextProvider
-
     logger.info("🔧 开始注册 LLM 提供商...")
 
     # ===== 注册 LiteLLM 统一接口 =====
     # LiteLLM 支持 100+ providers（OpenAI, Gemini, Qwen, DeepSeek, SiliconFlow, 等）
-    LLMServiceManager.register_vision_provider('litellm', LiteLLMVisionProvider)
-    LLMServiceManager.register_text_provider('litellm', LiteLLMTextProvider)
+    # litellm 导入耗时数秒，这里只登记类路径，首次创建提供商实例时才导入
+    LLMServiceManager.register_vision_provider('litellm', f'{LITELLM_MODULE}:LiteLLMVisionProvider')
+    LLMServiceManager.register_text_provider('litellm', f'{LITELLM_MODULE}:LiteLLMTextProvider')
 
     logger.info("✅ LiteLLM 提供商注册完成（支持 100+ providers）")
 
@@ -0,0 +1,351 @@
+"""
+大模型请求路由
+
+在 LLMServiceManager 返回的主提供商和配置的备用提供商之间路由请求：
+- 按 (类型, 提供商, 模型) 统计最近一段时间的 p50/p95 延迟和错误率
+- 可选的对冲请求：主提供商超过其 p95 延迟仍未返回时，向备用提供商发送相同请求，
+  采用先返回的有效结果并取消另一个
+- 主提供商触发速率限制等错误时自动切换到下一个提供商
+- 流式请求只在收到第一个片段之前失败时切换提供商（已输出的片段无法撤回），不做对冲请求
+
+路由策略可以在每个调用点通过 RoutePolicy 单独配置，未指定时使用 [app] 中的全局配置。
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple, Type, TypeVar
+
+from loguru import logger
+
+from app.config import config
+from .exceptions import LLMServiceError, RateLimitError
+
+T = TypeVar("T")
+
+# 每个提供商保留的最近请求数
+STATS_WINDOW = 50
+# 计算 p95 / 错误率所需的最少样本数
+MIN_SAMPLES = 5
+# 错误率超过该值的主提供商会被排到备用提供商之后
+UNHEALTHY_ERROR_RATE = 0.5
+
+
+@dataclass
+class RoutePolicy:
+    """单次调用的路由策略"""
+    # 主提供商超过 p95 延迟时是否向备用提供商发送对冲请求
+    hedge: bool = False
+    # 固定的对冲等待时间（秒），为None时使用主提供商的 p95 延迟（样本不足时不对冲）
+    hedge_delay: Optional[float] = None
+    # 遇到以下错误时是否切换到下一个提供商
+    failover: bool = True
+    failover_on: Tuple[Type[BaseException], ...] = (RateLimitError,)
+    # 结果校验，返回 False 的结果视为无效（对冲时继续等待另一个请求）
+    validate: Optional[Callable[[Any], bool]] = None
+
+    @classmethod
+    def from_config(cls) -> "RoutePolicy":
+        """根据 [app] 中的 llm_hedge_requests / llm_hedge_delay / llm_failover 创建默认策略"""
+        return cls(
+            hedge=bool(config.app.get("llm_hedge_requests", False)),
+            hedge_delay=config.app.get("llm_hedge_delay") or None,
+            failover=bool(config.app.get("llm_failover", True)),
+        )
+
+    def is_valid(self, result: Any) -> bool:
+        if self.validate is not None:
+            return bool(self.validate(result))
+        return bool(result)
+
+
+@dataclass
+class Route:
+    """一个可用的提供商实例"""
+    name: str
+    provider: Any
+
+    @property
+    def model(self) -> str:
+        return getattr(self.provider, "model_name", "")
+
+    def __str__(self) -> str:
+        return f"{self.name}({self.model})"
+
+
+@dataclass
+class LatencyStats:
+    """单个提供商/模型的滚动延迟与错误统计"""
+    latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=STATS_WINDOW))
+    outcomes: Deque[bool] = field(default_factory=lambda: deque(maxlen=STATS_WINDOW))
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, elapsed: float, success: bool) -> None:
+        with self._lock:
+            self.outcomes.append(success)
+            if success:
+                self.latencies.append(elapsed)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self.latencies)
+        if len(samples) < MIN_SAMPLES:
+            return None
+        index = min(len(samples) - 1, max(0, math.ceil(pct / 100 * len(samples)) - 1))
+        return samples[index]
+
+    @property
+    def p50(self) -> Optional[float]:
+        return self.percentile(50)
+
+    @property
+    def p95(self) -> Optional[float]:
+        return self.percentile(95)
+
+    @property
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self.outcomes:
+                return 0.0
+            return 1 - sum(self.outcomes) / len(self.outcomes)
+
+    @property
+    def samples(self) -> int:
+        return len(self.outcomes)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "samples": self.samples,
+            "p50": self.p50,
+            "p95": self.p95,
+            "error_rate": round(self.error_rate, 3),
+        }
+
+
+class LLMRouter:
+    """按延迟和错误率在多个提供商之间路由请求"""
+
+    def __init__(self):
+        self._stats: Dict[str, LatencyStats] = {}
+        self._lock = threading.Lock()
+
+    def stats_for(self, kind: str, route: Route) -> LatencyStats:
+        key = f"{kind}|{route.name}|{route.model}"
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = LatencyStats()
+            return stats
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """获取所有提供商的延迟统计"""
+        with self._lock:
+            items = list(self._stats.items())
+        return {key: stats.snapshot() for key, stats in items}
+
+    def order_routes(self, kind: str, routes: List[Route]) -> List[Route]:
+        """
+        确定尝试顺序：主提供商优先；备用提供商按错误率、p50 延迟排序；
+        主提供商近期错误率过高时排到备用提供商之后
+
+        Args:
+            kind: "text" 或 "vision"
+            routes: 主提供商在前的候选列表
+
+        Returns:
+            List[Route]: 排序后的候选列表
+        """
+        if len(routes) <= 1:
+            return routes
+
+        def health(route: Route) -> Tuple[float, float]:
+            stats = self.stats_for(kind, route)
+            p50 = stats.p50
+            return stats.error_rate, p50 if p50 is not None else math.inf
+
+        primary, fallbacks = routes[0], sorted(routes[1:], key=health)
+        primary_stats = self.stats_for(kind, primary)
+        if primary_stats.samples >= MIN_SAMPLES and primary_stats.error_rate >= UNHEALTHY_ERROR_RATE:
+            logger.warning(f"主提供商 {primary} 近期错误率 {primary_stats.error_rate:.0%}，优先使用备用提供商")
+            return fallbacks + [primary]
+        return [primary] + fallbacks
+
+    async def _timed(self, kind: str, route: Route, operation: Callable[[Any], Awaitable[T]]) -> T:
+        stats = self.stats_for(kind, route)
+        started = time.monotonic()
+        try:
+            result = await operation(route.provider)
+        except asyncio.CancelledError:
+            # 对冲中被取消的请求不计入统计
+            raise
+        except Exception:
+            stats.record(time.monotonic() - started, False)
+            raise
+        stats.record(time.monotonic() - started, True)
+        return result
+
+    async def call(
+        self,
+        kind: str,
+        routes: List[Route],
+        operation: Callable[[Any], Awaitable[T]],
+        policy: Optional[RoutePolicy] = None
+    ) -> T:
+        """
+        按路由策略执行请求
+
+        Args:
+            kind: "text" 或 "vision"
+            routes: 候选提供商（主提供商在前）
+            operation: 接收提供商实例并返回协程的函数
+            policy: 路由策略，为None时使用全局配置
+
+        Returns:
+            第一个有效的结果
+
+        Raises:
+            LLMServiceError: 所有候选提供商都失败时抛出最后一个错误
+        """
+        policy = policy or RoutePolicy.from_config()
+        routes = self.order_routes(kind, routes) if policy.failover or policy.hedge else routes[:1]
+
+        last_error: Optional[BaseException] = None
+        index = 0
+        while index < len(routes):
+            primary = routes[index]
+            secondary = routes[index + 1] if policy.hedge and index + 1 < len(routes) else None
+            attempted: List[Route] = []
+            try:
+                if secondary is not None:
+                    return await self._hedged(kind, primary, secondary, operation, policy, attempted)
+                attempted.append(primary)
+                return await self._timed(kind, primary, operation)
+            except policy.failover_on as e:
+                last_error = e
+                if not policy.failover:
+                    raise
+                logger.warning(f"提供商 {', '.join(map(str, attempted))} 请求失败（{type(e).__name__}），切换到下一个提供商")
+            index += len(attempted)
+
+        if last_error is not None:
+            raise last_error
+        raise LLMServiceError("没有可用的大模型提供商")
+
+    async def stream(
+        self,
+        kind: str,
+        routes: List[Route],
+        operation: Callable[[Any], AsyncIterator[T]],
+        policy: Optional[RoutePolicy] = None
+    ) -> AsyncIterator[T]:
+        """
+        按路由策略执行流式请求
+
+        与 call 使用相同的提供商顺序和失败切换规则，但只在收到第一个片段之前切换；
+        对冲请求会产生两路互相交错的输出，流式请求不使用（policy.hedge 被忽略）
+
+        Args:
+            kind: "text" 或 "vision"
+            routes: 候选提供商（主提供商在前）
+            operation: 接收提供商实例并返回异步迭代器的函数
+            policy: 路由策略，为None时使用全局配置
+
+        Yields:
+            提供商输出的片段
+
+        Raises:
+            LLMServiceError: 所有候选提供商都失败时抛出最后一个错误
+        """
+        policy = policy or RoutePolicy.from_config()
+        routes = self.order_routes(kind, routes) if policy.failover else routes[:1]
+
+        last_error: Optional[BaseException] = None
+        for route in routes:
+            stats = self.stats_for(kind, route)
+            started = time.monotonic()
+            received = False
+            try:
+                async for chunk in operation(route.provider):
+                    received = True
+                    yield chunk
+            except policy.failover_on as e:
+                stats.record(time.monotonic() - started, False)
+                if received or not policy.failover:
+                    raise
+                last_error = e
+                logger.warning(f"提供商 {route} 流式请求失败（{type(e).__name__}），切换到下一个提供商")
+                continue
+            except Exception:
+                stats.record(time.monotonic() - started, False)
+                raise
+            stats.record(time.monotonic() - started, True)
+            return
+
+        if last_error is not None:
+            raise last_error
+        raise LLMServiceError("没有可用的大模型提供商")
+
+    async def _hedged(
+        self,
+        kind: str,
+        primary: Route,
+        secondary: Route,
+        operation: Callable[[Any], Awaitable[T]],
+        policy: RoutePolicy,
+        attempted: List[Route]
+    ) -> T:
+        """向主提供商发送请求，超过对冲等待时间仍未返回时再向备用提供商发送，采用先返回的有效结果"""
+        attempted.append(primary)
+        delay = policy.hedge_delay if policy.hedge_delay is not None else self.stats_for(kind, primary).p95
+        if delay is None:
+            # 样本不足，无法判断主提供商的尾延迟
+            return await self._timed(kind, primary, operation)
+
+        primary_task = asyncio.ensure_future(self._timed(kind, primary, operation))
+        done, _ = await asyncio.wait({primary_task}, timeout=delay)
+        if done:
+            # 在对冲等待时间内返回（或失败），与普通请求相同
+            return primary_task.result()
+
+        logger.info(f"提供商 {primary} 超过 {delay:.2f}s 未返回，向 {secondary} 发送对冲请求")
+        attempted.append(secondary)
+        tasks: Dict[asyncio.Future, Route] = {
+            primary_task: primary,
+            asyncio.ensure_future(self._timed(kind, secondary, operation)): secondary,
+        }
+
+        pending = set(tasks.keys())
+        errors: List[BaseException] = []
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        errors.append(task.exception())
+                        continue
+                    result = task.result()
+                    if policy.is_valid(result):
+                        logger.info(f"采用提供商 {tasks[task]} 的结果")
+                        return result
+                    errors.append(LLMServiceError(f"提供商 {tasks[task]} 返回了无效结果"))
+        finally:
+            # 取消较慢的请求
+            for task in pending:
+                task.cancel()
+
+        # 两个请求都失败：优先抛出可切换提供商的错误，由调用方继续尝试后面的提供商
+        for error in errors:
+            if isinstance(error, policy.failover_on):
+                raise error
+        raise errors[-1]
+
+
+_router = LLMRouter()
+
+
+def get_router() -> LLMRouter:
+    """获取进程共享的请求路由器"""
+    return _router
@@ -4,13 +4,15 @@
 提供简化的API接口，方便现有代码迁移到新的架构
 """
 
-from typing import List, Dict, Any, Optional, Union
+from typing import AsyncIterator, List, Dict, Any, Optional, Union
 from pathlib import Path
 import PIL.Image
 from loguru import logger
 
 from .manager import LLMServiceManager
 from .validators import OutputValidator
+from .json_stream import JsonItemStream
+from .router import RoutePolicy, get_router
 from .exceptions import LLMServiceError
 
 # 提供商注册由 webui.py:main() 显式调用（见 LLM 提供商注册机制重构）
@@ -25,6 +27,7 @@ class UnifiedLLMService:
                            prompt: str,
                            provider: Optional[str] = None,
                            batch_size: int = 10,
+                           routing: Optional[RoutePolicy] = None,
                            **kwargs) -> List[str]:
         """
         分析图片内容
@@ -34,6 +37,7 @@ class UnifiedLLMService:
             prompt: 分析提示词
             provider: 视觉模型提供商名称，如果不指定则使用配置中的默认值
             batch_size: 批处理大小
+            routing: 路由策略（对冲请求、失败切换），为None时使用全局配置
             **kwargs: 其他参数
             
         Returns:
@@ -54,15 +58,20 @@ class UnifiedLLMService:
                     logger.error(f"LLM提供商重新注册失败: {reg_error}")
                     raise LLMServiceError(f"LLM提供商未注册且重新注册失败: {reg_error}")
             
-            # 获取视觉模型提供商
-            vision_provider = LLMServiceManager.get_vision_provider(provider)
+            # 获取视觉模型提供商（主提供商 + 备用提供商）
+            routes = LLMServiceManager.get_routes("vision", provider)
             
             # 执行图片分析
-            results = await vision_provider.analyze_images(
-                images=images,
-                prompt=prompt,
-                batch_size=batch_size,
-                **kwargs
+            results = await get_router().call(
+                "vision",
+                routes,
+                lambda vision_provider: vision_provider.analyze_images(
+                    images=images,
+                    prompt=prompt,
+                    batch_size=batch_size,
+                    **kwargs
+                ),
+                routing
             )
             
             logger.info(f"图片分析完成，共处理 {len(images)} 张图片，生成 {len(results)} 个结果")
@@ -79,6 +88,7 @@ class UnifiedLLMService:
                           temperature: float = 1.0,
                           max_tokens: Optional[int] = None,
                           response_format: Optional[str] = None,
+                          routing: Optional[RoutePolicy] = None,
                           **kwargs) -> str:
         """
         生成文本内容
@@ -90,6 +100,7 @@ class UnifiedLLMService:
             temperature: 生成温度
             max_tokens: 最大token数
             response_format: 响应格式 ('json' 或 None)
+            routing: 路由策略（对冲请求、失败切换），为None时使用全局配置
             **kwargs: 其他参数
             
         Returns:
@@ -110,17 +121,22 @@ class UnifiedLLMService:
                     logger.error(f"LLM提供商重新注册失败: {reg_error}")
                     raise LLMServiceError(f"LLM提供商未注册且重新注册失败: {reg_error}")
             
-            # 获取文本模型提供商
-            text_provider = LLMServiceManager.get_text_provider(provider)
+            # 获取文本模型提供商（主提供商 + 备用提供商）
+            routes = LLMServiceManager.get_routes("text", provider)
             
             # 执行文本生成
-            result = await text_provider.generate_text(
-                prompt=prompt,
-                system_prompt=system_prompt,
-                temperature=temperature,
-                max_tokens=max_tokens,
-                response_format=response_format,
-                **kwargs
+            result = await get_router().call(
+                "text",
+                routes,
+                lambda text_provider: text_provider.generate_text(
+                    prompt=prompt,
+                    system_prompt=system_prompt,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    response_format=response_format,
+                    **kwargs
+                ),
+                routing
             )
             
             logger.info(f"文本生成完成，生成内容长度: {len(result)} 字符")
@@ -180,6 +196,120 @@ class UnifiedLLMService:
             logger.error(f"解说文案生成失败: {str(e)}")
             raise LLMServiceError(f"解说文案生成失败: {str(e)}")
     
+    @staticmethod
+    async def stream_text(prompt: str,
+                          system_prompt: Optional[str] = None,
+                          provider: Optional[str] = None,
+                          temperature: float = 1.0,
+                          max_tokens: Optional[int] = None,
+                          response_format: Optional[str] = None,
+                          routing: Optional[RoutePolicy] = None,
+                          **kwargs) -> AsyncIterator[str]:
+        """
+        流式生成文本内容
+        
+        Args:
+            prompt: 用户提示词
+            system_prompt: 系统提示词
+            provider: 文本模型提供商名称，如果不指定则使用配置中的默认值
+            temperature: 生成温度
+            max_tokens: 最大token数
+            response_format: 响应格式 ('json' 或 None)
+            routing: 路由策略（失败切换，流式请求不做对冲），为None时使用全局配置
+            **kwargs: 其他参数
+            
+        Yields:
+            生成的文本片段
+            
+        Raises:
+            LLMServiceError: 服务调用失败时抛出
+        """
+        # 确保LLM提供商已注册（防止Streamlit重载时提供商未注册）
+        if not LLMServiceManager.is_registered():
+            logger.warning("LLM提供商未注册，尝试重新注册...")
+            try:
+                from .providers import register_all_providers
+                register_all_providers()
+                logger.info("LLM提供商重新注册成功")
+            except Exception as reg_error:
+                logger.error(f"LLM提供商重新注册失败: {reg_error}")
+                raise LLMServiceError(f"LLM提供商未注册且重新注册失败: {reg_error}")
+
+        try:
+            # 获取文本模型提供商（主提供商 + 备用提供商）
+            routes = LLMServiceManager.get_routes("text", provider)
+            async for chunk in get_router().stream(
+                "text",
+                routes,
+                lambda text_provider: text_provider.stream_text(
+                    prompt=prompt,
+                    system_prompt=system_prompt,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    response_format=response_format,
+                    **kwargs
+                ),
+                routing
+            ):
+                yield chunk
+        except LLMServiceError:
+            raise
+        except Exception as e:
+            logger.error(f"流式文本生成失败: {str(e)}")
+            raise LLMServiceError(f"流式文本生成失败: {str(e)}")
+
+    @staticmethod
+    async def stream_narration_items(prompt: str,
+                                     system_prompt: Optional[str] = None,
+                                     provider: Optional[str] = None,
+                                     temperature: float = 1.0,
+                                     stream: Optional[JsonItemStream] = None,
+                                     routing: Optional[RoutePolicy] = None,
+                                     **kwargs) -> AsyncIterator[Dict[str, Any]]:
+        """
+        流式生成解说文案，items 中的每个片段一完整生成就立即返回
+        
+        Args:
+            prompt: 提示词
+            system_prompt: 系统提示词
+            provider: 文本模型提供商名称
+            temperature: 生成温度
+            stream: 增量解析器，传入时调用方可在结束后通过 stream.text 取得完整输出
+            routing: 路由策略（失败切换，流式请求不做对冲），为None时使用全局配置
+            **kwargs: 其他参数
+            
+        Yields:
+            解说文案片段
+            
+        Raises:
+            LLMServiceError: 服务调用失败时抛出
+        """
+        stream = stream or JsonItemStream()
+        async for chunk in UnifiedLLMService.stream_text(
+            prompt=prompt,
+            system_prompt=system_prompt,
+            provider=provider,
+            temperature=temperature,
+            response_format="json",
+            routing=routing,
+            **kwargs
+        ):
+            for item in stream.feed(chunk):
+                yield item
+
+        if not stream.items:
+            # 输出不是预期的 {"items": [...]} 结构（或整体一次返回），按完整结果验证解析
+            try:
+                narration_items = OutputValidator.validate_narration_script(stream.text)
+            except Exception as e:
+                logger.error(f"解说文案解析失败: {str(e)}")
+                raise LLMServiceError(f"解说文案解析失败: {str(e)}")
+            for item in narration_items:
+                stream.items.append(item)
+                yield item
+
+        logger.info(f"解说文案流式生成完成，共 {len(stream.items)} 个片段")
+
     @staticmethod
     async def analyze_subtitle(subtitle_content: str,
                              provider: Optional[str] = None,
@@ -257,6 +387,16 @@ class UnifiedLLMService:
         """
         return LLMServiceManager.list_text_providers()
     
+    @staticmethod
+    def get_routing_stats() -> Dict[str, Dict[str, Any]]:
+        """
+        获取各提供商/模型的延迟和错误率统计
+        
+        Returns:
+            以 "类型|提供商|模型" 为键的统计信息（样本数、p50、p95、错误率）
+        """
+        return get_router().get_stats()
+    
     @staticmethod
     def clear_cache():
         """清空提供商实例缓存"""
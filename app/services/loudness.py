@@ -0,0 +1,269 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+'''
+@Project: NarratoAI
+@File   : loudness
+@Description: 基于 EBU R128 的响度测量服务（单次 ebur128 扫描 + 指纹缓存）
+'''
+
+import json
+import math
+import os
+import re
+import subprocess
+import threading
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from app.utils import utils
+from app.utils.ffmpeg_runner import run_ffmpeg
+from app.utils.fingerprint import file_fingerprint
+
+# 分段统计的窗口长度（秒）
+WINDOW_SECONDS = 3.0
+# EBU R128 绝对门限，低于该响度的窗口视为静音
+ABSOLUTE_GATE_LUFS = -70.0
+# 缓存格式版本，统计方式变化时递增
+CACHE_VERSION = 1
+
+_FRAME_PATTERN = re.compile(r"\bt:\s*([\d.]+)\s+TARGET:.*?\bM:\s*(-?[\d.]+|-inf)")
+_SUMMARY_PATTERNS = {
+    "integrated": re.compile(r"^\s*I:\s*(-?[\d.]+|-inf)\s*LUFS"),
+    "loudness_range": re.compile(r"^\s*LRA:\s*(-?[\d.]+)\s*LU\b"),
+    "true_peak": re.compile(r"^\s*Peak:\s*(-?[\d.]+|-inf)\s*dBFS"),
+}
+
+_memory_cache: Dict[str, "LoudnessProfile"] = {}
+_cache_lock = threading.Lock()
+
+
+@dataclass
+class LoudnessProfile:
+    """单个音频源的响度测量结果"""
+    integrated: Optional[float]
+    loudness_range: Optional[float] = None
+    true_peak: Optional[float] = None
+    window_seconds: float = WINDOW_SECONDS
+    # 每个窗口的响度（LUFS），静音窗口为None
+    windows: List[Optional[float]] = field(default_factory=list)
+
+    def loudness_between(self, start: float, end: float) -> Optional[float]:
+        """
+        计算指定时间区间的响度（对区间内非静音窗口做能量平均）
+
+        Args:
+            start: 开始时间（秒）
+            end: 结束时间（秒）
+
+        Returns:
+            Optional[float]: 区间响度（LUFS），区间内全部静音时返回None
+        """
+        first = max(int(start // self.window_seconds), 0)
+        last = min(int(math.ceil(end / self.window_seconds)), len(self.windows))
+        return _power_mean(self.windows[first:last])
+
+    def loudest_window(self) -> Optional[float]:
+        active = [value for value in self.windows if value is not None]
+        return max(active) if active else None
+
+    def reference_loudness(self) -> Optional[float]:
+        """用于增益计算的参考响度：优先使用积分响度，其次使用窗口能量平均"""
+        if self.integrated is not None and self.integrated > ABSOLUTE_GATE_LUFS:
+            return self.integrated
+        return _power_mean(self.windows)
+
+
+def _to_float(value: str) -> Optional[float]:
+    if value == "-inf":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _power_mean(values: List[Optional[float]]) -> Optional[float]:
+    active = [value for value in values if value is not None]
+    if not active:
+        return None
+    mean_power = sum(10 ** (value / 10) for value in active) / len(active)
+    return 10 * math.log10(mean_power)
+
+
+def _cache_path(cache_key: str) -> str:
+    return os.path.join(utils.temp_dir("loudness"), f"{cache_key}.json")
+
+
+def _load_cached(cache_key: str) -> Optional[LoudnessProfile]:
+    with _cache_lock:
+        profile = _memory_cache.get(cache_key)
+    if profile is not None:
+        return profile
+
+    path = _cache_path(cache_key)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.pop("version", None) != CACHE_VERSION:
+            return None
+        profile = LoudnessProfile(**data)
+    except (OSError, ValueError, TypeError) as e:
+        logger.debug(f"读取响度缓存失败: {str(e)}")
+        return None
+
+    with _cache_lock:
+        _memory_cache[cache_key] = profile
+    return profile
+
+
+def _save_cached(cache_key: str, profile: LoudnessProfile) -> None:
+    with _cache_lock:
+        _memory_cache[cache_key] = profile
+
+    path = _cache_path(cache_key)
+    temp_path = f"{path}.tmp"
+    try:
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": CACHE_VERSION, **asdict(profile)}, f)
+        os.replace(temp_path, path)
+    except OSError as e:
+        logger.debug(f"写入响度缓存失败: {str(e)}")
+
+
+def _scan(path: str) -> Optional[LoudnessProfile]:
+    """对音频/视频文件的第一条音轨执行一次 ebur128 扫描"""
+    window_power: Dict[int, Tuple[float, int]] = {}
+
+    def on_line(line: str) -> None:
+        match = _FRAME_PATTERN.search(line)
+        if not match:
+            return
+        momentary = _to_float(match.group(2))
+        if momentary is None or momentary <= ABSOLUTE_GATE_LUFS:
+            return
+        index = int(float(match.group(1)) // WINDOW_SECONDS)
+        total, count = window_power.get(index, (0.0, 0))
+        window_power[index] = (total + 10 ** (momentary / 10), count + 1)
+
+    cmd = [
+        'ffmpeg', '-hide_banner',
+        '-i', path,
+        '-map', '0:a:0',
+        '-af', 'ebur128=peak=true',
+        '-f', 'null', '-'
+    ]
+    try:
+        result = run_ffmpeg(cmd, stderr_handler=on_line)
+    except subprocess.CalledProcessError as e:
+        logger.warning(f"响度分析失败 {os.path.basename(path)}: {(e.stderr or str(e))[-300:]}")
+        return None
+
+    summary: Dict[str, Optional[float]] = {}
+    in_summary = False
+    for line in result.stderr.splitlines():
+        if "Summary:" in line:
+            in_summary = True
+            continue
+        if not in_summary:
+            continue
+        for key, pattern in _SUMMARY_PATTERNS.items():
+            match = pattern.match(line)
+            if match and key not in summary:
+                summary[key] = _to_float(match.group(1))
+
+    window_count = max(window_power) + 1 if window_power else 0
+    windows: List[Optional[float]] = []
+    for index in range(window_count):
+        total, count = window_power.get(index, (0.0, 0))
+        windows.append(round(10 * math.log10(total / count), 2) if count else None)
+
+    return LoudnessProfile(
+        integrated=summary.get("integrated"),
+        loudness_range=summary.get("loudness_range"),
+        true_peak=summary.get("true_peak"),
+        windows=windows,
+    )
+
+
+def measure_loudness(path: str) -> Optional[LoudnessProfile]:
+    """
+    测量音频/视频文件的 EBU R128 响度
+
+    直接读取源文件的第一条音轨，不生成临时文件；
+    结果按文件内容指纹缓存在内存和 storage/temp/loudness 中。
+
+    Args:
+        path: 音频或视频文件路径
+
+    Returns:
+        Optional[LoudnessProfile]: 响度测量结果，失败时返回None
+    """
+    if not path or not os.path.exists(path):
+        return None
+
+    cache_key = file_fingerprint(path)
+    profile = _load_cached(cache_key)
+    if profile is not None:
+        return profile
+
+    profile = _scan(path)
+    if profile is None:
+        return None
+
+    logger.info(
+        f"音频 {os.path.basename(path)} 响度: I={profile.integrated} LUFS, "
+        f"LRA={profile.loudness_range} LU, 峰值={profile.true_peak} dBFS"
+    )
+    _save_cached(cache_key, profile)
+    return profile
+
+
+def calculate_mix_gains(
+    tts_profile: LoudnessProfile,
+    original_profile: LoudnessProfile,
+    target_lufs: float = -20.0,
+    original_pre_gain: float = 1.0,
+    headroom_db: float = 6.0
+) -> Optional[Tuple[float, float]]:
+    """
+    根据响度测量结果计算TTS和原声的音量调整系数，使两者达到相似的响度
+
+    Args:
+        tts_profile: TTS音轨的响度
+        original_profile: 原声音轨的响度（未调整音量的源文件）
+        target_lufs: 目标响度
+        original_pre_gain: 原声在测量之后还会被乘上的音量系数
+        headroom_db: 调整后最响窗口允许超过目标响度的分贝数
+
+    Returns:
+        Optional[Tuple[float, float]]: (TTS音量系数, 原声音量系数)，无法计算时返回None
+    """
+    pre_gain_db = 20 * math.log10(original_pre_gain) if original_pre_gain > 0 else 0.0
+
+    def _gain(profile: LoudnessProfile, offset_db: float) -> Optional[float]:
+        reference = profile.reference_loudness()
+        if reference is None:
+            return None
+        gain_db = target_lufs - (reference + offset_db)
+        # 用分段统计限制增益，避免把本身有很响片段的音轨整体放大到削波
+        loudest = profile.loudest_window()
+        if loudest is not None:
+            gain_db = min(gain_db, target_lufs + headroom_db - (loudest + offset_db))
+        return 10 ** (gain_db / 20)
+
+    tts_adjustment = _gain(tts_profile, 0.0)
+    original_adjustment = _gain(original_profile, pre_gain_db)
+    if tts_adjustment is None or original_adjustment is None:
+        return None
+
+    # 限制调整范围，避免过度放大
+    tts_adjustment = max(0.1, min(2.0, tts_adjustment))
+    original_adjustment = max(0.1, min(3.0, original_adjustment))  # 原声可以放大更多
+
+    logger.info(f"音量调整建议 - TTS: {tts_adjustment:.2f}, 原声: {original_adjustment:.2f}")
+    return tts_adjustment, original_adjustment
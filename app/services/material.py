@@ -1,22 +1,25 @@
 import os
 import subprocess
+import threading
 import random
 import traceback
 from urllib.parse import urlencode
 from datetime import datetime
 import json
 
-import requests
 from typing import List, Optional
 from loguru import logger
-from moviepy.video.io.VideoFileClip import VideoFileClip
 
 from app.config import config
 from app.models.schema import VideoAspect, VideoConcatMode, MaterialInfo
+from app.models.timeline import parse_time_ms
+from app.services import storage_manager
 from app.utils import utils
 from app.utils import ffmpeg_utils
+from app.utils.http_session import get_session
 
 requested_count = 0
+_api_key_lock = threading.Lock()
 
 
 def get_api_key(cfg_key: str):
@@ -32,8 +35,10 @@ def get_api_key(cfg_key: str):
         return api_keys
 
     global requested_count
-    requested_count += 1
-    return api_keys[requested_count % len(api_keys)]
+    with _api_key_lock:
+        requested_count += 1
+        index = requested_count % len(api_keys)
+    return api_keys[index]
 
 
 def search_videos_pexels(
@@ -52,7 +57,7 @@ def search_videos_pexels(
     logger.info(f"searching videos: {query_url}, with proxies: {config.proxy}")
 
     try:
-        r = requests.get(
+        r = get_session("material_search").get(
             query_url,
             headers=headers,
             proxies=config.proxy,
@@ -111,7 +116,7 @@ def search_videos_pixabay(
     logger.info(f"searching videos: {query_url}, with proxies: {config.proxy}")
 
     try:
-        r = requests.get(
+        r = get_session("material_search").get(
             query_url, proxies=config.proxy, verify=False, timeout=(30, 60)
         )
         response = r.json()
@@ -147,44 +152,14 @@ def search_videos_pixabay(
 
 
 def save_video(video_url: str, save_dir: str = "") -> str:
-    if not save_dir:
-        save_dir = utils.storage_dir("cache_videos")
-
-    if not os.path.exists(save_dir):
-        os.makedirs(save_dir)
+    """
+    download a video (streamed to a .part file, resumable) and validate it with ffprobe
 
-    url_without_query = video_url.split("?")[0]
-    url_hash = utils.md5(url_without_query)
-    video_id = f"vid-{url_hash}"
-    video_path = f"{save_dir}/{video_id}.mp4"
+    concurrent calls for the same url share one download
+    """
+    from app.services.downloader import get_download_manager
 
-    # if video already exists, return the path
-    if os.path.exists(video_path) and os.path.getsize(video_path) > 0:
-        logger.info(f"video already exists: {video_path}")
-        return video_path
-
-    # if video does not exist, download it
-    with open(video_path, "wb") as f:
-        f.write(
-            requests.get(
-                video_url, proxies=config.proxy, verify=False, timeout=(60, 240)
-            ).content
-        )
-
-    if os.path.exists(video_path) and os.path.getsize(video_path) > 0:
-        try:
-            clip = VideoFileClip(video_path)
-            duration = clip.duration
-            fps = clip.fps
-            clip.close()
-            if duration > 0 and fps > 0:
-                return video_path
-        except Exception as e:
-            try:
-                os.remove(video_path)
-            except Exception as e:
-                logger.warning(f"无效的视频文件: {video_path} => {str(e)}")
-    return ""
+    return get_download_manager().download(video_url, save_dir)
 
 
 def download_videos(
@@ -199,16 +174,16 @@ def download_videos(
     valid_video_items = []
     valid_video_urls = []
     found_duration = 0.0
-    search_videos = search_videos_pexels
-    if source == "pixabay":
-        search_videos = search_videos_pixabay
-
-    for search_term in search_terms:
-        video_items = search_videos(
-            search_term=search_term,
-            minimum_duration=max_clip_duration,
-            video_aspect=video_aspect,
-        )
+    from app.services import material_search
+
+    # search all terms concurrently (rate limited per source, results cached on disk)
+    search_results = material_search.search_terms(
+        search_terms,
+        source=source,
+        minimum_duration=max_clip_duration,
+        video_aspect=video_aspect,
+    )
+    for search_term, video_items in search_results:
         logger.info(f"found {len(video_items)} videos for '{search_term}'")
 
         for item in video_items:
@@ -231,25 +206,30 @@ def download_videos(
     if video_contact_mode.value == VideoConcatMode.random.value:
         random.shuffle(valid_video_items)
 
+    from app.services.downloader import get_download_manager
+
+    # download in parallel (bounded pool), but consume results in order so the
+    # duration cut-off picks the same videos as a sequential download would
+    items_by_url = {item.url: item for item in valid_video_items}
     total_duration = 0.0
-    for item in valid_video_items:
-        try:
-            logger.info(f"downloading video: {item.url}")
-            saved_video_path = save_video(
-                video_url=item.url, save_dir=material_directory
+    downloads = get_download_manager().download_iter(
+        (item.url for item in valid_video_items), save_dir=material_directory
+    )
+    for url, saved_video_path in downloads:
+        item = items_by_url[url]
+        if not saved_video_path:
+            logger.error(f"failed to download video: {utils.to_json(item)}")
+            continue
+        logger.info(f"video saved: {saved_video_path}")
+        video_paths.append(saved_video_path)
+        seconds = min(max_clip_duration, item.duration)
+        total_duration += seconds
+        if total_duration > audio_duration:
+            logger.info(
+                f"total duration of downloaded videos: {total_duration} seconds, skip downloading more"
             )
-            if saved_video_path:
-                logger.info(f"video saved: {saved_video_path}")
-                video_paths.append(saved_video_path)
-                seconds = min(max_clip_duration, item.duration)
-                total_duration += seconds
-                if total_duration > audio_duration:
-                    logger.info(
-                        f"total duration of downloaded videos: {total_duration} seconds, skip downloading more"
-                    )
-                    break
-        except Exception as e:
-            logger.error(f"failed to download video: {utils.to_json(item)} => {str(e)}")
+            break
+    downloads.close()
     logger.success(f"downloaded {len(video_paths)} videos")
     return video_paths
 
@@ -266,23 +246,9 @@ def time_to_seconds(time_str: str) -> float:
         float: 转换后的秒数(包含毫秒)
     """
     try:
-        # 处理毫秒部分
-        if ',' in time_str:
-            time_part, ms_part = time_str.split(',')
-            ms = int(ms_part) / 1000
-        else:
-            time_part = time_str
-            ms = 0
-
-        # 处理时分秒
-        parts = time_part.split(':')
-        if len(parts) == 3:  # HH:MM:SS
-            h, m, s = map(int, parts)
-            seconds = h * 3600 + m * 60 + s
-        else:
+        if time_str.split(',')[0].count(':') != 2:
             raise ValueError("时间格式必须为 HH:MM:SS,mmm")
-
-        return seconds + ms
+        return parse_time_ms(time_str) / 1000
 
     except ValueError as e:
         logger.error(f"时间格式错误: {time_str}")
@@ -354,6 +320,7 @@ def save_clip_video(timestamp: str, origin_video: str, save_dir: str = "") -> st
     # 如果视频已存在，直接返回
     if os.path.exists(video_path) and os.path.getsize(video_path) > 0:
         logger.info(f"视频已存在: {video_path}")
+        storage_manager.touch(video_path)
         return video_path
 
     try:
@@ -475,6 +442,7 @@ def save_clip_video(timestamp: str, origin_video: str, save_dir: str = "") -> st
 
             if validate_result.returncode == 0:
                 logger.info(f"视频剪辑成功: {video_path}")
+                storage_manager.touch(video_path, written=True)
                 return video_path
 
         logger.error("视频文件验证失败")
@@ -0,0 +1,226 @@
+"""
+素材搜索
+
+- 多个搜索关键词并发查询（线程池），每个素材源单独限速（请求间隔 + 时间窗口内的请求配额），
+  避免触发 Pexels / Pixabay 的频率限制
+- 查询结果按 (素材源, 关键词, 画面比例, 最短时长) 缓存到磁盘，有效期内相同的关键词不再请求接口
+
+    storage/cache/material_search/<键的md5>.json
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+from app.config import config
+from app.models.schema import MaterialInfo, VideoAspect
+from app.utils import utils
+
+CACHE_DIR_NAME = "material_search"
+# 查询结果缓存有效期（秒）
+DEFAULT_CACHE_TTL = 24 * 3600
+# 默认并发查询数
+DEFAULT_MAX_WORKERS = 4
+# 每个素材源每秒最多发起的请求数（平滑并发查询的突发，不代表接口配额）
+DEFAULT_RATE_LIMITS = {
+    "pexels": 2.0,
+    "pixabay": 1.5,
+}
+# 每个素材源的接口配额：(时间窗口内最多请求数, 窗口秒数)；Pexels 每小时 200 次，Pixabay 每分钟 100 次
+DEFAULT_QUOTAS = {
+    "pexels": (200, 3600),
+    "pixabay": (100, 60),
+}
+
+
+class RateLimiter:
+    """按固定最小间隔发放请求许可、并限制时间窗口内请求总数的线程安全限速器"""
+
+    def __init__(self, rate: float, quota: Optional[Tuple[int, float]] = None):
+        """
+        Args:
+            rate: 每秒最多请求数，小于等于0表示不限速
+            quota: (窗口内最多请求数, 窗口秒数)，为None时不限制总数
+        """
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self.quota = (int(quota[0]), float(quota[1])) if quota and quota[0] > 0 and quota[1] > 0 else None
+        self._next_time = 0.0
+        # 已发放许可的时间（只保留最近 quota[0] 个）
+        self._issued: deque = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """阻塞直到可以发起下一次请求"""
+        if not self.interval and not self.quota:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_time)
+            if self.quota:
+                limit, window = self.quota
+                if len(self._issued) >= limit:
+                    # 窗口内的配额已用完，等到最早的一次请求移出窗口
+                    start = max(start, self._issued[0] + window)
+                    if start - now > 1:
+                        logger.warning(f"素材搜索已达到接口配额（{window:.0f} 秒 {limit} 次），等待 {start - now:.0f} 秒")
+                self._issued.append(start)
+                while len(self._issued) > limit:
+                    self._issued.popleft()
+            self._next_time = start + self.interval
+            wait = start - now
+        if wait > 0:
+            time.sleep(wait)
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(source: str) -> RateLimiter:
+    """
+    获取素材源的进程共享限速器
+
+    速率由 [app] material_search_rate_limits 配置，配额由 [app] material_search_quotas 配置
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(source)
+        if limiter is None:
+            rates = {**DEFAULT_RATE_LIMITS, **(config.app.get("material_search_rate_limits") or {})}
+            quotas = {**DEFAULT_QUOTAS, **(config.app.get("material_search_quotas") or {})}
+            limiter = _limiters[source] = RateLimiter(float(rates.get(source, 1.0)), quotas.get(source))
+        return limiter
+
+
+class SearchCache:
+    """素材搜索结果的磁盘缓存"""
+
+    def __init__(self, directory: Optional[str] = None, ttl: Optional[float] = None):
+        """
+        Args:
+            directory: 缓存目录，默认 storage/cache/material_search
+            ttl: 有效期（秒），默认读取 [app] material_search_cache_ttl；小于等于0表示不使用缓存
+        """
+        self._directory = directory
+        self.ttl = float(ttl if ttl is not None else config.app.get("material_search_cache_ttl", DEFAULT_CACHE_TTL))
+
+    @property
+    def directory(self) -> str:
+        if self._directory is None:
+            self._directory = os.path.join(utils.storage_dir("cache", create=True), CACHE_DIR_NAME)
+        os.makedirs(self._directory, exist_ok=True)
+        return self._directory
+
+    @staticmethod
+    def make_key(source: str, search_term: str, video_aspect: VideoAspect, minimum_duration: int) -> str:
+        aspect = VideoAspect(video_aspect).value
+        return utils.md5(f"{source}|{search_term.strip().lower()}|{aspect}|{int(minimum_duration)}")
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[List[MaterialInfo]]:
+        """读取未过期的缓存，不存在、过期或损坏时返回None"""
+        if self.ttl <= 0:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if time.time() - data.get("fetched_at", 0) > self.ttl:
+                return None
+            items = []
+            for raw in data["items"]:
+                item = MaterialInfo()
+                item.provider = raw["provider"]
+                item.url = raw["url"]
+                item.duration = raw["duration"]
+                items.append(item)
+            return items
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.debug(f"读取素材搜索缓存失败: {str(e)}")
+            return None
+
+    def put(self, key: str, items: List[MaterialInfo]) -> None:
+        """写入查询结果（先写临时文件再替换，避免并发读到不完整的内容）"""
+        if self.ttl <= 0:
+            return
+        path = self._path(key)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        data = {
+            "fetched_at": time.time(),
+            "items": [{"provider": item.provider, "url": item.url, "duration": item.duration} for item in items],
+        }
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"写入素材搜索缓存失败: {str(e)}")
+
+
+def _search_function(source: str) -> Callable[..., List[MaterialInfo]]:
+    from app.services import material
+
+    if source == "pixabay":
+        return material.search_videos_pixabay
+    return material.search_videos_pexels
+
+
+def search_terms(
+    search_terms: Sequence[str],
+    source: str = "pexels",
+    minimum_duration: int = 5,
+    video_aspect: VideoAspect = VideoAspect.portrait,
+    max_workers: Optional[int] = None,
+    cache: Optional[SearchCache] = None
+) -> List[Tuple[str, List[MaterialInfo]]]:
+    """
+    并发搜索多个关键词
+
+    Args:
+        search_terms: 搜索关键词
+        source: 素材源，pexels 或 pixabay
+        minimum_duration: 视频最短时长（秒）
+        video_aspect: 画面比例
+        max_workers: 并发查询数，默认读取 [app] material_search_workers
+        cache: 查询结果缓存，默认使用 storage/cache/material_search
+
+    Returns:
+        List[Tuple[str, List[MaterialInfo]]]: 按输入顺序排列的 (关键词, 搜索结果)
+    """
+    if not search_terms:
+        return []
+    search = _search_function(source)
+    limiter = get_rate_limiter(source)
+    cache = cache or SearchCache()
+    max_workers = max_workers or config.app.get("material_search_workers", DEFAULT_MAX_WORKERS)
+
+    def _search(search_term: str) -> List[MaterialInfo]:
+        key = cache.make_key(source, search_term, video_aspect, minimum_duration)
+        cached = cache.get(key)
+        if cached is not None:
+            logger.debug(f"使用缓存的素材搜索结果: {source} '{search_term}'")
+            return cached
+        limiter.acquire()
+        items = search(
+            search_term=search_term,
+            minimum_duration=minimum_duration,
+            video_aspect=video_aspect,
+        )
+        # 搜索失败时也返回空列表，空结果不缓存，下次重新查询
+        if items:
+            cache.put(key, items)
+        return items
+
+    workers = max(1, min(int(max_workers), len(search_terms)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="material-search") as executor:
+        results = list(executor.map(_search, search_terms))
+    return list(zip(search_terms, results))
@@ -8,6 +8,7 @@
 @Date   : 2025/5/6 下午7:38
 '''
 
+import hashlib
 import os
 import shutil
 import subprocess
@@ -15,7 +16,10 @@ from enum import Enum
 from typing import List, Optional, Tuple
 from loguru import logger
 
+from app.services import audio_assembly, proxy_media
 from app.utils import ffmpeg_utils
+from app.utils.fingerprint import file_fingerprint
+from app.utils.ffmpeg_runner import run_ffmpeg, scale_progress, ProgressCallback
 
 
 class VideoAspect(Enum):
@@ -133,7 +137,9 @@ def process_single_video(
         target_width: int,
         target_height: int,
         keep_audio: bool = True,
-        hwaccel: Optional[str] = None
+        hwaccel: Optional[str] = None,
+        progress_callback: Optional[ProgressCallback] = None,
+        draft: bool = False
 ) -> str:
     """
     处理单个视频：调整分辨率、帧率等
@@ -148,12 +154,16 @@ def process_single_video(
         target_height: 目标高度
         keep_audio: 是否保留音频
         hwaccel: 硬件加速选项
+        progress_callback: 进度回调，参数为0~1的完成比例
+        draft: 草稿模式，使用 ultrafast 软件编码和固定质量（帧率不变）
 
     Returns:
         str: 处理后的视频路径
     """
     if not os.path.exists(input_path):
         raise FileNotFoundError(f"找不到视频文件: {input_path}")
+    if draft:
+        hwaccel = None
 
     # 构建基本命令
     command = ['ffmpeg', '-y']
@@ -237,17 +247,20 @@ def process_single_video(
             logger.warning(f"硬件编码器检测失败: {str(e)}，将使用软件编码")
             hwaccel = None
     
-    if not hwaccel:
+    if draft:
+        command.extend(['-c:v', 'libx264', '-preset', proxy_media.DRAFT_PRESET, '-crf', proxy_media.DRAFT_CRF])
+    elif not hwaccel:
         logger.info("使用软件编码器(libx264)")
         command.extend(['-c:v', 'libx264', '-preset', 'medium', '-profile:v', 'high'])
 
     # 设置视频比特率和其他参数
-    command.extend([
-        '-b:v', '5M',
-        '-maxrate', '8M',
-        '-bufsize', '10M',
-        '-pix_fmt', 'yuv420p',  # 兼容性更好的颜色格式
-    ])
+    if not draft:
+        command.extend([
+            '-b:v', '5M',
+            '-maxrate', '8M',
+            '-bufsize', '10M',
+        ])
+    command.extend(['-pix_fmt', 'yuv420p'])  # 兼容性更好的颜色格式
 
     # 输出文件
     command.append(output_path)
@@ -255,11 +268,11 @@ def process_single_video(
     # 执行命令
     try:
         # logger.info(f"执行FFmpeg命令: {' '.join(command)}")
-        process = subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        run_ffmpeg(command, progress_callback=progress_callback)
         # logger.info(f"视频处理成功: {output_path}")
         return output_path
     except subprocess.CalledProcessError as e:
-        error_msg = e.stderr.decode() if e.stderr else str(e)
+        error_msg = e.stderr if e.stderr else str(e)
         logger.error(f"处理视频失败: {error_msg}")
 
         # 如果使用硬件加速失败，尝试使用软件编码
@@ -297,11 +310,11 @@ def process_single_video(
                 ])
 
                 logger.info("执行软件编码备选方案")
-                subprocess.run(fallback_cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                run_ffmpeg(fallback_cmd, progress_callback=progress_callback)
                 logger.info(f"使用软件编码成功处理视频: {output_path}")
                 return output_path
             except subprocess.CalledProcessError as fallback_error:
-                fallback_error_msg = fallback_error.stderr.decode() if fallback_error.stderr else str(fallback_error)
+                fallback_error_msg = fallback_error.stderr if fallback_error.stderr else str(fallback_error)
                 logger.error(f"软件编码备选方案也失败: {fallback_error_msg}")
 
                 # 尝试最基本的编码参数
@@ -313,11 +326,11 @@ def process_single_video(
                         '-crf', '23', '-pix_fmt', 'yuv420p',
                         output_path
                     ]
-                    subprocess.run(basic_cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                    run_ffmpeg(basic_cmd, progress_callback=progress_callback)
                     logger.info(f"使用基本编码参数成功处理视频: {output_path}")
                     return output_path
                 except subprocess.CalledProcessError as basic_error:
-                    basic_error_msg = basic_error.stderr.decode() if basic_error.stderr else str(basic_error)
+                    basic_error_msg = basic_error.stderr if basic_error.stderr else str(basic_error)
                     logger.error(f"基本编码参数也失败: {basic_error_msg}")
                     raise RuntimeError(f"无法处理视频 {input_path}: 所有编码方案都失败")
 
@@ -325,6 +338,52 @@ def process_single_video(
         raise RuntimeError(f"处理视频失败: {error_msg}")
 
 
+def _normalized_cache_path(
+        cache_dir: str,
+        input_path: str,
+        width: int,
+        height: int,
+        keep_audio: bool,
+        draft: bool
+) -> str:
+    """规范化中间文件的缓存路径：由输入片段的内容指纹和输出参数决定"""
+    key = hashlib.md5(
+        f"{file_fingerprint(input_path)}_{width}x{height}_{int(keep_audio)}_{int(draft)}".encode()
+    ).hexdigest()
+    os.makedirs(cache_dir, exist_ok=True)
+    return os.path.join(cache_dir, f"{key}.mp4")
+
+
+def _commit_output(temp_output: str, cached_output: Optional[str]) -> str:
+    """处理完成的中间文件写入缓存（完整写完后再重命名，中途失败不会留下不完整的缓存）"""
+    if cached_output is None:
+        return temp_output
+    os.replace(temp_output, cached_output)
+    return cached_output
+
+
+def _assemble_original_audio(
+        processed_videos: List[dict],
+        source_audio: Optional[List[Optional[Tuple[str, float]]]],
+        output_path: str
+) -> str:
+    """按规范化片段的时长排布保留的原声，拼装成一条与拼接后视频等长的音轨"""
+    placements = []
+    current_time = 0.0
+    for video in processed_videos:
+        duration = audio_assembly.media_duration(video["path"])
+        if video["keep_audio"]:
+            source = None
+            if source_audio and video["index"] < len(source_audio):
+                source = source_audio[video["index"]]
+            if source:
+                placements.append(audio_assembly.AudioPlacement(source[0], source[1], duration, current_time))
+            else:
+                placements.append(audio_assembly.AudioPlacement(video["path"], 0.0, duration, current_time))
+        current_time += duration
+    return audio_assembly.assemble_audio(placements, current_time, output_path)
+
+
 def combine_clip_videos(
         output_video_path: str,
         video_paths: List[str],
@@ -332,6 +391,10 @@ def combine_clip_videos(
         video_aspect: VideoAspect = VideoAspect.portrait,
         threads: int = 4,
         force_software_encoding: bool = False,  # 新参数，强制使用软件编码
+        progress_callback: Optional[ProgressCallback] = None,
+        draft: bool = False,
+        cache_dir: Optional[str] = None,
+        source_audio: Optional[List[Optional[Tuple[str, float]]]] = None,
 ) -> str:
     """
     合并子视频
@@ -342,6 +405,11 @@ def combine_clip_videos(
         video_aspect: 屏幕比例
         threads: 线程数
         force_software_encoding: 是否强制使用软件编码（忽略硬件加速检测）
+        progress_callback: 整体合并进度回调，参数为0~1的完成比例
+        draft: 草稿模式，按代理高度等比缩小分辨率并使用 ultrafast 编码
+        cache_dir: 规范化中间文件的缓存目录（增量渲染），按输入片段内容和输出参数命名，已存在时直接复用
+        source_audio: 与 video_paths 一一对应的原声来源 (原视频路径, 片段在原视频中的开始时间秒)，
+            提供时保留的原声直接从原视频解码，为空时从各片段中解码
 
     Returns:
         str: 合并后的视频路径
@@ -357,9 +425,12 @@ def combine_clip_videos(
     # 获取目标分辨率
     aspect = VideoAspect(video_aspect)
     video_width, video_height = aspect.to_resolution()
+    if draft:
+        video_width, video_height = proxy_media.draft_resolution(video_width, video_height)
+        logger.info(f"草稿模式：输出分辨率 {video_width}x{video_height}")
 
     # 检测可用的硬件加速选项
-    hwaccel = None if force_software_encoding else get_hardware_acceleration_option()
+    hwaccel = None if force_software_encoding or draft else get_hardware_acceleration_option()
     if hwaccel:
         logger.info(f"将使用 {hwaccel} 硬件加速")
     elif force_software_encoding:
@@ -414,9 +485,32 @@ def combine_clip_videos(
 
     try:
         # 第一阶段：处理所有视频片段到中间文件
-        for segment in video_segments:
+        total_segments = len(video_segments)
+        for position, segment in enumerate(video_segments):
             # 处理单个视频，去除或保留音频
             temp_output = os.path.join(temp_dir, f"processed_{segment['index']}.mp4")
+            cached_output = None
+            if cache_dir:
+                cached_output = _normalized_cache_path(
+                    cache_dir, segment['path'], video_width, video_height, segment['keep_audio'], draft
+                )
+                if os.path.exists(cached_output) and os.path.getsize(cached_output) > 0:
+                    # 更新修改时间，增量渲染清理缓存时据此保留本次用到的文件
+                    os.utime(cached_output)
+                    processed_videos.append({
+                        "index": segment["index"],
+                        "path": cached_output,
+                        "keep_audio": segment["keep_audio"]
+                    })
+                    logger.info(f"视频 {segment['index'] + 1}/{len(video_segments)} 复用已规范化的片段")
+                    continue
+                temp_output = f"{cached_output}.part.mp4"
+            # 片段处理占整体进度的80%，剩余部分留给合并阶段
+            segment_progress = scale_progress(
+                progress_callback,
+                0.8 * position / total_segments,
+                0.8 * (position + 1) / total_segments
+            )
             try:
                 process_single_video(
                     input_path=segment['path'],
@@ -424,11 +518,13 @@ def combine_clip_videos(
                     target_width=video_width,
                     target_height=video_height,
                     keep_audio=segment['keep_audio'],
-                    hwaccel=hwaccel
+                    hwaccel=hwaccel,
+                    progress_callback=segment_progress,
+                    draft=draft
                 )
                 processed_videos.append({
                     "index": segment["index"],
-                    "path": temp_output,
+                    "path": _commit_output(temp_output, cached_output),
                     "keep_audio": segment["keep_audio"]
                 })
                 logger.info(f"视频 {segment['index'] + 1}/{len(video_segments)} 处理完成")
@@ -444,11 +540,12 @@ def combine_clip_videos(
                             target_width=video_width,
                             target_height=video_height,
                             keep_audio=segment['keep_audio'],
-                            hwaccel=None  # 使用软件编码
+                            hwaccel=None,  # 使用软件编码
+                            progress_callback=segment_progress
                         )
                         processed_videos.append({
                             "index": segment["index"],
-                            "path": temp_output,
+                            "path": _commit_output(temp_output, cached_output),
                             "keep_audio": segment["keep_audio"]
                         })
                         logger.info(f"使用软件编码成功处理视频 {segment['index'] + 1}/{len(video_segments)}")
@@ -481,17 +578,17 @@ def combine_clip_videos(
                 '-safe', '0',
                 '-i', concat_file,
                 '-c:v', 'libx264',
-                '-preset', 'medium',
+                '-preset', proxy_media.DRAFT_PRESET if draft else 'medium',
                 '-profile:v', 'high',
                 '-an',  # 不包含音频
                 '-threads', str(threads),
                 video_concat_path
             ]
 
-            subprocess.run(concat_cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            run_ffmpeg(concat_cmd, progress_callback=scale_progress(progress_callback, 0.8, 0.95))
             logger.info("视频流合并完成")
 
-            # 2. 提取并合并有音频的片段
+            # 2. 检查是否有需要保留原声的片段
             audio_segments = [video for video in processed_videos if video["keep_audio"]]
 
             if not audio_segments:
@@ -500,127 +597,38 @@ def combine_clip_videos(
                 logger.info("无音频视频合并完成")
                 return output_video_path
 
-            # 创建音频中间文件
-            audio_files = []
-            for i, segment in enumerate(audio_segments):
-                # 提取音频
-                audio_file = os.path.join(temp_dir, f"audio_{i}.aac")
-                extract_audio_cmd = [
-                    'ffmpeg', '-y',
-                    '-i', segment["path"],
-                    '-vn',  # 不包含视频
-                    '-c:a', 'aac',
-                    '-b:a', '128k',
-                    audio_file
-                ]
-                subprocess.run(extract_audio_cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                audio_files.append({
-                    "index": segment["index"],
-                    "path": audio_file
-                })
-                logger.info(f"提取音频 {i+1}/{len(audio_segments)} 完成")
-
-            # 3. 计算每个音频片段的时间位置
-            audio_timings = []
-            current_time = 0.0
-
-            # 获取每个视频片段的时长
-            for i, video in enumerate(processed_videos):
-                duration_cmd = [
-                    'ffprobe', '-v', 'error',
-                    '-show_entries', 'format=duration',
-                    '-of', 'csv=p=0',
-                    video["path"]
-                ]
-                result = subprocess.run(duration_cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-                duration = float(result.stdout.strip())
-
-                # 如果当前片段需要保留音频，记录时间位置
-                if video["keep_audio"]:
-                    for audio in audio_files:
-                        if audio["index"] == video["index"]:
-                            audio_timings.append({
-                                "file": audio["path"],
-                                "start": current_time,
-                                "index": video["index"]
-                            })
-                            break
-
-                current_time += duration
-
-            # 4. 创建静音音频轨道作为基础
-            silence_audio = os.path.join(temp_dir, "silence.aac")
-            create_silence_cmd = [
-                'ffmpeg', '-y',
-                '-f', 'lavfi',
-                '-i', f'anullsrc=r=44100:cl=stereo',
-                '-t', str(current_time),  # 总时长
-                '-c:a', 'aac',
-                '-b:a', '128k',
-                silence_audio
-            ]
-            subprocess.run(create_silence_cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-
-            # 5. 创建复杂滤镜命令以混合音频
-            filter_script = os.path.join(temp_dir, "filter_script.txt")
-            with open(filter_script, 'w') as f:
-                f.write(f"[0:a]volume=0.0[silence];\n")  # 首先静音背景轨道
-
-                # 添加每个音频文件，并补偿amix的音量稀释
-                # amix会将n个输入的音量平均分配，所以我们需要将每个输入的音量提高n倍来保持原始音量
-                num_inputs = len(audio_timings) + 1  # +1 for silence track
-                volume_compensation = num_inputs  # 补偿系数
-
-                for i, timing in enumerate(audio_timings):
-                    # 为每个音频添加音量补偿，确保原声保持原始音量
-                    f.write(f"[{i+1}:a]volume={volume_compensation},adelay={int(timing['start']*1000)}|{int(timing['start']*1000)}[a{i}];\n")
-
-                # 混合所有音频
-                mix_str = "[silence]"
-                for i in range(len(audio_timings)):
-                    mix_str += f"[a{i}]"
-                mix_str += f"amix=inputs={len(audio_timings)+1}:duration=longest[aout]"
-                f.write(mix_str)
-
-            # 6. 构建音频合并命令
-            audio_inputs = ['-i', silence_audio]
-            for timing in audio_timings:
-                audio_inputs.extend(['-i', timing["file"]])
-
-            mixed_audio = os.path.join(temp_dir, "mixed_audio.aac")
-            audio_mix_cmd = [
-                'ffmpeg', '-y'
-            ] + audio_inputs + [
-                '-filter_complex_script', filter_script,
-                '-map', '[aout]',
-                '-c:a', 'aac',
-                '-b:a', '128k',
-                mixed_audio
-            ]
-
-            subprocess.run(audio_mix_cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            # 3. 按片段时长计算每段原声在成片中的位置，拼装成一条音轨
+            # 有原视频信息时直接从原视频解码（同一来源只解码一次），否则从规范化片段中解码
+            mixed_audio = os.path.join(temp_dir, "mixed_audio.m4a")
+            try:
+                _assemble_original_audio(processed_videos, source_audio, mixed_audio)
+            except subprocess.CalledProcessError as e:
+                if not source_audio:
+                    raise
+                logger.warning(f"从原视频解码原声失败，改为从规范化片段解码: {e.stderr or e}")
+                _assemble_original_audio(processed_videos, None, mixed_audio)
             logger.info("音频混合完成")
 
-            # 7. 将合并的视频和混合的音频组合在一起
+            # 4. 将合并的视频和拼装的音轨组合在一起
             final_cmd = [
                 'ffmpeg', '-y',
                 '-i', video_concat_path,
                 '-i', mixed_audio,
                 '-c:v', 'copy',
-                '-c:a', 'aac',
+                '-c:a', 'copy',
                 '-map', '0:v:0',
                 '-map', '1:a:0',
                 '-shortest',
                 output_video_path
             ]
 
-            subprocess.run(final_cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            run_ffmpeg(final_cmd, progress_callback=scale_progress(progress_callback, 0.95, 1.0))
             logger.info("视频最终合并完成")
 
             return output_video_path
 
         except subprocess.CalledProcessError as e:
-            logger.error(f"合并视频过程中出错: {e.stderr.decode() if e.stderr else str(e)}")
+            logger.error(f"合并视频过程中出错: {e.stderr if e.stderr else str(e)}")
 
             # 尝试备用合并方法 - 最简单的无音频合并
             logger.info("尝试备用合并方法 - 无音频合并")
@@ -639,7 +647,7 @@ def combine_clip_videos(
                     output_video_path
                 ]
 
-                subprocess.run(backup_cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                run_ffmpeg(backup_cmd)
                 logger.warning("使用备用方法（无音频）成功合并视频")
                 return output_video_path
             except Exception as backup_error:
@@ -11,6 +11,7 @@
 
 from .subtitle_analysis import SubtitleAnalysisPrompt
 from .plot_extraction import PlotExtractionPrompt
+from .window_plot_extraction import WindowPlotExtractionPrompt
 from ..manager import PromptManager
 
 
@@ -25,9 +26,14 @@ def register_prompts():
     plot_extraction_prompt = PlotExtractionPrompt()
     PromptManager.register_prompt(plot_extraction_prompt, is_default=True)
 
+    # 注册分段爆点提取提示词
+    window_plot_extraction_prompt = WindowPlotExtractionPrompt()
+    PromptManager.register_prompt(window_plot_extraction_prompt, is_default=True)
+
 
 __all__ = [
     "SubtitleAnalysisPrompt",
-    "PlotExtractionPrompt", 
+    "PlotExtractionPrompt",
+    "WindowPlotExtractionPrompt",
     "register_prompts"
 ]
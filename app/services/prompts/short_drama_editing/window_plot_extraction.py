@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+"""
+@Project: NarratoAI
+@File   : window_plot_extraction.py
+@Author : viccy同学
+@Date   : 2025/1/7
+@Description: 短剧分段爆点提取提示词（长字幕按时间窗口分段后逐段提取候选爆点）
+"""
+
+from ..base import TextPrompt, PromptMetadata, ModelType, OutputFormat
+
+
+class WindowPlotExtractionPrompt(TextPrompt):
+    """短剧分段爆点提取提示词"""
+
+    def __init__(self):
+        metadata = PromptMetadata(
+            name="window_plot_extraction",
+            category="short_drama_editing",
+            version="v1.0",
+            description="从一个时间窗口内的字幕中提取候选爆点、时间段和吸引力评分",
+            model_type=ModelType.TEXT,
+            output_format=OutputFormat.JSON,
+            tags=["短剧", "分段分析", "爆点定位", "时间戳"],
+            parameters=["subtitle_content", "window_range", "candidate_count"]
+        )
+        super().__init__(metadata)
+
+        self._system_prompt = "你是一名短剧编剧，非常擅长根据字幕中分析视频中关键剧情出现的具体时间段。"
+
+    def get_template(self) -> str:
+        return """以下是一部短剧中 ${window_range} 这一段的字幕，请从中找出最多 ${candidate_count} 个最具吸引力的关键情节点（爆点）。
+
+字幕内容：
+${subtitle_content}
+
+分析要求：
+1. 用一两句话概括这一段的剧情
+2. 关注剧情的转折点、冲突高潮、情感爆发等关键时刻，没有合适的情节点时可以少于 ${candidate_count} 个
+3. 为每个情节点找到对应的具体时间段，时间段要完整覆盖该情节的发展过程
+4. 为每个情节点给出 1-10 的吸引力评分，10 分表示戏剧张力最强
+
+请按照以下JSON格式输出分析结果：
+
+{
+  "summary": "这一段的剧情概括",
+  "plot_points": [
+    {
+      "timestamp": "时间段，格式为xx:xx:xx,xxx-xx:xx:xx,xxx",
+      "title": "关键剧情的主题",
+      "picture": "关键剧情前后的详细剧情描述，包括人物对话、动作、情感变化等",
+      "score": 8
+    }
+  ]
+}
+
+重要要求：
+1. 请确保返回的是合法的JSON格式
+2. 时间戳必须严格按照字幕中的格式，且位于本段字幕的时间范围内
+3. 剧情描述要详细具体，包含关键对话和动作
+4. 严禁虚构不存在的时间戳或剧情内容
+5. 只输出JSON内容，不要添加任何说明文字"""
@@ -0,0 +1,151 @@
+"""
+草稿渲染的低分辨率代理素材
+
+完整渲染在每个环节都使用成片参数：裁剪片段按 get_safe_encoder_config 编码，
+合并时按目标比例的分辨率以 5M 码率重新编码，最后再以 30fps 合成字幕和音频。
+剪辑审片只需要确认节奏和内容，草稿模式改为：
+
+- 从原视频生成一次低分辨率代理（默认 360p，按内容指纹缓存在 storage/temp/proxies 下），
+  之后的草稿都从代理裁剪；代理保留原视频的时间轴和帧率，裁剪的时间戳与成片完全一致
+- 所有编码使用 ultrafast 预设和较高的 CRF，输出分辨率按代理高度等比缩小
+- 最后一步跳过响度分析，字幕按缩放比例缩小，帧率、片段时长和字幕时间与成片相同
+"""
+
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+from loguru import logger
+
+from app.config import config
+from app.services import storage_manager
+from app.utils import media_info, utils
+from app.utils.ffmpeg_runner import ProgressCallback, run_ffmpeg
+from app.utils.fingerprint import file_fingerprint
+
+# 默认的代理高度（短边像素数）
+DEFAULT_PROXY_HEIGHT = 360
+# 草稿编码使用的 libx264 预设和质量
+DRAFT_PRESET = "ultrafast"
+DRAFT_CRF = "30"
+# 代理的关键帧间隔，较密的关键帧让按时间戳裁剪时更快定位
+PROXY_GOP = 48
+PROXY_DIR_NAME = "proxies"
+
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def _lock_for(key: str) -> threading.Lock:
+    with _locks_guard:
+        return _locks.setdefault(key, threading.Lock())
+
+
+def proxy_height() -> int:
+    """草稿使用的代理高度（[app] draft_proxy_height）"""
+    return int(config.app.get("draft_proxy_height", DEFAULT_PROXY_HEIGHT))
+
+
+def proxy_dir() -> str:
+    """代理素材的缓存目录"""
+    directory = os.path.join(utils.storage_dir("temp", create=True), PROXY_DIR_NAME)
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def draft_encoder_config() -> Dict[str, str]:
+    """草稿裁剪使用的编码器配置（与 clip_video.get_safe_encoder_config 的结构相同）"""
+    return {
+        "video_codec": "libx264",
+        "audio_codec": "aac",
+        "pixel_format": "yuv420p",
+        "preset": DRAFT_PRESET,
+        "quality_param": "crf",
+        "quality_value": DRAFT_CRF,
+    }
+
+
+def draft_resolution(width: int, height: int, short_side: Optional[int] = None) -> Tuple[int, int]:
+    """
+    把成片分辨率按比例缩小到短边为 short_side（宽高均为偶数）
+
+    Args:
+        width: 成片宽度
+        height: 成片高度
+        short_side: 草稿的短边像素数，默认使用代理高度
+
+    Returns:
+        Tuple[int, int]: 草稿的宽和高
+    """
+    short_side = short_side or proxy_height()
+    scale = min(1.0, short_side / min(width, height))
+    return max(2, int(round(width * scale / 2)) * 2), max(2, int(round(height * scale / 2)) * 2)
+
+
+def get_proxy(
+    video_path: str,
+    height: Optional[int] = None,
+    progress_callback: Optional[ProgressCallback] = None
+) -> str:
+    """
+    获取视频的低分辨率代理，不存在时生成（同一内容只生成一次）
+
+    Args:
+        video_path: 原视频路径
+        height: 代理高度，默认读取 [app] draft_proxy_height
+        progress_callback: 生成进度回调，参数为0~1的完成比例
+
+    Returns:
+        str: 代理视频路径；原视频分辨率不高于代理高度时直接返回原视频路径
+
+    Raises:
+        FileNotFoundError: 原视频不存在
+        subprocess.CalledProcessError: 代理生成失败
+    """
+    if not os.path.exists(video_path):
+        raise FileNotFoundError(f"视频文件不存在: {video_path}")
+    height = height or proxy_height()
+
+    info = media_info.get_video_info(video_path)
+    if info:
+        try:
+            if min(int(info["width"]), int(info["height"])) <= height:
+                logger.info(f"视频分辨率不高于 {height}p，草稿直接使用原视频")
+                return video_path
+        except (KeyError, ValueError):
+            pass
+
+    fingerprint = file_fingerprint(video_path)
+    proxy_path = os.path.join(proxy_dir(), f"{fingerprint}_{height}p.mp4")
+    with _lock_for(proxy_path):
+        if os.path.exists(proxy_path) and os.path.getsize(proxy_path) > 0:
+            logger.info(f"使用已缓存的代理视频: {proxy_path}")
+            storage_manager.touch(proxy_path)
+            return proxy_path
+
+        logger.info(f"生成 {height}p 代理视频: {video_path}")
+        part_path = f"{proxy_path}.part.mp4"
+        # 短边缩放到 height，不改变帧率和时间戳，保证按时间戳裁剪的结果与原视频一致
+        cmd = [
+            "ffmpeg", "-y",
+            "-i", video_path,
+            "-vf", f"scale='if(gt(iw,ih),-2,{height})':'if(gt(iw,ih),{height},-2)'",
+            "-c:v", "libx264",
+            "-preset", DRAFT_PRESET,
+            "-crf", "28",
+            "-g", str(PROXY_GOP),
+            "-pix_fmt", "yuv420p",
+            "-c:a", "aac", "-b:a", "96k", "-ar", "44100", "-ac", "2",
+            "-movflags", "+faststart",
+            part_path,
+        ]
+        try:
+            run_ffmpeg(cmd, progress_callback=progress_callback)
+            os.replace(part_path, proxy_path)
+        finally:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+
+    storage_manager.touch(proxy_path, written=True)
+    logger.success(f"代理视频生成完成: {proxy_path}")
+    return proxy_path
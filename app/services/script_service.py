@@ -3,11 +3,11 @@ import json
 import time
 import asyncio
 import requests
-from app.utils import video_processor
 from loguru import logger
 from typing import List, Dict, Any, Callable
 
-from app.utils import utils, gemini_analyzer, video_processor
+from app.utils import utils, gemini_analyzer
+from app.services import keyframe_store
 from app.utils.script_generator import ScriptProcessor
 from app.config import config
 
@@ -15,7 +15,6 @@ from app.config import config
 class ScriptGenerator:
     def __init__(self):
         self.temp_dir = utils.temp_dir()
-        self.keyframes_dir = os.path.join(self.temp_dir, "keyframes")
         
     async def generate_script(
         self,
@@ -51,15 +50,14 @@ class ScriptGenerator:
         try:
             # 提取关键帧
             progress_callback(10, "正在提取关键帧...")
-            keyframe_files = await self._extract_keyframes(
-                video_path, 
-                skip_seconds,
-                threshold
+            keyframe_set = await self._extract_keyframes(
+                video_path,
+                frame_interval_input
             )
             
             # 使用统一的 LLM 接口（支持所有 provider）
             script = await self._process_with_llm(
-                keyframe_files,
+                keyframe_set,
                 video_theme,
                 custom_prompt,
                 vision_batch_size,
@@ -76,50 +74,33 @@ class ScriptGenerator:
     async def _extract_keyframes(
         self,
         video_path: str,
-        skip_seconds: int,
-        threshold: int
-    ) -> List[str]:
-        """提取视频关键帧"""
-        video_hash = utils.md5(video_path + str(os.path.getmtime(video_path)))
-        video_keyframes_dir = os.path.join(self.keyframes_dir, video_hash)
-        
-        # 检查缓存
-        keyframe_files = []
-        if os.path.exists(video_keyframes_dir):
-            for filename in sorted(os.listdir(video_keyframes_dir)):
-                if filename.endswith('.jpg'):
-                    keyframe_files.append(os.path.join(video_keyframes_dir, filename))
-                    
-            if keyframe_files:
-                logger.info(f"Using cached keyframes: {video_keyframes_dir}")
-                return keyframe_files
-                
-        # 提取新的关键帧
-        os.makedirs(video_keyframes_dir, exist_ok=True)
-        
-        try:
-            processor = video_processor.VideoProcessor(video_path)
-            processor.process_video_pipeline(
-                output_dir=video_keyframes_dir,
-                skip_seconds=skip_seconds,
-                threshold=threshold
-            )
+        frame_interval: float
+    ) -> keyframe_store.KeyframeSet:
+        """
+        提取视频关键帧（按视频内容指纹缓存，可复用更密集间隔的提取结果）
 
-            for filename in sorted(os.listdir(video_keyframes_dir)):
-                if filename.endswith('.jpg'):
-                    keyframe_files.append(os.path.join(video_keyframes_dir, filename))
-                    
-            return keyframe_files
-            
-        except Exception as e:
-            if os.path.exists(video_keyframes_dir):
-                import shutil
-                shutil.rmtree(video_keyframes_dir)
+        没有缓存时单进程流式解码，帧以内存图片的形式直接交给视觉分析，失败时回退到逐帧提取
+        """
+        store = keyframe_store.get_store()
+        try:
+            return await asyncio.to_thread(store.get_for_vision, video_path, frame_interval)
+        except ValueError:
             raise
+        except Exception as e:
+            logger.warning(f"流式解码关键帧失败，改用逐帧提取: {e}")
+        return await asyncio.to_thread(
+            store.get_or_extract,
+            video_path,
+            frame_interval,
+            lambda processor, output_dir, interval: processor.process_video_pipeline(
+                output_dir=output_dir,
+                interval_seconds=interval
+            )
+        )
             
     async def _process_with_llm(
         self,
-        keyframe_files: List[str],
+        keyframe_set: keyframe_store.KeyframeSet,
         video_theme: str,
         custom_prompt: str,
         vision_batch_size: int,
@@ -152,8 +133,9 @@ class ScriptGenerator:
         progress_callback(40, "正在分析关键帧...")
 
         # 执行异步分析
+        keyframe_files = keyframe_set.files
         results = await analyzer.analyze_images(
-            images=keyframe_files,
+            images=keyframe_set.for_analysis(keyframe_files),
             prompt=config.app.get('vision_analysis_prompt'),
             batch_size=vision_batch_size
         )
@@ -252,6 +234,10 @@ class ScriptGenerator:
         batch_size: int
     ) -> List[str]:
         """获取当前批次的图片文件"""
+        if 'image_start' in result and 'images_processed' in result:
+            # 批次由规划器按 token 预算划分时，使用结果中记录的实际范围
+            batch_start = result['image_start']
+            return keyframe_files[batch_start:batch_start + result['images_processed']]
         batch_start = result['batch_index'] * batch_size
         batch_end = min(batch_start + batch_size, len(keyframe_files))
         return keyframe_files[batch_start:batch_end]
@@ -0,0 +1,449 @@
+"""
+存储配额管理
+
+storage/ 下的关键帧、裁剪片段、分析结果、任务目录和素材缓存会无限增长。这里按区域（area）管理这些目录：
+
+- 每个区域的直接子项（一个视频的关键帧目录、一个任务目录、一个缓存文件……）是一个缓存条目，
+  条目的大小和最近访问时间记录在一个小的索引文件中（storage/cache/storage_index.json），
+  清理时只列出各区域的顶层目录，不需要遍历整个存储树
+- 可以为每个区域和整个存储分别设置字节配额，以及按区域设置最长保留时间；
+  超出配额时按最近最少使用（LRU）的顺序删除条目
+- 正在运行的任务使用的条目会被固定（pin），最近刚访问过的条目也不会被删除
+- 后台清理线程按固定间隔执行清理
+
+缓存的生产者（关键帧存储、素材下载等）在写入或命中缓存时调用 touch() 更新访问时间。
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import wraps
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+from app.config import config
+from app.utils import utils
+
+INDEX_FILE = "storage_index.json"
+INDEX_VERSION = 1
+GB = 1024 ** 3
+# 默认的后台清理间隔（秒）
+DEFAULT_SWEEP_INTERVAL = 600
+# 最近访问时间在该时间（秒）内的条目不会被删除，避免删除其他进程正在写入的文件
+DEFAULT_MIN_IDLE = 3600
+# 索引写回磁盘的最短间隔（秒）
+FLUSH_INTERVAL = 30
+
+# 区域名称 -> storage/ 下的相对路径
+AREAS: Dict[str, str] = {
+    "keyframes": os.path.join("temp", "keyframes"),
+    "clip_video": os.path.join("temp", "clip_video"),
+    "clip_video_unified": os.path.join("temp", "clip_video_unified"),
+    "analysis": os.path.join("temp", "analysis"),
+    "proxies": os.path.join("temp", "proxies"),
+    "projects": os.path.join("temp", "projects"),
+    "voice_preview": os.path.join("temp", "voice_preview"),
+    "tasks": "tasks",
+    "cache_videos": "cache_videos",
+}
+# 以任务ID命名条目的区域，运行中的任务会固定这些条目
+TASK_AREAS = ("tasks", "clip_video_unified")
+
+
+@dataclass
+class StorageEntry:
+    """一个缓存条目（区域目录的直接子项）"""
+    area: str
+    name: str
+    size: int
+    accessed_at: float
+    # 测量大小时条目的修改时间，条目之后有变化时重新测量
+    measured_mtime: float = 0.0
+
+    @property
+    def key(self) -> str:
+        return f"{self.area}/{self.name}"
+
+
+def _entry_size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, filename))
+            except OSError:
+                pass
+    return total
+
+
+def _remove(path: str) -> None:
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+class StorageManager:
+    """按区域配额和 LRU 顺序清理 storage/ 下的缓存"""
+
+    def __init__(self, root: Optional[str] = None, index_path: Optional[str] = None):
+        """
+        Args:
+            root: 存储根目录，默认 storage/
+            index_path: 访问时间索引文件，默认 storage/cache/storage_index.json
+        """
+        self.root = os.path.abspath(root or utils.storage_dir())
+        self._index_path = index_path
+        self._entries: Optional[Dict[str, StorageEntry]] = None
+        self._pins: Dict[str, int] = {}
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._last_flush = 0.0
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def index_path(self) -> str:
+        if self._index_path is None:
+            self._index_path = os.path.join(self.root, "cache", INDEX_FILE)
+        return self._index_path
+
+    def area_dir(self, area: str) -> str:
+        return os.path.join(self.root, AREAS[area])
+
+    def _locate(self, path: str) -> Optional[Tuple[str, str]]:
+        """把路径映射为 (区域, 条目名称)，不属于任何区域时返回None"""
+        path = os.path.abspath(path)
+        for area in AREAS:
+            area_dir = self.area_dir(area)
+            if path.startswith(area_dir + os.sep):
+                name = os.path.relpath(path, area_dir).split(os.sep)[0]
+                return area, name
+        return None
+
+    # ---------- 索引 ----------
+
+    def _load(self) -> Dict[str, StorageEntry]:
+        if self._entries is not None:
+            return self._entries
+        entries: Dict[str, StorageEntry] = {}
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION:
+                for raw in data.get("entries", []):
+                    entry = StorageEntry(**raw)
+                    if entry.area in AREAS:
+                        entries[entry.key] = entry
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"读取存储索引失败，将重新建立: {str(e)}")
+        self._entries = entries
+        return entries
+
+    def flush(self, force: bool = False) -> None:
+        """把索引写回磁盘（距离上次写入不足 FLUSH_INTERVAL 秒时跳过，除非 force=True）"""
+        with self._lock:
+            if not self._dirty or (not force and time.time() - self._last_flush < FLUSH_INTERVAL):
+                return
+            data = {
+                "version": INDEX_VERSION,
+                "entries": [entry.__dict__ for entry in self._load().values()],
+            }
+            self._dirty = False
+            self._last_flush = time.time()
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        temp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(temp_path, self.index_path)
+        except OSError as e:
+            logger.warning(f"写入存储索引失败: {str(e)}")
+
+    def touch(self, path: str, written: bool = False) -> None:
+        """
+        记录条目被访问（命中缓存）或写入
+
+        Args:
+            path: 条目内的任意路径
+            written: 内容是否有变化，为 True 时重新测量条目大小
+        """
+        located = self._locate(path)
+        if located is None:
+            return
+        area, name = located
+        entry_path = os.path.join(self.area_dir(area), name)
+        if not os.path.exists(entry_path):
+            return
+        with self._lock:
+            entries = self._load()
+            key = f"{area}/{name}"
+            entry = entries.get(key)
+            if entry is None:
+                entry = entries[key] = StorageEntry(area, name, 0, time.time())
+                written = True
+            entry.accessed_at = time.time()
+            if written:
+                entry.size = _entry_size(entry_path)
+                entry.measured_mtime = os.path.getmtime(entry_path)
+            self._dirty = True
+        self.flush()
+
+    # ---------- 固定 ----------
+
+    def pin(self, path: str) -> None:
+        """固定条目，固定期间不会被清理"""
+        located = self._locate(path)
+        if located is None:
+            return
+        key = "/".join(located)
+        with self._lock:
+            self._pins[key] = self._pins.get(key, 0) + 1
+
+    def unpin(self, path: str) -> None:
+        located = self._locate(path)
+        if located is None:
+            return
+        key = "/".join(located)
+        with self._lock:
+            count = self._pins.get(key, 0) - 1
+            if count > 0:
+                self._pins[key] = count
+            else:
+                self._pins.pop(key, None)
+
+    def is_pinned(self, path: str) -> bool:
+        located = self._locate(path)
+        with self._lock:
+            return located is not None and "/".join(located) in self._pins
+
+    @contextmanager
+    def pinned(self, *paths: str) -> Iterator[None]:
+        """在 with 代码块内固定条目"""
+        for path in paths:
+            self.pin(path)
+        try:
+            yield
+        finally:
+            for path in paths:
+                self.unpin(path)
+                self.touch(path, written=True)
+
+    def task_paths(self, task_id: str) -> List[str]:
+        """任务使用的各区域条目路径"""
+        return [os.path.join(self.area_dir(area), task_id) for area in TASK_AREAS]
+
+    # ---------- 清理 ----------
+
+    def reconcile(self) -> Dict[str, StorageEntry]:
+        """
+        对照各区域的顶层目录更新索引：登记新条目、移除已不存在的条目、重新测量有变化的条目
+
+        Returns:
+            Dict[str, StorageEntry]: 当前的全部条目
+        """
+        found = {}
+        for area in AREAS:
+            area_dir = self.area_dir(area)
+            if not os.path.isdir(area_dir):
+                continue
+            for name in os.listdir(area_dir):
+                found[f"{area}/{name}"] = (area, name, os.path.join(area_dir, name))
+
+        with self._lock:
+            entries = self._load()
+            for key in list(entries):
+                if key not in found:
+                    del entries[key]
+                    self._dirty = True
+            for key, (area, name, path) in found.items():
+                try:
+                    mtime = os.path.getmtime(path)
+                except OSError:
+                    continue
+                entry = entries.get(key)
+                if entry is None:
+                    entries[key] = StorageEntry(area, name, _entry_size(path), mtime, mtime)
+                    self._dirty = True
+                elif mtime > entry.measured_mtime:
+                    entry.size = _entry_size(path)
+                    entry.measured_mtime = mtime
+                    entry.accessed_at = max(entry.accessed_at, mtime)
+                    self._dirty = True
+            return dict(entries)
+
+    def usage(self) -> Dict[str, int]:
+        """各区域当前占用的字节数（基于索引）"""
+        usage = {area: 0 for area in AREAS}
+        for entry in self.reconcile().values():
+            usage[entry.area] += entry.size
+        return usage
+
+    def _quotas(self) -> Tuple[int, Dict[str, int], Dict[str, float]]:
+        global_quota = int(float(config.app.get("storage_quota_gb", 0) or 0) * GB)
+        area_quotas = {
+            area: int(float(value) * GB)
+            for area, value in (config.app.get("storage_area_quotas_gb") or {}).items()
+            if area in AREAS and value
+        }
+        max_ages = {
+            area: float(value) * 86400
+            for area, value in (config.app.get("storage_max_age_days") or {}).items()
+            if area in AREAS and value
+        }
+        return global_quota, area_quotas, max_ages
+
+    def _evict(self, entry: StorageEntry, reason: str) -> None:
+        path = os.path.join(self.area_dir(entry.area), entry.name)
+        try:
+            _remove(path)
+        except OSError as e:
+            logger.warning(f"清理缓存失败: {path} => {str(e)}")
+            return
+        with self._lock:
+            self._load().pop(entry.key, None)
+            self._dirty = True
+        logger.info(f"清理缓存（{reason}）: {entry.key}，释放 {entry.size / 1024 / 1024:.1f} MB")
+
+    def sweep(
+        self,
+        global_quota: Optional[int] = None,
+        area_quotas: Optional[Dict[str, int]] = None,
+        max_ages: Optional[Dict[str, float]] = None,
+        min_idle: Optional[float] = None
+    ) -> int:
+        """
+        执行一次清理：先删除超过保留时间的条目，再按 LRU 顺序把各区域和总占用降到配额以内
+
+        Args:
+            global_quota: 总配额（字节），0 表示不限制；默认读取 [app] storage_quota_gb
+            area_quotas: 区域配额（字节）；默认读取 [app] storage_area_quotas_gb
+            max_ages: 区域最长保留时间（秒）；默认读取 [app] storage_max_age_days
+            min_idle: 最近访问时间在该秒数内的条目不删除；默认读取 [app] storage_min_idle_minutes
+
+        Returns:
+            int: 释放的字节数
+        """
+        configured = self._quotas()
+        global_quota = configured[0] if global_quota is None else global_quota
+        area_quotas = configured[1] if area_quotas is None else area_quotas
+        max_ages = configured[2] if max_ages is None else max_ages
+        if min_idle is None:
+            min_idle = float(config.app.get("storage_min_idle_minutes", DEFAULT_MIN_IDLE / 60)) * 60
+
+        now = time.time()
+        entries = self.reconcile()
+        with self._lock:
+            pins = set(self._pins)
+        # 按最近访问时间从旧到新排列，只有未固定且空闲足够久的条目可以删除
+        candidates = sorted(
+            (entry for key, entry in entries.items() if key not in pins and now - entry.accessed_at >= min_idle),
+            key=lambda entry: entry.accessed_at
+        )
+        usage = {area: 0 for area in AREAS}
+        for entry in entries.values():
+            usage[entry.area] += entry.size
+        freed = 0
+        evicted = set()
+
+        def evict(entry: StorageEntry, reason: str) -> None:
+            nonlocal freed
+            self._evict(entry, reason)
+            evicted.add(entry.key)
+            usage[entry.area] -= entry.size
+            freed += entry.size
+
+        for entry in candidates:
+            max_age = max_ages.get(entry.area)
+            if max_age and now - entry.accessed_at > max_age:
+                evict(entry, "超过保留时间")
+
+        for area, quota in area_quotas.items():
+            for entry in candidates:
+                if usage[area] <= quota:
+                    break
+                if entry.area == area and entry.key not in evicted:
+                    evict(entry, f"{area} 超出配额")
+
+        if global_quota:
+            for entry in candidates:
+                if sum(usage.values()) <= global_quota:
+                    break
+                if entry.key not in evicted:
+                    evict(entry, "超出总配额")
+
+        self.flush(force=True)
+        if freed:
+            logger.info(f"存储清理完成，共释放 {freed / 1024 / 1024:.1f} MB")
+        return freed
+
+    def start_sweeper(self, interval: Optional[float] = None) -> None:
+        """启动后台清理线程（重复调用无效果）"""
+        interval = float(interval or config.app.get("storage_sweep_interval", DEFAULT_SWEEP_INTERVAL))
+        with self._lock:
+            if self._sweeper is not None and self._sweeper.is_alive():
+                return
+            self._stop.clear()
+            self._sweeper = threading.Thread(
+                target=self._sweep_loop, args=(interval,), name="storage-sweeper", daemon=True
+            )
+            self._sweeper.start()
+        logger.debug(f"存储清理线程已启动，间隔 {interval:.0f} 秒")
+
+    def stop_sweeper(self) -> None:
+        self._stop.set()
+
+    def _sweep_loop(self, interval: float) -> None:
+        while not self._stop.is_set():
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.warning(f"存储清理失败: {str(e)}")
+            self._stop.wait(interval)
+
+
+_manager: Optional[StorageManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_storage_manager() -> StorageManager:
+    """获取进程共享的存储管理器"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = StorageManager()
+        return _manager
+
+
+def touch(path: str, written: bool = False) -> None:
+    """记录缓存条目被访问或写入（见 StorageManager.touch）"""
+    try:
+        get_storage_manager().touch(path, written)
+    except Exception as e:
+        logger.debug(f"更新存储索引失败: {str(e)}")
+
+
+def pins_task(func):
+    """装饰以 task_id 为第一个参数的任务函数：运行期间固定该任务的目录，避免被后台清理"""
+    @wraps(func)
+    def wrapper(task_id, *args, **kwargs):
+        manager = get_storage_manager()
+        with manager.pinned(*manager.task_paths(task_id)):
+            return func(task_id, *args, **kwargs)
+    return wrapper
+
+
+def maybe_start_sweeper() -> None:
+    """配置了任一配额或保留时间时启动后台清理线程"""
+    if config.app.get("storage_quota_gb") or config.app.get("storage_area_quotas_gb") \
+            or config.app.get("storage_max_age_days"):
+        get_storage_manager().start_sweeper()
@@ -12,6 +12,8 @@ import re
 import os
 from datetime import datetime, timedelta
 
+from app.models.timeline import Timeline, format_time_ms, parse_range_ms, parse_time_ms
+
 
 def parse_time(time_str):
     """解析时间字符串为timedelta对象"""
@@ -39,24 +41,16 @@ def format_time(td):
 
 
 def parse_edited_time_range(time_range_str):
-    """从editedTimeRange字符串中提取时间范围"""
+    """从editedTimeRange字符串中提取时间范围（支持 HH:MM:SS 和 HH:MM:SS,mmm）"""
     if not time_range_str:
         return None, None
-    
-    parts = time_range_str.split('-')
-    if len(parts) != 2:
+
+    try:
+        start_ms, end_ms = parse_range_ms(time_range_str)
+    except ValueError:
         return None, None
-    
-    start_time_str, end_time_str = parts
-    
-    # 将HH:MM:SS格式转换为timedelta
-    start_h, start_m, start_s = map(int, start_time_str.split(':'))
-    end_h, end_m, end_s = map(int, end_time_str.split(':'))
-    
-    start_time = timedelta(hours=start_h, minutes=start_m, seconds=start_s)
-    end_time = timedelta(hours=end_h, minutes=end_m, seconds=end_s)
-    
-    return start_time, end_time
+
+    return timedelta(milliseconds=start_ms), timedelta(milliseconds=end_ms)
 
 
 def merge_subtitle_files(subtitle_items, output_file=None):
@@ -64,39 +58,38 @@ def merge_subtitle_files(subtitle_items, output_file=None):
     合并多个SRT字幕文件
 
     参数:
-        subtitle_items: 字典列表，每个字典包含subtitle文件路径和editedTimeRange
+        subtitle_items: Timeline，或包含subtitle文件路径和duration的字典列表
         output_file: 输出文件的路径，如果为None则自动生成
 
     返回:
         合并后的字幕文件路径，如果没有有效字幕则返回None
     """
-    # 按照editedTimeRange的开始时间排序
-    sorted_items = sorted(subtitle_items,
-                         key=lambda x: parse_edited_time_range(x.get('editedTimeRange', ''))[0] or timedelta())
+    # 片段在成片中的起始位置由时间轴按整数毫秒计算，保持与音频合并完全一致
+    timeline = Timeline.coerce(subtitle_items, resume=True)
 
     merged_subtitles = []
     subtitle_index = 1
     valid_items_count = 0
 
-    for item in sorted_items:
-        if not item.get('subtitle') or not os.path.exists(item.get('subtitle')):
-            print(f"跳过项目 {item.get('_id')}：字幕文件不存在或路径为空")
+    for segment in timeline:
+        if not segment.subtitle or not os.path.exists(segment.subtitle):
+            print(f"跳过项目 {segment.id}：字幕文件不存在或路径为空")
             continue
 
-        # 从editedTimeRange获取起始时间偏移
-        offset_time, _ = parse_edited_time_range(item.get('editedTimeRange', ''))
+        # 从时间轴获取起始时间偏移
+        offset_ms = segment.edited_start
 
-        if offset_time is None:
-            print(f"警告: 无法从项目 {item.get('_id')} 的editedTimeRange中提取时间范围，跳过该项")
+        if offset_ms is None:
+            print(f"警告: 项目 {segment.id} 在成片中没有时长，跳过该项")
             continue
 
         try:
-            with open(item['subtitle'], 'r', encoding='utf-8') as file:
+            with open(segment.subtitle, 'r', encoding='utf-8') as file:
                 content = file.read().strip()
 
             # 检查文件内容是否为空
             if not content:
-                print(f"跳过项目 {item.get('_id')}：字幕文件内容为空")
+                print(f"跳过项目 {segment.id}：字幕文件内容为空")
                 continue
 
             valid_items_count += 1
@@ -115,15 +108,12 @@ def merge_subtitle_files(subtitle_items, output_file=None):
                 if len(time_parts) != 2:
                     continue
 
-                start_time = parse_time(time_parts[0])
-                end_time = parse_time(time_parts[1])
-
                 # 应用时间偏移
-                adjusted_start_time = start_time + offset_time
-                adjusted_end_time = end_time + offset_time
+                adjusted_start_ms = parse_time_ms(time_parts[0]) + offset_ms
+                adjusted_end_ms = parse_time_ms(time_parts[1]) + offset_ms
 
                 # 重建字幕块
-                adjusted_time_line = f"{format_time(adjusted_start_time)} --> {format_time(adjusted_end_time)}"
+                adjusted_time_line = f"{format_time_ms(adjusted_start_ms)} --> {format_time_ms(adjusted_end_ms)}"
                 text_lines = lines[2:]
 
                 new_block = [
@@ -135,37 +125,33 @@ def merge_subtitle_files(subtitle_items, output_file=None):
                 merged_subtitles.append('\n'.join(new_block))
                 subtitle_index += 1
         except Exception as e:
-            print(f"处理项目 {item.get('_id')} 的字幕文件时出错: {str(e)}")
+            print(f"处理项目 {segment.id} 的字幕文件时出错: {str(e)}")
             continue
 
     # 检查是否有有效的字幕内容
     if not merged_subtitles:
-        print(f"警告: 没有找到有效的字幕内容，共检查了 {len(subtitle_items)} 个项目，其中 {valid_items_count} 个有有效文件")
+        print(f"警告: 没有找到有效的字幕内容，共检查了 {len(timeline)} 个项目，其中 {valid_items_count} 个有有效文件")
         return None
 
     # 确定输出文件路径
     if output_file is None:
         # 找到第一个有效的字幕文件来确定目录
-        valid_item = None
-        for item in sorted_items:
-            if item.get('subtitle') and os.path.exists(item.get('subtitle')):
-                valid_item = item
+        valid_segment = None
+        for segment in timeline:
+            if segment.subtitle and os.path.exists(segment.subtitle):
+                valid_segment = segment
                 break
 
-        if not valid_item:
+        if not valid_segment:
             print("错误: 无法确定输出目录，没有找到有效的字幕文件")
             return None
 
-        dir_path = os.path.dirname(valid_item['subtitle'])
-        first_start = parse_edited_time_range(sorted_items[0]['editedTimeRange'])[0]
-        last_end = parse_edited_time_range(sorted_items[-1]['editedTimeRange'])[1]
-
-        if first_start and last_end:
-            first_start_h, first_start_m, first_start_s = int(first_start.seconds // 3600), int((first_start.seconds % 3600) // 60), int(first_start.seconds % 60)
-            last_end_h, last_end_m, last_end_s = int(last_end.seconds // 3600), int((last_end.seconds % 3600) // 60), int(last_end.seconds % 60)
+        dir_path = os.path.dirname(valid_segment.subtitle)
+        placed = [segment for segment in timeline if segment.edited_start is not None]
 
-            first_start_str = f"{first_start_h:02d}_{first_start_m:02d}_{first_start_s:02d}"
-            last_end_str = f"{last_end_h:02d}_{last_end_m:02d}_{last_end_s:02d}"
+        if placed:
+            first_start_str = format_time_ms(placed[0].edited_start).split(',')[0].replace(':', '_')
+            last_end_str = format_time_ms(placed[-1].edited_end).split(',')[0].replace(':', '_')
 
             output_file = os.path.join(dir_path, f"merged_subtitle_{first_start_str}-{last_end_str}.srt")
         else:
@@ -10,10 +10,14 @@ from loguru import logger
 from app.config import config
 from app.config.audio_config import AudioConfig, get_recommended_volumes_for_content
 from app.models import const
-from app.models.schema import VideoClipParams
+from app.models.timeline import Timeline
+from app.models.schema import VideoAspect, VideoClipParams
 from app.services import (voice, audio_merger, subtitle_merger, clip_video, merger_video, update_script, generate_video)
+from app.services import chunked_encode, incremental_render, proxy_media
 from app.services import state as sm
+from app.services import storage_manager
 from app.utils import utils
+from app.utils.ffmpeg_runner import state_progress_callback
 
 
 def _save_script_if_possible(script_path: str, script_items: list) -> None:
@@ -35,6 +39,7 @@ def _save_script_if_possible(script_path: str, script_items: list) -> None:
         logger.warning(f"更新脚本文件失败: {script_path}, 错误: {e}")
 
 
+@storage_manager.pins_task
 def start_subclip(task_id: str, params: VideoClipParams, subclip_path_videos: dict = None):
     """
     后台任务（统一视频裁剪处理）- 优化版本
@@ -129,7 +134,8 @@ def start_subclip(task_id: str, params: VideoClipParams, subclip_path_videos: di
     video_clip_result = clip_video.clip_video_unified(
         video_origin_path=params.video_origin_path,
         script_list=list_script,
-        tts_results=tts_results
+        tts_results=tts_results,
+        progress_callback=state_progress_callback(task_id, 20, 60)
     )
 
     # 更新 list_script 中的时间戳和路径信息
@@ -214,7 +220,8 @@ def start_subclip(task_id: str, params: VideoClipParams, subclip_path_videos: di
         video_paths=video_clips,
         video_ost_list=video_ost,
         video_aspect=params.video_aspect,
-        threads=params.n_threads
+        threads=params.n_threads,
+        progress_callback=state_progress_callback(task_id, 60, 80)
     )
     sm.state.update_task(task_id, state=const.TASK_STATE_PROCESSING, progress=80)
 
@@ -285,6 +292,7 @@ def start_subclip(task_id: str, params: VideoClipParams, subclip_path_videos: di
     return kwargs
 
 
+@storage_manager.pins_task
 def start_subclip_unified(task_id: str, params: VideoClipParams):
     """
     统一视频裁剪处理函数 - 完全基于OST类型的新实现
@@ -292,13 +300,39 @@ def start_subclip_unified(task_id: str, params: VideoClipParams):
     这是优化后的版本，完全移除了对预裁剪视频的依赖，
     实现真正的统一裁剪策略。
 
+    params.draft 为True时渲染草稿：从低分辨率代理裁剪，所有编码使用 ultrafast，
+    输出 draft.mp4，片段时长、字幕时间和帧率与成片一致。
+
+    params.incremental 为True时进行增量渲染：与同一原视频上一次成功的渲染按片段 _id 比较，
+    只为解说文本、时间戳、OST 或配音设置有变化的片段重新生成配音、裁剪和规范化，
+    音频/字幕合并和最后的合成仍然完整执行。
+
     Args:
         task_id: 任务ID
         params: 视频参数
     """
+    if not params.incremental:
+        return _render_unified(task_id, params, None)
+
+    cache = incremental_render.IncrementalRender.open(params.video_origin_path, draft=bool(params.draft))
+    # 渲染期间固定项目缓存目录，避免被后台清理
+    with storage_manager.get_storage_manager().pinned(cache.directory):
+        return _render_unified(task_id, params, cache)
+
+
+def _render_unified(task_id: str, params: VideoClipParams, cache):
+    """
+    start_subclip_unified 的渲染流程
+
+    Args:
+        task_id: 任务ID
+        params: 视频参数
+        cache: 增量渲染缓存（IncrementalRender），None 表示完整渲染
+    """
     global merged_audio_path, merged_subtitle_path
 
-    logger.info(f"\n\n## 开始统一视频处理任务: {task_id}")
+    draft = bool(params.draft)
+    logger.info(f"\n\n## 开始统一视频处理任务: {task_id}{'（草稿模式）' if draft else ''}")
     sm.state.update_task(task_id, state=const.TASK_STATE_PROCESSING, progress=0)
 
     """
@@ -330,16 +364,24 @@ def start_subclip_unified(task_id: str, params: VideoClipParams):
     2. 使用 TTS 生成音频素材
     """
     logger.info("\n\n## 2. 根据OST设置生成音频列表")
+    # 脚本时间戳只在这里解析一次，之后各阶段共用同一个时间轴
+    timeline = Timeline.from_script(list_script)
     # 只为OST=0 or 2的判断生成音频， OST=0 仅保留解说 OST=2 保留解说和原声
-    tts_segments = [
-        segment for segment in list_script
-        if segment['OST'] in [0, 2]
-    ]
+    tts_segments = [segment for segment in timeline if segment.ost in [0, 2]]
     logger.debug(f"需要生成TTS的片段数: {len(tts_segments)}")
 
+    tts_settings = {
+        "tts_engine": params.tts_engine,
+        "voice_name": params.voice_name,
+        "voice_rate": params.voice_rate,
+        "voice_pitch": params.voice_pitch,
+    }
+    # 增量渲染时只为有变化的片段生成配音，其余片段的配音从项目缓存恢复到时间轴
+    tts_targets = cache.restore_tts(timeline, tts_settings) if cache else timeline
+
     tts_results = voice.tts_multiple(
         task_id=task_id,
-        list_script=tts_segments,  # 只传入需要TTS的片段
+        list_script=tts_targets,  # 配音路径和时长直接写入时间轴（OST=1的片段会被跳过）
         tts_engine=params.tts_engine,
         voice_name=params.voice_name,
         voice_rate=params.voice_rate,
@@ -353,20 +395,20 @@ def start_subclip_unified(task_id: str, params: VideoClipParams):
     """
     logger.info("\n\n## 3. 统一视频裁剪（基于OST类型）")
 
+    if cache:
+        cache.restore_clips(timeline)
+
     # 使用新的统一裁剪策略
     video_clip_result = clip_video.clip_video_unified(
         video_origin_path=params.video_origin_path,
-        script_list=list_script,
-        tts_results=tts_results
+        script_list=timeline,
+        tts_results=tts_results,
+        output_dir=cache.clip_dir if cache else None,
+        progress_callback=state_progress_callback(task_id, 20, 60),
+        draft=draft,
+        reuse_existing=cache is not None
     )
 
-    # 更新 list_script 中的时间戳和路径信息
-    tts_clip_result = {tts_result['_id']: tts_result['audio_file'] for tts_result in tts_results}
-    subclip_clip_result = {
-        tts_result['_id']: tts_result['subtitle_file'] for tts_result in tts_results
-    }
-    new_script_list = update_script.update_script_timestamps(list_script, video_clip_result, tts_clip_result, subclip_clip_result)
-
     logger.info(f"统一裁剪完成，处理了 {len(video_clip_result)} 个视频片段")
 
     sm.state.update_task(task_id, state=const.TASK_STATE_PROCESSING, progress=60)
@@ -375,19 +417,23 @@ def start_subclip_unified(task_id: str, params: VideoClipParams):
     4. 合并音频和字幕
     """
     logger.info("\n\n## 4. 合并音频和字幕")
-    total_duration = sum([script["duration"] for script in new_script_list])
+    total_duration = timeline.total_duration / 1000
     if tts_segments:
         try:
             # 合并音频文件
             merged_audio_path = audio_merger.merge_audio_files(
                 task_id=task_id,
                 total_duration=total_duration,
-                list_script=new_script_list
+                list_script=timeline
             )
             logger.info(f"音频文件合并成功->{merged_audio_path}")
 
             # 合并字幕文件
-            merged_subtitle_path = subtitle_merger.merge_subtitle_files(new_script_list)
+            # 增量渲染复用的字幕位于项目缓存目录，合并结果仍然写入任务目录
+            merged_subtitle_path = subtitle_merger.merge_subtitle_files(
+                timeline,
+                output_file=path.join(utils.task_dir(task_id), "merged_subtitle.srt") if cache else None
+            )
             if merged_subtitle_path:
                 logger.info(f"字幕文件合并成功->{merged_subtitle_path}")
             else:
@@ -411,33 +457,41 @@ def start_subclip_unified(task_id: str, params: VideoClipParams):
     final_video_paths = []
     combined_video_paths = []
 
-    combined_video_path = path.join(utils.task_dir(task_id), f"merger.mp4")
+    combined_video_path = path.join(utils.task_dir(task_id), "draft_merger.mp4" if draft else "merger.mp4")
     logger.info(f"\n\n## 5. 合并视频: => {combined_video_path}")
 
-    # 使用统一裁剪后的视频片段
+    # 使用统一裁剪后的视频片段（原声设置与片段一一对应）
+    # 保留的原声直接从原视频按片段的裁剪开始时间解码，不再逐个片段提取
     video_clips = []
-    for new_script in new_script_list:
-        video_path = new_script.get('video')
-        if video_path and os.path.exists(video_path):
-            video_clips.append(video_path)
+    clip_ost = []
+    source_audio = []
+    for segment in timeline:
+        if segment.video and os.path.exists(segment.video):
+            video_clips.append(segment.video)
+            clip_ost.append(segment.ost)
+            source_audio.append((params.video_origin_path, segment.source_start / 1000))
         else:
-            logger.error(f"片段 {new_script.get('_id')} 的视频文件不存在: {video_path}")
+            logger.error(f"片段 {segment.id} 的视频文件不存在: {segment.video}")
 
     logger.info(f"准备合并 {len(video_clips)} 个视频片段")
 
     merger_video.combine_clip_videos(
         output_video_path=combined_video_path,
         video_paths=video_clips,
-        video_ost_list=video_ost,
+        video_ost_list=clip_ost,
         video_aspect=params.video_aspect,
-        threads=params.n_threads
+        threads=params.n_threads,
+        progress_callback=state_progress_callback(task_id, 60, 80),
+        draft=draft,
+        cache_dir=cache.normalized_dir if cache else None,
+        source_audio=source_audio
     )
     sm.state.update_task(task_id, state=const.TASK_STATE_PROCESSING, progress=80)
 
     """
     6. 合并字幕/BGM/配音/视频
     """
-    output_video_path = path.join(utils.task_dir(task_id), f"combined.mp4")
+    output_video_path = path.join(utils.task_dir(task_id), "draft.mp4" if draft else "combined.mp4")
     logger.info(f"\n\n## 6. 最后一步: 合并字幕/BGM/配音/视频 -> {output_video_path}")
 
     bgm_path = utils.get_bgm_file()
@@ -446,7 +500,7 @@ def start_subclip_unified(task_id: str, params: VideoClipParams):
     optimized_volumes = get_recommended_volumes_for_content('mixed')
 
     # 检查是否有OST=1的原声片段，如果有，则保持原声音量为1.0不变
-    has_original_audio_segments = any(segment['OST'] == 1 for segment in list_script)
+    has_original_audio_segments = any(segment.ost == 1 for segment in timeline)
 
     # 应用用户设置和优化建议的组合
     final_tts_volume = params.tts_volume if hasattr(params, 'tts_volume') and params.tts_volume != 1.0 else optimized_volumes['tts_volume']
@@ -475,20 +529,40 @@ def start_subclip_unified(task_id: str, params: VideoClipParams):
         'subtitle_bg_color': None,
         'subtitle_position': params.subtitle_position,
         'custom_position': params.custom_position,
-        'threads': params.n_threads
+        'threads': params.n_threads,
+        'draft': draft
     }
-    generate_video.merge_materials(
-        video_path=combined_video_path,
-        audio_path=merged_audio_path,
-        subtitle_path=merged_subtitle_path,
-        bgm_path=bgm_path,
-        output_path=output_video_path,
-        options=options
-    )
+    if draft:
+        # 草稿分辨率按比例缩小，字幕同比缩小以保持与成片相同的布局
+        final_width, final_height = VideoAspect(params.video_aspect).to_resolution()
+        options['subtitle_scale'] = proxy_media.draft_resolution(final_width, final_height)[1] / final_height
+    if chunked_encode.encode_workers() > 1:
+        # 多进程分段编码，切点取各片段在成片中的开始位置
+        chunked_encode.merge_materials_chunked(
+            video_path=combined_video_path,
+            audio_path=merged_audio_path,
+            subtitle_path=merged_subtitle_path,
+            bgm_path=bgm_path,
+            output_path=output_video_path,
+            options=options,
+            boundaries=[segment.edited_start / 1000 for segment in timeline if segment.edited_start is not None]
+        )
+    else:
+        generate_video.merge_materials(
+            video_path=combined_video_path,
+            audio_path=merged_audio_path,
+            subtitle_path=merged_subtitle_path,
+            bgm_path=bgm_path,
+            output_path=output_video_path,
+            options=options
+        )
 
     final_video_paths.append(output_video_path)
     combined_video_paths.append(combined_video_path)
 
+    if cache:
+        cache.commit(timeline)
+
     logger.success(f"统一处理任务 {task_id} 已完成, 生成 {len(final_video_paths)} 个视频.")
 
     kwargs = {
@@ -10,7 +10,9 @@
 
 import re
 import os
-from typing import Dict, List, Any, Tuple, Union
+from typing import Dict, List, Any, Optional, Tuple, Union
+
+from app.models.timeline import MS_PER_SECOND, Segment, Timeline, parse_range_ms
 
 
 def extract_timestamp_from_video_path(video_path: str) -> str:
@@ -56,35 +58,19 @@ def calculate_duration(timestamp: str) -> float:
         持续时间（秒）
     """
     try:
-        start_time, end_time = timestamp.split('-')
-
-        # 处理毫秒部分
-        if ',' in start_time:
-            start_parts = start_time.split(',')
-            start_time_parts = start_parts[0].split(':')
-            start_ms = float('0.' + start_parts[1]) if len(start_parts) > 1 else 0
-            start_h, start_m, start_s = map(int, start_time_parts)
-        else:
-            start_h, start_m, start_s = map(int, start_time.split(':'))
-            start_ms = 0
-
-        if ',' in end_time:
-            end_parts = end_time.split(',')
-            end_time_parts = end_parts[0].split(':')
-            end_ms = float('0.' + end_parts[1]) if len(end_parts) > 1 else 0
-            end_h, end_m, end_s = map(int, end_time_parts)
-        else:
-            end_h, end_m, end_s = map(int, end_time.split(':'))
-            end_ms = 0
-
-        # 转换为秒
-        start_seconds = start_h * 3600 + start_m * 60 + start_s + start_ms
-        end_seconds = end_h * 3600 + end_m * 60 + end_s + end_ms
-
-        # 计算时间差（秒）
-        return round(end_seconds - start_seconds, 2)
+        start_ms, end_ms = parse_range_ms(timestamp)
     except (ValueError, AttributeError):
         return 0.0
+    return (end_ms - start_ms) / MS_PER_SECOND
+
+
+def _lookup(result: Optional[Dict[Union[str, int], str]], segment: Segment) -> str:
+    """按 _id 或原时间戳从结果字典中查找路径"""
+    if not result:
+        return ""
+    if segment.id and segment.id in result:
+        return result[segment.id]
+    return result.get(segment.timestamp, "")
 
 
 def update_script_timestamps(
@@ -97,6 +83,9 @@ def update_script_timestamps(
     """
     根据 video_result 中的视频文件更新 script_list 中的时间戳，添加持续时间，
     并根据 audio_result 添加音频路径，根据 subtitle_result 添加字幕路径
+
+    只有裁剪结果的路径时使用此函数（从文件名中解析实际裁剪的时间段）；
+    已经有 Timeline 时直接使用 Timeline.to_script()
     
     Args:
         script_list: 原始脚本列表
@@ -108,93 +97,26 @@ def update_script_timestamps(
     Returns:
         更新后的脚本列表
     """
-    # 创建副本，避免修改原始数据
-    updated_script = []
+    timeline = Timeline.from_script(script_list)
 
-    # 建立ID和时间戳到视频路径和新时间戳的映射
-    id_timestamp_mapping = {}
-    for key, video_path in video_result.items():
-        new_timestamp = extract_timestamp_from_video_path(video_path)
-        if new_timestamp:
-            id_timestamp_mapping[key] = {
-                'new_timestamp': new_timestamp,
-                'video_path': video_path
-            }
-
-    # 计算累积时长，用于生成成品视频中的时间范围
-    accumulated_duration = 0.0
-    
-    # 更新脚本中的时间戳
-    for item in script_list:
-        item_copy = item.copy()
-        item_id = item_copy.get('_id')
-        orig_timestamp = item_copy.get('timestamp', '')
-
-        # 初始化音频和字幕路径为空字符串
-        item_copy['audio'] = ""
-        item_copy['subtitle'] = ""
-        item_copy['video'] = ""  # 初始化视频路径为空字符串
+    for segment in timeline:
+        segment.audio = _lookup(audio_result, segment)
+        segment.subtitle = _lookup(subtitle_result, segment)
+        segment.video = _lookup(video_result, segment)
 
-        # 如果提供了音频结果字典且ID存在于音频结果中，直接使用对应的音频路径
-        if audio_result:
-            if item_id and item_id in audio_result:
-                item_copy['audio'] = audio_result[item_id]
-            elif orig_timestamp in audio_result:
-                item_copy['audio'] = audio_result[orig_timestamp]
-
-        # 如果提供了字幕结果字典且ID存在于字幕结果中，直接使用对应的字幕路径
-        if subtitle_result:
-            if item_id and item_id in subtitle_result:
-                item_copy['subtitle'] = subtitle_result[item_id]
-            elif orig_timestamp in subtitle_result:
-                item_copy['subtitle'] = subtitle_result[orig_timestamp]
-
-        # 添加视频路径
-        if item_id and item_id in video_result:
-            item_copy['video'] = video_result[item_id]
-        elif orig_timestamp in video_result:
-            item_copy['video'] = video_result[orig_timestamp]
-
-        # 更新时间戳和计算持续时间
-        current_duration = 0.0
-        if item_id and item_id in id_timestamp_mapping:
-            # 根据ID找到对应的新时间戳
-            item_copy['sourceTimeRange'] = id_timestamp_mapping[item_id]['new_timestamp']
-            current_duration = calculate_duration(item_copy['sourceTimeRange'])
-            item_copy['duration'] = current_duration
-        elif orig_timestamp in id_timestamp_mapping:
-            # 根据原始时间戳找到对应的新时间戳
-            item_copy['sourceTimeRange'] = id_timestamp_mapping[orig_timestamp]['new_timestamp']
-            current_duration = calculate_duration(item_copy['sourceTimeRange'])
-            item_copy['duration'] = current_duration
-        elif orig_timestamp:
-            # 对于未更新的时间戳，也计算并添加持续时间
-            item_copy['sourceTimeRange'] = orig_timestamp
-            current_duration = calculate_duration(orig_timestamp)
-            item_copy['duration'] = current_duration
-            
-        # 计算片段在成品视频中的时间范围
-        if calculate_edited_timerange and current_duration > 0:
-            start_time_seconds = accumulated_duration
-            end_time_seconds = accumulated_duration + current_duration
-            
-            # 将秒数转换为 HH:MM:SS 格式
-            start_h = int(start_time_seconds // 3600)
-            start_m = int((start_time_seconds % 3600) // 60)
-            start_s = int(start_time_seconds % 60)
-            
-            end_h = int(end_time_seconds // 3600)
-            end_m = int((end_time_seconds % 3600) // 60)
-            end_s = int(end_time_seconds % 60)
-            
-            item_copy['editedTimeRange'] = f"{start_h:02d}:{start_m:02d}:{start_s:02d}-{end_h:02d}:{end_m:02d}:{end_s:02d}"
-            
-            # 更新累积时长
-            accumulated_duration = end_time_seconds
+        # 裁剪后的实际时间段编码在文件名中
+        new_timestamp = extract_timestamp_from_video_path(segment.video) if segment.video else ""
+        if new_timestamp:
+            start_ms, end_ms = parse_range_ms(new_timestamp)
+            segment.clip_end = segment.source_start + (end_ms - start_ms)
 
-        updated_script.append(item_copy)
+    # 按整数毫秒累加计算片段在成品视频中的时间范围
+    timeline.layout()
+    if not calculate_edited_timerange:
+        for segment in timeline:
+            segment.edited_start = None
 
-    return updated_script
+    return timeline.to_script()
 
 
 if __name__ == '__main__':
@@ -5,7 +5,6 @@ from typing import Optional
 from typing import List
 from loguru import logger
 from moviepy import *
-from PIL import ImageFont
 from contextlib import contextmanager
 from moviepy import (
     VideoFileClip,
@@ -17,75 +16,23 @@ from moviepy import (
 
 
 from app.models.schema import VideoAspect, SubtitlePosition
+from app.utils import subtitle_layout
 
 
 def wrap_text(text, max_width, font, fontsize=60):
     """
-    文本自动换行处理
+    文本自动换行处理（字体和字形宽度按字体、字号缓存，见 app.utils.subtitle_layout）
+
     Args:
         text: 待处理的文本
-        max_width: 最大宽度
+        max_width: 最大宽度（像素）
         font: 字体文件路径
         fontsize: 字体大小
 
     Returns:
         tuple: (换行后的文本, 文本高度)
     """
-    # 创建字体对象
-    font = ImageFont.truetype(font, fontsize)
-
-    def get_text_size(inner_text):
-        inner_text = inner_text.strip()
-        left, top, right, bottom = font.getbbox(inner_text)
-        return right - left, bottom - top
-
-    width, height = get_text_size(text)
-    if width <= max_width:
-        return text, height
-
-    logger.debug(f"换行文本, 最大宽度: {max_width}, 文本宽度: {width}, 文本: {text}")
-
-    processed = True
-
-    _wrapped_lines_ = []
-    words = text.split(" ")
-    _txt_ = ""
-    for word in words:
-        _before = _txt_
-        _txt_ += f"{word} "
-        _width, _height = get_text_size(_txt_)
-        if _width <= max_width:
-            continue
-        else:
-            if _txt_.strip() == word.strip():
-                processed = False
-                break
-            _wrapped_lines_.append(_before)
-            _txt_ = f"{word} "
-    _wrapped_lines_.append(_txt_)
-    if processed:
-        _wrapped_lines_ = [line.strip() for line in _wrapped_lines_]
-        result = "\n".join(_wrapped_lines_).strip()
-        height = len(_wrapped_lines_) * height
-        # logger.warning(f"wrapped text: {result}")
-        return result, height
-
-    _wrapped_lines_ = []
-    chars = list(text)
-    _txt_ = ""
-    for word in chars:
-        _txt_ += word
-        _width, _height = get_text_size(_txt_)
-        if _width <= max_width:
-            continue
-        else:
-            _wrapped_lines_.append(_txt_)
-            _txt_ = ""
-    _wrapped_lines_.append(_txt_)
-    result = "\n".join(_wrapped_lines_).strip()
-    height = len(_wrapped_lines_) * height
-    logger.debug(f"换行文本: {result}")
-    return result, height
+    return subtitle_layout.wrap_text(text, max_width, font, fontsize)
 
 
 @contextmanager
@@ -1,29 +1,46 @@
+from __future__ import annotations
+
 import os
 import re
 import json
 import traceback
-import edge_tts
-import asyncio
 import requests
 import uuid
 from loguru import logger
-from typing import List, Union, Tuple
+from typing import List, Union, Tuple, TYPE_CHECKING
 from datetime import datetime
 from xml.sax.saxutils import unescape
-from edge_tts import submaker, SubMaker
 # from edge_tts.submaker import mktimestamp  # 函数可能不存在，我们自己实现
-from moviepy.video.tools import subtitles
-from pydub import AudioSegment
-try:
-    from moviepy import AudioFileClip
-    MOVIEPY_AVAILABLE = True
-except ImportError:
-    MOVIEPY_AVAILABLE = False
-    logger.warning("moviepy 未安装，将使用估算方法计算音频时长")
+import importlib.util
 import time
 
+# edge_tts / moviepy / pydub 导入较慢，仅在实际合成或处理音频时才加载
+if TYPE_CHECKING:
+    from edge_tts import SubMaker
+
+MOVIEPY_AVAILABLE = importlib.util.find_spec("moviepy") is not None
+if not MOVIEPY_AVAILABLE:
+    logger.warning("moviepy 未安装，将使用估算方法计算音频时长")
+
 from app.config import config
+from app.models.timeline import Timeline
+from app.services import voice_catalog
 from app.utils import utils
+from app.utils.async_runtime import run_sync
+from app.utils.http_session import RetryPolicy, download_to_file, get_session
+
+# REST 类 TTS 接口的重试策略（指数退避 + 抖动，遵循 Retry-After）
+TTS_RETRY = RetryPolicy(attempts=3, base_delay=1.0, max_delay=20.0)
+# TTS 接口连接池的默认大小
+DEFAULT_TTS_POOL_SIZE = 4
+
+
+def _tts_session() -> requests.Session:
+    """REST 类 TTS 引擎共享的 HTTP 会话，连接池大小由 [app] tts_http_pool_size 配置"""
+    return get_session("tts", pool_size=int(config.app.get("tts_http_pool_size", DEFAULT_TTS_POOL_SIZE)))
+
+# Azure官方音色格式，如 zh-CN-YunzeNeural
+_AZURE_VOICE_PATTERN = re.compile(r'^[a-z]{2}-[A-Z]{2}-\w+Neural$')
 
 
 def mktimestamp(time_seconds: float) -> str:
@@ -43,1014 +60,25 @@ def mktimestamp(time_seconds: float) -> str:
 
 
 def get_all_azure_voices(filter_locals=None) -> list[str]:
-    if filter_locals is None:
-        filter_locals = ["zh-CN", "en-US", "zh-HK", "zh-TW", "vi-VN"]
-    voices_str = """
-Name: af-ZA-AdriNeural
-Gender: Female
-
-Name: af-ZA-WillemNeural
-Gender: Male
-
-Name: am-ET-AmehaNeural
-Gender: Male
-
-Name: am-ET-MekdesNeural
-Gender: Female
-
-Name: ar-AE-FatimaNeural
-Gender: Female
-
-Name: ar-AE-HamdanNeural
-Gender: Male
-
-Name: ar-BH-AliNeural
-Gender: Male
-
-Name: ar-BH-LailaNeural
-Gender: Female
-
-Name: ar-DZ-AminaNeural
-Gender: Female
-
-Name: ar-DZ-IsmaelNeural
-Gender: Male
-
-Name: ar-EG-SalmaNeural
-Gender: Female
-
-Name: ar-EG-ShakirNeural
-Gender: Male
-
-Name: ar-IQ-BasselNeural
-Gender: Male
-
-Name: ar-IQ-RanaNeural
-Gender: Female
-
-Name: ar-JO-SanaNeural
-Gender: Female
-
-Name: ar-JO-TaimNeural
-Gender: Male
-
-Name: ar-KW-FahedNeural
-Gender: Male
-
-Name: ar-KW-NouraNeural
-Gender: Female
-
-Name: ar-LB-LaylaNeural
-Gender: Female
-
-Name: ar-LB-RamiNeural
-Gender: Male
-
-Name: ar-LY-ImanNeural
-Gender: Female
-
-Name: ar-LY-OmarNeural
-Gender: Male
-
-Name: ar-MA-JamalNeural
-Gender: Male
-
-Name: ar-MA-MounaNeural
-Gender: Female
-
-Name: ar-OM-AbdullahNeural
-Gender: Male
-
-Name: ar-OM-AyshaNeural
-Gender: Female
-
-Name: ar-QA-AmalNeural
-Gender: Female
-
-Name: ar-QA-MoazNeural
-Gender: Male
-
-Name: ar-SA-HamedNeural
-Gender: Male
-
-Name: ar-SA-ZariyahNeural
-Gender: Female
-
-Name: ar-SY-AmanyNeural
-Gender: Female
-
-Name: ar-SY-LaithNeural
-Gender: Male
-
-Name: ar-TN-HediNeural
-Gender: Male
-
-Name: ar-TN-ReemNeural
-Gender: Female
-
-Name: ar-YE-MaryamNeural
-Gender: Female
-
-Name: ar-YE-SalehNeural
-Gender: Male
-
-Name: az-AZ-BabekNeural
-Gender: Male
-
-Name: az-AZ-BanuNeural
-Gender: Female
-
-Name: bg-BG-BorislavNeural
-Gender: Male
-
-Name: bg-BG-KalinaNeural
-Gender: Female
-
-Name: bn-BD-NabanitaNeural
-Gender: Female
-
-Name: bn-BD-PradeepNeural
-Gender: Male
-
-Name: bn-IN-BashkarNeural
-Gender: Male
-
-Name: bn-IN-TanishaaNeural
-Gender: Female
-
-Name: bs-BA-GoranNeural
-Gender: Male
-
-Name: bs-BA-VesnaNeural
-Gender: Female
-
-Name: ca-ES-EnricNeural
-Gender: Male
-
-Name: ca-ES-JoanaNeural
-Gender: Female
-
-Name: cs-CZ-AntoninNeural
-Gender: Male
-
-Name: cs-CZ-VlastaNeural
-Gender: Female
-
-Name: cy-GB-AledNeural
-Gender: Male
-
-Name: cy-GB-NiaNeural
-Gender: Female
-
-Name: da-DK-ChristelNeural
-Gender: Female
-
-Name: da-DK-JeppeNeural
-Gender: Male
-
-Name: de-AT-IngridNeural
-Gender: Female
-
-Name: de-AT-JonasNeural
-Gender: Male
-
-Name: de-CH-JanNeural
-Gender: Male
-
-Name: de-CH-LeniNeural
-Gender: Female
-
-Name: de-DE-AmalaNeural
-Gender: Female
-
-Name: de-DE-ConradNeural
-Gender: Male
-
-Name: de-DE-FlorianMultilingualNeural
-Gender: Male
-
-Name: de-DE-KatjaNeural
-Gender: Female
-
-Name: de-DE-KillianNeural
-Gender: Male
-
-Name: de-DE-SeraphinaMultilingualNeural
-Gender: Female
-
-Name: el-GR-AthinaNeural
-Gender: Female
-
-Name: el-GR-NestorasNeural
-Gender: Male
-
-Name: en-AU-NatashaNeural
-Gender: Female
-
-Name: en-AU-WilliamNeural
-Gender: Male
-
-Name: en-CA-ClaraNeural
-Gender: Female
-
-Name: en-CA-LiamNeural
-Gender: Male
-
-Name: en-GB-LibbyNeural
-Gender: Female
-
-Name: en-GB-MaisieNeural
-Gender: Female
-
-Name: en-GB-RyanNeural
-Gender: Male
-
-Name: en-GB-SoniaNeural
-Gender: Female
-
-Name: en-GB-ThomasNeural
-Gender: Male
-
-Name: en-HK-SamNeural
-Gender: Male
-
-Name: en-HK-YanNeural
-Gender: Female
-
-Name: en-IE-ConnorNeural
-Gender: Male
-
-Name: en-IE-EmilyNeural
-Gender: Female
-
-Name: en-IN-NeerjaExpressiveNeural
-Gender: Female
-
-Name: en-IN-NeerjaNeural
-Gender: Female
-
-Name: en-IN-PrabhatNeural
-Gender: Male
-
-Name: en-KE-AsiliaNeural
-Gender: Female
-
-Name: en-KE-ChilembaNeural
-Gender: Male
-
-Name: en-NG-AbeoNeural
-Gender: Male
-
-Name: en-NG-EzinneNeural
-Gender: Female
-
-Name: en-NZ-MitchellNeural
-Gender: Male
-
-Name: en-NZ-MollyNeural
-Gender: Female
-
-Name: en-PH-JamesNeural
-Gender: Male
-
-Name: en-PH-RosaNeural
-Gender: Female
-
-Name: en-SG-LunaNeural
-Gender: Female
-
-Name: en-SG-WayneNeural
-Gender: Male
-
-Name: en-TZ-ElimuNeural
-Gender: Male
-
-Name: en-TZ-ImaniNeural
-Gender: Female
-
-Name: en-US-AnaNeural
-Gender: Female
-
-Name: en-US-AndrewNeural
-Gender: Male
-
-Name: en-US-AriaNeural
-Gender: Female
-
-Name: en-US-AvaNeural
-Gender: Female
-
-Name: en-US-BrianNeural
-Gender: Male
-
-Name: en-US-ChristopherNeural
-Gender: Male
-
-Name: en-US-EmmaNeural
-Gender: Female
-
-Name: en-US-EricNeural
-Gender: Male
-
-Name: en-US-GuyNeural
-Gender: Male
-
-Name: en-US-JennyNeural
-Gender: Female
-
-Name: en-US-MichelleNeural
-Gender: Female
-
-Name: en-US-RogerNeural
-Gender: Male
-
-Name: en-US-SteffanNeural
-Gender: Male
-
-Name: en-ZA-LeahNeural
-Gender: Female
-
-Name: en-ZA-LukeNeural
-Gender: Male
-
-Name: es-AR-ElenaNeural
-Gender: Female
-
-Name: es-AR-TomasNeural
-Gender: Male
-
-Name: es-BO-MarceloNeural
-Gender: Male
-
-Name: es-BO-SofiaNeural
-Gender: Female
-
-Name: es-CL-CatalinaNeural
-Gender: Female
-
-Name: es-CL-LorenzoNeural
-Gender: Male
-
-Name: es-CO-GonzaloNeural
-Gender: Male
-
-Name: es-CO-SalomeNeural
-Gender: Female
-
-Name: es-CR-JuanNeural
-Gender: Male
-
-Name: es-CR-MariaNeural
-Gender: Female
-
-Name: es-CU-BelkysNeural
-Gender: Female
-
-Name: es-CU-ManuelNeural
-Gender: Male
-
-Name: es-DO-EmilioNeural
-Gender: Male
-
-Name: es-DO-RamonaNeural
-Gender: Female
-
-Name: es-EC-AndreaNeural
-Gender: Female
-
-Name: es-EC-LuisNeural
-Gender: Male
-
-Name: es-ES-AlvaroNeural
-Gender: Male
-
-Name: es-ES-ElviraNeural
-Gender: Female
-
-Name: es-ES-XimenaNeural
-Gender: Female
-
-Name: es-GQ-JavierNeural
-Gender: Male
-
-Name: es-GQ-TeresaNeural
-Gender: Female
-
-Name: es-GT-AndresNeural
-Gender: Male
-
-Name: es-GT-MartaNeural
-Gender: Female
-
-Name: es-HN-CarlosNeural
-Gender: Male
-
-Name: es-HN-KarlaNeural
-Gender: Female
-
-Name: es-MX-DaliaNeural
-Gender: Female
-
-Name: es-MX-JorgeNeural
-Gender: Male
-
-Name: es-NI-FedericoNeural
-Gender: Male
-
-Name: es-NI-YolandaNeural
-Gender: Female
-
-Name: es-PA-MargaritaNeural
-Gender: Female
-
-Name: es-PA-RobertoNeural
-Gender: Male
-
-Name: es-PE-AlexNeural
-Gender: Male
-
-Name: es-PE-CamilaNeural
-Gender: Female
-
-Name: es-PR-KarinaNeural
-Gender: Female
-
-Name: es-PR-VictorNeural
-Gender: Male
-
-Name: es-PY-MarioNeural
-Gender: Male
-
-Name: es-PY-TaniaNeural
-Gender: Female
-
-Name: es-SV-LorenaNeural
-Gender: Female
-
-Name: es-SV-RodrigoNeural
-Gender: Male
-
-Name: es-US-AlonsoNeural
-Gender: Male
-
-Name: es-US-PalomaNeural
-Gender: Female
-
-Name: es-UY-MateoNeural
-Gender: Male
-
-Name: es-UY-ValentinaNeural
-Gender: Female
-
-Name: es-VE-PaolaNeural
-Gender: Female
-
-Name: es-VE-SebastianNeural
-Gender: Male
-
-Name: et-EE-AnuNeural
-Gender: Female
-
-Name: et-EE-KertNeural
-Gender: Male
-
-Name: fa-IR-DilaraNeural
-Gender: Female
-
-Name: fa-IR-FaridNeural
-Gender: Male
-
-Name: fi-FI-HarriNeural
-Gender: Male
-
-Name: fi-FI-NooraNeural
-Gender: Female
-
-Name: fil-PH-AngeloNeural
-Gender: Male
-
-Name: fil-PH-BlessicaNeural
-Gender: Female
-
-Name: fr-BE-CharlineNeural
-Gender: Female
-
-Name: fr-BE-GerardNeural
-Gender: Male
-
-Name: fr-CA-AntoineNeural
-Gender: Male
-
-Name: fr-CA-JeanNeural
-Gender: Male
-
-Name: fr-CA-SylvieNeural
-Gender: Female
-
-Name: fr-CA-ThierryNeural
-Gender: Male
-
-Name: fr-CH-ArianeNeural
-Gender: Female
-
-Name: fr-CH-FabriceNeural
-Gender: Male
-
-Name: fr-FR-DeniseNeural
-Gender: Female
-
-Name: fr-FR-EloiseNeural
-Gender: Female
-
-Name: fr-FR-HenriNeural
-Gender: Male
-
-Name: fr-FR-RemyMultilingualNeural
-Gender: Male
-
-Name: fr-FR-VivienneMultilingualNeural
-Gender: Female
-
-Name: ga-IE-ColmNeural
-Gender: Male
-
-Name: ga-IE-OrlaNeural
-Gender: Female
-
-Name: gl-ES-RoiNeural
-Gender: Male
-
-Name: gl-ES-SabelaNeural
-Gender: Female
-
-Name: gu-IN-DhwaniNeural
-Gender: Female
-
-Name: gu-IN-NiranjanNeural
-Gender: Male
-
-Name: he-IL-AvriNeural
-Gender: Male
-
-Name: he-IL-HilaNeural
-Gender: Female
-
-Name: hi-IN-MadhurNeural
-Gender: Male
-
-Name: hi-IN-SwaraNeural
-Gender: Female
-
-Name: hr-HR-GabrijelaNeural
-Gender: Female
-
-Name: hr-HR-SreckoNeural
-Gender: Male
-
-Name: hu-HU-NoemiNeural
-Gender: Female
-
-Name: hu-HU-TamasNeural
-Gender: Male
-
-Name: id-ID-ArdiNeural
-Gender: Male
-
-Name: id-ID-GadisNeural
-Gender: Female
-
-Name: is-IS-GudrunNeural
-Gender: Female
-
-Name: is-IS-GunnarNeural
-Gender: Male
-
-Name: it-IT-DiegoNeural
-Gender: Male
-
-Name: it-IT-ElsaNeural
-Gender: Female
-
-Name: it-IT-GiuseppeNeural
-Gender: Male
-
-Name: it-IT-IsabellaNeural
-Gender: Female
-
-Name: ja-JP-KeitaNeural
-Gender: Male
-
-Name: ja-JP-NanamiNeural
-Gender: Female
-
-Name: jv-ID-DimasNeural
-Gender: Male
-
-Name: jv-ID-SitiNeural
-Gender: Female
-
-Name: ka-GE-EkaNeural
-Gender: Female
-
-Name: ka-GE-GiorgiNeural
-Gender: Male
-
-Name: kk-KZ-AigulNeural
-Gender: Female
-
-Name: kk-KZ-DauletNeural
-Gender: Male
-
-Name: km-KH-PisethNeural
-Gender: Male
-
-Name: km-KH-SreymomNeural
-Gender: Female
-
-Name: kn-IN-GaganNeural
-Gender: Male
-
-Name: kn-IN-SapnaNeural
-Gender: Female
-
-Name: ko-KR-HyunsuNeural
-Gender: Male
-
-Name: ko-KR-InJoonNeural
-Gender: Male
-
-Name: ko-KR-SunHiNeural
-Gender: Female
-
-Name: lo-LA-ChanthavongNeural
-Gender: Male
-
-Name: lo-LA-KeomanyNeural
-Gender: Female
-
-Name: lt-LT-LeonasNeural
-Gender: Male
-
-Name: lt-LT-OnaNeural
-Gender: Female
-
-Name: lv-LV-EveritaNeural
-Gender: Female
-
-Name: lv-LV-NilsNeural
-Gender: Male
-
-Name: mk-MK-AleksandarNeural
-Gender: Male
-
-Name: mk-MK-MarijaNeural
-Gender: Female
-
-Name: ml-IN-MidhunNeural
-Gender: Male
-
-Name: ml-IN-SobhanaNeural
-Gender: Female
-
-Name: mn-MN-BataaNeural
-Gender: Male
-
-Name: mn-MN-YesuiNeural
-Gender: Female
-
-Name: mr-IN-AarohiNeural
-Gender: Female
-
-Name: mr-IN-ManoharNeural
-Gender: Male
-
-Name: ms-MY-OsmanNeural
-Gender: Male
-
-Name: ms-MY-YasminNeural
-Gender: Female
-
-Name: mt-MT-GraceNeural
-Gender: Female
-
-Name: mt-MT-JosephNeural
-Gender: Male
-
-Name: my-MM-NilarNeural
-Gender: Female
-
-Name: my-MM-ThihaNeural
-Gender: Male
-
-Name: nb-NO-FinnNeural
-Gender: Male
-
-Name: nb-NO-PernilleNeural
-Gender: Female
-
-Name: ne-NP-HemkalaNeural
-Gender: Female
-
-Name: ne-NP-SagarNeural
-Gender: Male
-
-Name: nl-BE-ArnaudNeural
-Gender: Male
-
-Name: nl-BE-DenaNeural
-Gender: Female
-
-Name: nl-NL-ColetteNeural
-Gender: Female
-
-Name: nl-NL-FennaNeural
-Gender: Female
-
-Name: nl-NL-MaartenNeural
-Gender: Male
-
-Name: pl-PL-MarekNeural
-Gender: Male
-
-Name: pl-PL-ZofiaNeural
-Gender: Female
-
-Name: ps-AF-GulNawazNeural
-Gender: Male
-
-Name: ps-AF-LatifaNeural
-Gender: Female
-
-Name: pt-BR-AntonioNeural
-Gender: Male
-
-Name: pt-BR-FranciscaNeural
-Gender: Female
-
-Name: pt-BR-ThalitaNeural
-Gender: Female
-
-Name: pt-PT-DuarteNeural
-Gender: Male
-
-Name: pt-PT-RaquelNeural
-Gender: Female
-
-Name: ro-RO-AlinaNeural
-Gender: Female
-
-Name: ro-RO-EmilNeural
-Gender: Male
-
-Name: ru-RU-DmitryNeural
-Gender: Male
-
-Name: ru-RU-SvetlanaNeural
-Gender: Female
-
-Name: si-LK-SameeraNeural
-Gender: Male
-
-Name: si-LK-ThiliniNeural
-Gender: Female
-
-Name: sk-SK-LukasNeural
-Gender: Male
-
-Name: sk-SK-ViktoriaNeural
-Gender: Female
-
-Name: sl-SI-PetraNeural
-Gender: Female
-
-Name: sl-SI-RokNeural
-Gender: Male
-
-Name: so-SO-MuuseNeural
-Gender: Male
-
-Name: so-SO-UbaxNeural
-Gender: Female
-
-Name: sq-AL-AnilaNeural
-Gender: Female
-
-Name: sq-AL-IlirNeural
-Gender: Male
-
-Name: sr-RS-NicholasNeural
-Gender: Male
-
-Name: sr-RS-SophieNeural
-Gender: Female
-
-Name: su-ID-JajangNeural
-Gender: Male
-
-Name: su-ID-TutiNeural
-Gender: Female
-
-Name: sv-SE-MattiasNeural
-Gender: Male
-
-Name: sv-SE-SofieNeural
-Gender: Female
-
-Name: sw-KE-RafikiNeural
-Gender: Male
-
-Name: sw-KE-ZuriNeural
-Gender: Female
-
-Name: sw-TZ-DaudiNeural
-Gender: Male
-
-Name: sw-TZ-RehemaNeural
-Gender: Female
-
-Name: ta-IN-PallaviNeural
-Gender: Female
-
-Name: ta-IN-ValluvarNeural
-Gender: Male
-
-Name: ta-LK-KumarNeural
-Gender: Male
-
-Name: ta-LK-SaranyaNeural
-Gender: Female
-
-Name: ta-MY-KaniNeural
-Gender: Female
-
-Name: ta-MY-SuryaNeural
-Gender: Male
-
-Name: ta-SG-AnbuNeural
-Gender: Male
-
-Name: ta-SG-VenbaNeural
-Gender: Female
-
-Name: te-IN-MohanNeural
-Gender: Male
-
-Name: te-IN-ShrutiNeural
-Gender: Female
-
-Name: th-TH-NiwatNeural
-Gender: Male
-
-Name: th-TH-PremwadeeNeural
-Gender: Female
-
-Name: tr-TR-AhmetNeural
-Gender: Male
-
-Name: tr-TR-EmelNeural
-Gender: Female
-
-Name: uk-UA-OstapNeural
-Gender: Male
-
-Name: uk-UA-PolinaNeural
-Gender: Female
-
-Name: ur-IN-GulNeural
-Gender: Female
-
-Name: ur-IN-SalmanNeural
-Gender: Male
-
-Name: ur-PK-AsadNeural
-Gender: Male
-
-Name: ur-PK-UzmaNeural
-Gender: Female
-
-Name: uz-UZ-MadinaNeural
-Gender: Female
-
-Name: uz-UZ-SardorNeural
-Gender: Male
-
-Name: vi-VN-HoaiMyNeural
-Gender: Female
-
-Name: vi-VN-NamMinhNeural
-Gender: Male
-
-Name: zh-CN-XiaoxiaoNeural
-Gender: Female
-
-Name: zh-CN-XiaoyiNeural
-Gender: Female
-
-Name: zh-CN-YunjianNeural
-Gender: Male
-
-Name: zh-CN-YunxiNeural
-Gender: Male
-
-Name: zh-CN-YunxiaNeural
-Gender: Male
-
-Name: zh-CN-YunyangNeural
-Gender: Male
-
-Name: zh-CN-liaoning-XiaobeiNeural
-Gender: Female
-
-Name: zh-CN-shaanxi-XiaoniNeural
-Gender: Female
-
-Name: zh-HK-HiuGaaiNeural
-Gender: Female
-
-Name: zh-HK-HiuMaanNeural
-Gender: Female
-
-Name: zh-HK-WanLungNeural
-Gender: Male
-
-Name: zh-TW-HsiaoChenNeural
-Gender: Female
-
-Name: zh-TW-HsiaoYuNeural
-Gender: Female
-
-Name: zh-TW-YunJheNeural
-Gender: Male
-
-Name: zu-ZA-ThandoNeural
-Gender: Female
-
-Name: zu-ZA-ThembaNeural
-Gender: Male
-
-
-Name: en-US-AvaMultilingualNeural-V2
-Gender: Female
-
-Name: en-US-AndrewMultilingualNeural-V2
-Gender: Male
-
-Name: en-US-EmmaMultilingualNeural-V2
-Gender: Female
-
-Name: en-US-BrianMultilingualNeural-V2
-Gender: Male
-
-Name: de-DE-FlorianMultilingualNeural-V2
-Gender: Male
-
-Name: de-DE-SeraphinaMultilingualNeural-V2
-Gender: Female
-
-Name: fr-FR-RemyMultilingualNeural-V2
-Gender: Male
-
-Name: fr-FR-VivienneMultilingualNeural-V2
-Gender: Female
+    """
+    获取内置音色的显示名称列表（如 zh-CN-XiaoxiaoNeural-Female）
 
-Name: zh-CN-XiaoxiaoMultilingualNeural-V2
-Gender: Female
+    Args:
+        filter_locals: 地区前缀列表，为None时使用默认地区，为空列表时返回全部音色
 
-Name: zh-CN-YunxiNeural-V2
-Gender: Male
-    """.strip()
-    voices = []
-    name = ""
-    for line in voices_str.split("\n"):
-        line = line.strip()
-        if not line:
-            continue
-        if line.startswith("Name: "):
-            name = line[6:].strip()
-        if line.startswith("Gender: "):
-            gender = line[8:].strip()
-            if name and gender:
-                # voices.append({
-                #     "name": name,
-                #     "gender": gender,
-                # })
-                if filter_locals:
-                    for filter_local in filter_locals:
-                        if name.lower().startswith(filter_local.lower()):
-                            voices.append(f"{name}-{gender}")
-                else:
-                    voices.append(f"{name}-{gender}")
-                name = ""
-    voices.sort()
-    return voices
+    Returns:
+        list[str]: 排序后的音色显示名称
+    """
+    if filter_locals is None:
+        filter_locals = ["zh-CN", "en-US", "zh-HK", "zh-TW", "vi-VN"]
+    return voice_catalog.get_catalog().display_names(locales=filter_locals)
 
 
 def parse_voice_name(name: str):
     # zh-CN-XiaoyiNeural-Female
     # zh-CN-YunxiNeural-Male
     # zh-CN-XiaoxiaoMultilingualNeural-V2-Female
-    name = name.replace("-Female", "").replace("-Male", "").strip()
-    return name
+    return voice_catalog.strip_gender_suffix(name)
 
 
 def is_azure_v2_voice(voice_name: str):
@@ -1073,12 +101,7 @@ def should_use_azure_speech_services(voice_name: str) -> bool:
 
     # 检查是否为Azure官方音色格式 (如: zh-CN-YunzeNeural)
     # Azure音色通常格式为: [语言]-[地区]-[名称]Neural
-    import re
-    pattern = r'^[a-z]{2}-[A-Z]{2}-\w+Neural$'
-    if re.match(pattern, voice_name):
-        return True
-
-    return False
+    return _AZURE_VOICE_PATTERN.match(voice_name) is not None
 
 
 def tts(
@@ -1145,6 +168,7 @@ def azure_tts_v1(
         try:
             logger.info(f"第 {i+1} 次使用 edge_tts 生成音频")
 
+            import edge_tts
             async def _do() -> tuple[SubMaker, bytes]:
                 communicate = edge_tts.Communicate(text, voice_name, rate=rate_str, pitch=pitch_str, proxy=config.proxy.get("http"))
                 sub_maker = edge_tts.SubMaker()
@@ -1160,7 +184,7 @@ def azure_tts_v1(
                 return sub_maker, audio_data
 
             # 获取音频数据和字幕信息
-            sub_maker, audio_data = asyncio.run(_do())
+            sub_maker, audio_data = run_sync(_do())
             
             # 验证数据是否有效
             if not sub_maker or not sub_maker.subs or not audio_data:
@@ -1217,6 +241,7 @@ def azure_tts_v2(text: str, voice_name: str, voice_file: str) -> Union[SubMaker,
         try:
             logger.info(f"start, voice name: {processed_voice_name}, try: {i + 1}")
 
+            from edge_tts import SubMaker
             sub_maker = SubMaker()
 
             def speech_synthesizer_word_boundary_cb(evt: speechsdk.SessionEventArgs):
@@ -1393,7 +418,7 @@ def create_subtitle_from_multiple(text: str, sub_maker_list: List[SubMaker], lis
         traceback.print_exc()
 
 
-def create_subtitle(sub_maker: submaker.SubMaker, text: str, subtitle_file: str):
+def create_subtitle(sub_maker: SubMaker, text: str, subtitle_file: str):
     """
     优化字幕文件
     1. 将字幕文件按照标点符号分割成多行
@@ -1470,6 +495,7 @@ def create_subtitle(sub_maker: submaker.SubMaker, text: str, subtitle_file: str)
             with open(subtitle_file, "w", encoding="utf-8") as file:
                 file.write("\n".join(sub_items) + "\n")
             try:
+                from moviepy.video.tools import subtitles
                 sbs = subtitles.file_to_subtitles(subtitle_file, encoding="utf-8")
                 duration = max([tb for ((ta, tb), txt) in sbs])
                 logger.info(
@@ -1494,7 +520,7 @@ def create_subtitle(sub_maker: submaker.SubMaker, text: str, subtitle_file: str)
         return subtitle_file, 3.0
 
 
-def get_audio_duration(sub_maker: submaker.SubMaker):
+def get_audio_duration(sub_maker: SubMaker):
     """
     获取音频时长
     """
@@ -1508,7 +534,7 @@ def tts_multiple(task_id: str, list_script: list, voice_name: str, voice_rate: f
     根据JSON文件中的多段文本进行TTS转换
     
     :param task_id: 任务ID
-    :param list_script: 脚本列表
+    :param list_script: 脚本列表或 Timeline（传入 Timeline 时配音路径和时长直接写入对应片段）
     :param voice_name: 语音名称
     :param voice_rate: 语音速率
     :param tts_engine: TTS 引擎
@@ -1516,16 +542,17 @@ def tts_multiple(task_id: str, list_script: list, voice_name: str, voice_rate: f
     """
     voice_name = parse_voice_name(voice_name)
     output_dir = utils.task_dir(task_id)
+    timeline = Timeline.coerce(list_script)
     tts_results = []
 
-    for item in list_script:
-        if item['OST'] != 1:
+    for segment in timeline:
+        if segment.ost != 1:
             # 将时间戳中的冒号替换为下划线
-            timestamp = item['timestamp'].replace(':', '_')
+            timestamp = segment.timestamp.replace(':', '_')
             audio_file = os.path.join(output_dir, f"audio_{timestamp}.mp3")
             subtitle_file = os.path.join(output_dir, f"subtitle_{timestamp}.srt")
 
-            text = item['narration']
+            text = segment.narration
 
             sub_maker = tts(
                 text=text,
@@ -1561,6 +588,7 @@ def tts_multiple(task_id: str, list_script: list, voice_name: str, voice_rate: f
 
                 # 使用pydub获取更精确的音频时长，避免fallback估算带来的误差
                 try:
+                    from pydub import AudioSegment
                     audio_segment = AudioSegment.from_file(audio_file)
                     precise_duration = audio_segment.duration_seconds
                     if precise_duration > 0:
@@ -1570,8 +598,8 @@ def tts_multiple(task_id: str, list_script: list, voice_name: str, voice_rate: f
                     logger.warning(f"使用pydub获取音频时长失败，继续使用已有时长估算: {duration_error}")
 
             tts_results.append({
-                "_id": item['_id'],
-                "timestamp": item['timestamp'],
+                "_id": segment.id,
+                "timestamp": segment.timestamp,
                 "audio_file": audio_file,
                 "subtitle_file": subtitle_file,
                 "duration": duration,
@@ -1579,6 +607,7 @@ def tts_multiple(task_id: str, list_script: list, voice_name: str, voice_rate: f
             })
             logger.info(f"已生成音频文件: {audio_file}")
 
+    timeline.apply_tts(tts_results)
     return tts_results
 
 
@@ -1588,6 +617,7 @@ def get_audio_duration_from_file(audio_file: str) -> float:
     """
     if MOVIEPY_AVAILABLE:
         try:
+            from moviepy import AudioFileClip
             audio_clip = AudioFileClip(audio_file)
             duration = audio_clip.duration
             audio_clip.close()
@@ -1693,49 +723,45 @@ def qwen3_tts(text: str, voice_name: str, voice_file: str, speed: float = 1.0) -
             logger.info(f"Qwen3 TTS API 响应: {result}")
         
 
-            audio_bytes: bytes | None = None
+            audio_size = 0
 
             # 解析返回结果，提取音频URL并下载
-            try:# 假设 result 是你收到的字符串
+            try:
                 audio_url = None
-                
+
                 if result.output and result.output.audio:
                     audio_url = result.output.audio.url
-                # 从响应中提取音频URL
-    
+
                 if audio_url:
-                    # 直接下载音频文件
-                    response = requests.get(audio_url, timeout=30)
-                    response.raise_for_status()
-                    audio_bytes = response.content
+                    # 通过共享连接池把音频流式写入文件（下载失败时按退避策略重试）
+                    audio_size = download_to_file(
+                        _tts_session(), "GET", audio_url, voice_file, retry=TTS_RETRY, timeout=30
+                    )
                 else:
                     logger.warning("API响应中未找到音频URL")
-                    
+
             except Exception as e:
                 logger.error(f"解析API响应失败: {str(e)}")
 
-            if not audio_bytes:
+            if not audio_size:
                 logger.warning("DashScope SDK 返回空音频数据，重试")
                 if i < 2:
-                    time.sleep(1)
+                    time.sleep(TTS_RETRY.delay(i))
                 continue
 
-            # 写入文件
-            with open(voice_file, "wb") as f:
-                f.write(audio_bytes)
-
             # 估算字幕
+            from edge_tts import SubMaker
             sub = SubMaker()
             est_ms = max(800, int(len(text) * 180))
             sub.create_sub((0, est_ms), text)
             
-            logger.info(f"Qwen3 TTS 生成成功（DashScope SDK），文件大小: {len(audio_bytes)} 字节")
+            logger.info(f"Qwen3 TTS 生成成功（DashScope SDK），文件大小: {audio_size} 字节")
             return sub
 
         except Exception as e:
             logger.error(f"DashScope SDK 合成失败: {e}")
             if i < 2:
-                time.sleep(1)
+                time.sleep(TTS_RETRY.delay(i))
 
     return None
 
@@ -1819,6 +845,7 @@ def tencent_tts(text: str, voice_name: str, voice_file: str, speed: float = 1.0)
                 f.write(audio_data)
 
             # 创建字幕对象
+            from edge_tts import SubMaker
             sub_maker = SubMaker()
             if resp.Subtitles:
                 for sub in resp.Subtitles:
@@ -1881,57 +908,51 @@ def soulvoice_tts(text: str, voice_name: str, voice_file: str, speed: float = 1.
         'speed': speed
     }
 
-    # 重试机制
-    for attempt in range(3):
-        try:
-            logger.info(f"第 {attempt + 1} 次调用 SoulVoice API")
-
-            # 设置代理
-            proxies = {}
-            if config.proxy.get("http"):
-                proxies = {
-                    'http': config.proxy.get("http"),
-                    'https': config.proxy.get("https", config.proxy.get("http"))
-                }
-
-            # 调用 API
-            response = requests.post(
-                api_url,
-                headers=headers,
-                json=data,
-                proxies=proxies,
-                timeout=60
-            )
-
-            if response.status_code == 200:
-                # 保存音频文件
-                with open(voice_file, 'wb') as f:
-                    f.write(response.content)
-
-                logger.info(f"SoulVoice TTS 成功生成音频: {voice_file}")
+    # 设置代理
+    proxies = {}
+    if config.proxy.get("http"):
+        proxies = {
+            'http': config.proxy.get("http"),
+            'https': config.proxy.get("https", config.proxy.get("http"))
+        }
 
-                # SoulVoice 不支持精确字幕生成，返回简单的 SubMaker 对象
-                sub_maker = SubMaker()
-                sub_maker.subs = [text]  # 整个文本作为一个段落
-                sub_maker.offset = [(0, 0)]  # 占位时间戳
-
-                return sub_maker
+    # 调用 API：复用共享连接池，超时、连接错误和 429/5xx 按退避策略重试，音频流式写入文件
+    try:
+        logger.info("调用 SoulVoice API")
+        audio_size = download_to_file(
+            _tts_session(),
+            "POST",
+            api_url,
+            voice_file,
+            retry=TTS_RETRY,
+            headers=headers,
+            json=data,
+            proxies=proxies,
+            timeout=60
+        )
+    except requests.exceptions.Timeout:
+        logger.error(f"SoulVoice API 调用超时，已达到最大重试次数 ({TTS_RETRY.attempts})")
+        return None
+    except requests.exceptions.RequestException as e:
+        logger.error(f"SoulVoice API 调用失败: {str(e)}")
+        return None
+    except Exception as e:
+        logger.error(f"SoulVoice TTS 处理错误: {str(e)}")
+        return None
 
-            else:
-                logger.error(f"SoulVoice API 调用失败: {response.status_code} - {response.text}")
+    if not audio_size:
+        logger.error("SoulVoice API 返回空音频数据")
+        return None
 
-        except requests.exceptions.Timeout:
-            logger.error(f"SoulVoice API 调用超时 (尝试 {attempt + 1}/3)")
-        except requests.exceptions.RequestException as e:
-            logger.error(f"SoulVoice API 网络错误: {str(e)} (尝试 {attempt + 1}/3)")
-        except Exception as e:
-            logger.error(f"SoulVoice TTS 处理错误: {str(e)} (尝试 {attempt + 1}/3)")
+    logger.info(f"SoulVoice TTS 成功生成音频: {voice_file}")
 
-        if attempt < 2:  # 不是最后一次尝试
-            time.sleep(2)  # 等待2秒后重试
+    # SoulVoice 不支持精确字幕生成，返回简单的 SubMaker 对象
+    from edge_tts import SubMaker
+    sub_maker = SubMaker()
+    sub_maker.subs = [text]  # 整个文本作为一个段落
+    sub_maker.offset = [(0, 0)]  # 占位时间戳
 
-    logger.error("SoulVoice TTS 生成失败，已达到最大重试次数")
-    return None
+    return sub_maker
 
 
 def is_soulvoice_voice(voice_name: str) -> bool:
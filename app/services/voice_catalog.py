@@ -0,0 +1,606 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+
+'''
+@Project: NarratoAI
+@File   : voice_catalog
+@Description: 预构建的音色目录索引（按地区、性别、引擎、V2 支持），以及可选的 edge_tts 音色列表磁盘缓存
+'''
+
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+from app.utils.async_runtime import run_sync
+
+# 引擎类型
+ENGINE_EDGE = "edge_tts"
+ENGINE_AZURE_V2 = "azure_speech"
+
+# 内置音色中仅 Azure Speech Services 支持的音色使用该后缀
+V2_SUFFIX = "-V2"
+GENDER_SUFFIXES = ("-Female", "-Male")
+
+# edge_tts 在线音色列表缓存的有效期（秒）
+EDGE_VOICES_TTL = 7 * 24 * 3600
+EDGE_VOICES_CACHE_FILE = "edge_voices.json"
+
+# 内置音色列表：(音色名称, 性别)
+_BUILTIN_VOICES: Tuple[Tuple[str, str], ...] = (
+    ("af-ZA-AdriNeural", "Female"),
+    ("af-ZA-WillemNeural", "Male"),
+    ("am-ET-AmehaNeural", "Male"),
+    ("am-ET-MekdesNeural", "Female"),
+    ("ar-AE-FatimaNeural", "Female"),
+    ("ar-AE-HamdanNeural", "Male"),
+    ("ar-BH-AliNeural", "Male"),
+    ("ar-BH-LailaNeural", "Female"),
+    ("ar-DZ-AminaNeural", "Female"),
+    ("ar-DZ-IsmaelNeural", "Male"),
+    ("ar-EG-SalmaNeural", "Female"),
+    ("ar-EG-ShakirNeural", "Male"),
+    ("ar-IQ-BasselNeural", "Male"),
+    ("ar-IQ-RanaNeural", "Female"),
+    ("ar-JO-SanaNeural", "Female"),
+    ("ar-JO-TaimNeural", "Male"),
+    ("ar-KW-FahedNeural", "Male"),
+    ("ar-KW-NouraNeural", "Female"),
+    ("ar-LB-LaylaNeural", "Female"),
+    ("ar-LB-RamiNeural", "Male"),
+    ("ar-LY-ImanNeural", "Female"),
+    ("ar-LY-OmarNeural", "Male"),
+    ("ar-MA-JamalNeural", "Male"),
+    ("ar-MA-MounaNeural", "Female"),
+    ("ar-OM-AbdullahNeural", "Male"),
+    ("ar-OM-AyshaNeural", "Female"),
+    ("ar-QA-AmalNeural", "Female"),
+    ("ar-QA-MoazNeural", "Male"),
+    ("ar-SA-HamedNeural", "Male"),
+    ("ar-SA-ZariyahNeural", "Female"),
+    ("ar-SY-AmanyNeural", "Female"),
+    ("ar-SY-LaithNeural", "Male"),
+    ("ar-TN-HediNeural", "Male"),
+    ("ar-TN-ReemNeural", "Female"),
+    ("ar-YE-MaryamNeural", "Female"),
+    ("ar-YE-SalehNeural", "Male"),
+    ("az-AZ-BabekNeural", "Male"),
+    ("az-AZ-BanuNeural", "Female"),
+    ("bg-BG-BorislavNeural", "Male"),
+    ("bg-BG-KalinaNeural", "Female"),
+    ("bn-BD-NabanitaNeural", "Female"),
+    ("bn-BD-PradeepNeural", "Male"),
+    ("bn-IN-BashkarNeural", "Male"),
+    ("bn-IN-TanishaaNeural", "Female"),
+    ("bs-BA-GoranNeural", "Male"),
+    ("bs-BA-VesnaNeural", "Female"),
+    ("ca-ES-EnricNeural", "Male"),
+    ("ca-ES-JoanaNeural", "Female"),
+    ("cs-CZ-AntoninNeural", "Male"),
+    ("cs-CZ-VlastaNeural", "Female"),
+    ("cy-GB-AledNeural", "Male"),
+    ("cy-GB-NiaNeural", "Female"),
+    ("da-DK-ChristelNeural", "Female"),
+    ("da-DK-JeppeNeural", "Male"),
+    ("de-AT-IngridNeural", "Female"),
+    ("de-AT-JonasNeural", "Male"),
+    ("de-CH-JanNeural", "Male"),
+    ("de-CH-LeniNeural", "Female"),
+    ("de-DE-AmalaNeural", "Female"),
+    ("de-DE-ConradNeural", "Male"),
+    ("de-DE-FlorianMultilingualNeural", "Male"),
+    ("de-DE-KatjaNeural", "Female"),
+    ("de-DE-KillianNeural", "Male"),
+    ("de-DE-SeraphinaMultilingualNeural", "Female"),
+    ("el-GR-AthinaNeural", "Female"),
+    ("el-GR-NestorasNeural", "Male"),
+    ("en-AU-NatashaNeural", "Female"),
+    ("en-AU-WilliamNeural", "Male"),
+    ("en-CA-ClaraNeural", "Female"),
+    ("en-CA-LiamNeural", "Male"),
+    ("en-GB-LibbyNeural", "Female"),
+    ("en-GB-MaisieNeural", "Female"),
+    ("en-GB-RyanNeural", "Male"),
+    ("en-GB-SoniaNeural", "Female"),
+    ("en-GB-ThomasNeural", "Male"),
+    ("en-HK-SamNeural", "Male"),
+    ("en-HK-YanNeural", "Female"),
+    ("en-IE-ConnorNeural", "Male"),
+    ("en-IE-EmilyNeural", "Female"),
+    ("en-IN-NeerjaExpressiveNeural", "Female"),
+    ("en-IN-NeerjaNeural", "Female"),
+    ("en-IN-PrabhatNeural", "Male"),
+    ("en-KE-AsiliaNeural", "Female"),
+    ("en-KE-ChilembaNeural", "Male"),
+    ("en-NG-AbeoNeural", "Male"),
+    ("en-NG-EzinneNeural", "Female"),
+    ("en-NZ-MitchellNeural", "Male"),
+    ("en-NZ-MollyNeural", "Female"),
+    ("en-PH-JamesNeural", "Male"),
+    ("en-PH-RosaNeural", "Female"),
+    ("en-SG-LunaNeural", "Female"),
+    ("en-SG-WayneNeural", "Male"),
+    ("en-TZ-ElimuNeural", "Male"),
+    ("en-TZ-ImaniNeural", "Female"),
+    ("en-US-AnaNeural", "Female"),
+    ("en-US-AndrewNeural", "Male"),
+    ("en-US-AriaNeural", "Female"),
+    ("en-US-AvaNeural", "Female"),
+    ("en-US-BrianNeural", "Male"),
+    ("en-US-ChristopherNeural", "Male"),
+    ("en-US-EmmaNeural", "Female"),
+    ("en-US-EricNeural", "Male"),
+    ("en-US-GuyNeural", "Male"),
+    ("en-US-JennyNeural", "Female"),
+    ("en-US-MichelleNeural", "Female"),
+    ("en-US-RogerNeural", "Male"),
+    ("en-US-SteffanNeural", "Male"),
+    ("en-ZA-LeahNeural", "Female"),
+    ("en-ZA-LukeNeural", "Male"),
+    ("es-AR-ElenaNeural", "Female"),
+    ("es-AR-TomasNeural", "Male"),
+    ("es-BO-MarceloNeural", "Male"),
+    ("es-BO-SofiaNeural", "Female"),
+    ("es-CL-CatalinaNeural", "Female"),
+    ("es-CL-LorenzoNeural", "Male"),
+    ("es-CO-GonzaloNeural", "Male"),
+    ("es-CO-SalomeNeural", "Female"),
+    ("es-CR-JuanNeural", "Male"),
+    ("es-CR-MariaNeural", "Female"),
+    ("es-CU-BelkysNeural", "Female"),
+    ("es-CU-ManuelNeural", "Male"),
+    ("es-DO-EmilioNeural", "Male"),
+    ("es-DO-RamonaNeural", "Female"),
+    ("es-EC-AndreaNeural", "Female"),
+    ("es-EC-LuisNeural", "Male"),
+    ("es-ES-AlvaroNeural", "Male"),
+    ("es-ES-ElviraNeural", "Female"),
+    ("es-ES-XimenaNeural", "Female"),
+    ("es-GQ-JavierNeural", "Male"),
+    ("es-GQ-TeresaNeural", "Female"),
+    ("es-GT-AndresNeural", "Male"),
+    ("es-GT-MartaNeural", "Female"),
+    ("es-HN-CarlosNeural", "Male"),
+    ("es-HN-KarlaNeural", "Female"),
+    ("es-MX-DaliaNeural", "Female"),
+    ("es-MX-JorgeNeural", "Male"),
+    ("es-NI-FedericoNeural", "Male"),
+    ("es-NI-YolandaNeural", "Female"),
+    ("es-PA-MargaritaNeural", "Female"),
+    ("es-PA-RobertoNeural", "Male"),
+    ("es-PE-AlexNeural", "Male"),
+    ("es-PE-CamilaNeural", "Female"),
+    ("es-PR-KarinaNeural", "Female"),
+    ("es-PR-VictorNeural", "Male"),
+    ("es-PY-MarioNeural", "Male"),
+    ("es-PY-TaniaNeural", "Female"),
+    ("es-SV-LorenaNeural", "Female"),
+    ("es-SV-RodrigoNeural", "Male"),
+    ("es-US-AlonsoNeural", "Male"),
+    ("es-US-PalomaNeural", "Female"),
+    ("es-UY-MateoNeural", "Male"),
+    ("es-UY-ValentinaNeural", "Female"),
+    ("es-VE-PaolaNeural", "Female"),
+    ("es-VE-SebastianNeural", "Male"),
+    ("et-EE-AnuNeural", "Female"),
+    ("et-EE-KertNeural", "Male"),
+    ("fa-IR-DilaraNeural", "Female"),
+    ("fa-IR-FaridNeural", "Male"),
+    ("fi-FI-HarriNeural", "Male"),
+    ("fi-FI-NooraNeural", "Female"),
+    ("fil-PH-AngeloNeural", "Male"),
+    ("fil-PH-BlessicaNeural", "Female"),
+    ("fr-BE-CharlineNeural", "Female"),
+    ("fr-BE-GerardNeural", "Male"),
+    ("fr-CA-AntoineNeural", "Male"),
+    ("fr-CA-JeanNeural", "Male"),
+    ("fr-CA-SylvieNeural", "Female"),
+    ("fr-CA-ThierryNeural", "Male"),
+    ("fr-CH-ArianeNeural", "Female"),
+    ("fr-CH-FabriceNeural", "Male"),
+    ("fr-FR-DeniseNeural", "Female"),
+    ("fr-FR-EloiseNeural", "Female"),
+    ("fr-FR-HenriNeural", "Male"),
+    ("fr-FR-RemyMultilingualNeural", "Male"),
+    ("fr-FR-VivienneMultilingualNeural", "Female"),
+    ("ga-IE-ColmNeural", "Male"),
+    ("ga-IE-OrlaNeural", "Female"),
+    ("gl-ES-RoiNeural", "Male"),
+    ("gl-ES-SabelaNeural", "Female"),
+    ("gu-IN-DhwaniNeural", "Female"),
+    ("gu-IN-NiranjanNeural", "Male"),
+    ("he-IL-AvriNeural", "Male"),
+    ("he-IL-HilaNeural", "Female"),
+    ("hi-IN-MadhurNeural", "Male"),
+    ("hi-IN-SwaraNeural", "Female"),
+    ("hr-HR-GabrijelaNeural", "Female"),
+    ("hr-HR-SreckoNeural", "Male"),
+    ("hu-HU-NoemiNeural", "Female"),
+    ("hu-HU-TamasNeural", "Male"),
+    ("id-ID-ArdiNeural", "Male"),
+    ("id-ID-GadisNeural", "Female"),
+    ("is-IS-GudrunNeural", "Female"),
+    ("is-IS-GunnarNeural", "Male"),
+    ("it-IT-DiegoNeural", "Male"),
+    ("it-IT-ElsaNeural", "Female"),
+    ("it-IT-GiuseppeNeural", "Male"),
+    ("it-IT-IsabellaNeural", "Female"),
+    ("ja-JP-KeitaNeural", "Male"),
+    ("ja-JP-NanamiNeural", "Female"),
+    ("jv-ID-DimasNeural", "Male"),
+    ("jv-ID-SitiNeural", "Female"),
+    ("ka-GE-EkaNeural", "Female"),
+    ("ka-GE-GiorgiNeural", "Male"),
+    ("kk-KZ-AigulNeural", "Female"),
+    ("kk-KZ-DauletNeural", "Male"),
+    ("km-KH-PisethNeural", "Male"),
+    ("km-KH-SreymomNeural", "Female"),
+    ("kn-IN-GaganNeural", "Male"),
+    ("kn-IN-SapnaNeural", "Female"),
+    ("ko-KR-HyunsuNeural", "Male"),
+    ("ko-KR-InJoonNeural", "Male"),
+    ("ko-KR-SunHiNeural", "Female"),
+    ("lo-LA-ChanthavongNeural", "Male"),
+    ("lo-LA-KeomanyNeural", "Female"),
+    ("lt-LT-LeonasNeural", "Male"),
+    ("lt-LT-OnaNeural", "Female"),
+    ("lv-LV-EveritaNeural", "Female"),
+    ("lv-LV-NilsNeural", "Male"),
+    ("mk-MK-AleksandarNeural", "Male"),
+    ("mk-MK-MarijaNeural", "Female"),
+    ("ml-IN-MidhunNeural", "Male"),
+    ("ml-IN-SobhanaNeural", "Female"),
+    ("mn-MN-BataaNeural", "Male"),
+    ("mn-MN-YesuiNeural", "Female"),
+    ("mr-IN-AarohiNeural", "Female"),
+    ("mr-IN-ManoharNeural", "Male"),
+    ("ms-MY-OsmanNeural", "Male"),
+    ("ms-MY-YasminNeural", "Female"),
+    ("mt-MT-GraceNeural", "Female"),
+    ("mt-MT-JosephNeural", "Male"),
+    ("my-MM-NilarNeural", "Female"),
+    ("my-MM-ThihaNeural", "Male"),
+    ("nb-NO-FinnNeural", "Male"),
+    ("nb-NO-PernilleNeural", "Female"),
+    ("ne-NP-HemkalaNeural", "Female"),
+    ("ne-NP-SagarNeural", "Male"),
+    ("nl-BE-ArnaudNeural", "Male"),
+    ("nl-BE-DenaNeural", "Female"),
+    ("nl-NL-ColetteNeural", "Female"),
+    ("nl-NL-FennaNeural", "Female"),
+    ("nl-NL-MaartenNeural", "Male"),
+    ("pl-PL-MarekNeural", "Male"),
+    ("pl-PL-ZofiaNeural", "Female"),
+    ("ps-AF-GulNawazNeural", "Male"),
+    ("ps-AF-LatifaNeural", "Female"),
+    ("pt-BR-AntonioNeural", "Male"),
+    ("pt-BR-FranciscaNeural", "Female"),
+    ("pt-BR-ThalitaNeural", "Female"),
+    ("pt-PT-DuarteNeural", "Male"),
+    ("pt-PT-RaquelNeural", "Female"),
+    ("ro-RO-AlinaNeural", "Female"),
+    ("ro-RO-EmilNeural", "Male"),
+    ("ru-RU-DmitryNeural", "Male"),
+    ("ru-RU-SvetlanaNeural", "Female"),
+    ("si-LK-SameeraNeural", "Male"),
+    ("si-LK-ThiliniNeural", "Female"),
+    ("sk-SK-LukasNeural", "Male"),
+    ("sk-SK-ViktoriaNeural", "Female"),
+    ("sl-SI-PetraNeural", "Female"),
+    ("sl-SI-RokNeural", "Male"),
+    ("so-SO-MuuseNeural", "Male"),
+    ("so-SO-UbaxNeural", "Female"),
+    ("sq-AL-AnilaNeural", "Female"),
+    ("sq-AL-IlirNeural", "Male"),
+    ("sr-RS-NicholasNeural", "Male"),
+    ("sr-RS-SophieNeural", "Female"),
+    ("su-ID-JajangNeural", "Male"),
+    ("su-ID-TutiNeural", "Female"),
+    ("sv-SE-MattiasNeural", "Male"),
+    ("sv-SE-SofieNeural", "Female"),
+    ("sw-KE-RafikiNeural", "Male"),
+    ("sw-KE-ZuriNeural", "Female"),
+    ("sw-TZ-DaudiNeural", "Male"),
+    ("sw-TZ-RehemaNeural", "Female"),
+    ("ta-IN-PallaviNeural", "Female"),
+    ("ta-IN-ValluvarNeural", "Male"),
+    ("ta-LK-KumarNeural", "Male"),
+    ("ta-LK-SaranyaNeural", "Female"),
+    ("ta-MY-KaniNeural", "Female"),
+    ("ta-MY-SuryaNeural", "Male"),
+    ("ta-SG-AnbuNeural", "Male"),
+    ("ta-SG-VenbaNeural", "Female"),
+    ("te-IN-MohanNeural", "Male"),
+    ("te-IN-ShrutiNeural", "Female"),
+    ("th-TH-NiwatNeural", "Male"),
+    ("th-TH-PremwadeeNeural", "Female"),
+    ("tr-TR-AhmetNeural", "Male"),
+    ("tr-TR-EmelNeural", "Female"),
+    ("uk-UA-OstapNeural", "Male"),
+    ("uk-UA-PolinaNeural", "Female"),
+    ("ur-IN-GulNeural", "Female"),
+    ("ur-IN-SalmanNeural", "Male"),
+    ("ur-PK-AsadNeural", "Male"),
+    ("ur-PK-UzmaNeural", "Female"),
+    ("uz-UZ-MadinaNeural", "Female"),
+    ("uz-UZ-SardorNeural", "Male"),
+    ("vi-VN-HoaiMyNeural", "Female"),
+    ("vi-VN-NamMinhNeural", "Male"),
+    ("zh-CN-XiaoxiaoNeural", "Female"),
+    ("zh-CN-XiaoyiNeural", "Female"),
+    ("zh-CN-YunjianNeural", "Male"),
+    ("zh-CN-YunxiNeural", "Male"),
+    ("zh-CN-YunxiaNeural", "Male"),
+    ("zh-CN-YunyangNeural", "Male"),
+    ("zh-CN-liaoning-XiaobeiNeural", "Female"),
+    ("zh-CN-shaanxi-XiaoniNeural", "Female"),
+    ("zh-HK-HiuGaaiNeural", "Female"),
+    ("zh-HK-HiuMaanNeural", "Female"),
+    ("zh-HK-WanLungNeural", "Male"),
+    ("zh-TW-HsiaoChenNeural", "Female"),
+    ("zh-TW-HsiaoYuNeural", "Female"),
+    ("zh-TW-YunJheNeural", "Male"),
+    ("zu-ZA-ThandoNeural", "Female"),
+    ("zu-ZA-ThembaNeural", "Male"),
+    ("en-US-AvaMultilingualNeural-V2", "Female"),
+    ("en-US-AndrewMultilingualNeural-V2", "Male"),
+    ("en-US-EmmaMultilingualNeural-V2", "Female"),
+    ("en-US-BrianMultilingualNeural-V2", "Male"),
+    ("de-DE-FlorianMultilingualNeural-V2", "Male"),
+    ("de-DE-SeraphinaMultilingualNeural-V2", "Female"),
+    ("fr-FR-RemyMultilingualNeural-V2", "Male"),
+    ("fr-FR-VivienneMultilingualNeural-V2", "Female"),
+    ("zh-CN-XiaoxiaoMultilingualNeural-V2", "Female"),
+    ("zh-CN-YunxiNeural-V2", "Male"),
+)
+
+
+@dataclass(frozen=True)
+class VoiceInfo:
+    """单个音色的结构化信息"""
+    name: str
+    gender: str
+    locale: str
+    engine: str
+
+    @property
+    def is_v2(self) -> bool:
+        return self.engine == ENGINE_AZURE_V2
+
+    @property
+    def display_name(self) -> str:
+        """界面与配置中使用的名称，如 zh-CN-XiaoxiaoNeural-Female"""
+        return f"{self.name}-{self.gender}"
+
+
+def _voice_locale(name: str) -> str:
+    """从音色名称中解析地区，如 zh-CN-liaoning-XiaobeiNeural -> zh-CN-liaoning"""
+    base = name[:-len(V2_SUFFIX)] if name.endswith(V2_SUFFIX) else name
+    return base.rsplit("-", 1)[0]
+
+
+def _make_voice(name: str, gender: str, locale: Optional[str] = None) -> VoiceInfo:
+    return VoiceInfo(
+        name=name,
+        gender=gender,
+        locale=locale or _voice_locale(name),
+        engine=ENGINE_AZURE_V2 if name.endswith(V2_SUFFIX) else ENGINE_EDGE,
+    )
+
+
+class VoiceCatalog:
+    """
+    音色目录
+
+    构建时一次性生成按名称、地区、性别、引擎的索引，之后的查询都是字典查找；
+    按地区过滤的列表结果也会缓存，Streamlit 每次重绘时不再重复解析和过滤。
+    """
+
+    def __init__(self, voices: Iterable[VoiceInfo]):
+        self._by_name: Dict[str, VoiceInfo] = {}
+        self._by_display_name: Dict[str, VoiceInfo] = {}
+        self._by_locale: Dict[str, List[VoiceInfo]] = {}
+        self._by_gender: Dict[str, List[VoiceInfo]] = {}
+        self._by_engine: Dict[str, List[VoiceInfo]] = {}
+
+        for voice in sorted(voices, key=lambda v: v.display_name):
+            if voice.name in self._by_name:
+                continue
+            self._by_name[voice.name] = voice
+            self._by_display_name[voice.display_name] = voice
+            self._by_locale.setdefault(voice.locale.lower(), []).append(voice)
+            self._by_gender.setdefault(voice.gender.lower(), []).append(voice)
+            self._by_engine.setdefault(voice.engine, []).append(voice)
+
+        self._filter_cache: Dict[Tuple, Tuple[str, ...]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._by_name)
+
+    def __contains__(self, voice_name: str) -> bool:
+        return self.lookup(voice_name) is not None
+
+    def lookup(self, voice_name: str) -> Optional[VoiceInfo]:
+        """
+        查找音色，支持带性别后缀的显示名称和不带后缀的音色名称
+
+        Args:
+            voice_name: 如 zh-CN-XiaoxiaoNeural-Female 或 zh-CN-XiaoxiaoNeural
+
+        Returns:
+            Optional[VoiceInfo]: 音色信息，不在目录中时返回None
+        """
+        if not voice_name:
+            return None
+        voice_name = voice_name.strip()
+        return self._by_display_name.get(voice_name) or self._by_name.get(voice_name)
+
+    def locales(self) -> List[str]:
+        return sorted({voice.locale for voices in self._by_locale.values() for voice in voices})
+
+    def voices(
+        self,
+        locales: Optional[Sequence[str]] = None,
+        gender: Optional[str] = None,
+        engine: Optional[str] = None
+    ) -> List[VoiceInfo]:
+        """
+        按条件筛选音色
+
+        Args:
+            locales: 地区前缀列表（不区分大小写，如 ["zh-CN", "en"]），为空时不过滤
+            gender: 性别（Female/Male），为None时不过滤
+            engine: 引擎（ENGINE_EDGE/ENGINE_AZURE_V2），为None时不过滤
+
+        Returns:
+            List[VoiceInfo]: 按显示名称排序的音色列表
+        """
+        if locales:
+            prefixes = tuple(locale.lower() for locale in locales)
+            candidates = [
+                voice
+                for locale, voices in self._by_locale.items()
+                if locale.startswith(prefixes)
+                for voice in voices
+            ]
+        elif engine:
+            candidates = list(self._by_engine.get(engine, []))
+        else:
+            candidates = list(self._by_display_name.values())
+
+        return sorted(
+            (
+                voice for voice in candidates
+                if (gender is None or voice.gender.lower() == gender.lower())
+                and (engine is None or voice.engine == engine)
+            ),
+            key=lambda v: v.display_name,
+        )
+
+    def display_names(
+        self,
+        locales: Optional[Sequence[str]] = None,
+        gender: Optional[str] = None,
+        engine: Optional[str] = None
+    ) -> List[str]:
+        """按条件筛选音色并返回显示名称列表，相同条件的结果会被缓存"""
+        key = (tuple(locales) if locales else (), gender, engine)
+        with self._lock:
+            cached = self._filter_cache.get(key)
+        if cached is None:
+            cached = tuple(voice.display_name for voice in self.voices(locales, gender, engine))
+            with self._lock:
+                self._filter_cache[key] = cached
+        return list(cached)
+
+
+_catalog: Optional[VoiceCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def _edge_voices_cache_path() -> str:
+    from app.utils import utils
+    return os.path.join(utils.storage_dir("cache", create=True), EDGE_VOICES_CACHE_FILE)
+
+
+def _load_edge_voices_cache(ttl: Optional[float] = EDGE_VOICES_TTL) -> Optional[List[VoiceInfo]]:
+    """读取磁盘上的 edge_tts 音色列表缓存，过期或损坏时返回None"""
+    path = _edge_voices_cache_path()
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if ttl is not None and time.time() - data.get("fetched_at", 0) > ttl:
+            return None
+        return [_make_voice(item["name"], item["gender"], item.get("locale")) for item in data["voices"]]
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.debug(f"读取音色列表缓存失败: {str(e)}")
+        return None
+
+
+def _build_catalog() -> VoiceCatalog:
+    voices = [_make_voice(name, gender) for name, gender in _BUILTIN_VOICES]
+    online_voices = _load_edge_voices_cache()
+    if online_voices:
+        voices.extend(online_voices)
+    return VoiceCatalog(voices)
+
+
+def get_catalog() -> VoiceCatalog:
+    """
+    获取进程内共享的音色目录（首次调用时构建）
+
+    目录由内置音色列表和未过期的 edge_tts 在线音色缓存（如果存在）合并而成，不会访问网络。
+
+    Returns:
+        VoiceCatalog: 音色目录
+    """
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = _build_catalog()
+    return _catalog
+
+
+def refresh_edge_voices(force: bool = False, proxy: Optional[str] = None) -> VoiceCatalog:
+    """
+    从 edge_tts 拉取在线音色列表并写入磁盘缓存，然后重建音色目录
+
+    缓存未过期且 force=False 时不访问网络。拉取失败时保留现有目录。
+
+    Args:
+        force: 是否忽略缓存有效期强制刷新
+        proxy: 访问 edge_tts 服务使用的代理
+
+    Returns:
+        VoiceCatalog: 刷新后的音色目录
+    """
+    global _catalog
+    if not force and _load_edge_voices_cache() is not None:
+        # 缓存可能是其它进程写入的，重建目录以合并最新的缓存内容
+        with _catalog_lock:
+            _catalog = _build_catalog()
+        return _catalog
+
+    try:
+        import edge_tts
+        raw_voices = run_sync(edge_tts.list_voices(proxy=proxy))
+    except Exception as e:
+        logger.warning(f"获取 edge_tts 在线音色列表失败: {str(e)}")
+        return get_catalog()
+
+    voices = [
+        {"name": item["ShortName"], "gender": item["Gender"], "locale": item.get("Locale")}
+        for item in raw_voices
+        if item.get("ShortName") and item.get("Gender")
+    ]
+    path = _edge_voices_cache_path()
+    temp_path = f"{path}.tmp"
+    try:
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"fetched_at": time.time(), "voices": voices}, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+    except OSError as e:
+        logger.warning(f"写入音色列表缓存失败: {str(e)}")
+
+    with _catalog_lock:
+        _catalog = _build_catalog()
+    logger.info(f"edge_tts 在线音色列表已刷新，共 {len(voices)} 个音色")
+    return _catalog
+
+
+def strip_gender_suffix(voice_name: str) -> str:
+    """去掉显示名称中的性别后缀，如 zh-CN-XiaoxiaoNeural-Female -> zh-CN-XiaoxiaoNeural"""
+    info = get_catalog().lookup(voice_name)
+    if info is not None:
+        return info.name
+    for suffix in GENDER_SUFFIXES:
+        voice_name = voice_name.replace(suffix, "")
+    return voice_name.strip()
@@ -0,0 +1,180 @@
+"""
+音色试听缓存
+
+试听按钮每次点击都用固定的示例句子调用一次 voice.tts，写入临时文件、播放后删除，
+逐个试听几十个音色时每次都要等待一次在线合成。这里：
+
+- 试听音频按 (TTS 引擎, 音色, 语速, 音调, 文本) 缓存在 storage/temp/voice_preview/ 下，
+  命中时直接返回磁盘文件，由存储管理器按访问时间统一清理
+- 后台预取线程为当前引擎的音色列表提前合成示例句子（[ui] voice_preview_prefetch 控制，默认开启）；
+  设置变化时丢弃尚未开始的旧任务，同一个音频不会被试听和预取重复合成
+"""
+
+import hashlib
+import json
+import os
+import queue
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+from loguru import logger
+
+from app.config import config
+from app.services import storage_manager, voice
+from app.utils import utils
+
+# 试听使用的示例句子
+PREVIEW_TEXT = "感谢关注 NarratoAI，有任何问题或建议，可以关注微信公众号，求助或讨论"
+PREVIEW_DIR_NAME = "voice_preview"
+
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def _lock_for(key: str) -> threading.Lock:
+    with _locks_guard:
+        return _locks.setdefault(key, threading.Lock())
+
+
+def preview_key(engine: str, voice_name: str, voice_rate: float, voice_pitch: float, text: str = PREVIEW_TEXT) -> str:
+    """试听音频的缓存键"""
+    parts = [engine or "", voice_name, round(float(voice_rate), 3), round(float(voice_pitch), 3), text]
+    return hashlib.md5(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def preview_path(engine: str, voice_name: str, voice_rate: float, voice_pitch: float, text: str = PREVIEW_TEXT) -> str:
+    """试听音频的缓存路径（不保证存在）"""
+    directory = os.path.join(utils.storage_dir("temp", create=True), PREVIEW_DIR_NAME)
+    return os.path.join(directory, f"{preview_key(engine, voice_name, voice_rate, voice_pitch, text)}.mp3")
+
+
+def cached_preview(
+    engine: str, voice_name: str, voice_rate: float, voice_pitch: float, text: str = PREVIEW_TEXT
+) -> Optional[str]:
+    """已缓存的试听音频路径，没有缓存时返回None"""
+    path = preview_path(engine, voice_name, voice_rate, voice_pitch, text)
+    if os.path.isfile(path) and os.path.getsize(path) > 0:
+        storage_manager.touch(path)
+        return path
+    return None
+
+
+def get_preview(
+    engine: str, voice_name: str, voice_rate: float, voice_pitch: float, text: str = PREVIEW_TEXT
+) -> Optional[str]:
+    """
+    获取试听音频，没有缓存时合成并写入缓存
+
+    Args:
+        engine: TTS 引擎
+        voice_name: 音色名称（与 voice.tts 的 voice_name 相同）
+        voice_rate: 语速
+        voice_pitch: 音调
+        text: 试听文本
+
+    Returns:
+        Optional[str]: 试听音频路径，合成失败时返回None
+    """
+    key = preview_key(engine, voice_name, voice_rate, voice_pitch, text)
+    # 同一个音频正在被预取时等待其完成，而不是重复合成
+    with _lock_for(key):
+        path = cached_preview(engine, voice_name, voice_rate, voice_pitch, text)
+        if path:
+            return path
+
+        path = preview_path(engine, voice_name, voice_rate, voice_pitch, text)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        part = f"{os.path.splitext(path)[0]}.part.mp3"
+        try:
+            sub_maker = voice.tts(
+                text=text,
+                voice_name=voice_name,
+                voice_rate=voice_rate,
+                voice_pitch=voice_pitch,
+                voice_file=part,
+                tts_engine=engine,
+            )
+            if not sub_maker or not os.path.isfile(part) or os.path.getsize(part) == 0:
+                logger.warning(f"试听音频合成失败: {engine} / {voice_name}")
+                return None
+            os.replace(part, path)
+        finally:
+            if os.path.exists(part):
+                os.remove(part)
+        storage_manager.touch(path, written=True)
+        return path
+
+
+class PreviewPrefetcher:
+    """在后台按顺序预先合成试听音频的单线程预取器"""
+
+    def __init__(self):
+        self._queue: "queue.Queue[Tuple[int, Tuple]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._current: Optional[Tuple] = None
+        self._worker: Optional[threading.Thread] = None
+
+    def prefetch(
+        self,
+        engine: str,
+        voices: Iterable[str],
+        voice_rate: float,
+        voice_pitch: float,
+        text: str = PREVIEW_TEXT
+    ) -> None:
+        """
+        预取一组音色的试听音频，参数与上一次相同时不做任何事
+
+        新的请求会让尚未开始的旧任务失效（Streamlit 每次交互都会重新执行页面，设置变化后只保留最新的一组）
+        """
+        voices = tuple(dict.fromkeys(v for v in voices if v))
+        request = (engine, voices, round(float(voice_rate), 3), round(float(voice_pitch), 3), text)
+        with self._lock:
+            if request == self._current:
+                return
+            self._current = request
+            self._generation += 1
+            generation = self._generation
+            for voice_name in voices:
+                self._queue.put((generation, (engine, voice_name, voice_rate, voice_pitch, text)))
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="voice-preview-prefetch", daemon=True)
+                self._worker.start()
+        logger.debug(f"预取 {engine} 的 {len(voices)} 个音色试听")
+
+    def _run(self) -> None:
+        while True:
+            try:
+                generation, args = self._queue.get(timeout=60)
+            except queue.Empty:
+                with self._lock:
+                    if self._queue.empty():
+                        self._worker = None
+                        return
+                continue
+            if generation != self._generation or cached_preview(*args):
+                continue
+            try:
+                get_preview(*args)
+            except Exception as e:
+                logger.warning(f"预取试听音频失败 {args[0]} / {args[1]}: {str(e)}")
+
+
+_prefetcher = PreviewPrefetcher()
+
+
+def prefetch(engine: str, voices: Iterable[str], voice_rate: float, voice_pitch: float, text: str = PREVIEW_TEXT) -> None:
+    """
+    在后台预取试听音频（[ui] voice_preview_prefetch 关闭时不做任何事）
+
+    Args:
+        engine: TTS 引擎
+        voices: 需要预取的音色，按顺序合成（当前选中的音色应放在最前面）
+        voice_rate: 语速
+        voice_pitch: 音调
+        text: 试听文本
+    """
+    if not config.ui.get("voice_preview_prefetch", True):
+        return
+    _prefetcher.prefetch(engine, voices, voice_rate, voice_pitch, text)
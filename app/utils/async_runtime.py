@@ -0,0 +1,191 @@
+"""
+进程级异步运行时 - 同步代码调用协程的统一入口
+
+在一个专用的后台线程上运行一个长期存在的事件循环，同步代码通过 `run_sync` 把协程提交过去并等待结果。
+与每次调用都新建事件循环（asyncio.run / new_event_loop）相比，HTTP 连接池、TLS 会话和
+litellm 等客户端缓存的异步状态都绑定在同一个事件循环上，可以在多次调用之间复用。
+"""
+
+import asyncio
+import atexit
+import concurrent.futures
+import os
+import threading
+from typing import Any, AsyncIterable, Awaitable, Callable, Iterator, Optional, TypeVar, Union
+
+from loguru import logger
+
+T = TypeVar("T")
+
+# 关闭运行时时等待事件循环线程退出的时间（秒）
+SHUTDOWN_TIMEOUT = 5.0
+
+# 异步迭代结束的标记
+_EXHAUSTED = object()
+
+
+class AsyncRuntime:
+    """在专用线程上运行的长期事件循环"""
+
+    def __init__(self, name: str = "narrato-async-runtime"):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """获取运行中的事件循环，必要时启动后台线程"""
+        with self._lock:
+            # fork 出的子进程不会继承事件循环线程，需要重新启动
+            if self._loop is None or self._loop.is_closed() or self._pid != os.getpid():
+                self._start()
+            return self._loop
+
+    def _start(self) -> None:
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def _run() -> None:
+            asyncio.set_event_loop(loop)
+            loop.call_soon(ready.set)
+            try:
+                loop.run_forever()
+            finally:
+                try:
+                    loop.run_until_complete(loop.shutdown_asyncgens())
+                except Exception:
+                    pass
+                loop.close()
+
+        thread = threading.Thread(target=_run, name=self.name, daemon=True)
+        thread.start()
+        ready.wait()
+
+        self._loop = loop
+        self._thread = thread
+        self._pid = os.getpid()
+        logger.debug(f"异步运行时已启动: {self.name}")
+
+    def in_runtime_thread(self) -> bool:
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def submit(self, coro: Awaitable[T]) -> "concurrent.futures.Future[T]":
+        """
+        把协程提交到后台事件循环，立即返回 concurrent.futures.Future
+
+        Args:
+            coro: 协程对象
+
+        Returns:
+            concurrent.futures.Future: 协程执行结果
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+        """
+        在后台事件循环上执行协程并阻塞等待结果
+
+        Args:
+            coro: 协程对象
+            timeout: 等待超时时间（秒），超时后取消协程
+
+        Returns:
+            协程的返回值
+
+        Raises:
+            TimeoutError: 等待超时
+            协程本身抛出的异常
+        """
+        if self.in_runtime_thread():
+            # 在运行时线程内同步等待会造成死锁，退回到临时线程 + 临时事件循环
+            logger.warning("在异步运行时线程内发起同步调用，改用临时事件循环执行")
+            with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+                return executor.submit(asyncio.run, coro).result(timeout)
+
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise TimeoutError(f"异步任务超过 {timeout} 秒未完成")
+
+    def shutdown(self) -> None:
+        """停止事件循环并等待后台线程退出"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = None
+            self._thread = None
+        if loop is None or loop.is_closed() or self._pid != os.getpid():
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(SHUTDOWN_TIMEOUT)
+
+
+_runtime = AsyncRuntime()
+atexit.register(_runtime.shutdown)
+
+
+def get_runtime() -> AsyncRuntime:
+    """获取进程级共享的异步运行时"""
+    return _runtime
+
+
+def run_sync(
+    coro_or_func: Union[Awaitable[T], Callable[..., Awaitable[T]]],
+    *args: Any,
+    timeout: Optional[float] = None,
+    **kwargs: Any
+) -> T:
+    """
+    在共享的后台事件循环上执行协程，并在当前线程同步返回结果
+
+    Args:
+        coro_or_func: 协程对象，或返回协程的函数（此时使用 args/kwargs 调用）
+        *args: 协程函数的位置参数
+        timeout: 等待超时时间（秒）
+        **kwargs: 协程函数的关键字参数
+
+    Returns:
+        协程的返回值
+    """
+    coro = coro_or_func(*args, **kwargs) if callable(coro_or_func) else coro_or_func
+    return _runtime.run(coro, timeout=timeout)
+
+
+def iterate_sync(aiterable: AsyncIterable[T], timeout: Optional[float] = None) -> Iterator[T]:
+    """
+    在共享的后台事件循环上驱动异步迭代器，在当前线程逐个返回元素
+
+    元素在调用方线程中产出，Streamlit 等要求在脚本线程中更新界面的调用方可以直接使用
+
+    Args:
+        aiterable: 异步可迭代对象（如异步生成器）
+        timeout: 等待下一个元素的超时时间（秒）
+
+    Yields:
+        异步迭代器产出的元素
+    """
+    iterator = aiterable.__aiter__()
+
+    async def _next():
+        try:
+            return await iterator.__anext__()
+        except StopAsyncIteration:
+            return _EXHAUSTED
+
+    try:
+        while True:
+            item = _runtime.run(_next(), timeout=timeout)
+            if item is _EXHAUSTED:
+                return
+            yield item
+    finally:
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            try:
+                _runtime.run(aclose(), timeout=SHUTDOWN_TIMEOUT)
+            except Exception:
+                pass
@@ -0,0 +1,339 @@
+"""
+FFmpeg 执行器模块 - 统一的 ffmpeg 子进程运行入口
+
+主要特点：
+1. 通过 `-progress pipe:1` 流式解析进度，而不是等待进程结束
+2. 检测卡死（长时间没有新的进度输出）并终止进程，交给调用方的fallback链重试
+3. 支持单任务超时
+4. stderr 只保留最近若干行（环形缓冲区），避免大量日志堆积在内存中
+"""
+
+import io
+import os
+import re
+import subprocess
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, List, Optional
+
+from loguru import logger
+
+# 默认卡死检测时间（秒）：超过该时间没有输出任何进度块则认为进程卡死
+# （输出端 -ss 定位时 ffmpeg 要先解码到起始位置，这段时间帧数和 out_time 都不变，但仍会定期输出进度块）
+DEFAULT_STALL_TIMEOUT = 60.0
+# stderr 环形缓冲区保留的行数
+STDERR_TAIL_LINES = 200
+# 进度回调的最小变化量，避免频繁写入任务状态
+PROGRESS_REPORT_STEP = 0.01
+
+_DURATION_PATTERN = re.compile(r"Duration:\s*(\d+):(\d{2}):(\d{2}(?:\.\d+)?)")
+
+ProgressCallback = Callable[[float], None]
+
+
+class FFmpegStallError(subprocess.CalledProcessError):
+    """ffmpeg 进程长时间没有进度，已被终止"""
+
+
+class FFmpegTimeoutError(subprocess.CalledProcessError):
+    """ffmpeg 进程超过单任务超时时间，已被终止"""
+
+
+@dataclass
+class FFmpegResult:
+    """ffmpeg 执行结果"""
+    returncode: int
+    stderr: str
+    elapsed: float
+
+
+def _is_ffmpeg(cmd: List[str]) -> bool:
+    executable = os.path.basename(cmd[0]).lower() if cmd else ""
+    return executable in ("ffmpeg", "ffmpeg.exe")
+
+
+def _with_progress_args(cmd: List[str]) -> List[str]:
+    """在可执行文件之后插入进度输出参数"""
+    if not _is_ffmpeg(cmd) or "-progress" in cmd:
+        return list(cmd)
+    return [cmd[0], "-progress", "pipe:1", "-nostats"] + list(cmd[1:])
+
+
+def _parse_duration(line: str) -> Optional[float]:
+    match = _DURATION_PATTERN.search(line)
+    if not match:
+        return None
+    h, m, s = match.groups()
+    return int(h) * 3600 + int(m) * 60 + float(s)
+
+
+class _ProgressTracker:
+    """汇总 stdout 进度输出与 stderr 尾部信息，供主线程轮询"""
+
+    def __init__(
+        self,
+        duration: Optional[float],
+        callback: Optional[ProgressCallback],
+        stderr_handler: Optional[Callable[[str], None]] = None
+    ):
+        self.duration = duration if duration and duration > 0 else None
+        self.callback = callback
+        self.stderr_handler = stderr_handler
+        self.stderr_tail: Deque[str] = deque(maxlen=STDERR_TAIL_LINES)
+        self.last_advance = time.monotonic()
+        self._frame = -1
+        self._out_time = -1.0
+        self._reported = -1.0
+        self._lock = threading.Lock()
+
+    def on_progress_line(self, line: str) -> None:
+        key, _, value = line.strip().partition("=")
+        if not value:
+            return
+        advanced = False
+        with self._lock:
+            if key == "frame":
+                try:
+                    frame = int(value)
+                except ValueError:
+                    return
+                if frame > self._frame:
+                    self._frame = frame
+                    advanced = True
+            elif key in ("out_time_us", "out_time_ms"):
+                # 两个字段的单位都是微秒（out_time_ms 是 ffmpeg 的历史命名问题）
+                try:
+                    out_time = int(value) / 1_000_000
+                except ValueError:
+                    return
+                if out_time > self._out_time:
+                    self._out_time = out_time
+                    advanced = True
+            elif key == "progress":
+                # 每个进度块以 progress=continue/end 结尾，收到即说明进程仍在处理数据
+                self.last_advance = time.monotonic()
+                if value == "end":
+                    self._report(1.0)
+                return
+            if advanced:
+                self.last_advance = time.monotonic()
+                if self.duration and self._out_time >= 0:
+                    self._report(min(self._out_time / self.duration, 1.0))
+
+    def on_stderr_line(self, line: str) -> None:
+        line = line.rstrip()
+        if not line:
+            return
+        self.stderr_tail.append(line)
+        if self.stderr_handler is not None:
+            try:
+                self.stderr_handler(line)
+            except Exception as e:
+                logger.debug(f"处理ffmpeg日志失败: {str(e)}")
+        if self.duration is None:
+            # 未指定时长时，从输入信息中解析第一个 Duration
+            self.duration = _parse_duration(line)
+
+    def _report(self, fraction: float) -> None:
+        if self.callback is None:
+            return
+        if fraction < 1.0 and fraction - self._reported < PROGRESS_REPORT_STEP:
+            return
+        self._reported = fraction
+        try:
+            self.callback(fraction)
+        except Exception as e:
+            logger.debug(f"进度回调失败: {str(e)}")
+
+    def stderr_text(self) -> str:
+        return "\n".join(self.stderr_tail)
+
+
+def _pump(stream, handler: Callable[[str], None]) -> None:
+    try:
+        for line in iter(stream.readline, ""):
+            handler(line)
+    except Exception as e:
+        logger.debug(f"读取ffmpeg输出失败: {str(e)}")
+    finally:
+        try:
+            stream.close()
+        except Exception:
+            pass
+
+
+class StderrTail:
+    """
+    在后台线程持续读取（二进制）stderr 管道，只保留最后 STDERR_TAIL_LINES 行
+
+    供直接用管道读取 ffmpeg 输出（原始像素、PCM 等）的调用方使用：stderr 如果等进程结束才读取，
+    大量解码错误会写满管道，ffmpeg 阻塞在写 stderr 上，调用方阻塞在读 stdout 上，两边互相等待
+    """
+
+    def __init__(self, stream):
+        self._lines: Deque[str] = deque(maxlen=STDERR_TAIL_LINES)
+        text_stream = io.TextIOWrapper(stream, encoding="utf-8", errors="replace")
+        self._thread = threading.Thread(target=_pump, args=(text_stream, self._append), name="ffmpeg-stderr", daemon=True)
+        self._thread.start()
+
+    def _append(self, line: str) -> None:
+        line = line.rstrip()
+        if line:
+            self._lines.append(line)
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        """等待读取线程结束（进程退出、管道关闭后返回）"""
+        self._thread.join(timeout)
+
+    def text(self) -> str:
+        """等待读取结束并返回保留的 stderr 内容"""
+        self.join()
+        return "\n".join(self._lines)
+
+
+def _kill(process: subprocess.Popen) -> None:
+    try:
+        process.kill()
+    except Exception:
+        pass
+    try:
+        process.wait(timeout=5)
+    except Exception:
+        pass
+
+
+def run_ffmpeg(
+    cmd: List[str],
+    duration: Optional[float] = None,
+    progress_callback: Optional[ProgressCallback] = None,
+    stall_timeout: Optional[float] = DEFAULT_STALL_TIMEOUT,
+    timeout: Optional[float] = None,
+    check: bool = True,
+    stderr_handler: Optional[Callable[[str], None]] = None,
+) -> FFmpegResult:
+    """
+    执行ffmpeg命令，流式解析进度并检测卡死
+
+    Args:
+        cmd: ffmpeg 命令列表
+        duration: 输出的预期时长（秒），用于计算进度；为None时从输入信息中解析
+        progress_callback: 进度回调，参数为 0~1 的完成比例
+        stall_timeout: 卡死检测时间（秒），超过该时间没有新的进度块时终止进程，为None时不检测
+        timeout: 单任务超时时间（秒），为None时不限制
+        check: 返回码非0时是否抛出 CalledProcessError
+        stderr_handler: 逐行处理stderr的回调，用于解析滤镜输出的完整日志（如ebur128）
+
+    Returns:
+        FFmpegResult: 执行结果，stderr 只包含最后 STDERR_TAIL_LINES 行
+
+    Raises:
+        FFmpegStallError: 进程卡死并被终止
+        FFmpegTimeoutError: 进程超时并被终止
+        subprocess.CalledProcessError: check=True 且返回码非0
+    """
+    full_cmd = _with_progress_args(cmd)
+    tracker = _ProgressTracker(duration, progress_callback, stderr_handler)
+
+    process = subprocess.Popen(
+        full_cmd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+    )
+    readers = [
+        threading.Thread(target=_pump, args=(process.stdout, tracker.on_progress_line), daemon=True),
+        threading.Thread(target=_pump, args=(process.stderr, tracker.on_stderr_line), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+
+    started = time.monotonic()
+    error_cls = None
+    while True:
+        try:
+            process.wait(timeout=0.5)
+            break
+        except subprocess.TimeoutExpired:
+            pass
+
+        now = time.monotonic()
+        if timeout and now - started > timeout:
+            error_cls = FFmpegTimeoutError
+            logger.warning(f"ffmpeg 执行超过 {timeout:.0f} 秒，终止进程")
+        elif stall_timeout and now - tracker.last_advance > stall_timeout:
+            error_cls = FFmpegStallError
+            logger.warning(f"ffmpeg 已 {stall_timeout:.0f} 秒没有进度，判定为卡死并终止进程")
+        if error_cls is not None:
+            _kill(process)
+            break
+
+    for reader in readers:
+        reader.join(timeout=5)
+
+    elapsed = time.monotonic() - started
+    stderr = tracker.stderr_text()
+
+    if error_cls is not None:
+        reason = "stalled" if error_cls is FFmpegStallError else "timeout"
+        raise error_cls(process.returncode or -9, full_cmd, output="", stderr=f"{stderr}\nffmpeg {reason}".strip())
+
+    if check and process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, full_cmd, output="", stderr=stderr)
+
+    return FFmpegResult(returncode=process.returncode, stderr=stderr, elapsed=elapsed)
+
+
+def scale_progress(callback: Optional[ProgressCallback], start: float, end: float) -> Optional[ProgressCallback]:
+    """
+    将 0~1 的进度映射到 [start, end] 区间后再回调，用于多段任务的整体进度
+
+    Args:
+        callback: 原始进度回调
+        start: 区间起点（0~1）
+        end: 区间终点（0~1）
+
+    Returns:
+        Optional[ProgressCallback]: 映射后的回调，callback为None时返回None
+    """
+    if callback is None:
+        return None
+
+    def _scaled(fraction: float) -> None:
+        callback(start + (end - start) * fraction)
+
+    return _scaled
+
+
+def state_progress_callback(task_id: Optional[str], start: int, end: int) -> Optional[ProgressCallback]:
+    """
+    生成写入任务状态的进度回调，把 0~1 的完成比例映射为 [start, end] 的任务进度
+
+    Args:
+        task_id: 任务ID，为None时不上报
+        start: 该阶段开始时的任务进度
+        end: 该阶段结束时的任务进度
+
+    Returns:
+        Optional[ProgressCallback]: 进度回调
+    """
+    if not task_id:
+        return None
+
+    from app.models import const
+    from app.services import state as sm
+
+    def _update(fraction: float) -> None:
+        progress = start + (end - start) * max(0.0, min(fraction, 1.0))
+        sm.state.update_task(
+            task_id,
+            state=const.TASK_STATE_PROCESSING,
+            progress=int(progress),
+            stage_progress=round(fraction, 3),
+        )
+
+    return _update
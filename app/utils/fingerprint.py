@@ -0,0 +1,117 @@
+"""
+文件指纹工具 - 基于文件内容生成稳定的缓存键
+
+与 md5(路径 + 修改时间) 不同，内容指纹在文件被重命名、复制后保持不变。
+对大文件只采样头部、中部、尾部若干字节，避免每次读取整个视频。
+
+流式写入文件（如上传视频）时可以用 FingerprintBuilder 在写入过程中同步计算指纹，
+写入完成后通过 seed_fingerprint 放入缓存，之后的 file_fingerprint 调用不需要再读文件。
+"""
+
+import hashlib
+import os
+import threading
+from typing import Dict, List, Tuple
+
+# 每个采样块的大小
+SAMPLE_SIZE = 1024 * 1024
+# 小于该大小的文件直接对全部内容计算哈希
+FULL_HASH_LIMIT = 4 * SAMPLE_SIZE
+
+_cache: Dict[Tuple[str, int, int], str] = {}
+_lock = threading.Lock()
+
+
+def _stat_key(path: str) -> Tuple[str, int, int]:
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+
+
+def _sample_ranges(size: int) -> List[Tuple[int, int]]:
+    """参与指纹计算的字节区间 [start, end)"""
+    if size <= FULL_HASH_LIMIT:
+        return [(0, size)]
+    return [
+        (offset, offset + SAMPLE_SIZE)
+        for offset in (0, size // 2 - SAMPLE_SIZE // 2, size - SAMPLE_SIZE)
+    ]
+
+
+def _compute(path: str, size: int) -> str:
+    hasher = hashlib.sha256()
+    hasher.update(str(size).encode())
+    with open(path, "rb") as f:
+        for start, end in _sample_ranges(size):
+            f.seek(start)
+            hasher.update(f.read(end - start))
+    return hasher.hexdigest()
+
+
+def file_fingerprint(path: str) -> str:
+    """
+    获取文件的内容指纹
+
+    同一文件（路径、大小、修改时间均未变化）的结果会被缓存在进程内存中
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        str: 十六进制指纹字符串
+    """
+    key = _stat_key(path)
+    with _lock:
+        cached = _cache.get(key)
+    if cached:
+        return cached
+
+    fingerprint = _compute(path, key[1])
+    with _lock:
+        _cache[key] = fingerprint
+    return fingerprint
+
+
+class FingerprintBuilder:
+    """
+    按顺序接收文件内容，增量计算与 file_fingerprint 相同的指纹
+
+    需要预先知道文件的总大小（上传文件都会提供）
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._ranges = _sample_ranges(size)
+        self._buffers = [bytearray() for _ in self._ranges]
+        self._offset = 0
+
+    def update(self, chunk: bytes) -> None:
+        start = self._offset
+        end = start + len(chunk)
+        for (range_start, range_end), buffer in zip(self._ranges, self._buffers):
+            lo, hi = max(start, range_start), min(end, range_end)
+            if lo < hi:
+                buffer += chunk[lo - start:hi - start]
+        self._offset = end
+
+    def hexdigest(self) -> str:
+        """
+        Returns:
+            str: 十六进制指纹字符串
+
+        Raises:
+            ValueError: 接收的字节数与声明的文件大小不一致
+        """
+        if self._offset != self.size:
+            raise ValueError(f"已接收 {self._offset} 字节，与文件大小 {self.size} 不一致")
+        hasher = hashlib.sha256()
+        hasher.update(str(self.size).encode())
+        for buffer in self._buffers:
+            hasher.update(buffer)
+        return hasher.hexdigest()
+
+
+def seed_fingerprint(path: str, fingerprint: str) -> None:
+    """把写入时已计算好的指纹放入缓存（文件写入并关闭后调用）"""
+    key = _stat_key(path)
+    with _lock:
+        _cache[key] = fingerprint
@@ -0,0 +1,263 @@
+"""
+关键帧流式解码（共享内存帧环）
+
+原来的关键帧提取对每个时间点启动一次 ffmpeg（-ss 定位后输出一张全分辨率 PNG，再转成 JPEG 写盘），
+视觉分析时再从磁盘读回、缩放到 1024 以内、重新编码成 JPEG 后 base64。一个 60 分钟的视频按 3 秒间隔
+要启动 1200 次 ffmpeg，每一帧经历 PNG 编码、PNG 解码、JPEG 编码、JPEG 解码、JPEG 编码共五次编解码。
+
+流式方案：
+
+- 只启动一个 ffmpeg 解码器，用 fps 滤镜按间隔取帧，并直接缩放到视觉模型使用的尺寸（最长边不超过 1024），
+  以 rgb24 原始像素写到标准输出
+- 读取线程把像素直接 readinto 到预先分配的 NumPy 环形缓冲区（FrameRing）的空闲槽位，
+  消费者取出后编码一次 JPEG 并归还槽位；缓冲区满时读取线程阻塞，ffmpeg 随管道自然背压
+- 编码好的 JPEG 字节挂在 PIL 图片上（encoded_jpeg），视觉模型提供商直接 base64，不再解码和重新编码；
+  同样的字节也可以原样写入关键帧存储作为磁盘缓存
+"""
+
+import io
+import math
+import subprocess
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+from PIL import Image
+
+from app.utils.ffmpeg_runner import StderrTail
+
+# 视觉模型使用的最长边（与 BaseLLMProvider._prepare_images 的缩放上限一致）
+DEFAULT_MAX_SIDE = 1024
+# 环形缓冲区的槽位数
+DEFAULT_CAPACITY = 8
+# JPEG 编码质量（与视觉模型提供商的 _image_to_base64 一致）
+JPEG_QUALITY = 85
+
+
+def output_size(width: int, height: int, max_side: int = DEFAULT_MAX_SIDE) -> Tuple[int, int]:
+    """
+    按最长边不超过 max_side 等比缩放后的尺寸（宽高取偶数）
+
+    Returns:
+        Tuple[int, int]: (宽, 高)
+    """
+    scale = min(1.0, max_side / max(width, height, 1))
+    out_width = max(2, int(width * scale) // 2 * 2)
+    out_height = max(2, int(height * scale) // 2 * 2)
+    return out_width, out_height
+
+
+def frame_name(timestamp: float, fps: float) -> str:
+    """与关键帧提取一致的文件名 keyframe_<帧号>_<HHMMSSmmm>.jpg"""
+    frame_number = int(timestamp * fps)
+    hours = int(timestamp // 3600)
+    minutes = int((timestamp % 3600) // 60)
+    seconds = int(timestamp % 60)
+    milliseconds = int((timestamp % 1) * 1000)
+    return f"keyframe_{frame_number:06d}_{hours:02d}{minutes:02d}{seconds:02d}{milliseconds:03d}.jpg"
+
+
+def encoded_jpeg(img: Image.Image) -> Optional[bytes]:
+    """流式解码时已经编码好的 JPEG 字节，普通图片返回None"""
+    return getattr(img, "encoded_jpeg", None)
+
+
+class FrameRing:
+    """
+    固定槽位的帧缓冲区
+
+    生产者 acquire 一个空闲槽位、写入像素后 publish；消费者 take 取出已就绪的槽位，用完后 release 归还
+    """
+
+    def __init__(self, capacity: int, height: int, width: int):
+        self.buffer = np.empty((capacity, height, width, 3), dtype=np.uint8)
+        self._cond = threading.Condition()
+        self._free = deque(range(capacity))
+        self._ready = deque()
+        self._closed = False
+        self._cancelled = False
+        self._error: Optional[BaseException] = None
+
+    def acquire(self) -> Optional[int]:
+        """等待一个空闲槽位，消费者已取消时返回None"""
+        with self._cond:
+            while not self._free and not self._cancelled:
+                self._cond.wait()
+            if self._cancelled:
+                return None
+            return self._free.popleft()
+
+    def publish(self, slot: int, index: int) -> None:
+        """槽位写入完成，交给消费者"""
+        with self._cond:
+            self._ready.append((slot, index))
+            self._cond.notify_all()
+
+    def take(self) -> Optional[Tuple[int, int]]:
+        """
+        取出下一个就绪的槽位
+
+        Returns:
+            Optional[Tuple[int, int]]: (槽位, 帧序号)，生产者已结束且没有剩余帧时返回None
+
+        Raises:
+            生产者记录的异常
+        """
+        with self._cond:
+            while not self._ready and not self._closed:
+                self._cond.wait()
+            if self._ready:
+                return self._ready.popleft()
+            if self._error is not None:
+                raise self._error
+            return None
+
+    def release(self, slot: int) -> None:
+        """归还槽位"""
+        with self._cond:
+            self._free.append(slot)
+            self._cond.notify_all()
+
+    def close(self, error: Optional[BaseException] = None) -> None:
+        """生产者结束（error 不为None表示异常结束）"""
+        with self._cond:
+            self._closed = True
+            self._error = error
+            self._cond.notify_all()
+
+    def cancel(self) -> None:
+        """消费者提前退出，唤醒等待槽位的生产者"""
+        with self._cond:
+            self._cancelled = True
+            self._cond.notify_all()
+
+
+@dataclass
+class StreamedFrame:
+    """一帧已编码的关键帧"""
+    index: int
+    time: float
+    name: str
+    data: bytes
+
+    def image(self) -> Image.Image:
+        """延迟解码的 PIL 图片，携带编码好的 JPEG 字节（encoded_jpeg）"""
+        img = Image.open(io.BytesIO(self.data))
+        img.encoded_jpeg = self.data
+        return img
+
+
+def _read_frames(stdout, ring: FrameRing, frame_bytes: int) -> None:
+    """读取线程：把 ffmpeg 输出的原始像素逐帧写入帧环"""
+    index = 0
+    error = None
+    try:
+        while True:
+            slot = ring.acquire()
+            if slot is None:
+                break
+            view = memoryview(ring.buffer[slot]).cast("B")
+            filled = 0
+            while filled < frame_bytes:
+                count = stdout.readinto(view[filled:])
+                if not count:
+                    break
+                filled += count
+            if filled == 0:
+                ring.release(slot)
+                break
+            if filled < frame_bytes:
+                raise IOError(f"关键帧数据不完整: {filled}/{frame_bytes} 字节")
+            ring.publish(slot, index)
+            index += 1
+    except BaseException as e:
+        error = e
+    finally:
+        ring.close(error)
+
+
+def stream_keyframes(
+    video_path: str,
+    interval: float,
+    width: int,
+    height: int,
+    fps: float,
+    duration: Optional[float] = None,
+    max_side: int = DEFAULT_MAX_SIDE,
+    capacity: int = DEFAULT_CAPACITY
+) -> Iterator[StreamedFrame]:
+    """
+    按间隔流式解码关键帧，每帧只编码一次 JPEG
+
+    Args:
+        video_path: 视频文件路径
+        interval: 帧间隔（秒），第 k 帧取自 k * interval 秒
+        width: 原视频宽度
+        height: 原视频高度
+        fps: 原视频帧率（用于生成与磁盘关键帧一致的文件名）
+        duration: 视频时长（秒），用于限制帧数，为空时读到视频结束
+        max_side: 输出帧的最长边
+        capacity: 帧环槽位数
+
+    Yields:
+        StreamedFrame: 按时间顺序的关键帧
+
+    Raises:
+        RuntimeError: ffmpeg 解码失败
+    """
+    out_width, out_height = output_size(width, height, max_side)
+    # round=up 让第 k 帧取自 k * interval 秒处（默认的 round=near 会取到约 (k + 0.5) * interval 秒处，
+    # 与 -ss 定位提取的帧和文件名中的时间不一致）
+    # 宽高比与探测结果不一致时（如带旋转信息的竖屏视频）等比缩放并补边，保证每帧大小固定
+    vf = (
+        f"fps=1/{interval}:round=up,"
+        f"scale={out_width}:{out_height}:force_original_aspect_ratio=decrease,"
+        f"pad={out_width}:{out_height}:(ow-iw)/2:(oh-ih)/2"
+    )
+    cmd = ["ffmpeg", "-hide_banner", "-nostats", "-loglevel", "error", "-i", video_path, "-vf", vf]
+    if duration:
+        cmd += ["-frames:v", str(max(1, math.ceil(duration / interval - 1e-9)))]
+    cmd += ["-f", "rawvideo", "-pix_fmt", "rgb24", "pipe:1"]
+
+    logger.info(f"流式解码关键帧: 间隔 {interval}秒, 输出 {out_width}x{out_height}")
+    process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stderr_tail = StderrTail(process.stderr)
+    ring = FrameRing(capacity, out_height, out_width)
+    reader = threading.Thread(
+        target=_read_frames,
+        args=(process.stdout, ring, out_width * out_height * 3),
+        name="keyframe-reader",
+        daemon=True,
+    )
+    reader.start()
+    finished = False
+    try:
+        while True:
+            item = ring.take()
+            if item is None:
+                break
+            slot, index = item
+            try:
+                img = Image.frombuffer("RGB", (out_width, out_height), ring.buffer[slot], "raw", "RGB", 0, 1)
+                buffer = io.BytesIO()
+                img.save(buffer, format="JPEG", quality=JPEG_QUALITY)
+            finally:
+                ring.release(slot)
+            timestamp = round(index * interval, 3)
+            yield StreamedFrame(index=index, time=timestamp, name=frame_name(timestamp, fps), data=buffer.getvalue())
+
+        returncode = process.wait()
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg 流式解码失败 (返回码 {returncode}): {stderr_tail.text()}")
+        finished = True
+    finally:
+        ring.cancel()
+        if not finished and process.poll() is None:
+            process.kill()
+        process.wait()
+        reader.join()
+        stderr_tail.join()
+        process.stdout.close()
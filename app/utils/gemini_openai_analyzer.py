@@ -17,6 +17,7 @@ import traceback
 import base64
 import io
 from app.utils import utils
+from app.utils.async_runtime import run_sync
 
 
 class GeminiOpenAIAnalyzer:
@@ -174,4 +175,4 @@ class GeminiOpenAIAnalyzer:
         """
         同步版本的图片分析方法
         """
-        return asyncio.run(self.analyze_images(images, prompt, batch_size))
+        return run_sync(self.analyze_images(images, prompt, batch_size))
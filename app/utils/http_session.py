@@ -0,0 +1,226 @@
+"""
+共享的 HTTP 会话
+
+requests.get() 每次调用都会新建连接（TCP + TLS 握手），批量下载或频繁调用同一服务时开销明显。
+这里按名称提供进程共享的 requests.Session，连接池大小可配置，同一主机的连接在多次请求之间复用。
+
+另外提供带重试的请求（指数退避 + 随机抖动，遵循 429/503 响应的 Retry-After）
+和把响应体流式写入文件的下载函数，供 TTS 等 REST 接口使用。
+"""
+
+import email.utils
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, TypeVar
+
+import requests
+from loguru import logger
+from requests.adapters import HTTPAdapter
+
+T = TypeVar("T")
+
+# 默认连接池大小（每个主机保留的连接数）
+DEFAULT_POOL_SIZE = 10
+# 可以重试的响应状态码
+RETRYABLE_STATUS = frozenset({408, 425, 429, 500, 502, 503, 504})
+# 可以重试的网络错误
+RETRYABLE_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+
+_sessions: Dict[str, requests.Session] = {}
+_lock = threading.Lock()
+
+
+def get_session(name: str = "default", pool_size: int = DEFAULT_POOL_SIZE, headers: Optional[Dict[str, str]] = None) -> requests.Session:
+    """
+    获取进程共享的 HTTP 会话（首次调用时创建）
+
+    Args:
+        name: 会话名称，不同用途（素材下载、TTS 等）使用各自的会话和连接池
+        pool_size: 连接池大小，只在首次创建时生效
+        headers: 会话默认请求头，只在首次创建时生效
+
+    Returns:
+        requests.Session: 共享会话
+    """
+    with _lock:
+        session = _sessions.get(name)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            if headers:
+                session.headers.update(headers)
+            _sessions[name] = session
+        return session
+
+
+def close_sessions() -> None:
+    """关闭全部共享会话（主要用于测试和进程退出前）"""
+    with _lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
+
+
+@dataclass
+class RetryPolicy:
+    """重试策略：第 n 次重试前等待 min(max_delay, base_delay * 2^n) 秒，并加上随机抖动"""
+    attempts: int = 3
+    base_delay: float = 1.0
+    max_delay: float = 30.0
+    # 抖动比例，实际等待时间在 [delay * (1 - jitter), delay] 之间
+    jitter: float = 0.5
+
+    def delay(self, retry: int, retry_after: Optional[float] = None) -> float:
+        """
+        计算第 retry 次重试（从0开始）前的等待时间
+
+        Args:
+            retry: 已经失败的次数减一
+            retry_after: 服务端要求的等待时间（秒），优先使用
+
+        Returns:
+            float: 等待秒数
+        """
+        if retry_after is not None:
+            return min(self.max_delay, max(0.0, retry_after))
+        delay = min(self.max_delay, self.base_delay * (2 ** retry))
+        return delay * (1 - self.jitter * random.random())
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 响应头（秒数或 HTTP 日期），无法解析时返回None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at is None:
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class RetryableStatusError(requests.HTTPError):
+    """返回了可重试状态码的响应"""
+
+
+def _raise_for_status(response: requests.Response) -> None:
+    if response.status_code < 400:
+        return
+    try:
+        detail = response.text[:200]
+    except Exception:
+        detail = ""
+    error_type = RetryableStatusError if response.status_code in RETRYABLE_STATUS else requests.HTTPError
+    raise error_type(f"HTTP {response.status_code}: {detail}", response=response)
+
+
+def request_with_retry(
+    session: requests.Session,
+    method: str,
+    url: str,
+    consume: Callable[[requests.Response], T],
+    retry: Optional[RetryPolicy] = None,
+    sleep: Callable[[float], None] = time.sleep,
+    **kwargs
+) -> T:
+    """
+    发送请求并处理响应，网络错误和可重试的状态码按策略重试
+
+    响应在 consume 中处理（例如流式写入文件），读取响应体时连接中断同样会重试。
+    4xx 等不可重试的错误直接抛出。
+
+    Args:
+        session: HTTP 会话
+        method: 请求方法
+        url: 请求地址
+        consume: 处理成功响应的函数，返回值作为本函数的返回值
+        retry: 重试策略，默认 RetryPolicy()
+        sleep: 等待函数（测试时可替换）
+        **kwargs: 传给 session.request 的参数
+
+    Returns:
+        consume 的返回值
+
+    Raises:
+        requests.RequestException: 重试次数用完或不可重试的错误
+    """
+    retry = retry or RetryPolicy()
+    for attempt in range(retry.attempts):
+        retry_after = None
+        try:
+            with session.request(method, url, **kwargs) as response:
+                _raise_for_status(response)
+                return consume(response)
+        except RetryableStatusError as e:
+            retry_after = parse_retry_after(e.response.headers.get("Retry-After"))
+            error = e
+        except RETRYABLE_ERRORS as e:
+            error = e
+        if attempt >= retry.attempts - 1:
+            raise error
+        delay = retry.delay(attempt, retry_after)
+        logger.warning(f"请求失败（{str(error)[:100]}），{delay:.1f} 秒后第 {attempt + 2}/{retry.attempts} 次尝试: {url}")
+        sleep(delay)
+
+
+def download_to_file(
+    session: requests.Session,
+    method: str,
+    url: str,
+    path: str,
+    retry: Optional[RetryPolicy] = None,
+    chunk_size: int = 64 * 1024,
+    sleep: Callable[[float], None] = time.sleep,
+    **kwargs
+) -> int:
+    """
+    把响应体流式写入文件（先写入 .part 临时文件，完成后替换），失败时按策略重试
+
+    Args:
+        session: HTTP 会话
+        method: 请求方法
+        url: 请求地址
+        path: 目标文件路径
+        retry: 重试策略
+        chunk_size: 写入块大小
+        sleep: 等待函数（测试时可替换）
+        **kwargs: 传给 session.request 的参数
+
+    Returns:
+        int: 写入的字节数
+
+    Raises:
+        requests.RequestException: 重试次数用完或不可重试的错误
+    """
+    part_path = f"{path}.part"
+
+    def _write(response: requests.Response) -> int:
+        written = 0
+        with open(part_path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                if chunk:
+                    f.write(chunk)
+                    written += len(chunk)
+        expected = response.headers.get("Content-Length")
+        if expected is not None and written < int(expected):
+            raise requests.exceptions.ChunkedEncodingError(f"连接提前关闭: {written}/{expected} 字节")
+        return written
+
+    try:
+        written = request_with_retry(session, method, url, _write, retry=retry, sleep=sleep, stream=True, **kwargs)
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+    os.replace(part_path, path)
+    return written
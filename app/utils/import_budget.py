@@ -0,0 +1,138 @@
+"""
+导入耗时预算检查
+
+使用 `python -X importtime` 在独立子进程中测量 WebUI 启动和常用服务模块的导入耗时，
+并检查启动路径上没有提前加载重量级的模型 SDK / 媒体库（它们应在功能实际使用时才导入）。
+
+用法（在项目根目录执行）：
+    python -m app.utils.import_budget
+    python -m app.utils.import_budget --scale 2   # 在较慢的机器上放宽预算
+
+返回码为0表示全部满足预算，否则为1。
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+# 项目根目录
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+# WebUI 启动路径上不应加载的模块（首次使用对应功能时才导入）
+HEAVY_MODULES = ("litellm", "moviepy", "openai", "edge_tts", "pydub", "google.generativeai")
+
+LOADED_MARKER = "__loaded_heavy_modules__:"
+
+WEBUI_STARTUP = """
+from webui.components import basic_settings, video_settings, audio_settings, subtitle_settings, \\
+    script_settings, system_settings
+from app.utils import utils, ffmpeg_utils
+from app.models.schema import VideoClipParams, VideoAspect
+from app.services.llm.providers import register_all_providers
+register_all_providers()
+"""
+
+
+@dataclass
+class ImportBudget:
+    """单项导入预算"""
+    name: str
+    code: str
+    budget_ms: float
+    # 导入完成后不允许出现在 sys.modules 中的模块
+    forbidden: Tuple[str, ...] = ()
+
+
+BUDGETS: List[ImportBudget] = [
+    ImportBudget("webui 启动", WEBUI_STARTUP, 1500, HEAVY_MODULES),
+    ImportBudget("app.config", "import app.config", 500, ("streamlit",) + HEAVY_MODULES),
+    ImportBudget("app.services.voice", "import app.services.voice", 600, HEAVY_MODULES),
+    ImportBudget("app.services.material", "import app.services.material", 600, HEAVY_MODULES),
+    ImportBudget("app.services.llm", "import app.services.llm", 600, HEAVY_MODULES),
+]
+
+
+def _parse_importtime(stderr: str) -> float:
+    """汇总 -X importtime 输出中所有模块的自身耗时，返回总耗时（毫秒）"""
+    total_us = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) < 3:
+            continue
+        try:
+            total_us += int(fields[0].strip())
+        except ValueError:
+            # 表头行
+            continue
+    return total_us / 1000
+
+
+def measure(item: ImportBudget) -> Tuple[float, List[str], Optional[str]]:
+    """
+    在新的解释器进程中执行导入并测量耗时
+
+    Args:
+        item: 导入预算项
+
+    Returns:
+        Tuple[float, List[str], Optional[str]]: (导入耗时毫秒, 被提前加载的重量级模块, 错误信息)
+    """
+    check_code = (
+        f"{item.code}\n"
+        "import sys\n"
+        f"print({LOADED_MARKER!r} + ','.join(m for m in {item.forbidden!r} if m in sys.modules))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", check_code],
+        cwd=ROOT_DIR,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+    )
+    if result.returncode != 0:
+        return 0.0, [], result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "导入失败"
+
+    loaded: List[str] = []
+    for line in result.stdout.splitlines():
+        # 导入过程中的日志也会输出到 stdout，只解析带标记的一行
+        if line.startswith(LOADED_MARKER):
+            loaded = [m for m in line[len(LOADED_MARKER):].split(",") if m]
+    return _parse_importtime(result.stderr), loaded, None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="检查模块导入耗时预算")
+    parser.add_argument("--scale", type=float, default=1.0, help="预算放大倍数，用于较慢的机器")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for item in BUDGETS:
+        # 第一次导入会写入 .pyc 缓存，先预热一次再测量
+        measure(item)
+        elapsed, loaded, error = measure(item)
+        budget = item.budget_ms * args.scale
+
+        if error:
+            failed = True
+            print(f"❌ {item.name}: {error}")
+            continue
+
+        ok = elapsed <= budget and not loaded
+        failed = failed or not ok
+        status = "✅" if ok else "❌"
+        print(f"{status} {item.name}: {elapsed:.0f}ms / 预算 {budget:.0f}ms")
+        if loaded:
+            print(f"   提前加载了重量级模块: {', '.join(loaded)}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
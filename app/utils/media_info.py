@@ -0,0 +1,80 @@
+"""
+视频元数据缓存
+
+VideoProcessor 等每次处理视频都要调用 ffprobe 读取分辨率、帧率和时长。
+这里按 (路径, 大小, 修改时间) 在进程内缓存 ffprobe 的结果：上传完成时探测一次，
+之后第一次渲染、提取关键帧时直接复用。
+"""
+
+import os
+import subprocess
+import threading
+from typing import Dict, Optional, Tuple
+
+from loguru import logger
+
+_cache: Dict[Tuple[str, int, int], Dict[str, str]] = {}
+_lock = threading.Lock()
+
+
+def _stat_key(path: str) -> Tuple[str, int, int]:
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+
+
+def _probe(path: str) -> Optional[Dict[str, str]]:
+    cmd = [
+        "ffprobe",
+        "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "stream=width,height,r_frame_rate,duration",
+        "-of", "default=noprint_wrappers=1:nokey=0",
+        path
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    except FileNotFoundError:
+        logger.warning("未找到 ffprobe，无法读取视频信息")
+        return None
+    except subprocess.CalledProcessError as e:
+        logger.error(f"获取视频信息失败: {e.stderr}")
+        return None
+
+    info = {}
+    for line in result.stdout.strip().split('\n'):
+        if '=' in line:
+            key, value = line.split('=', 1)
+            info[key] = value
+
+    # 处理帧率（可能是分数形式）
+    if 'r_frame_rate' in info:
+        try:
+            num, den = map(int, info['r_frame_rate'].split('/'))
+            info['fps'] = str(num / den)
+        except (ValueError, ZeroDivisionError):
+            info['fps'] = info.get('r_frame_rate', '25')
+    return info
+
+
+def get_video_info(path: str) -> Optional[Dict[str, str]]:
+    """
+    获取视频的 width / height / fps / duration 等信息（ffprobe 原始字符串）
+
+    Args:
+        path: 视频文件路径
+
+    Returns:
+        Optional[Dict[str, str]]: 视频信息，ffprobe 失败时返回None（失败结果不缓存）
+    """
+    key = _stat_key(path)
+    with _lock:
+        cached = _cache.get(key)
+    if cached is not None:
+        return dict(cached)
+
+    info = _probe(path)
+    if info is not None:
+        with _lock:
+            _cache[key] = info
+        return dict(info)
+    return None
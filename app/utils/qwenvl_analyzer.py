@@ -6,12 +6,13 @@ from loguru import logger
 from tqdm import tqdm
 import asyncio
 from tenacity import retry, stop_after_attempt, RetryError, wait_exponential
-from openai import OpenAI
 import PIL.Image
 import base64
 import io
 import traceback
 
+from app.utils.frame_ring import encoded_jpeg
+
 
 class QwenAnalyzer:
     """千问视觉分析器类"""
@@ -41,6 +42,8 @@ class QwenAnalyzer:
         使用最简化的参数配置，避免不必要的参数
         """
         try:
+            from openai import OpenAI
+
             self.client = OpenAI(
                 api_key=self.api_key,
                 base_url=self.base_url
@@ -51,11 +54,14 @@ class QwenAnalyzer:
 
     def _image_to_base64(self, image: PIL.Image.Image) -> str:
         """
-        将PIL图片对象转换为base64字符串
+        将PIL图片对象转换为base64字符串（流式解码的关键帧已经是 JPEG，直接使用）
         """
-        buffered = io.BytesIO()
-        image.save(buffered, format="JPEG")
-        return base64.b64encode(buffered.getvalue()).decode("utf-8")
+        data = encoded_jpeg(image)
+        if data is None:
+            buffered = io.BytesIO()
+            image.save(buffered, format="JPEG")
+            data = buffered.getvalue()
+        return base64.b64encode(data).decode("utf-8")
 
     @retry(
         stop=stop_after_attempt(3),
@@ -0,0 +1,249 @@
+"""
+字幕排版（自动换行）
+
+原来的 wrap_text 每条字幕都重新加载一次字体，换行时逐词（中文逐字）把前缀拼长后对整个前缀调用 getbbox，
+单行的测量量是 O(n²)。这里：
+
+- 按 (字体, 字号) 缓存字体对象和每个字符的前进宽度（advance width）
+- 一次线性扫描完成换行：拉丁文字按单词（空格处）断行，CJK 字符之间可以断行，
+  行首禁则标点（，。！？等）跟随前一个字符、行尾禁则标点（“（《等）跟随后一个字符，
+  单个单词超过行宽时按字符断开
+- 返回的 SubtitleLayout 同时提供 MoviePy 使用的换行文本（\\n）和 ASS/ffmpeg 字幕使用的文本（\\N）
+"""
+
+import threading
+import unicodedata
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+from PIL import ImageFont
+
+# 不能出现在行首的标点（跟随前一个字符）
+NO_LINE_START = set("，。、；：！？）」』》〉】〕”’…—,.;:!?)]}%·~～")
+# 不能出现在行尾的标点（跟随后一个字符）
+NO_LINE_END = set("（「『《〈【〔“‘([{")
+
+
+def _is_cjk(char: str) -> bool:
+    """CJK 文字和全角标点，字符之间允许断行"""
+    code = ord(char)
+    return (
+        0x2E80 <= code <= 0x9FFF      # CJK 部首、符号、假名、统一汉字
+        or 0xAC00 <= code <= 0xD7AF   # 韩文音节
+        or 0xF900 <= code <= 0xFAFF   # CJK 兼容汉字
+        or 0xFF00 <= code <= 0xFFEF   # 全角字符
+        or 0x20000 <= code <= 0x2FFFF
+        or unicodedata.east_asian_width(char) in ("W", "F")
+    )
+
+
+@lru_cache(maxsize=32)
+def get_font(font: Optional[str], fontsize: int):
+    """加载字体（按路径和字号缓存），无法加载时使用 Pillow 默认字体"""
+    try:
+        return ImageFont.truetype(font, fontsize)
+    except (OSError, TypeError, ValueError, AttributeError):
+        logger.warning(f"无法加载字体 {font}，使用默认字体")
+        return ImageFont.load_default()
+
+
+class FontMetrics:
+    """一个 (字体, 字号) 的字形宽度缓存"""
+
+    def __init__(self, font: Optional[str], fontsize: int):
+        self.font = get_font(font, fontsize)
+        self._advances: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        ascent, descent = self.font.getmetrics()
+        self.line_height = ascent + descent
+
+    def advance(self, char: str) -> float:
+        """单个字符的前进宽度"""
+        width = self._advances.get(char)
+        if width is None:
+            width = self.font.getlength(char)
+            with self._lock:
+                self._advances[char] = width
+        return width
+
+    def measure(self, text: str) -> float:
+        """按字符前进宽度累加计算文本宽度"""
+        return sum(self.advance(char) for char in text)
+
+
+_metrics: Dict[Tuple[Optional[str], int], FontMetrics] = {}
+_metrics_lock = threading.Lock()
+
+
+def get_metrics(font: Optional[str], fontsize: int) -> FontMetrics:
+    """获取 (字体, 字号) 对应的字形宽度缓存"""
+    key = (font, int(fontsize))
+    metrics = _metrics.get(key)
+    if metrics is None:
+        with _metrics_lock:
+            metrics = _metrics.get(key)
+            if metrics is None:
+                metrics = FontMetrics(font, int(fontsize))
+                _metrics[key] = metrics
+    return metrics
+
+
+@dataclass
+class SubtitleLayout:
+    """排版结果"""
+    lines: List[str]
+    width: float
+    height: int
+    line_height: int
+
+    @property
+    def text(self) -> str:
+        """MoviePy TextClip 使用的换行文本"""
+        return "\n".join(self.lines)
+
+    @property
+    def ass_text(self) -> str:
+        """ASS 字幕（ffmpeg subtitles/ass 滤镜）使用的换行文本"""
+        return r"\N".join(self.lines)
+
+
+def _tokenize(paragraph: str) -> List[Tuple[str, bool]]:
+    """
+    把一段文本切分为不可断开的单元，返回 (单元, 单元前是否有空格)
+
+    拉丁文字的连续非空白字符为一个单元，每个 CJK 字符为一个单元；禁则标点并入相邻单元
+    """
+    tokens: List[Tuple[str, bool]] = []
+    current = ""
+    space_before = False
+    pending_space = False
+    carry = ""  # 等待并入下一个单元的行尾禁则标点
+
+    def flush():
+        nonlocal current
+        if current:
+            tokens.append((current, space_before))
+            current = ""
+
+    for char in paragraph:
+        if char.isspace():
+            flush()
+            pending_space = True
+            continue
+        if char in NO_LINE_START and (current or tokens) and not pending_space:
+            # 跟随前一个单元
+            if current:
+                current += char
+            else:
+                text, space = tokens[-1]
+                tokens[-1] = (text + char, space)
+            continue
+        if char in NO_LINE_END:
+            flush()
+            if not carry:
+                space_before = pending_space
+            carry += char
+            pending_space = False
+            continue
+        if _is_cjk(char):
+            flush()
+            tokens.append((carry + char, space_before if carry else pending_space))
+            carry = ""
+        else:
+            if not current:
+                space_before = space_before if carry else pending_space
+                current = carry
+                carry = ""
+            current += char
+        pending_space = False
+    flush()
+    if carry:
+        tokens.append((carry, space_before))
+    return tokens
+
+
+def _split_long(token: str, metrics: FontMetrics, max_width: float) -> List[str]:
+    """单个单元超过行宽时按字符断开"""
+    parts = []
+    current = ""
+    width = 0.0
+    for char in token:
+        advance = metrics.advance(char)
+        if current and width + advance > max_width:
+            parts.append(current)
+            current, width = "", 0.0
+        current += char
+        width += advance
+    if current:
+        parts.append(current)
+    return parts
+
+
+def layout_text(text: str, max_width: float, font: Optional[str] = None, fontsize: int = 60) -> SubtitleLayout:
+    """
+    计算字幕的换行
+
+    Args:
+        text: 字幕文本（已有的换行符会保留）
+        max_width: 最大行宽（像素）
+        font: 字体文件路径
+        fontsize: 字号
+
+    Returns:
+        SubtitleLayout: 各行文本、最大行宽和总高度
+    """
+    metrics = get_metrics(font, fontsize)
+    space_width = metrics.advance(" ")
+    lines: List[str] = []
+    widest = 0.0
+
+    for paragraph in text.split("\n"):
+        line = ""
+        line_width = 0.0
+        for token, space_before in _tokenize(paragraph):
+            token_width = metrics.measure(token)
+            gap = space_width if space_before and line else 0.0
+            if not line or line_width + gap + token_width <= max_width:
+                if line and space_before:
+                    line += " "
+                    line_width += space_width
+                if not line and token_width > max_width:
+                    # 超长单词：前面的部分各占一行，最后一部分继续排版
+                    *full, token = _split_long(token, metrics, max_width)
+                    lines.extend(full)
+                    widest = max([widest] + [metrics.measure(part) for part in full])
+                    token_width = metrics.measure(token)
+                line += token
+                line_width += token_width
+                continue
+            lines.append(line)
+            widest = max(widest, line_width)
+            line, line_width = "", 0.0
+            if token_width > max_width:
+                *full, token = _split_long(token, metrics, max_width)
+                lines.extend(full)
+                widest = max([widest] + [metrics.measure(part) for part in full])
+                token_width = metrics.measure(token)
+            line, line_width = token, token_width
+        lines.append(line)
+        widest = max(widest, line_width)
+
+    return SubtitleLayout(
+        lines=lines,
+        width=widest,
+        height=len(lines) * metrics.line_height,
+        line_height=metrics.line_height,
+    )
+
+
+def wrap_text(text: str, max_width: float, font: Optional[str] = None, fontsize: int = 60) -> Tuple[str, int]:
+    """
+    文本自动换行（兼容原有的 wrap_text 接口）
+
+    Returns:
+        Tuple[str, int]: (换行后的文本, 文本高度)
+    """
+    layout = layout_text(text, max_width, font, fontsize)
+    return layout.text, layout.height
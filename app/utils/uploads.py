@@ -0,0 +1,85 @@
+"""
+上传文件的流式保存
+
+uploaded_file.read() 会把整个文件再复制一份到内存中，多 GB 的视频在并发上传时很容易耗尽内存。
+这里按固定大小的块把上传内容写入 .part 临时文件，写入过程中同步计算内容指纹，
+完成后重命名为正式文件，并把指纹放入 fingerprint 缓存（后续的关键帧、分析结果等缓存直接复用）。
+视频文件在保存后立即探测一次元数据，第一次渲染时不再重复调用 ffprobe。
+"""
+
+import os
+from typing import BinaryIO, Optional
+
+from loguru import logger
+
+from app.utils import media_info
+from app.utils.fingerprint import FingerprintBuilder, seed_fingerprint
+
+# 每次复制的块大小
+CHUNK_SIZE = 8 * 1024 * 1024
+VIDEO_EXTENSIONS = {".mp4", ".mov", ".avi", ".flv", ".mkv"}
+
+
+def _stream_size(stream: BinaryIO) -> Optional[int]:
+    size = getattr(stream, "size", None)
+    if isinstance(size, int):
+        return size
+    try:
+        position = stream.tell()
+        stream.seek(0, os.SEEK_END)
+        size = stream.tell() - position
+        stream.seek(position)
+        return size
+    except (AttributeError, OSError):
+        return None
+
+
+def save_stream(stream: BinaryIO, save_path: str, chunk_size: int = CHUNK_SIZE, probe: Optional[bool] = None) -> str:
+    """
+    把文件对象按块复制到 save_path，并计算内容指纹
+
+    Args:
+        stream: 可读的二进制文件对象（如 Streamlit 的 UploadedFile）
+        save_path: 保存路径
+        chunk_size: 每次复制的字节数
+        probe: 是否在保存后探测视频元数据，None 表示按扩展名判断
+
+    Returns:
+        str: 保存后的文件路径
+
+    Raises:
+        OSError: 写入失败（临时文件会被删除）
+    """
+    os.makedirs(os.path.dirname(save_path) or ".", exist_ok=True)
+    if hasattr(stream, "seek"):
+        stream.seek(0)
+    size = _stream_size(stream)
+    builder = FingerprintBuilder(size) if size is not None else None
+
+    part_path = f"{save_path}.part"
+    written = 0
+    try:
+        with open(part_path, "wb") as f:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                f.write(chunk)
+                if builder is not None:
+                    builder.update(chunk)
+                written += len(chunk)
+        os.replace(part_path, save_path)
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+
+    if builder is not None and written == size:
+        seed_fingerprint(save_path, builder.hexdigest())
+    logger.info(f"文件保存成功: {save_path}（{written / 1024 / 1024:.1f} MB）")
+
+    if probe is None:
+        probe = os.path.splitext(save_path)[1].lower() in VIDEO_EXTENSIONS
+    if probe:
+        media_info.get_video_info(save_path)
+    return save_path
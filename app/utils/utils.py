@@ -6,15 +6,14 @@ import requests
 import threading
 from typing import Any
 from loguru import logger
-import streamlit as st
 import json
 from uuid import uuid4
 import urllib3
 from datetime import datetime, timedelta
 
 from app.models import const
+from app.models.timeline import parse_time_ms
 from app.utils import check_script
-from app.services import material
 
 urllib3.disable_warnings()
 
@@ -397,31 +396,8 @@ def time_to_seconds(time_str: str) -> float:
         float: 转换后的秒数(包含毫秒)
     """
     try:
-        # 处理带有'-'的毫秒格式
-        if '-' in time_str:
-            time_part, ms_part = time_str.split('-')
-            ms = float(ms_part) / 1000
-        # 处理带有','的毫秒格式
-        elif ',' in time_str:
-            time_part, ms_part = time_str.split(',')
-            ms = float(ms_part) / 1000
-        else:
-            time_part = time_str
-            ms = 0
-
-        # 分割时间部分
-        parts = time_part.split(':')
-
-        if len(parts) == 3:  # HH:MM:SS
-            h, m, s = map(float, parts)
-            seconds = h * 3600 + m * 60 + s
-        elif len(parts) == 2:  # MM:SS
-            m, s = map(float, parts)
-            seconds = m * 60 + s
-        else:  # SS
-            seconds = float(parts[0])
-
-        return seconds + ms
+        # 带有'-'的毫秒格式与','相同
+        return parse_time_ms(time_str.replace('-', ',')) / 1000
 
     except (ValueError, IndexError) as e:
         logger.error(f"时间格式转换错误 {time_str}: {str(e)}")
@@ -515,6 +491,9 @@ def cut_video(params, progress_callback=None):
     注意：此函数已被统一裁剪策略取代，不再推荐使用。
     新的实现请使用 task.start_subclip_unified() 函数。
     """
+    # 仅该已弃用函数依赖 streamlit 会话状态，延迟导入避免后台任务加载 streamlit
+    import streamlit as st
+
     try:
         task_id = str(uuid4())
         st.session_state['task_id'] = task_id
@@ -530,6 +509,8 @@ def cut_video(params, progress_callback=None):
             if progress_callback:
                 progress_callback(progress)
 
+        from app.services import material
+
         subclip_videos = material.clip_videos(
             task_id=task_id,
             timestamp_terms=time_list,
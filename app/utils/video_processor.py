@@ -19,7 +19,8 @@ from typing import List, Dict
 from loguru import logger
 from tqdm import tqdm
 
-from app.utils import ffmpeg_utils
+from app.utils import ffmpeg_utils, media_info
+from app.utils.ffmpeg_runner import run_ffmpeg, FFmpegTimeoutError
 from app.config.ffmpeg_config import FFmpegConfigManager
 
 
@@ -92,47 +93,20 @@ class VideoProcessor:
 
     def _get_video_info(self) -> Dict[str, str]:
         """
-        使用ffprobe获取视频信息
+        使用ffprobe获取视频信息（同一文件的结果会被缓存，上传时探测过的视频不再重复调用）
 
         Returns:
             Dict[str, str]: 包含视频基本信息的字典
         """
-        cmd = [
-            "ffprobe",
-            "-v", "error",
-            "-select_streams", "v:0",
-            "-show_entries", "stream=width,height,r_frame_rate,duration",
-            "-of", "default=noprint_wrappers=1:nokey=0",
-            self.video_path
-        ]
-
-        try:
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            lines = result.stdout.strip().split('\n')
-            info = {}
-            for line in lines:
-                if '=' in line:
-                    key, value = line.split('=', 1)
-                    info[key] = value
-
-            # 处理帧率（可能是分数形式）
-            if 'r_frame_rate' in info:
-                try:
-                    num, den = map(int, info['r_frame_rate'].split('/'))
-                    info['fps'] = str(num / den)
-                except ValueError:
-                    info['fps'] = info.get('r_frame_rate', '25')
-
-            return info
-
-        except subprocess.CalledProcessError as e:
-            logger.error(f"获取视频信息失败: {e.stderr}")
+        info = media_info.get_video_info(self.video_path)
+        if info is None:
             return {
                 'width': '1280',
                 'height': '720',
                 'fps': '25',
                 'duration': '0'
             }
+        return info
 
     def extract_frames_by_interval(self, output_dir: str, interval_seconds: float = 5.0,
                                   use_hw_accel: bool = True) -> List[int]:
@@ -495,20 +469,8 @@ class VideoProcessor:
             bool: 是否成功
         """
         try:
-            # 参考 clip_video.py 中的 Windows 处理方式
-            is_windows = os.name == 'nt'
-            process_kwargs = {
-                "stdout": subprocess.PIPE,
-                "stderr": subprocess.PIPE,
-                "text": True,
-                "check": True,
-                "timeout": 30  # 30秒超时
-            }
-
-            if is_windows:
-                process_kwargs["encoding"] = 'utf-8'
-
-            result = subprocess.run(cmd, **process_kwargs)
+            # 单帧提取很快，超时后直接终止，交给下一个提取策略
+            run_ffmpeg(cmd, stall_timeout=15, timeout=30)
 
             # 验证输出文件
             output_path = cmd[-1]
@@ -518,9 +480,7 @@ class VideoProcessor:
                 return False
 
         except subprocess.CalledProcessError as e:
-            # 简化错误日志，仅记录关键信息
-            return False
-        except subprocess.TimeoutExpired:
+            # 简化错误日志，仅记录关键信息（包括卡死与超时）
             return False
         except Exception as e:
             return False
@@ -714,7 +674,7 @@ class VideoProcessor:
 
         try:
             # 执行FFmpeg命令
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True, timeout=30)
+            run_ffmpeg(cmd, stall_timeout=15, timeout=30)
             
             # 验证PNG文件是否成功生成
             if os.path.exists(png_output) and os.path.getsize(png_output) > 0:
@@ -743,12 +703,12 @@ class VideoProcessor:
             else:
                 return False
                 
+        except FFmpegTimeoutError:
+            logger.warning(f"超级兼容性方案提取帧 {timestamp:.1f}s 超时")
+            return False
         except subprocess.CalledProcessError as e:
             logger.warning(f"超级兼容性方案提取帧 {timestamp:.1f}s 失败: {e}")
             return False
-        except subprocess.TimeoutExpired:
-            logger.warning(f"超级兼容性方案提取帧 {timestamp:.1f}s 超时")
-            return False
         except Exception as e:
             logger.warning(f"超级兼容性方案提取帧 {timestamp:.1f}s 异常: {e}")
             return False
@@ -0,0 +1,42 @@
+"""
+测试公共夹具
+
+仓库没有打包配置，测试从仓库根目录以源码方式导入 app 包
+"""
+
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+class QuietHandler(BaseHTTPRequestHandler):
+    """不向 stderr 打印访问日志的请求处理器，测试中的本地服务继承它"""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def serve():
+    """在 127.0.0.1 的随机端口启动本地 HTTP 服务，返回服务地址；测试结束后关闭"""
+    servers = []
+
+    def _serve(handler_class) -> str:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler_class)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}"
+
+    yield _serve
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,99 @@
+"""app.services.downloader 的断点续传与重复下载合并（本地 HTTP 服务）"""
+
+import os
+import threading
+
+import requests
+
+from app.services.downloader import PART_SUFFIX, DownloadManager
+from conftest import QuietHandler
+
+BODY = os.urandom(5 * 1024 * 1024 + 77)
+DROP_AT = 2 * 1024 * 1024
+
+
+def _manager(**kwargs) -> DownloadManager:
+    session = requests.Session()
+    session.trust_env = False
+    return DownloadManager(session=session, proxies={}, chunk_size=64 * 1024, validate=lambda path: True, **kwargs)
+
+
+def _range_handler(requests_seen, drop_first=False, gate=None):
+    """支持 Range 的文件服务；drop_first 时第一次请求在 DROP_AT 字节处断开，gate 不为空时等待其放行"""
+
+    class Handler(QuietHandler):
+        def do_GET(self):
+            range_header = self.headers.get("Range")
+            requests_seen.append(range_header)
+            if gate is not None:
+                gate.wait(10)
+            start = int(range_header[len("bytes="):].rstrip("-")) if range_header else 0
+            payload = BODY[start:]
+            if range_header:
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{len(BODY) - 1}/{len(BODY)}")
+            else:
+                self.send_response(200)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            if drop_first and len(requests_seen) == 1:
+                self.wfile.write(payload[:DROP_AT])
+                self.close_connection = True
+                return
+            self.wfile.write(payload)
+
+    return Handler
+
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_interrupted_download_resumes_with_range(serve, tmp_path):
+    seen = []
+    url = serve(_range_handler(seen, drop_first=True)) + "/video.mp4"
+    manager = _manager()
+    try:
+        path = manager.download(url, str(tmp_path))
+    finally:
+        manager.shutdown()
+
+    assert path and _read(path) == BODY
+    assert not os.path.exists(path + PART_SUFFIX)
+    assert seen == [None, f"bytes={DROP_AT}-"]
+
+
+def test_existing_part_file_is_resumed(serve, tmp_path):
+    seen = []
+    url = serve(_range_handler(seen)) + "/video.mp4"
+    manager = _manager()
+    part_path = manager.target_path(url, str(tmp_path)) + PART_SUFFIX
+    with open(part_path, "wb") as f:
+        f.write(BODY[:1000])
+    try:
+        path = manager.download(url, str(tmp_path))
+    finally:
+        manager.shutdown()
+
+    assert _read(path) == BODY
+    assert seen == ["bytes=1000-"]
+
+
+def test_concurrent_downloads_of_same_url_are_collapsed(serve, tmp_path):
+    seen = []
+    gate = threading.Event()
+    base = serve(_range_handler(seen, gate=gate)) + "/video.mp4"
+    manager = _manager(max_workers=4)
+    try:
+        # 查询参数不同（如签名）的同一个视频也只下载一次
+        first = manager.submit(base + "?sig=a", str(tmp_path))
+        second = manager.submit(base + "?sig=b", str(tmp_path))
+        assert first is second
+        gate.set()
+        assert _read(first.result(timeout=30)) == BODY
+    finally:
+        gate.set()
+        manager.shutdown()
+
+    assert seen == [None]
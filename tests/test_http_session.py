@@ -0,0 +1,117 @@
+"""app.utils.http_session 的重试与流式下载（本地 HTTP 服务）"""
+
+import os
+
+import pytest
+import requests
+
+from app.utils.http_session import RetryPolicy, RetryableStatusError, download_to_file, request_with_retry
+from conftest import QuietHandler
+
+
+def _session() -> requests.Session:
+    session = requests.Session()
+    # 不使用环境变量中的代理访问本地服务
+    session.trust_env = False
+    return session
+
+
+def _scripted_server(serve, responses):
+    """按顺序返回 responses 中的 (状态码, 响应头, 响应体)，最后一个响应重复使用"""
+    hits = []
+
+    class Handler(QuietHandler):
+        def do_GET(self):
+            status, headers, body = responses[min(len(hits), len(responses) - 1)]
+            hits.append(self.path)
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return serve(Handler), hits
+
+
+def test_retry_after_is_respected(serve):
+    url, hits = _scripted_server(serve, [
+        (429, {"Retry-After": "7"}, b"slow down"),
+        (200, {}, b"ok"),
+    ])
+    slept = []
+    result = request_with_retry(_session(), "GET", url, lambda r: r.content, sleep=slept.append)
+    assert result == b"ok"
+    assert slept == [7.0]
+    assert len(hits) == 2
+
+
+def test_server_errors_back_off_exponentially(serve):
+    url, hits = _scripted_server(serve, [
+        (503, {}, b"busy"),
+        (502, {}, b"bad gateway"),
+        (200, {}, b"ok"),
+    ])
+    slept = []
+    policy = RetryPolicy(attempts=3, base_delay=0.5, jitter=0)
+    result = request_with_retry(_session(), "GET", url, lambda r: r.content, retry=policy, sleep=slept.append)
+    assert result == b"ok"
+    assert slept == [0.5, 1.0]
+    assert len(hits) == 3
+
+
+def test_server_errors_give_up_after_attempts(serve):
+    url, hits = _scripted_server(serve, [(500, {}, b"boom")])
+    slept = []
+    with pytest.raises(RetryableStatusError):
+        request_with_retry(_session(), "GET", url, lambda r: r.content, retry=RetryPolicy(attempts=2), sleep=slept.append)
+    assert len(hits) == 2
+    assert len(slept) == 1
+
+
+def test_client_errors_are_not_retried(serve):
+    url, hits = _scripted_server(serve, [(404, {}, b"missing")])
+    with pytest.raises(requests.HTTPError) as info:
+        request_with_retry(_session(), "GET", url, lambda r: r.content, sleep=lambda _: None)
+    assert not isinstance(info.value, RetryableStatusError)
+    assert len(hits) == 1
+
+
+def test_download_to_file_streams_and_retries_truncated_body(serve, tmp_path):
+    body = os.urandom(3 * 1024 * 1024 + 123)
+    hits = []
+
+    class Handler(QuietHandler):
+        def do_GET(self):
+            hits.append(self.path)
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if len(hits) == 1:
+                # 第一次只发送一半就断开连接
+                self.wfile.write(body[:len(body) // 2])
+                self.close_connection = True
+                return
+            for start in range(0, len(body), 256 * 1024):
+                self.wfile.write(body[start:start + 256 * 1024])
+
+    url = serve(Handler)
+    path = str(tmp_path / "audio.mp3")
+    slept = []
+    written = download_to_file(_session(), "GET", url, path, chunk_size=16 * 1024, sleep=slept.append)
+
+    assert written == len(body)
+    with open(path, "rb") as f:
+        assert f.read() == body
+    assert not os.path.exists(f"{path}.part")
+    assert len(hits) == 2
+    assert len(slept) == 1
+
+
+def test_download_to_file_removes_part_on_failure(serve, tmp_path):
+    url, _ = _scripted_server(serve, [(403, {}, b"forbidden")])
+    path = str(tmp_path / "audio.mp3")
+    with pytest.raises(requests.HTTPError):
+        download_to_file(_session(), "GET", url, path, sleep=lambda _: None)
+    assert not os.path.exists(path)
+    assert not os.path.exists(f"{path}.part")
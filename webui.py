@@ -385,6 +385,10 @@ def main():
     except Exception as e:
         logger.warning(f"资源初始化时出现警告: {e}")
 
+    # 配置了存储配额时启动后台清理线程（进程内只启动一次）
+    from app.services.storage_manager import maybe_start_sweeper
+    maybe_start_sweeper()
+
     st.title(f"Narrato:blue[AI]:sunglasses: 📽️")
     st.write(tr("Get Help"))
 
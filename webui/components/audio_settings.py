@@ -1,11 +1,9 @@
 from venv import logger
 import streamlit as st
 import os
-from uuid import uuid4
 from app.config import config
-from app.services import voice
+from app.services import voice, voice_catalog, voice_preview
 from app.models.schema import AudioVolumeDefaults
-from app.utils import utils
 from webui.utils.cache import get_songs_cache
 
 
@@ -148,10 +146,10 @@ def render_edge_tts_settings(tr):
     """渲染 Edge TTS 引擎设置"""
     # 获取支持的语音列表
     support_locales = ["zh-CN", "en-US"]
-    all_voices = voice.get_all_azure_voices(filter_locals=support_locales)
-
     # 只保留标准版本的语音（Edge TTS专用，不包含V2）
-    edge_voices = [v for v in all_voices if "-V2" not in v]
+    edge_voices = voice_catalog.get_catalog().display_names(
+        locales=support_locales, engine=voice_catalog.ENGINE_EDGE
+    )
 
     # 创建友好的显示名称
     friendly_names = {}
@@ -205,6 +203,12 @@ def render_edge_tts_settings(tr):
         if len([v for v in edge_voices if v.startswith("en-US")]) > 5:
             st.write("• ... 更多英文音色")
 
+        # 内置列表之外的新音色需要从 edge_tts 在线拉取，结果缓存到磁盘
+        if st.button("🔄 刷新在线音色列表", help="从 Edge TTS 服务获取最新的音色列表"):
+            with st.spinner("正在获取音色列表..."):
+                voice_catalog.refresh_edge_voices(force=True, proxy=config.proxy.get("http"))
+            st.rerun()
+
     config.ui["edge_voice_name"] = voice_name
     config.ui["voice_name"] = voice_name  # 兼容性
 
@@ -562,76 +566,71 @@ def render_qwen3_tts_settings(tr):
     config.ui["qwen3_rate"] = voice_rate
     config.ui["voice_name"] = voice_type #兼容性
 
+def get_preview_voice_settings(selected_engine):
+    """获取当前引擎试听使用的 (音色, 语速, 音调)，未配置音色时音色为空"""
+    voice_name = ""
+    voice_rate = 1.0
+    voice_pitch = 1.0
+
+    if selected_engine == "edge_tts":
+        voice_name = config.ui.get("edge_voice_name", "zh-CN-XiaoyiNeural-Female")
+        voice_rate = config.ui.get("edge_rate", 1.0)
+        voice_pitch = 1.0 + (config.ui.get("edge_pitch", 0) / 100.0)
+    elif selected_engine == "azure_speech":
+        voice_name = config.ui.get("azure_voice_name", "zh-CN-XiaoxiaoMultilingualNeural")
+        voice_rate = config.ui.get("azure_rate", 1.0)
+        voice_pitch = 1.0 + (config.ui.get("azure_pitch", 0) / 100.0)
+    elif selected_engine == "soulvoice":
+        voice_uri = config.soulvoice.get("voice_uri", "")
+        if voice_uri:
+            if not voice_uri.startswith("soulvoice:") and not voice_uri.startswith("speech:"):
+                voice_name = f"soulvoice:{voice_uri}"
+            else:
+                voice_name = voice_uri if voice_uri.startswith("soulvoice:") else f"soulvoice:{voice_uri}"
+        voice_rate = 1.0  # SoulVoice 使用默认语速
+        voice_pitch = 1.0  # SoulVoice 不支持音调调节
+    elif selected_engine == "tencent_tts":
+        voice_type = config.ui.get("tencent_voice_type", "101001")
+        voice_name = f"tencent:{voice_type}"
+        voice_rate = config.ui.get("tencent_rate", 1.0)
+        voice_pitch = 1.0  # 腾讯云 TTS 不支持音调调节
+    elif selected_engine == "qwen3_tts":
+        vt = config.ui.get("qwen_voice_type", "Cherry")
+        voice_name = f"qwen3:{vt}"
+        voice_rate = config.ui.get("qwen3_rate", 1.0)
+        voice_pitch = 1.0  # Qwen3 TTS 不支持音调调节
+
+    return voice_name, voice_rate, voice_pitch
+
+
 def render_voice_preview_new(tr, selected_engine):
     """渲染新的语音试听功能"""
-    if st.button("🎵 试听语音合成", use_container_width=True):
-        play_content = "感谢关注 NarratoAI，有任何问题或建议，可以关注微信公众号，求助或讨论"
-
-        # 根据选择的引擎获取对应的语音配置
-        voice_name = ""
-        voice_rate = 1.0
-        voice_pitch = 1.0
+    voice_name, voice_rate, voice_pitch = get_preview_voice_settings(selected_engine)
 
+    # 后台预取试听音频：Edge TTS 免费，预取整个音色列表；其他引擎按字符计费，只预取当前音色
+    if voice_name:
+        prefetch_voices = [voice_name]
         if selected_engine == "edge_tts":
-            voice_name = config.ui.get("edge_voice_name", "zh-CN-XiaoyiNeural-Female")
-            voice_rate = config.ui.get("edge_rate", 1.0)
-            voice_pitch = 1.0 + (config.ui.get("edge_pitch", 0) / 100.0)
-        elif selected_engine == "azure_speech":
-            voice_name = config.ui.get("azure_voice_name", "zh-CN-XiaoxiaoMultilingualNeural")
-            voice_rate = config.ui.get("azure_rate", 1.0)
-            voice_pitch = 1.0 + (config.ui.get("azure_pitch", 0) / 100.0)
-        elif selected_engine == "soulvoice":
-            voice_uri = config.soulvoice.get("voice_uri", "")
-            if voice_uri:
-                if not voice_uri.startswith("soulvoice:") and not voice_uri.startswith("speech:"):
-                    voice_name = f"soulvoice:{voice_uri}"
-                else:
-                    voice_name = voice_uri if voice_uri.startswith("soulvoice:") else f"soulvoice:{voice_uri}"
-            voice_rate = 1.0  # SoulVoice 使用默认语速
-            voice_pitch = 1.0  # SoulVoice 不支持音调调节
-        elif selected_engine == "tencent_tts":
-            voice_type = config.ui.get("tencent_voice_type", "101001")
-            voice_name = f"tencent:{voice_type}"
-            voice_rate = config.ui.get("tencent_rate", 1.0)
-            voice_pitch = 1.0  # 腾讯云 TTS 不支持音调调节
-        elif selected_engine == "qwen3_tts":
-            vt = config.ui.get("qwen_voice_type", "Cherry")
-            voice_name = f"qwen3:{vt}"
-            voice_rate = config.ui.get("qwen3_rate", 1.0)
-            voice_pitch = 1.0  # Qwen3 TTS 不支持音调调节
+            prefetch_voices += voice_catalog.get_catalog().display_names(
+                locales=["zh-CN", "en-US"], engine=voice_catalog.ENGINE_EDGE
+            )
+        voice_preview.prefetch(selected_engine, prefetch_voices, voice_rate, voice_pitch)
 
+    if st.button("🎵 试听语音合成", use_container_width=True):
         if not voice_name:
             st.error("请先配置语音设置")
             return
 
-        with st.spinner("正在合成语音..."):
-            temp_dir = utils.storage_dir("temp", create=True)
-            audio_file = os.path.join(temp_dir, f"tmp-voice-{str(uuid4())}.mp3")
-
-            sub_maker = voice.tts(
-                text=play_content,
-                voice_name=voice_name,
-                voice_rate=voice_rate,
-                voice_pitch=voice_pitch,
-                voice_file=audio_file,
-                tts_engine=st.session_state.get('tts_engine')
-            )
-
-            if sub_maker and os.path.exists(audio_file):
-                st.success("✅ 语音合成成功！")
-
-                # 播放音频
-                with open(audio_file, 'rb') as audio_file_obj:
-                    audio_bytes = audio_file_obj.read()
-                    st.audio(audio_bytes, format='audio/mp3')
+        audio_file = voice_preview.cached_preview(selected_engine, voice_name, voice_rate, voice_pitch)
+        if not audio_file:
+            with st.spinner("正在合成语音..."):
+                audio_file = voice_preview.get_preview(selected_engine, voice_name, voice_rate, voice_pitch)
 
-                # 清理临时文件
-                try:
-                    os.remove(audio_file)
-                except:
-                    pass
-            else:
-                st.error("❌ 语音合成失败，请检查配置")
+        if audio_file:
+            st.success("✅ 语音合成成功！")
+            st.audio(audio_file, format='audio/mp3')
+        else:
+            st.error("❌ 语音合成失败，请检查配置")
 
 
 def render_azure_v2_settings(tr):
@@ -706,42 +705,27 @@ def render_voice_parameters(tr, voice_name):
 def render_voice_preview(tr, voice_name):
     """渲染语音试听功能"""
     if st.button(tr("Play Voice")):
-        play_content = "感谢关注 NarratoAI，有任何问题或建议，可以关注微信公众号，求助或讨论"
-        if not play_content:
-            play_content = st.session_state.get('video_script', '')
-        if not play_content:
-            play_content = tr("Voice Example")
-
-        with st.spinner(tr("Synthesizing Voice")):
-            temp_dir = utils.storage_dir("temp", create=True)
-            audio_file = os.path.join(temp_dir, f"tmp-voice-{str(uuid4())}.mp3")
-
-            sub_maker = voice.tts(
-                text=play_content,
-                voice_name=voice_name,
-                voice_rate=st.session_state.get('voice_rate', 1.0),
-                voice_pitch=st.session_state.get('voice_pitch', 1.0),
-                voice_file=audio_file,
-            )
-
-            # 如果语音文件生成失败，使用默认内容重试
-            if not sub_maker:
-                play_content = "This is a example voice. if you hear this, the voice synthesis failed with the original content."
-                sub_maker = voice.tts(
-                    text=play_content,
-                    voice_name=voice_name,
-                    voice_rate=st.session_state.get('voice_rate', 1.0),
-                    voice_pitch=st.session_state.get('voice_pitch', 1.0),
-                    voice_file=audio_file,
-                )
-
-            if sub_maker and os.path.exists(audio_file):
-                st.success(tr("Voice synthesis successful"))
-                st.audio(audio_file, format="audio/mp3")
-                if os.path.exists(audio_file):
-                    os.remove(audio_file)
-            else:
-                st.error(tr("Voice synthesis failed"))
+        tts_engine = st.session_state.get('tts_engine') or config.ui.get("tts_engine", "edge_tts")
+        voice_rate = st.session_state.get('voice_rate', 1.0)
+        voice_pitch = st.session_state.get('voice_pitch', 1.0)
+
+        audio_file = voice_preview.cached_preview(tts_engine, voice_name, voice_rate, voice_pitch)
+        if not audio_file:
+            with st.spinner(tr("Synthesizing Voice")):
+                audio_file = voice_preview.get_preview(tts_engine, voice_name, voice_rate, voice_pitch)
+
+                # 如果语音文件生成失败，使用默认内容重试
+                if not audio_file:
+                    play_content = "This is a example voice. if you hear this, the voice synthesis failed with the original content."
+                    audio_file = voice_preview.get_preview(
+                        tts_engine, voice_name, voice_rate, voice_pitch, text=play_content
+                    )
+
+        if audio_file:
+            st.success(tr("Voice synthesis successful"))
+            st.audio(audio_file, format="audio/mp3")
+        else:
+            st.error(tr("Voice synthesis failed"))
 
 
 def render_bgm_settings(tr):
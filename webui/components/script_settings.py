@@ -10,9 +10,6 @@ from loguru import logger
 from app.config import config
 from app.models.schema import VideoClipParams
 from app.utils import utils, check_script
-from webui.tools.generate_script_docu import generate_script_docu
-from webui.tools.generate_script_short import generate_script_short
-from webui.tools.generate_short_summary import generate_script_short_sunmmary
 
 
 def render_script_panel(tr):
@@ -203,34 +200,9 @@ def render_video_file(tr, params):
         # 清空旧的脚本路径
         params.video_clip_json_path = ''
         
-        # 关键修复：清理旧视频的所有缓存（关键帧、分析结果）
+        # 关键修复：清理旧视频的分析结果缓存
+        # （关键帧缓存按视频内容指纹存储，不会与新视频混用，保留以便切回旧视频时复用）
         try:
-            # 清理关键帧缓存
-            keyframes_dir = os.path.join(utils.temp_dir(), "keyframes")
-            if os.path.exists(keyframes_dir):
-                try:
-                    old_video_hash = None
-                    if previous_video_path and os.path.exists(previous_video_path):
-                        old_video_hash = utils.md5(
-                            os.path.abspath(previous_video_path) + str(os.path.getmtime(previous_video_path))
-                        )
-
-                    if old_video_hash:
-                        old_keyframes_dir = os.path.join(keyframes_dir, old_video_hash)
-                        if os.path.exists(old_keyframes_dir):
-                            shutil.rmtree(old_keyframes_dir)
-                            logger.info(f"已删除旧视频的关键帧缓存: {old_keyframes_dir}")
-                    else:
-                        shutil.rmtree(keyframes_dir)
-                        logger.info("旧视频文件不存在，已清空全部关键帧缓存目录")
-                except Exception as e:
-                    logger.warning(f"按哈希清理关键帧缓存失败，将清空整个缓存目录: {e}")
-                    try:
-                        shutil.rmtree(keyframes_dir)
-                        logger.info("已清空关键帧缓存目录")
-                    except Exception as remove_err:
-                        logger.error(f"删除关键帧缓存目录失败: {remove_err}")
-
             # 清理分析结果缓存（直接清空目录，避免遗留）
             analysis_dir = os.path.join(utils.storage_dir(), "temp", "analysis")
             if os.path.exists(analysis_dir):
@@ -267,13 +239,14 @@ def render_video_file(tr, params):
                 file_name_with_timestamp = f"{file_name}_{timestamp}"
                 video_file_path = os.path.join(utils.video_dir(), file_name_with_timestamp + file_extension)
 
-            with open(video_file_path, "wb") as f:
-                f.write(uploaded_file.read())
-                st.success(tr("File Uploaded Successfully"))
-                st.session_state['video_origin_path'] = video_file_path
-                params.video_origin_path = video_file_path
-                time.sleep(1)
-                st.rerun()
+            # 按块流式保存，同时计算内容指纹并探测视频信息，供后续缓存和渲染复用
+            from app.utils.uploads import save_stream
+            save_stream(uploaded_file, video_file_path)
+            st.success(tr("File Uploaded Successfully"))
+            st.session_state['video_origin_path'] = video_file_path
+            params.video_origin_path = video_file_path
+            time.sleep(1)
+            st.rerun()
 
 
 def render_short_generate_options(tr):
@@ -423,6 +396,11 @@ def render_script_buttons(tr, params):
         button_name = tr("Please Select Script File")
 
     if st.button(button_name, key="script_action", disabled=not script_path):
+        # 脚本生成器依赖视觉/文本模型 SDK，点击按钮时才加载
+        from webui.tools.generate_script_docu import generate_script_docu
+        from webui.tools.generate_script_short import generate_script_short
+        from webui.tools.generate_short_summary import generate_script_short_sunmmary
+
         if script_path == "auto":
             # 执行纪录片视频脚本生成（视频无字幕无配音）
             generate_script_docu(params)
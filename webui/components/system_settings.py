@@ -4,15 +4,21 @@ import shutil
 import glob
 from loguru import logger
 
+from app.services.storage_manager import AREAS, get_storage_manager
 from app.utils.utils import storage_dir
 
 
 def clear_directory(dir_path, tr):
     """清理指定目录"""
     if os.path.exists(dir_path):
+        manager = get_storage_manager()
         try:
             for item in os.listdir(dir_path):
                 item_path = os.path.join(dir_path, item)
+                if manager.is_pinned(item_path):
+                    # 正在运行的任务使用的文件不删除
+                    logger.info(f"跳过正在使用的文件: {item_path}")
+                    continue
                 try:
                     if os.path.isfile(item_path):
                         os.unlink(item_path)
@@ -67,6 +73,16 @@ def render_system_panel(tr):
                 else:
                     st.info("分析结果目录不存在")
         
+        # 存储占用与按配额清理（只删除最久未使用且未被运行中任务占用的缓存）
+        st.divider()
+        manager = get_storage_manager()
+        usage = manager.usage()
+        st.caption(" | ".join(f"{area}: {usage[area] / 1024 / 1024:.0f} MB" for area in AREAS))
+        if st.button("按配额清理缓存", use_container_width=True,
+                     help="按 config.toml 中的 storage_quota_gb / storage_area_quotas_gb / storage_max_age_days 清理最久未使用的缓存"):
+            freed = manager.sweep()
+            st.success(f"✅ 已释放 {freed / 1024 / 1024:.1f} MB")
+
         # 新增：一键清理所有缓存
         st.divider()
         if st.button("🗑️ 一键清理所有缓存", use_container_width=True, type="primary", 
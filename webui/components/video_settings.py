@@ -41,6 +41,22 @@ def render_video_config(tr, params):
     )
     st.session_state['video_quality'] = video_qualities[quality_index][1]
 
+    # 草稿预览：从低分辨率代理快速渲染，时间轴与成片一致
+    params.draft = st.checkbox(
+        tr("Draft Preview"),
+        value=False,
+        help=tr("Render a fast low-resolution preview with the same timeline as the final video")
+    )
+    st.session_state['draft'] = params.draft
+
+    # 增量渲染：只重新生成有变化的片段
+    params.incremental = st.checkbox(
+        tr("Incremental Render"),
+        value=False,
+        help=tr("Reuse the voiceover and clips of unchanged segments from the last render of this video")
+    )
+    st.session_state['incremental'] = params.incremental
+
     # 原声音量 - 使用统一的默认值
     params.original_volume = st.slider(
         tr("Original Volume"),
@@ -58,5 +74,7 @@ def get_video_params():
     return {
         'video_aspect': st.session_state.get('video_aspect', VideoAspect.portrait.value),
         'video_quality': st.session_state.get('video_quality', '1080p'),
-        'original_volume': st.session_state.get('original_volume', AudioVolumeDefaults.ORIGINAL_VOLUME)
+        'original_volume': st.session_state.get('original_volume', AudioVolumeDefaults.ORIGINAL_VOLUME),
+        'draft': st.session_state.get('draft', False),
+        'incremental': st.session_state.get('incremental', False)
     }
@@ -6,11 +6,6 @@ from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
 from app.config import config
-# 导入新的LLM服务模块 - 确保提供商被注册
-import app.services.llm  # 这会触发提供商注册
-from app.services.llm.migration_adapter import create_vision_analyzer as create_vision_analyzer_new
-# 保留旧的导入以确保向后兼容
-from app.utils import gemini_analyzer, qwenvl_analyzer
 
 
 def create_vision_analyzer(provider, api_key, model, base_url):
@@ -39,19 +34,22 @@ def create_vision_analyzer(provider, api_key, model, base_url):
                 logger.error(f"LLM提供商重新注册失败: {reg_error}")
                 # 继续尝试使用旧实现
         
-        # 优先使用新的LLM服务架构
+        # 优先使用新的LLM服务架构（延迟导入，避免页面启动时加载视觉模型依赖）
+        from app.services.llm.migration_adapter import create_vision_analyzer as create_vision_analyzer_new
         return create_vision_analyzer_new(provider, api_key, model, base_url)
     except Exception as e:
         logger.warning(f"使用新LLM服务失败，回退到旧实现: {str(e)}")
 
         # 回退到旧的实现以确保兼容性
         if provider == 'gemini':
+            from app.utils import gemini_analyzer
             return gemini_analyzer.VisionAnalyzer(model_name=model, api_key=api_key, base_url=base_url)
         elif provider == 'gemini(openai)':
             from app.utils.gemini_openai_analyzer import GeminiOpenAIAnalyzer
             return GeminiOpenAIAnalyzer(model_name=model, api_key=api_key, base_url=base_url)
         else:
             # 只传入必要的参数
+            from app.utils import qwenvl_analyzer
             return qwenvl_analyzer.QwenAnalyzer(
                 model_name=model,
                 api_key=api_key,
@@ -153,6 +151,10 @@ def get_batch_files(keyframe_files, result, batch_size=5):
     """
     获取当前批次的图片文件
     """
+    if 'image_start' in result and 'images_processed' in result:
+        # 批次由规划器按 token 预算划分时，使用结果中记录的实际范围
+        batch_start = result['image_start']
+        return keyframe_files[batch_start:batch_start + result['images_processed']]
     batch_start = result['batch_index'] * batch_size
     batch_end = min(batch_start + batch_size, len(keyframe_files))
     return keyframe_files[batch_start:batch_end]
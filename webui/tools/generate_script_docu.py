@@ -9,7 +9,9 @@ from loguru import logger
 from datetime import datetime
 
 from app.config import config
-from app.utils import utils, video_processor
+from app.utils import utils
+from app.utils.async_runtime import run_sync
+from app.utils.fingerprint import file_fingerprint
 from webui.tools.base import create_vision_analyzer, get_batch_files, get_batch_timestamps, chekc_video_config
 
 
@@ -39,146 +41,77 @@ def generate_script_docu(params):
             """
             update_progress(10, "正在提取关键帧...")
 
-            # 创建临时目录用于存储关键帧
-            keyframes_dir = os.path.join(utils.temp_dir(), "keyframes")
-            
-            # 关键修复：使用视频文件的完整路径和修改时间生成唯一哈希
-            # 确保即使文件名相同，但文件内容不同时也能正确识别
-            video_path_normalized = os.path.abspath(params.video_origin_path)
-            video_mtime = os.path.getmtime(video_path_normalized) if os.path.exists(video_path_normalized) else 0
-            video_hash = utils.md5(video_path_normalized + str(video_mtime))
-            video_keyframes_dir = os.path.join(keyframes_dir, video_hash)
-            
-            logger.info(f"视频文件: {video_path_normalized}, 修改时间: {video_mtime}, 哈希: {video_hash}")
-
-            # 检查是否已经提取过关键帧（必须完全匹配当前视频文件）
-            keyframe_files = []
-            if os.path.exists(video_keyframes_dir):
-                # 验证缓存目录是否属于当前视频文件
-                # 双重验证：检查目录中的标记文件（如果存在）
-                cache_valid = True
-                cache_marker_file = os.path.join(video_keyframes_dir, ".video_info.txt")
-                if os.path.exists(cache_marker_file):
-                    try:
-                        with open(cache_marker_file, 'r', encoding='utf-8') as f:
-                            cached_info = f.read().strip()
-                            if cached_info != video_path_normalized:
-                                logger.warning(f"缓存目录的视频路径不匹配: {cached_info} != {video_path_normalized}")
-                                cache_valid = False
-                    except Exception as e:
-                        logger.warning(f"读取缓存标记文件失败: {e}")
-                        cache_valid = False
-                
-                if cache_valid:
-                    # 取已有的关键帧文件
-                    for filename in sorted(os.listdir(video_keyframes_dir)):
-                        if filename.endswith('.jpg'):
-                            keyframe_files.append(os.path.join(video_keyframes_dir, filename))
-
-                    if keyframe_files:
-                        logger.info(f"使用已缓存的关键帧: {video_keyframes_dir}")
-                        st.info(f"✅ 使用已缓存关键帧，共 {len(keyframe_files)} 帧")
-                        update_progress(20, f"使用已缓存关键帧，共 {len(keyframe_files)} 帧")
-                else:
-                    # 缓存无效，删除旧缓存目录
-                    logger.warning(f"检测到无效缓存，删除旧缓存目录: {video_keyframes_dir}")
-                    import shutil
-                    try:
-                        shutil.rmtree(video_keyframes_dir)
-                        logger.info("已删除无效缓存目录")
-                    except Exception as e:
-                        logger.error(f"删除无效缓存目录失败: {e}")
-
-            # 如果没有缓存的关键帧，则进行提取
-            if not keyframe_files:
-                try:
-                    # 确保目录存在
-                    os.makedirs(video_keyframes_dir, exist_ok=True)
-                    
-                    # 关键修复：保存视频文件信息到缓存目录，用于后续验证
-                    cache_marker_file = os.path.join(video_keyframes_dir, ".video_info.txt")
-                    try:
-                        with open(cache_marker_file, 'w', encoding='utf-8') as f:
-                            f.write(video_path_normalized)
-                        logger.info(f"已保存视频信息到缓存标记文件: {cache_marker_file}")
-                    except Exception as marker_error:
-                        logger.warning(f"保存缓存标记文件失败: {marker_error}")
+            # 获取帧间隔，确保不是 None
+            frame_interval = st.session_state.get('frame_interval_input')
+            if frame_interval is None:
+                frame_interval = 5.0  # 默认值
+                logger.warning(f"帧间隔未设置，使用默认值: {frame_interval}秒")
 
-                    # 初始化视频处理器
-                    processor = video_processor.VideoProcessor(params.video_origin_path)
-
-                    # 验证视频信息是否有效
-                    if processor.fps is None or processor.fps <= 0:
-                        raise ValueError(f"无法获取有效的视频帧率信息，请检查视频文件: {params.video_origin_path}")
-                    if processor.duration is None or processor.duration <= 0:
-                        raise ValueError(f"无法获取有效的视频时长信息，请检查视频文件: {params.video_origin_path}")
+            # 确保 frame_interval 是有效的数字
+            try:
+                frame_interval = float(frame_interval)
+                if frame_interval <= 0:
+                    frame_interval = 5.0
+                    logger.warning(f"帧间隔无效，使用默认值: {frame_interval}秒")
+            except (ValueError, TypeError):
+                frame_interval = 5.0
+                logger.warning(f"帧间隔格式错误，使用默认值: {frame_interval}秒")
 
-                    # 显示视频信息
-                    st.info(f"📹 视频信息: {processor.width}x{processor.height}, {processor.fps:.1f}fps, {processor.duration:.1f}秒")
+            def extract_keyframes(processor, output_dir, interval):
+                # 验证视频信息是否有效
+                if processor.fps is None or processor.fps <= 0:
+                    raise ValueError(f"无法获取有效的视频帧率信息，请检查视频文件: {params.video_origin_path}")
+                if processor.duration is None or processor.duration <= 0:
+                    raise ValueError(f"无法获取有效的视频时长信息，请检查视频文件: {params.video_origin_path}")
 
-                    # 处理视频并提取关键帧 - 直接使用超级兼容性方案
-                    update_progress(15, "正在提取关键帧（使用超级兼容性方案）...")
+                # 显示视频信息
+                st.info(f"📹 视频信息: {processor.width}x{processor.height}, {processor.fps:.1f}fps, {processor.duration:.1f}秒")
 
-                    # 获取帧间隔，确保不是 None
-                    frame_interval = st.session_state.get('frame_interval_input')
-                    if frame_interval is None:
-                        frame_interval = 5.0  # 默认值
-                        logger.warning(f"帧间隔未设置，使用默认值: {frame_interval}秒")
-                    
-                    # 确保 frame_interval 是有效的数字
-                    try:
-                        frame_interval = float(frame_interval)
-                        if frame_interval <= 0:
-                            frame_interval = 5.0
-                            logger.warning(f"帧间隔无效，使用默认值: {frame_interval}秒")
-                    except (ValueError, TypeError):
-                        frame_interval = 5.0
-                        logger.warning(f"帧间隔格式错误，使用默认值: {frame_interval}秒")
-
-                    try:
-                        # 使用优化的关键帧提取方法
-                        processor.extract_frames_by_interval_ultra_compatible(
-                            output_dir=video_keyframes_dir,
-                            interval_seconds=frame_interval,
-                        )
-                    except Exception as extract_error:
-                        logger.error(f"关键帧提取失败: {extract_error}")
-                        
-                        # 提供详细的错误信息和解决建议
-                        error_msg = str(extract_error)
-                        if "权限" in error_msg or "permission" in error_msg.lower():
-                            suggestion = "建议：检查输出目录权限，或更换输出位置"
-                        elif "空间" in error_msg or "space" in error_msg.lower():
-                            suggestion = "建议：检查磁盘空间是否足够"
-                        else:
-                            suggestion = "建议：检查视频文件是否损坏，或尝试转换为标准格式"
-
-                        raise Exception(f"关键帧提取失败: {error_msg}\n{suggestion}")
-
-                    # 获取所有关键文件路径
-                    for filename in sorted(os.listdir(video_keyframes_dir)):
-                        if filename.endswith('.jpg'):
-                            keyframe_files.append(os.path.join(video_keyframes_dir, filename))
+                # 处理视频并提取关键帧 - 直接使用超级兼容性方案
+                update_progress(15, "正在提取关键帧（使用超级兼容性方案）...")
+                processor.extract_frames_by_interval_ultra_compatible(
+                    output_dir=output_dir,
+                    interval_seconds=interval,
+                )
 
-                    if not keyframe_files:
-                        # 检查目录中是否有其他文件
-                        all_files = os.listdir(video_keyframes_dir)
-                        logger.error(f"关键帧目录内容: {all_files}")
-                        raise Exception("未提取到任何关键帧文件，请检查视频文件格式")
+            # 关键帧按视频内容指纹缓存：重命名/复制视频后仍可复用，
+            # 已有更密集间隔的提取结果时直接抽取子集，未完成的提取不会被当作缓存；
+            # 没有缓存时单进程流式解码，帧在内存中直接交给视觉分析，失败时回退到超级兼容性方案
+            try:
+                from app.services.keyframe_store import get_store
+                store = get_store()
+                try:
+                    keyframe_set = store.get_for_vision(params.video_origin_path, frame_interval)
+                except ValueError:
+                    raise
+                except Exception as stream_error:
+                    logger.warning(f"流式解码关键帧失败，改用超级兼容性方案: {stream_error}")
+                    keyframe_set = store.get_or_extract(
+                        params.video_origin_path,
+                        frame_interval,
+                        extract=extract_keyframes
+                    )
+            except Exception as extract_error:
+                logger.error(f"关键帧提取失败: {extract_error}")
 
-                    update_progress(20, f"关键帧提取完成，共 {len(keyframe_files)} 帧")
-                    st.success(f"✅ 成功提取 {len(keyframe_files)} 个关键帧")
+                # 提供详细的错误信息和解决建议
+                error_msg = str(extract_error)
+                if "权限" in error_msg or "permission" in error_msg.lower():
+                    suggestion = "建议：检查输出目录权限，或更换输出位置"
+                elif "空间" in error_msg or "space" in error_msg.lower():
+                    suggestion = "建议：检查磁盘空间是否足够"
+                else:
+                    suggestion = "建议：检查视频文件是否损坏，或尝试转换为标准格式"
 
-                except Exception as e:
-                    # 如果提取失败，清理创建的目录
-                    try:
-                        if os.path.exists(video_keyframes_dir):
-                            import shutil
-                            shutil.rmtree(video_keyframes_dir)
-                    except Exception as cleanup_err:
-                        logger.error(f"清理失败的关键帧目录时出错: {cleanup_err}")
+                raise Exception(f"关键帧提取失败: {error_msg}\n{suggestion}")
 
-                    raise Exception(f"关键帧提取失败: {str(e)}")
+            keyframe_files = keyframe_set.files
+            if keyframe_set.cached:
+                st.info(f"✅ 使用已缓存关键帧，共 {len(keyframe_files)} 帧")
+                update_progress(20, f"使用已缓存关键帧，共 {len(keyframe_files)} 帧")
+            else:
+                update_progress(20, f"关键帧提取完成，共 {len(keyframe_files)} 帧")
+                st.success(f"✅ 成功提取 {len(keyframe_files)} 个关键帧")
 
             """
             2. 视觉分析(批量分析每一帧)
@@ -257,10 +190,6 @@ def generate_script_docu(params):
                 logger.info(f"开始视觉分析: 共{total_frames}帧，批处理大小={vision_batch_size}，预计{estimated_batches}个批次")
                 update_progress(40, f"正在分析关键帧 ({total_frames}帧，预计{estimated_batches}个批次)...")
 
-                # ===================创建异步事件循环===================
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-
                 vision_analysis_prompt = """
 我提供了 %s 张视频帧，它们按时间顺序排列，代表一个连续的视频片段。请仔细分析每一帧的内容，并关注帧与帧之间的变化，以理解整个片段的活动。
 
@@ -304,8 +233,33 @@ def generate_script_docu(params):
                 # 格式化提示词，填充帧数量
                 formatted_prompt = vision_analysis_prompt % (len(keyframe_files), len(keyframe_files), len(keyframe_files))
                 
+                async def analyze_batch(batch_files, current_batch):
+                    """分析单个批次，超时后重试"""
+                    max_retries = 2
+                    for attempt in range(max_retries):
+                        try:
+                            # 使用asyncio.wait_for添加超时控制
+                            return await asyncio.wait_for(
+                                analyzer.analyze_images(
+                                    images=keyframe_set.for_analysis(batch_files),
+                                    prompt=formatted_prompt,
+                                    batch_size=len(batch_files),  # 这个批次的实际大小
+                                    timeout=600,
+                                    retries=2
+                                ),
+                                timeout=600  # 10分钟超时
+                            )
+                        except asyncio.TimeoutError:
+                            logger.warning(f"批次{current_batch}在第{attempt + 1}次尝试时超时，正在重试...")
+                            if attempt < max_retries - 1:
+                                await asyncio.sleep(2)
+                                continue
+                            raise
+                    raise asyncio.TimeoutError()
+
                 # 添加带进度的批处理包装
-                async def analyze_with_progress():
+                # 批次协程提交到共享的后台事件循环执行，进度更新留在当前（Streamlit脚本）线程
+                def analyze_with_progress():
                     """带进度显示的批处理分析"""
                     all_results = []
                     batch_count = (len(keyframe_files) + vision_batch_size - 1) // vision_batch_size
@@ -320,50 +274,31 @@ def generate_script_docu(params):
                         logger.info(f"处理批次 {current_batch}/{batch_count}: {len(batch_files)}张图片")
                         
                         try:
-                            batch_result = None
-                            max_retries = 2
-                            for attempt in range(max_retries):
-                                try:
-                                    # 使用asyncio.wait_for添加超时控制
-                                    batch_result = await asyncio.wait_for(
-                                        analyzer.analyze_images(
-                                            images=batch_files,
-                                            prompt=formatted_prompt,
-                                            batch_size=len(batch_files),  # 这个批次的实际大小
-                                            timeout=600,
-                                            retries=2
-                                        ),
-                                        timeout=600  # 10分钟超时
-                                    )
-                                    break
-                                except asyncio.TimeoutError:
-                                    logger.warning(f"批次{current_batch}在第{attempt + 1}次尝试时超时，正在重试...")
-                                    if attempt < max_retries - 1:
-                                        await asyncio.sleep(2)
-                                        continue
-                                    raise
-                            if batch_result is None:
-                                raise asyncio.TimeoutError()
-                            
-                            # analyzer.analyze_images返回List[Dict]，对于单个批次通常只有一个元素
+                            batch_result = run_sync(analyze_batch(batch_files, current_batch))
+                            # analyzer.analyze_images返回List[Dict]，通常只有一个元素；
+                            # 当批次超出模型的 token/请求体预算时会被拆分为多个子批次
                             # 处理返回结果
                             if isinstance(batch_result, list) and len(batch_result) > 0:
-                                # 取第一个结果（单个批次应该只有一个结果）
-                                batch_result_dict = batch_result[0] if isinstance(batch_result[0], dict) else {
-                                    'batch_index': current_batch - 1,
-                                    'response': str(batch_result[0]) if batch_result[0] else '',
-                                    'images_processed': len(batch_files)
-                                }
-                                batch_result_dict['batch_index'] = current_batch - 1
-                                all_results.append(batch_result_dict)
+                                for sub_result in batch_result:
+                                    batch_result_dict = sub_result if isinstance(sub_result, dict) else {
+                                        'response': str(sub_result) if sub_result else '',
+                                        'images_processed': len(batch_files)
+                                    }
+                                    batch_result_dict['batch_index'] = len(all_results)
+                                    # 子批次的起始位置换算为在全部关键帧中的位置
+                                    batch_result_dict['image_start'] = batch_idx + batch_result_dict.get('image_start', 0)
+                                    all_results.append(batch_result_dict)
                             elif isinstance(batch_result, dict):
-                                batch_result['batch_index'] = current_batch - 1
+                                batch_result['batch_index'] = len(all_results)
+                                batch_result.setdefault('image_start', batch_idx)
+                                batch_result.setdefault('images_processed', len(batch_files))
                                 all_results.append(batch_result)
                             else:
                                 logger.warning(f"批次{current_batch}返回格式异常: {type(batch_result)}")
                                 # 尝试转换
                                 all_results.append({
-                                    'batch_index': current_batch - 1,
+                                    'batch_index': len(all_results),
+                                    'image_start': batch_idx,
                                     'response': str(batch_result) if batch_result else '',
                                     'images_processed': len(batch_files)
                                 })
@@ -371,31 +306,31 @@ def generate_script_docu(params):
                         except asyncio.TimeoutError:
                             logger.error(f"批次{current_batch}处理超时（超过5分钟）")
                             all_results.append({
-                                'batch_index': current_batch - 1,
+                                'batch_index': len(all_results),
+                                'image_start': batch_idx,
                                 'error': f'处理超时（超过5分钟），可能API响应过慢',
                                 'images_processed': len(batch_files)
                             })
                         except Exception as e:
                             logger.error(f"批次{current_batch}处理失败: {str(e)}")
                             all_results.append({
-                                'batch_index': current_batch - 1,
+                                'batch_index': len(all_results),
+                                'image_start': batch_idx,
                                 'error': str(e),
                                 'images_processed': len(batch_files)
                             })
                         
                         # 批次间短暂停顿，避免API限流
                         if current_batch < batch_count:
-                            await asyncio.sleep(0.5)
+                            time.sleep(0.5)
                     
                     return all_results
                 
                 try:
-                    results = loop.run_until_complete(analyze_with_progress())
+                    results = analyze_with_progress()
                 except Exception as e:
                     logger.exception(f"视觉分析API调用失败: {str(e)}")
                     raise Exception(f"视觉分析API调用失败: {str(e)}\n\n请检查：\n1. API配置是否正确\n2. 网络连接是否正常\n3. API密钥是否有效\n4. 如果长时间无响应，可能是API服务异常")
-                finally:
-                    loop.close()
                 
                 # 验证results不为空
                 if not results:
@@ -617,6 +552,10 @@ def generate_script_docu(params):
                 
                 logger.info(f"成功合并分析结果: {len(merged_frame_observations)}个帧观察, {len(overall_activity_summaries)}个总结")
                 
+                # 分析结果关联的视频信息（哈希与关键帧存储一致，使用内容指纹）
+                video_path_normalized = os.path.abspath(params.video_origin_path)
+                video_hash = file_fingerprint(params.video_origin_path)
+
                 # 使用当前时间创建文件名
                 now = datetime.now()
                 timestamp_str = now.strftime("%Y%m%d_%H%M")
@@ -812,14 +751,25 @@ def generate_script_docu(params):
                 # 生成解说文案
                 logger.info(f"使用视频类型 '{video_type}' 生成解说文案")
                 update_progress(85, f"正在生成解说文案（视频类型：{video_type}）...")
-                
+
+                # 流式生成：每完成一个片段就在界面上预览，不必等待完整响应
+                narration_preview = st.empty()
+                streamed_items = []
+
+                def on_narration_item(item):
+                    streamed_items.append(item)
+                    update_progress(85, f"正在生成解说文案（视频类型：{video_type}）... 已生成 {len(streamed_items)} 段")
+                    narration_preview.caption(f"#{len(streamed_items)} {item.get('timestamp', '')} {item.get('narration', '')}")
+
                 narration = generate_narration(
                     markdown_output,
                     text_api_key,
                     base_url=text_base_url,
                     model=text_model,
-                    video_type=video_type
+                    video_type=video_type,
+                    on_item=on_narration_item
                 )
+                narration_preview.empty()
                 
                 logger.info(f"解说文案生成完成，类型：{video_type}")
 
@@ -113,12 +113,9 @@ def save_uploaded_file(uploaded_file, save_dir, allowed_types=None):
             new_file_name = f"{file_name}_{timestamp}{file_extension}"
             save_path = os.path.join(save_dir, new_file_name)
         
-        # 保存文件
-        with open(save_path, "wb") as f:
-            f.write(uploaded_file.read())
-        
-        logger.info(f"文件保存成功: {save_path}")
-        return save_path
+        # 按块流式保存，避免把整个文件再复制一份到内存
+        from app.utils.uploads import save_stream
+        return save_stream(uploaded_file, save_path)
     
     except Exception as e:
         logger.error(f"保存上传文件失败: {e}")